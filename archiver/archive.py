@@ -1,5 +1,4 @@
 # archive.py
-import base64
 import datetime
 import hashlib
 import json
@@ -17,9 +16,7 @@ from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
 
-import cv2
 import ijson
-import numpy as np
 import pyautogui
 import pygetwindow as gw
 from dotenv import load_dotenv
@@ -33,10 +30,16 @@ from archiver.summarizers import download_log as dl
 from archiver.summarizers.har_summary_generator import generate_entities_summary
 from extractors.extract_photos import PhotoAcquisitionConfig
 from extractors.extract_videos import VideoAcquisitionConfig
+from extractors import har_body_store, har_index
+from extractors.har_body_store import BodyStore, encode_body, resolve_body_ref
+from extractors.har_index import HarIndex, HarIndexEntry, har_entry_urls, har_index_entry
+from extractors.structures_to_entities import HarScanner, HarScanResult
 from root_anchor import ROOT_DIR
 from utils.commit_tracker.git_helper import ensure_committed
 from utils.ffmpeg_installer import ensure_ffmpeg_installed
 from utils.integrity import FileIntegrity, protect_file, seal_archive
+from utils.integrity import par2 as par2_mod
+from utils.integrity.chunk_manifest import ChunkHasher
 from utils.misc import ensure_vpn_connection, get_my_public_ip, get_system_info
 from utils.par2_installer import ensure_par2_installed
 
@@ -193,18 +196,23 @@ def get_tls_certs_for_domains(domain_resolutions: Optional[dict]) -> dict:
     return certs
 
 
-def resolve_har_domains(har_path: Path) -> dict:
-    """Parse all unique hostnames from HAR requests and resolve each to an IP."""
+def har_hostnames(har_path: Path) -> set[str]:
+    hostnames = set()
+    for url in har_entry_urls(har_path):
+        if url:
+            hostname = urlparse(url).hostname
+            if hostname:
+                hostnames.add(hostname)
+    return hostnames
+
+
+def resolve_har_domains(har_path: Path, hostnames: Optional[set[str]] = None) -> dict:
+    """Parse all unique hostnames from HAR requests and resolve each to an IP.
+    Pass ``hostnames`` when they were already collected (HarFinalizationTaps)."""
     resolutions = {}
     try:
-        hostnames = set()
-        with open(har_path, 'rb') as f:
-            for entry in ijson.items(f, 'log.entries.item'):
-                url = entry.get('request', {}).get('url', '')
-                if url:
-                    hostname = urlparse(url).hostname
-                    if hostname:
-                        hostnames.add(hostname)
+        if hostnames is None:
+            hostnames = har_hostnames(har_path)
         for hostname in sorted(hostnames):
             try:
                 resolutions[hostname] = socket.getaddrinfo(hostname, None)[0][4][0]
@@ -218,6 +226,9 @@ def resolve_har_domains(har_path: Path) -> dict:
 
 def screen_record(output_path, stop_event, frame_hashes_path=None):
     # Screen recording using OpenCV, only capturing the Playwright browser window
+    import cv2
+    import numpy as np
+
     window_keywords = ("Nightly")
     browser_window = None
     for attempt in range(5):
@@ -411,7 +422,36 @@ def get_storage_config() -> Optional[StorageConfig]:
     return StorageConfig(**storage_config_dict)
 
 
-def merge_har_attachments(har_path: Path) -> Path:
+class HarFinalizationTaps:
+    """
+    Consumers fed by merge_har_attachments while it writes the merged HAR.
+
+    finish_recording used to read the merged HAR again for each of domain
+    resolution, the chunk manifest (protect_file) and the summary's structure
+    scan. The merge already has every entry in memory and every output byte in
+    hand, so it feeds them here instead; none of the outputs change.
+    """
+
+    def __init__(self):
+        self.chunks: Optional[ChunkHasher] = None  # set by the merge: bytes of the final file
+        self.hostnames: set[str] = set()
+        self.scanner = HarScanner()
+
+    def on_entry(self, entry: dict, meta: HarIndexEntry, archive_dir: Path) -> None:
+        """Called after the entry has been written, so it may be modified here."""
+        if meta.url:
+            hostname = urlparse(meta.url).hostname
+            if hostname:
+                self.hostnames.add(hostname)
+        if self.scanner.wants(meta):
+            resolve_body_ref(entry.get('response', {}).get('content'), archive_dir)
+            self.scanner.feed(entry)
+
+    def scan(self) -> HarScanResult:
+        return self.scanner.result()
+
+
+def merge_har_attachments(har_path: Path, taps: Optional[HarFinalizationTaps] = None) -> Path:
     """
     Playwright's record_har_content="attach" mode writes each response body as
     a separate file (named by content hash) in the same directory as the HAR,
@@ -422,6 +462,8 @@ def merge_har_attachments(har_path: Path) -> Path:
     Returns the path of the merged HAR.
     If the HAR contains no "_file" references it is moved as-is and the
     workspace is still removed.
+    With ``taps``, each merged entry and the output bytes are also fed to the
+    finalization consumers (see HarFinalizationTaps).
     """
     workspace_dir = har_path.parent
     final_path = workspace_dir.parent / "archive.har"
@@ -451,16 +493,37 @@ def merge_har_attachments(har_path: Path) -> Path:
     # warning fires) and only surfaces much later as un-reassemblable videos.
     dropped_count = 0
     dropped_by_mime: dict[str, int] = {}
+    # The merged HAR is written as bytes so entry offsets and the chunk hashes can
+    # be tracked on the way out; that gives its sidecar index (extractors/har_index.py)
+    # and its integrity manifest for free instead of a re-read by each consumer.
+    index_entries: list[HarIndexEntry] = []
+    chunks = ChunkHasher()
+    # Opt-in: bodies go to the archive's content-addressed store instead of being
+    # base64-inlined (extractors/har_body_store.py).
+    body_store = BodyStore(final_path.parent) if har_body_store.ENABLED else None
+    if taps is not None:
+        taps.chunks = chunks
+    offset = 0
+
+    def write(text: str) -> int:
+        nonlocal offset
+        data = text.encode('utf-8')
+        out_f.write(data)
+        chunks.update(data)
+        start = offset
+        offset += len(data)
+        return start
+
     with open(har_path, 'rb') as har_f, \
-         open(temp_path, 'w', encoding='utf-8') as out_f:
+         open(temp_path, 'wb') as out_f:
 
-        out_f.write('{"log":{')
-        out_f.write(f'"version":{json.dumps(version)}')
-        out_f.write(f',"creator":{json.dumps(creator, ensure_ascii=False)}')
+        write('{"log":{')
+        write(f'"version":{json.dumps(version)}')
+        write(f',"creator":{json.dumps(creator, ensure_ascii=False)}')
         if browser is not None:
-            out_f.write(f',"browser":{json.dumps(browser, ensure_ascii=False)}')
-        out_f.write(f',"pages":{json.dumps(pages, ensure_ascii=False)}')
-        out_f.write(',"entries":[')
+            write(f',"browser":{json.dumps(browser, ensure_ascii=False)}')
+        write(f',"pages":{json.dumps(pages, ensure_ascii=False)}')
+        write(',"entries":[')
 
         first = True
         for entry in ijson.items(har_f, 'log.entries.item', use_float=True):
@@ -471,22 +534,12 @@ def merge_har_attachments(har_path: Path) -> Path:
                 attachment_path = workspace_dir / file_ref
                 if attachment_path.exists():
                     body_bytes = attachment_path.read_bytes()
-                    mime = content.get('mimeType', '')
-                    is_text = (
-                        mime.startswith('text/') or
-                        'json' in mime or
-                        'xml' in mime or
-                        'javascript' in mime
-                    )
-                    if is_text:
-                        try:
-                            content['text'] = body_bytes.decode('utf-8')
-                        except UnicodeDecodeError:
-                            content['text'] = base64.b64encode(body_bytes).decode('ascii')
-                            content['encoding'] = 'base64'
+                    if body_store is not None:
+                        content['_file'], content['_sha256'] = body_store.put(body_bytes)
                     else:
-                        content['text'] = base64.b64encode(body_bytes).decode('ascii')
-                        content['encoding'] = 'base64'
+                        content['text'], encoding = encode_body(body_bytes, content.get('mimeType', ''))
+                        if encoding:
+                            content['encoding'] = encoding
                 else:
                     # Playwright recorded a `_file` reference but the attachment
                     # was never written to disk — almost always means
@@ -518,11 +571,16 @@ def merge_har_attachments(har_path: Path) -> Path:
                     dropped_by_mime[mime_key] = dropped_by_mime.get(mime_key, 0) + 1
 
             if not first:
-                out_f.write(',')
-            out_f.write(json.dumps(entry, ensure_ascii=False))
+                write(',')
+            serialized = json.dumps(entry, ensure_ascii=False)
+            entry_offset = write(serialized)
+            meta = har_index_entry(entry, entry_offset, offset - entry_offset)
+            index_entries.append(meta)
+            if taps is not None:
+                taps.on_entry(entry, meta, final_path.parent)
             first = False
 
-        out_f.write(']}}')
+        write(']}}')
 
     # Move the merged HAR to the archive root and delete the whole workspace.
     if missing_count:
@@ -555,11 +613,38 @@ def merge_har_attachments(har_path: Path) -> Path:
     # (e.g. a re-merge / resumed session), which would abort the merge and strand
     # the bodies in the workspace.
     os.replace(str(temp_path), str(final_path))
+    if body_store is not None:
+        body_store.write_index()
+        print(f"Stored {len(body_store.bodies)} distinct bodies in {har_body_store.BODY_DIR}/ "
+              f"({body_store.pooled} linked from the shared pool).")
+    if har_index.ENABLED:
+        st = final_path.stat()
+        HarIndex(final_path, index_entries, chunks.whole_file_sha256, st.st_size, st.st_mtime_ns).write()
     shutil.rmtree(workspace_dir)
     print("HAR merge complete.")
     return final_path
 
 
+def protect_body_store(archive_dir: Path) -> None:
+    """Protect bodies.json when the HAR's bodies live in the content-addressed store,
+    and write one PAR2 recovery set (bodies.par2) over the bodies/ tree. bodies.json's
+    manifest is sealed with the rest; each body file is named by its own hash, so
+    verification detects damage and the PAR2 set repairs it, as it would have inside
+    an inline HAR."""
+    if not har_body_store.uses_body_store(archive_dir):
+        return
+    try:
+        protect_file(archive_dir / har_body_store.INDEX_FILENAME)
+    except Exception as e:
+        traceback.print_exc()
+        print(f"❌ Body store integrity protection failed: {e}")
+    try:
+        par2_mod.create_tree_recovery(archive_dir / har_body_store.BODY_DIR)
+    except Exception as e:
+        traceback.print_exc()
+        print(f"⚠️  PAR2 recovery generation failed for {har_body_store.BODY_DIR}/: {e}")
+
+
 def _read_only_video_config() -> VideoAcquisitionConfig:
     """Acquisition config that links files already on disk but never downloads
     or reassembles anything. Used post-curation and from finalize_archive."""
@@ -666,6 +751,9 @@ def finish_recording(recording_thread: Optional[threading.Thread], archive_dir:
     # har_path may be updated by merge_har_attachments inside the try block below;
     # initialise here so it is always defined when generate_entities_summary runs.
     har_path = metadata.har_archive
+    # Filled by the merge so the steps after it don't re-read the HAR; None when
+    # the merge did not complete (each step then reads the HAR itself).
+    taps: Optional[HarFinalizationTaps] = None
 
     # video downloading configuration
     v_download_missing: bool = True
@@ -723,8 +811,10 @@ def finish_recording(recording_thread: Optional[threading.Thread], archive_dir:
         # Inline response bodies from the har_workspace into a single self-contained
         # HAR at archive_dir / "archive.har", then remove the workspace directory.
         try:
-            metadata.har_archive = merge_har_attachments(metadata.har_archive)
+            merge_taps = HarFinalizationTaps()
+            metadata.har_archive = merge_har_attachments(metadata.har_archive, merge_taps)
             har_path = metadata.har_archive
+            taps = merge_taps
         except Exception as e:
             traceback.print_exc()
             print(f"❌ HAR merge failed, proceeding with unmerged HAR: {e}")
@@ -732,7 +822,9 @@ def finish_recording(recording_thread: Optional[threading.Thread], archive_dir:
         # Resolve all domains contacted during the session, then capture the TLS
         # certificate each of them presented (platform-agnostic; covers every server
         # content was fetched from, not just the landing page).
-        metadata.domain_resolutions = resolve_har_domains(metadata.har_archive)
+        metadata.domain_resolutions = resolve_har_domains(
+            metadata.har_archive, taps.hostnames if taps else None
+        )
         metadata.tls_certs = get_tls_certs_for_domains(metadata.domain_resolutions)
 
         metadata.archiving_finished_timestamp = datetime.datetime.now().isoformat()
@@ -741,11 +833,12 @@ def finish_recording(recording_thread: Optional[threading.Thread], archive_dir:
         # HAR on top of the archive-level seal — the HAR is the load-bearing
         # evidence file, so an independent per-asset timestamp is worth the extra cost.
         try:
-            har_protection = protect_file(har_path, timestamp=True)
+            har_protection = protect_file(har_path, timestamp=True, prehashed=taps.chunks if taps else None)
             metadata.har_integrity = har_protection.to_integrity(base_dir=archive_dir)
         except Exception as e:
             traceback.print_exc()
             print(f"❌ HAR integrity protection failed: {e}")
+        protect_body_store(archive_dir)
 
     except Exception as e:
         traceback.print_exc()
@@ -782,9 +875,11 @@ def finish_recording(recording_thread: Optional[threading.Thread], archive_dir:
             metadata_dict,
             video_config,
             photo_config,
+            scan=taps.scan() if taps else None,
         )
     except Exception:
         traceback.print_exc()
+    taps = None  # the scan holds decoded media bodies; the re-render below re-reads via the index
 
     if storage_config.manually_curate_assets:
         try:
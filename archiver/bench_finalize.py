@@ -0,0 +1,134 @@
+"""
+Compare the archiver's HAR finalization done step by step (each consumer
+re-reading the merged HAR, as before the sidecar index existed) against the
+single pass in which merge_har_attachments feeds HarFinalizationTaps, and check
+that both produce the same outputs.
+
+Run from the project root on a copy of a captured session's workspace (the
+directory holding the unmerged archive.har and its attachment files; it is
+copied, never modified):
+
+    uv run python -m archiver.bench_finalize <path/to/har_workspace> [--runs N]
+
+Timed per mode: merge, hostname collection, chunk manifest, structure scan.
+DNS/TLS, PAR2 and OpenTimestamps are identical in both modes and are left out.
+Exits non-zero if the merged HAR bytes, manifest (minus created_at), hostnames
+or scan results differ.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from archiver.archive import HarFinalizationTaps, har_hostnames, merge_har_attachments
+from extractors import har_index
+from extractors.structures_to_entities import _scan_har_once
+from utils.integrity.chunk_manifest import build_manifest
+
+
+def _scan_fingerprint(scan) -> str:
+    structures, videos, photos, requested_mp4_urls = scan
+    return json.dumps({
+        "structures": [s.model_dump() for s in structures],
+        "videos": sorted(v.model_dump_json() for v in videos),
+        "photos": sorted(p.model_dump_json() for p in photos),
+        "requested_mp4_urls": sorted(requested_mp4_urls),
+    }, sort_keys=True, default=str)
+
+
+def _fresh_workspace(source: Path, root: Path) -> Path:
+    if root.exists():
+        shutil.rmtree(root)
+    workspace = root / "har_workspace"
+    shutil.copytree(source, workspace)
+    return workspace / "archive.har"
+
+
+def _stepwise(har_path: Path) -> tuple[dict, dict]:
+    timings = {}
+    har_index.ENABLED = False
+    try:
+        t = time.perf_counter()
+        final_path = merge_har_attachments(har_path)
+        timings["merge"] = time.perf_counter() - t
+        t = time.perf_counter()
+        hostnames = har_hostnames(final_path)
+        timings["hostnames"] = time.perf_counter() - t
+        t = time.perf_counter()
+        manifest = build_manifest(final_path)
+        timings["manifest"] = time.perf_counter() - t
+        t = time.perf_counter()
+        scan = _scan_har_once(final_path)
+        timings["scan"] = time.perf_counter() - t
+    finally:
+        har_index.ENABLED = True
+    return timings, {"har": final_path.read_bytes(), "manifest": manifest, "hostnames": hostnames,
+                     "scan": _scan_fingerprint(scan)}
+
+
+def _single_pass(har_path: Path) -> tuple[dict, dict]:
+    timings = {}
+    taps = HarFinalizationTaps()
+    t = time.perf_counter()
+    final_path = merge_har_attachments(har_path, taps)
+    timings["merge"] = time.perf_counter() - t
+    t = time.perf_counter()
+    manifest = taps.chunks.manifest(final_path.name)
+    scan = taps.scan()
+    timings["manifest+scan"] = time.perf_counter() - t
+    return timings, {"har": final_path.read_bytes(), "manifest": manifest, "hostnames": taps.hostnames,
+                     "scan": _scan_fingerprint(scan)}
+
+
+def _compare(a: dict, b: dict) -> list[str]:
+    diffs = []
+    if a["har"] != b["har"]:
+        diffs.append("merged HAR bytes")
+    strip = lambda m: {k: v for k, v in m.items() if k != "created_at"}
+    if strip(a["manifest"]) != strip(b["manifest"]):
+        diffs.append("chunk manifest")
+    if a["hostnames"] != b["hostnames"]:
+        diffs.append("hostnames")
+    if a["scan"] != b["scan"]:
+        diffs.append("structure/media scan")
+    return diffs
+
+
+def main(workspace: Path, runs: int):
+    if not (workspace / "archive.har").exists():
+        print(f"No archive.har in {workspace}")
+        sys.exit(2)
+    totals = {"stepwise": [], "single-pass": []}
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(runs):
+            step_t, step_out = _stepwise(_fresh_workspace(workspace, Path(tmp) / "stepwise"))
+            single_t, single_out = _single_pass(_fresh_workspace(workspace, Path(tmp) / "single"))
+            totals["stepwise"].append(sum(step_t.values()))
+            totals["single-pass"].append(sum(single_t.values()))
+            print(f"run {run + 1}: stepwise "
+                  + ", ".join(f"{k}={v:.2f}s" for k, v in step_t.items())
+                  + " | single-pass "
+                  + ", ".join(f"{k}={v:.2f}s" for k, v in single_t.items()))
+            diffs = _compare(step_out, single_out)
+            if diffs:
+                failed = True
+                print(f"  MISMATCH: {', '.join(diffs)}")
+    size_mb = step_out["manifest"]["size"] / (1 << 20)
+    for mode, values in totals.items():
+        median = statistics.median(values)
+        print(f"{mode:12s} median {median:7.2f}s  ({size_mb / median:7.1f} MiB/s of merged HAR)")
+    print("outputs identical" if not failed else "OUTPUTS DIFFER")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("workspace", type=Path)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    main(args.workspace, args.runs)
@@ -2,7 +2,7 @@ import asyncio
 import os
 from pathlib import Path
 
-from har2warc.har2warc import har2warc
+from utils.har_to_warc import har_to_warc_file
 
 
 async def generate_warc(archive_name):
@@ -15,7 +15,7 @@ async def generate_warc(archive_name):
 
     har_file = archive_path / "archive.har"
     warc_file = archive_path / "archive.warc.gz"
-    har2warc(str(har_file), str(warc_file))
+    har_to_warc_file(har_file, warc_file)
     print(f"WARC file generated at: {warc_file}")
 
 
@@ -47,6 +47,7 @@ from archiver.archive import (
     get_storage_config,
     get_tls_certs_for_domains,
     merge_har_attachments,
+    protect_body_store,
     resolve_har_domains,
 )
 from archiver.summarizers.finalize_archive import finalize_archive
@@ -251,6 +252,7 @@ def resume_archive(archive_dir: Path) -> None:
     except Exception as e:
         traceback.print_exc()
         print(f"HAR integrity protection failed: {e}")
+    protect_body_store(archive_dir)
 
     metadata_dict = metadata.model_dump()
     (archive_dir / "metadata.json").write_text(
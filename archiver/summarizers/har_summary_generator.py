@@ -1,6 +1,6 @@
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 from bs4 import BeautifulSoup, Tag
 
@@ -10,7 +10,7 @@ from extractors.entity_types import (
 )
 from extractors.extract_photos import PhotoAcquisitionConfig
 from extractors.extract_videos import VideoAcquisitionConfig
-from extractors.structures_to_entities import extract_entities_from_har, nest_entities_from_archive_session
+from extractors.structures_to_entities import HarScanResult, extract_entities_from_har, nest_entities_from_archive_session
 
 
 def generate_stylesheet() -> str:
@@ -1027,9 +1027,11 @@ def generate_entities_summary(
         photo_acquisition_config: PhotoAcquisitionConfig = PhotoAcquisitionConfig(
             download_missing=False, download_media_not_in_structures=False, download_unfetched_media=False,
             download_highest_quality_assets_from_structures=False
-        )
+        ),
+        scan: Optional[HarScanResult] = None,
 ):
-    flattened_entities = extract_entities_from_har(har_path, video_acquisition_config, photo_acquisition_config)
+    flattened_entities = extract_entities_from_har(har_path, video_acquisition_config, photo_acquisition_config,
+                                                   scan=scan)
     nested_entities = nest_entities_from_archive_session(flattened_entities)
     html = summarize_nested_entities(nested_entities, metadata)
     archive_dir_str = archive_dir.as_posix()
@@ -0,0 +1,100 @@
+"""
+Check that the HAR readers give the same answers whether the response bodies are
+inline or in a body store (extractors/har_body_store.py, HAR_BODY_STORE=true).
+
+Writes every synthetic HAR archive (benchmarks/corpus.py) in both forms and, per
+pair, compares:
+
+  structures_from_har                          structures, as JSON; run twice, so both
+                                               the index-building pass and the indexed
+                                               read (extractors/har_index.py) are covered
+  keep_only_requests_for_known_structures      the filtered HARs' entries (the filtered
+                                               body-store HAR must be self-contained)
+  extract_data_from_har (Part B)               structures, videos and photos found
+
+Run from the project root:
+
+    uv run python -m benchmarks.check_body_store [--size small|medium|large] [--keep DIR]
+
+Exit status 1 on any difference.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Don't hard-link the synthetic bodies into the shared pool.
+os.environ["HAR_BODY_POOL_DIR"] = ""
+
+from benchmarks.corpus import add_spec_arguments, build_archives, spec_from_args, write_har
+from benchmarks.run import NO_DOWNLOAD_PHOTOS, NO_DOWNLOAD_VIDEOS
+from extractors.structures_extraction import keep_only_requests_for_known_structures, structures_from_har
+from extractors.structures_to_entities import extract_data_from_har, strip_media_contents
+
+
+def _structures_json(har_path: Path) -> str:
+    return json.dumps([s.model_dump() for s in structures_from_har(har_path)], default=str, sort_keys=True)
+
+
+def _filtered_entries(har_path: Path) -> list:
+    keep_only_requests_for_known_structures(har_path)
+    filtered = har_path.with_name(har_path.stem + "_filtered.har")
+    entries = json.loads(filtered.read_text(encoding="utf-8"))["log"]["entries"]
+    filtered.unlink()
+    return entries
+
+
+def _part_b_counts(har_path: Path) -> tuple[int, int, int]:
+    data = extract_data_from_har(har_path, NO_DOWNLOAD_VIDEOS, NO_DOWNLOAD_PHOTOS)
+    strip_media_contents(data)
+    return len(data.structures), len(data.videos), len(data.photos)
+
+
+def check_pair(inline_har: Path, stored_har: Path) -> list[str]:
+    problems = []
+    expected = _structures_json(inline_har)
+    if expected == "[]":
+        problems.append("no structures in the inline HAR; the comparison proves nothing")
+    for attempt in ("first read", "indexed read"):
+        if _structures_json(stored_har) != expected:
+            problems.append(f"structures_from_har differs ({attempt})")
+    stored_entries = _filtered_entries(stored_har)
+    if any("_file" in (e.get("response") or {}).get("content", {}) for e in stored_entries):
+        problems.append("filtered body-store HAR still refers to bodies/")
+    if stored_entries != _filtered_entries(inline_har):
+        problems.append("keep_only_requests_for_known_structures output differs")
+    inline_counts, stored_counts = _part_b_counts(inline_har), _part_b_counts(stored_har)
+    if inline_counts != stored_counts:
+        problems.append(f"extract_data_from_har found {stored_counts} instead of {inline_counts}")
+    return problems
+
+
+def main(args: argparse.Namespace) -> int:
+    spec = spec_from_args(args)
+    work_dir = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="check_body_store_"))
+    failures = 0
+    try:
+        for platform in args.platform:
+            for archive in build_archives(spec, platform):
+                inline_dir = write_har(archive, work_dir, "inline")
+                stored_dir = write_har(archive, work_dir, "stored", body_store=True)
+                problems = check_pair(inline_dir / "archive.har", stored_dir / "archive.har")
+                print(f"{stored_dir.name:60s} {'OK' if not problems else 'FAIL'}")
+                for problem in problems:
+                    print(f"    {problem}")
+                failures += bool(problems)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"{failures} archives differ" if failures else "All archives read the same in both layouts")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare HAR readers on inline and body-store archives")
+    parser.add_argument("--keep", help="Write the archives here and keep them")
+    add_spec_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""
+Check the tracer's percentiles (utils/tracing.py) on known inputs: the
+nearest-rank percentile must be the ceil(q * n)-th smallest sample, whether
+q * n is a whole number or not. Then record more spans than the per-name
+duration sample holds and check that it stays bounded, that count, total and
+max stay exact and that the sampled percentiles stay close to the true ones.
+
+Run from the project root:
+
+    uv run python -m benchmarks.check_tracing
+
+Exit status 1 on any difference.
+"""
+import sys
+
+from utils import tracing
+from utils.tracing import Span, Tracer, _percentile
+
+# (samples, q, expected)
+PERCENTILE_CASES = [
+    (list(range(1, 11)), 0.50, 5),     # q * n = 5: the 5th value, not the 6th
+    (list(range(1, 11)), 0.90, 9),
+    (list(range(1, 11)), 0.70, 7),     # 0.7 * 10 is 7.000000000000001 in floating point
+    (list(range(1, 11)), 0.99, 10),
+    (list(range(1, 11)), 0.05, 1),
+    (list(range(1, 10)), 0.50, 5),     # q * n = 4.5: rounds up to the 5th
+    (list(range(1, 101)), 0.99, 99),
+    (list(range(1, 101)), 0.995, 100),
+    ([42], 0.50, 42),
+    ([42], 0.99, 42),
+    ([1, 2], 0.0, 1),
+    ([1, 2], 1.0, 2),
+]
+
+
+def check_bounded_aggregates(spans: int = 5 * tracing.MAX_DURATION_SAMPLES) -> list[str]:
+    """Spans of 1..spans ms, in a shuffled order, under one name."""
+    tracer = Tracer(enabled=True)
+    order = list(range(1, spans + 1))
+    tracer._rng.shuffle(order)
+    for ms in order:
+        span = Span(tracer, "check", {})
+        span.start_ns, span.end_ns = 0, ms * 1_000_000
+        tracer._record(span)
+    problems = []
+    kept = len(tracer._aggregates["check"].samples)
+    if kept != tracing.MAX_DURATION_SAMPLES:
+        problems.append(f"{kept} durations kept, expected {tracing.MAX_DURATION_SAMPLES}")
+    s = tracer.summary()["check"]
+    if s["count"] != spans or s["max_s"] != round(spans / 1000, 4) \
+            or abs(s["total_s"] - spans * (spans + 1) / 2000) > 1e-3 * spans:
+        problems.append(f"count/total/max {s['count']}/{s['total_s']}/{s['max_s']} are not exact")
+    for key, q in (("p50_s", 0.50), ("p90_s", 0.90), ("p99_s", 0.99)):
+        true_s = _percentile(list(range(1, spans + 1)), q) / 1000
+        if abs(s[key] - true_s) > 0.02 * spans / 1000:  # within 2% of the range
+            problems.append(f"sampled {key} {s[key]} is far from the true {true_s}")
+    return problems
+
+
+def main() -> int:
+    failures = 0
+    for samples, q, expected in PERCENTILE_CASES:
+        got = _percentile(samples, q)
+        ok = got == expected
+        failures += not ok
+        print(f"p{q * 100:g} of {len(samples)} samples: {got} {'OK' if ok else f'FAIL (expected {expected})'}")
+    problems = check_bounded_aggregates()
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("Bounded duration sample: OK")
+    failures += len(problems)
+    print(f"{failures} case(s) failed" if failures else "All percentile cases match")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
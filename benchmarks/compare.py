@@ -0,0 +1,93 @@
+"""
+Compare two benchmark result files (benchmarks/run.py) and flag regressions.
+
+A timing metric regresses when its median is both more than `threshold` slower
+(relative) and more than `min_delta_s` slower (absolute) than the baseline's; the
+absolute floor keeps millisecond-scale metrics from flapping on noise. Item
+counts (entities extracted, rows written, search hits) must match exactly: a
+changed count means the code now produces different output from the same
+corpus, which is reported alongside the timings.
+
+Timings are only comparable on the same corpus, so a corpus digest mismatch is
+an error; a different machine or Python version is only a warning.
+
+    uv run python -m benchmarks.compare <results.json> <baseline.json> [--threshold 0.15] [--min-delta-ms 5]
+
+Exits 1 on any regression or changed count.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_MIN_DELTA_S = 0.005
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+                    min_delta_s: float = DEFAULT_MIN_DELTA_S) -> tuple[list[str], int]:
+    """Returns (report lines, number of failures)."""
+    lines: list[str] = []
+    failures = 0
+
+    cur_digest = current.get("corpus", {}).get("digest")
+    base_digest = baseline.get("corpus", {}).get("digest")
+    if cur_digest != base_digest:
+        lines.append(f"ERROR corpus differs (digest {cur_digest} vs baseline {base_digest}); timings are not comparable")
+        return lines, 1
+    for key in ("python", "machine", "cpus", "platform"):
+        cur_env, base_env = current.get("environment", {}).get(key), baseline.get("environment", {}).get(key)
+        if cur_env != base_env:
+            lines.append(f"WARN  environment {key}: {cur_env} (baseline {base_env})")
+
+    cur_metrics, base_metrics = current.get("metrics", {}), baseline.get("metrics", {})
+    lines.append(f"{'metric':52s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for name in sorted(set(cur_metrics) | set(base_metrics)):
+        cur, base = cur_metrics.get(name), base_metrics.get(name)
+        if cur is None or base is None:
+            lines.append(f"{name:52s} {'-' if base is None else _fmt(base['median_s']):>10s} "
+                         f"{'-' if cur is None else _fmt(cur['median_s']):>10s} {'new' if base is None else 'gone':>8s}")
+            continue
+        b, c = base["median_s"], cur["median_s"]
+        change = (c - b) / b if b > 0 else 0.0
+        verdict = ""
+        if c - b > min_delta_s and change > threshold:
+            verdict = "  REGRESSION"
+            failures += 1
+        elif b - c > min_delta_s and -change > threshold:
+            verdict = "  improved"
+        lines.append(f"{name:52s} {_fmt(b):>10s} {_fmt(c):>10s} {change:+8.1%}{verdict}")
+
+    cur_counts, base_counts = current.get("counts", {}), baseline.get("counts", {})
+    for name in sorted(set(cur_counts) | set(base_counts)):
+        cur, base = cur_counts.get(name, {}), base_counts.get(name, {})
+        for key in sorted(set(cur) | set(base)):
+            if cur.get(key) != base.get(key):
+                lines.append(f"CHANGED count {name}.{key}: {cur.get(key)} (baseline {base.get(key)})")
+                failures += 1
+
+    lines.append(f"{failures} regression(s)/changed count(s) at threshold {threshold:.0%}, "
+                 f"min delta {min_delta_s * 1000:.1f} ms")
+    return lines, failures
+
+
+def _fmt(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}ms" if seconds < 1 else f"{seconds:.3f}s"
+
+
+def load(path: Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline")
+    arg_parser.add_argument("results", type=Path)
+    arg_parser.add_argument("baseline", type=Path)
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help=f"Relative slowdown that counts as a regression (default {DEFAULT_THRESHOLD})")
+    arg_parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_S * 1000,
+                            help="Ignore slowdowns smaller than this many milliseconds")
+    args = arg_parser.parse_args()
+    report, failed = compare_results(load(args.results), load(args.baseline), args.threshold, args.min_delta_ms / 1000)
+    print("\n".join(report))
+    sys.exit(1 if failed else 0)
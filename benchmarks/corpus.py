@@ -0,0 +1,818 @@
+"""
+Deterministic synthetic Instagram and Threads archives for the benchmark suite.
+
+Real captures can't leave our network, so the benchmarks run on generated ones.
+A CorpusSpec and a seed fully determine the output: the same spec produces
+byte-identical archive files on any machine (no wall-clock times, random UUIDs
+or zip mtimes leak in), and corpus_digest() records that in every result file
+so two runs are only compared when they measured the same input.
+
+Each archive is one capture of one profile (archives beyond `accounts` capture
+the same profiles again, as real re-archiving does, which exercises the
+existing-entity paths of db_intake). The payloads use the shapes the extractors
+accept, with every route they support:
+
+  Instagram  profile page HTML, profile info (graphql data.user), timeline pages
+             (graphql xdt_api__v1__feed__user_timeline_graphql_connection), and
+             per post, rotating between captures: HTML bootstrap page
+             (xdt_api__v1__media__shortcode__web_info), api/v1 media info, or the
+             timeline alone; comments via graphql (media_id in the POST variables)
+             or api/v1, 20 per page.
+  Threads    profile page HTML (Relay bootstrap with mediaData and the user),
+             timeline pages and post pages (thread_items with replies) over
+             graphql or HTML. About a third of the posts are text-only.
+
+Stills are captured as small PNGs (pure Python, so thumbnails and perceptual
+hashes have something real to decode); videos are referenced but never
+captured. Every post also gets `noise` unrelated entries (stylesheets, scripts,
+fonts, beacons, a 404) for the scanners to skip.
+
+HAR archives are a directory with archive.har and metadata.json, as the archiver
+writes them. WACZ archives hold a per-record gzipped WARC (request and response
+records), a CDXJ index, pages.jsonl and datapackage.json, as Webrecorder writes
+them; POST requests use Webrecorder's ?__wb_method=POST encoding, so as with real
+WACZ files the graphql comment pages carry no media_id context.
+
+Run from the project root to write a corpus for manual loader runs:
+
+    uv run python -m benchmarks.corpus <out_dir> [--size small|medium|large] [--platform instagram threads] [--format har wacz] [--seed N]
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import json
+import random
+import struct
+import uuid
+import zipfile
+import zlib
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode, urlsplit, parse_qsl
+
+PLATFORMS = ("instagram", "threads")
+FORMATS = ("har", "wacz")
+
+# Capture times are fixed so the archive names, metadata and WARC dates are stable.
+BASE_TIME = datetime(2026, 1, 5, 9, 0, 0, tzinfo=timezone.utc)
+# Zip member timestamps (the zip format's epoch) for byte-identical WACZ files.
+_ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+IG_TIMELINE_PAGE = 12
+IG_COMMENTS_PAGE = 20
+THREADS_TIMELINE_PAGE = 10
+THREADS_TEXT_ONLY_SHARE = 0.3
+
+WORDS = (
+    "harbor", "market", "river", "bridge", "morning", "evening", "convoy", "village", "school", "stadium",
+    "border", "checkpoint", "station", "festival", "garden", "street", "square", "rally", "camp", "clinic",
+    "storm", "flood", "smoke", "crowd", "night", "coast", "road", "truck", "train", "banner", "families",
+    "workers", "farmers", "students", "volunteers", "neighbours", "journalists", "today", "yesterday",
+    "again", "finally", "still", "live", "update", "photo", "video", "footage", "statement", "report",
+    "north", "south", "east", "west", "centre", "old", "new", "quiet", "loud", "long", "queue", "water",
+)
+# Words the runner's search queries look for; all of them occur in generated captions.
+SEARCH_TERMS = ("harbor", "checkpoint", "volunteers")
+_ADJECTIVES = ("blue", "quiet", "early", "north", "urban", "field", "open", "daily", "local", "coastal")
+_NOUNS = ("lens", "notes", "reporter", "watch", "archive", "desk", "view", "press", "frame", "signal")
+_FIRST = ("Alex", "Sam", "Noa", "Rami", "Dana", "Yael", "Omar", "Lina", "Tom", "Maya", "Ido", "Sara")
+_LAST = ("Levi", "Haddad", "Cohen", "Nasser", "Mizrahi", "Khoury", "Peretz", "Saleh", "Amir", "Bar")
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    archives: int = 4           # archives per platform and format
+    accounts: int = 3           # distinct captured profiles; later archives recapture them
+    posts: int = 24             # posts per profile
+    comments: int = 10          # comments (Threads: replies) per post
+    media: int = 1              # media per post; above 1, every third post is a carousel of this many
+    commenters: int = 40        # pool the comment authors are drawn from
+    video_share: float = 0.2    # share of media that are videos (referenced, never captured)
+    image_px: int = 96          # side of the captured PNG stills; 0 captures no image bytes
+    noise: int = 2              # unrelated entries per post
+    html_padding_kb: int = 24   # bootstrap JSON padding per HTML page, as real pages carry
+    seed: int = 1
+
+
+SIZES = {
+    "small": CorpusSpec(archives=2, accounts=2, posts=12, comments=5, commenters=20),
+    "medium": CorpusSpec(),
+    "large": CorpusSpec(archives=12, accounts=6, posts=96, comments=30, media=3, commenters=300),
+}
+
+
+@dataclass
+class Capture:
+    url: str
+    mime: str
+    body: bytes
+    status: int = 200
+    method: str = "GET"
+    params: Optional[list[tuple[str, str]]] = None  # form fields of a POST
+
+
+@dataclass
+class Archive:
+    platform: str
+    seed: int
+    index: int
+    target_url: str
+    title: str
+    captured_at: datetime
+    captures: list[Capture]
+
+    def dir_name(self, fmt: str, prefix: str) -> str:
+        # Ends in _YYYYMMDD_HHMMSS like the archiver's names, so the loader sorts them by capture time.
+        return f"{prefix}_{self.platform}_{fmt}_{self.index:03d}_{self.captured_at:%Y%m%d_%H%M%S}"
+
+
+def _rng(spec: CorpusSpec, *parts) -> random.Random:
+    # String seeds are hashed with SHA-512, so this is stable across processes and PYTHONHASHSEED.
+    return random.Random(":".join(str(p) for p in (spec.seed, *parts)))
+
+
+def _shortcode(media_id: int) -> str:
+    # Instagram's media id -> shortcode mapping; comment pages derive the post URL from the
+    # media id, so generated codes must agree with it.
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    code = ""
+    while media_id > 0:
+        media_id, remainder = divmod(media_id, 64)
+        code = alphabet[remainder] + code
+    return code
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    # Make sure every search term occurs in the corpus, in roughly one caption in five.
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(SEARCH_TERMS))
+    text = " ".join(words).capitalize() + "."
+    if rng.random() < 0.3:
+        text += f" #{rng.choice(WORDS)}"
+    return text
+
+
+def _png(rng: random.Random, px: int) -> bytes:
+    """An 8x8 grid of random colours scaled to px*px, so every still hashes differently."""
+    cells = [bytes((rng.randrange(256), rng.randrange(256), rng.randrange(256))) for _ in range(64)]
+    rows = []
+    for y in range(px):
+        cy = y * 8 // px * 8
+        rows.append(b"\x00" + b"".join(cells[cy + x * 8 // px] for x in range(px)))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", px, px, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b""))
+
+
+# ---------------------------------------------------------------------------
+# Platform-neutral profile data. Generated once per profile, so every capture
+# of a profile sees the same accounts, posts, media and comments.
+# ---------------------------------------------------------------------------
+
+def _make_user(rng: random.Random, n: int) -> dict:
+    pk = str(rng.randrange(10 ** 9, 10 ** 11))
+    username = f"{rng.choice(_ADJECTIVES)}.{rng.choice(_NOUNS)}{n}"
+    return {
+        "pk": pk,
+        "username": username,
+        "full_name": f"{rng.choice(_FIRST)} {rng.choice(_LAST)}",
+        "is_verified": rng.random() < 0.1,
+        "biography": _sentence(rng, 4, 12),
+        "follower_count": rng.randrange(10, 250_000),
+        "profile_pic_url": f"https://scontent.cdninstagram.com/v/t51.2885-19/{pk}_{rng.randrange(10 ** 8)}_n.jpg",
+    }
+
+
+def _make_media(rng: random.Random, spec: CorpusSpec, owner_pk: str, taken_at: int) -> dict:
+    pk = rng.randrange(3 * 10 ** 18, 4 * 10 ** 18)
+    asset = f"{rng.randrange(10 ** 8, 10 ** 9)}_{rng.randrange(10 ** 15, 10 ** 16)}_{taken_at % 10 ** 6}"
+    video = rng.random() < spec.video_share
+    width, height = rng.choice(((1080, 1080), (1080, 1350), (1080, 1920), (1440, 1080)))
+    pop = rng.choice(("lhr8-1", "fra3-2", "tlv1-1", "ams2-1"))
+    query = urlencode({"stp": "dst-jpg_e35", "_nc_ht": f"scontent-{pop}.cdninstagram.com",
+                       "_nc_cat": rng.randrange(1, 110), "oh": f"00_{rng.getrandbits(96):024x}",
+                       "oe": f"{rng.getrandbits(32):08X}"})
+    media = {
+        "pk": str(pk),
+        "id": f"{pk}_{owner_pk}",
+        "video": video,
+        "width": width,
+        "height": height,
+        "image_url": f"https://scontent-{pop}.cdninstagram.com/v/t51.2885-15/{asset}_n.png?{query}",
+        "thumb_url": f"https://scontent-{pop}.cdninstagram.com/v/t51.2885-15/s640x640/{asset}_n.png?{query}",
+        "video_url": (f"https://scontent-{pop}.cdninstagram.com/o1/v/t16/f2/m86/{asset}.mp4"
+                      f"?_nc_cat={rng.randrange(1, 110)}&vs={rng.getrandbits(64):016x}") if video else None,
+        "png": None,
+    }
+    if not video and spec.image_px > 0:
+        media["png"] = _png(rng, spec.image_px)
+    return media
+
+
+def _make_profile(spec: CorpusSpec, platform: str, n: int, commenters: list[dict]) -> dict:
+    rng = _rng(spec, platform, "profile", n)
+    user = _make_user(rng, n)
+    posts = []
+    taken_at = int((BASE_TIME - timedelta(days=2)).timestamp())
+    for j in range(spec.posts):
+        taken_at -= rng.randrange(1800, 3 * 86400)
+        pk = rng.randrange(3 * 10 ** 18, 4 * 10 ** 18)
+        text_only = platform == "threads" and rng.random() < THREADS_TEXT_ONLY_SHARE
+        n_media = 0 if text_only else (spec.media if spec.media > 1 and j % 3 == 0 else 1)
+        comments = []
+        for c in range(spec.comments):
+            comment_pk = rng.randrange(17 * 10 ** 16, 18 * 10 ** 16)
+            comments.append({
+                "pk": str(comment_pk),
+                "code": _shortcode(comment_pk),
+                "text": _sentence(rng, 2, 14),
+                "created_at": taken_at + (c + 1) * rng.randrange(30, 4000),
+                "author": rng.choice(commenters),
+                "likes": rng.randrange(0, 40),
+            })
+        posts.append({
+            "pk": str(pk),
+            "code": _shortcode(pk),
+            "taken_at": taken_at,
+            "caption": _sentence(rng, 6, 30),
+            "caption_pk": str(rng.randrange(17 * 10 ** 16, 18 * 10 ** 16)),
+            "media": [_make_media(rng, spec, user["pk"], taken_at) for _ in range(n_media)],
+            "comments": comments,
+        })
+    return {"user": user, "posts": posts}
+
+
+# ---------------------------------------------------------------------------
+# Payload builders
+# ---------------------------------------------------------------------------
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _padding(rng: random.Random, kb: int) -> dict:
+    """A ServerJS config blob of roughly kb KiB: parsed and walked by the HTML extractors like the real ones."""
+    config, size, i = {}, 0, 0
+    while size < kb * 1024:
+        value = " ".join(rng.choices(WORDS, k=12))
+        config[f"gk_{i:05d}"] = {"value": value, "hash": f"{rng.getrandbits(64):016x}", "enabled": i % 3 == 0}
+        size += len(value) + 64
+        i += 1
+    return {"require": [["ServerJS", "handle", None, [{"define": [["SiteConfig", [], config, i]]}]]]}
+
+
+def _bbox(query: str, data: dict) -> dict:
+    # The Relay preloader nesting Meta's bootstrap pages use around query results.
+    return {"require": [["ScheduledServerJS", "handle", None, [{"__bbox": {"require": [
+        ["RelayPrefetchedStreamCache", "next", [], [f"adp_{query}RelayPreloader", {"__bbox": {"result": {
+            "data": data, "extensions": {"is_final": True}}}}]]]}}]]]}
+
+
+def _html_page(title: str, blobs: list[dict], rng: random.Random, padding_kb: int) -> bytes:
+    scripts = []
+    for blob in [_padding(rng, padding_kb)] + blobs:
+        payload = json.dumps(blob, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+        scripts.append(f'<script type="application/json" data-content-len="{len(payload)}" data-sjs>{payload}</script>')
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{title}</title>'
+            f'<link rel="stylesheet" href="https://static.cdninstagram.com/rsrc.php/v4/main.css"></head>'
+            f'<body><div id="root"></div>{"".join(scripts)}</body></html>').encode("utf-8")
+
+
+def _graphql(url: str, friendly_name: str, variables: dict, data: dict) -> Capture:
+    params = [("fb_api_caller_class", "RelayModern"), ("fb_api_req_friendly_name", friendly_name),
+              ("variables", json.dumps(variables, separators=(",", ":"))), ("server_timestamps", "true"),
+              ("doc_id", str(int(hashlib.md5(friendly_name.encode()).hexdigest()[:15], 16)))]
+    return Capture(url=url, mime="application/json; charset=utf-8", body=_json({"data": data, "extensions": {"is_final": True}}),
+                   method="POST", params=params)
+
+
+def _media_captures(post: dict) -> list[Capture]:
+    return [Capture(url=m["image_url"], mime="image/png", body=m["png"]) for m in post["media"] if m["png"]]
+
+
+def _noise(rng: random.Random, platform: str, n: int) -> list[Capture]:
+    site = "https://www.instagram.com" if platform == "instagram" else "https://www.threads.com"
+    out = []
+    for i in range(n):
+        kind = rng.randrange(5)
+        tag = f"{rng.getrandbits(48):012x}"
+        if kind == 0:
+            out.append(Capture(f"https://static.cdninstagram.com/rsrc.php/v4/y{tag[:2]}/r/{tag}.css", "text/css",
+                               (".x" + tag + "{display:flex;align-items:center}") .encode() * 40))
+        elif kind == 1:
+            out.append(Capture(f"https://static.cdninstagram.com/rsrc.php/v4i{tag[:2]}/y/r/{tag}.js",
+                               "application/javascript", (f"__d('M{tag}',[],function(a,b,c){{return {i}}});").encode() * 60))
+        elif kind == 2:
+            out.append(Capture(f"https://static.cdninstagram.com/rsrc.php/v4/y{tag[:2]}/l/{tag}.woff2", "font/woff2",
+                               rng.randbytes(2048)))
+        elif kind == 3:
+            out.append(Capture(f"{site}/ajax/bz?__a=1&__req={tag[:3]}", "application/json", b'for (;;);{"__ar":1}',
+                               method="POST", params=[("q", tag), ("ts", str(i))]))
+        else:
+            out.append(Capture(f"{site}/api/v1/web/fxcal/ig_sso_users/?{tag}", "application/json",
+                               b'{"message":"not found","status":"fail"}', status=404))
+    return out
+
+
+# --- Instagram -------------------------------------------------------------
+
+def _ig_user(u: dict) -> dict:
+    return {"pk": u["pk"], "id": u["pk"], "username": u["username"], "full_name": u["full_name"],
+            "is_private": False, "is_verified": u["is_verified"], "profile_pic_url": u["profile_pic_url"],
+            "__typename": "XDTUserDict"}
+
+
+def _ig_v1_user(u: dict) -> dict:
+    return {"pk": u["pk"], "pk_id": u["pk"], "id": u["pk"], "strong_id__": u["pk"], "username": u["username"],
+            "full_name": u["full_name"], "is_private": False, "is_verified": u["is_verified"],
+            "profile_pic_url": u["profile_pic_url"], "fbid_v2": str(17841400000000000 + int(u["pk"]))}
+
+
+def _ig_media_fields(m: dict) -> dict:
+    fields = {
+        "media_type": 2 if m["video"] else 1,
+        "original_width": m["width"],
+        "original_height": m["height"],
+        "image_versions2": {"candidates": [
+            {"url": m["image_url"], "width": m["width"], "height": m["height"]},
+            {"url": m["thumb_url"], "width": 640, "height": round(640 * m["height"] / m["width"])},
+        ]},
+    }
+    if m["video"]:
+        fields["video_versions"] = [{"id": m["pk"], "type": 101, "url": m["video_url"],
+                                     "width": m["width"], "height": m["height"]}]
+    return fields
+
+
+def _ig_post(owner: dict, post: dict, likes: int) -> dict:
+    item = {
+        "pk": post["pk"],
+        "id": f"{post['pk']}_{owner['pk']}",
+        "code": post["code"],
+        "taken_at": post["taken_at"],
+        "caption": {"pk": post["caption_pk"], "text": post["caption"], "created_at": post["taken_at"],
+                    "has_translation": False},
+        "user": _ig_user(owner),
+        "owner": _ig_user(owner),
+        "comment_count": len(post["comments"]),
+        "like_count": likes,
+        "has_liked": False,
+        "__typename": "XDTMediaDict",
+    }
+    media = post["media"]
+    if len(media) > 1:
+        item.update(media_type=8, product_type="carousel_container", carousel_media_count=len(media),
+                    carousel_media=[{"pk": m["pk"], "id": m["id"], "carousel_parent_id": item["id"],
+                                     **_ig_media_fields(m)} for m in media])
+        item["image_versions2"] = _ig_media_fields(media[0])["image_versions2"]
+    else:
+        item.update(_ig_media_fields(media[0]))
+        item["product_type"] = "clips" if media[0]["video"] else "feed"
+    return item
+
+
+def _ig_v1_comment_fields(c: dict, media_pk: str) -> dict:
+    return {"pk": c["pk"], "user_id": c["author"]["pk"], "type": 0, "did_report_as_spam": False,
+            "created_at": c["created_at"], "created_at_utc": c["created_at"], "created_at_for_fb_app": c["created_at"],
+            "content_type": "comment", "status": "Active", "bit_flags": 0, "share_enabled": True,
+            "is_ranked_comment": False, "media_id": media_pk, "strong_id__": c["pk"], "text": c["text"],
+            "is_covered": False, "private_reply_status": 0, "user": _ig_v1_user(c["author"])}
+
+
+def _ig_v1_media_item(owner: dict, post: dict, likes: int) -> dict:
+    item = _ig_post(owner, post, likes)
+    caption = {"pk": post["caption_pk"], "text": post["caption"], "created_at": post["taken_at"],
+               "author": owner}
+    item.update(strong_id__=item["id"], caption_is_edited=False, user=_ig_v1_user(owner),
+                owner=_ig_v1_user(owner), caption=_ig_v1_comment_fields(caption, post["pk"]))
+    return item
+
+
+def _instagram_captures(spec: CorpusSpec, profile: dict, k: int, rng: random.Random) -> list[Capture]:
+    user, posts = profile["user"], profile["posts"]
+    site = "https://www.instagram.com"
+    likes = {p["pk"]: rng.randrange(0, 5000) for p in posts}  # the one thing that changes between captures
+    out = [
+        Capture(f"{site}/{user['username']}/", "text/html; charset=utf-8",
+                _html_page(f"{user['full_name']} (@{user['username']}) • Instagram photos and videos", [], rng,
+                           spec.html_padding_kb)),
+        _graphql(f"{site}/graphql/query", "PolarisProfilePageContentQuery", {"id": user["pk"], "render_surface": "PROFILE"},
+                 {"user": {**_ig_user(user), "biography": user["biography"], "follower_count": user["follower_count"],
+                           "media_count": len(posts), "following_count": rng.randrange(10, 900)}}),
+    ]
+    for start in range(0, len(posts), IG_TIMELINE_PAGE):
+        page = posts[start:start + IG_TIMELINE_PAGE]
+        variables = {"data": {"count": IG_TIMELINE_PAGE}, "username": user["username"], "__relay_internal__pv__PolarisIsLoggedInrelayprovider": True}
+        if start:
+            variables["after"] = f"{posts[start - 1]['pk']}_{user['pk']}"
+        out.append(_graphql(f"{site}/graphql/query", "PolarisProfilePostsQuery", variables, {
+            "xdt_api__v1__feed__user_timeline_graphql_connection": {
+                "edges": [{"node": _ig_post(user, p, likes[p["pk"]]), "cursor": f"{p['pk']}_{user['pk']}"} for p in page],
+                "page_info": {"has_next_page": start + IG_TIMELINE_PAGE < len(posts), "has_previous_page": bool(start),
+                              "end_cursor": f"{page[-1]['pk']}_{user['pk']}", "start_cursor": None},
+            }}))
+
+    for j, post in enumerate(posts):
+        route = (j + k) % 3
+        if route == 0:
+            out.append(Capture(f"{site}/p/{post['code']}/", "text/html; charset=utf-8", _html_page(
+                f"Instagram post by {user['username']}", [_bbox("PolarisPostRootQuery", {
+                    "xdt_api__v1__media__shortcode__web_info": {"items": [_ig_post(user, post, likes[post["pk"]])]}})],
+                rng, spec.html_padding_kb)))
+        elif route == 1:
+            out.append(Capture(f"{site}/api/v1/media/{post['pk']}/info/", "application/json; charset=utf-8", _json({
+                "items": [_ig_v1_media_item(user, post, likes[post["pk"]])], "num_results": 1,
+                "more_available": False, "auto_load_more_enabled": False, "showQRModal": False, "status": "ok"})))
+        comments = post["comments"]
+        for start in range(0, len(comments), IG_COMMENTS_PAGE):
+            page = comments[start:start + IG_COMMENTS_PAGE]
+            more = start + IG_COMMENTS_PAGE < len(comments)
+            if route == 1:
+                url = f"{site}/api/v1/media/{post['pk']}/comments/?can_support_threading=true&permalink_enabled=false"
+                if start:
+                    url += f"&min_id={page[0]['pk']}"
+                out.append(Capture(url, "application/json; charset=utf-8", _json({
+                    "comments": [{**_ig_v1_comment_fields(c, post["pk"]), "has_liked_comment": False,
+                                  "comment_like_count": c["likes"], "child_comment_count": 0} for c in page],
+                    "comment_count": len(comments), "has_more_comments": more, "caption_is_edited": False,
+                    "status": "ok"})))
+            else:
+                out.append(_graphql(f"{site}/graphql/query", "PolarisPostCommentsPaginationQuery",
+                                    {"media_id": post["pk"], "first": IG_COMMENTS_PAGE, "after": page[0]["pk"] if start else None},
+                                    {"xdt_api__v1__media__media_id__comments__connection": {
+                                        "count": len(comments),
+                                        "page_info": {"has_next_page": more, "end_cursor": page[-1]["pk"]},
+                                        "edges": [{"node": {
+                                            "pk": c["pk"], "text": c["text"], "created_at": c["created_at"],
+                                            "comment_like_count": c["likes"], "child_comment_count": 0,
+                                            "has_liked_comment": False, "__typename": "XDTCommentDict",
+                                            "user": {"id": c["author"]["pk"], "pk": c["author"]["pk"],
+                                                     "username": c["author"]["username"],
+                                                     "profile_pic_url": c["author"]["profile_pic_url"],
+                                                     "is_verified": c["author"]["is_verified"]},
+                                        }} for c in page],
+                                    }}))
+        out.extend(_media_captures(post))
+        out.extend(_noise(rng, "instagram", spec.noise))
+    return out
+
+
+# --- Threads ---------------------------------------------------------------
+
+def _threads_user(u: dict) -> dict:
+    # Embedded in posts: no biography/follower_count, so it isn't picked up as a profile user.
+    return {"pk": u["pk"], "id": u["pk"], "username": u["username"], "full_name": u["full_name"],
+            "profile_pic_url": u["profile_pic_url"], "is_verified": u["is_verified"], "__typename": "XDTUserDict"}
+
+
+def _threads_profile_user(u: dict) -> dict:
+    return {**_threads_user(u), "biography": u["biography"], "follower_count": u["follower_count"],
+            "has_onboarded_to_text_post_app": True, "text_post_app_is_private": False}
+
+
+def _threads_media_fields(m: dict) -> dict:
+    fields = _ig_media_fields(m)
+    fields.setdefault("video_versions", None)
+    return fields
+
+
+def _threads_post(owner: dict, post: dict, likes: int) -> dict:
+    item = {
+        "pk": post["pk"],
+        "id": f"{post['pk']}_{owner['pk']}",
+        "code": post["code"],
+        "taken_at": post["taken_at"],
+        "caption": {"text": post["caption"], "pk": post["caption_pk"]},
+        "like_count": likes,
+        "user": _threads_user(owner),
+        "is_reply": False,
+        "text_post_app_info": {"is_reply": False, "reply_to_author": None, "direct_reply_count": len(post["comments"]),
+                               "is_post_unavailable": False, "share_info": {"quoted_post": None, "reposted_post": None}},
+        "__typename": "XDTMediaDict",
+    }
+    media = post["media"]
+    if not media:
+        item.update(media_type=19, image_versions2={"candidates": []}, video_versions=None, carousel_media=None)
+    elif len(media) > 1:
+        item.update(media_type=8, image_versions2={"candidates": []}, video_versions=None,
+                    carousel_media=[{"pk": m["pk"], "id": m["id"], "code": None, **_threads_media_fields(m)}
+                                    for m in media])
+    else:
+        item.update(carousel_media=None, **_threads_media_fields(media[0]))
+    return item
+
+
+def _threads_reply(owner: dict, post: dict, c: dict) -> dict:
+    return {
+        "pk": c["pk"], "id": f"{c['pk']}_{c['author']['pk']}", "code": c["code"], "taken_at": c["created_at"],
+        "caption": {"text": c["text"], "pk": str(int(c["pk"]) + 1)}, "like_count": c["likes"], "media_type": 19,
+        "image_versions2": {"candidates": []}, "video_versions": None, "carousel_media": None,
+        "user": _threads_user(c["author"]), "is_reply": True,
+        "text_post_app_info": {"is_reply": True, "reply_to_author": {"username": owner["username"], "id": owner["pk"]},
+                               "direct_reply_count": 0, "is_post_unavailable": False},
+        "__typename": "XDTMediaDict",
+    }
+
+
+def _thread_edges(owner: dict, posts: list[dict], likes: dict) -> list[dict]:
+    return [{"node": {"thread_items": [{"post": _threads_post(owner, p, likes[p["pk"]])}], "id": p["pk"]}}
+            for p in posts]
+
+
+def _threads_captures(spec: CorpusSpec, profile: dict, k: int, rng: random.Random) -> list[Capture]:
+    user, posts = profile["user"], profile["posts"]
+    site = "https://www.threads.com"
+    likes = {p["pk"]: rng.randrange(0, 5000) for p in posts}
+    first = posts[:THREADS_TIMELINE_PAGE]
+    out = [Capture(f"{site}/@{user['username']}", "text/html; charset=utf-8", _html_page(
+        f"{user['full_name']} (@{user['username']}) • Threads", [
+            _bbox("BarcelonaProfileRootQuery", {"user": _threads_profile_user(user)}),
+            _bbox("BarcelonaProfileThreadsTabQuery", {"mediaData": {
+                "edges": _thread_edges(user, first, likes),
+                "page_info": {"has_next_page": len(posts) > len(first), "end_cursor": first[-1]["pk"] if first else None}}}),
+        ], rng, spec.html_padding_kb))]
+    for start in range(THREADS_TIMELINE_PAGE, len(posts), THREADS_TIMELINE_PAGE):
+        page = posts[start:start + THREADS_TIMELINE_PAGE]
+        out.append(_graphql(f"{site}/graphql/query", "BarcelonaProfileThreadsTabRefetchableDirectQuery",
+                            {"userID": user["pk"], "after": posts[start - 1]["pk"], "first": THREADS_TIMELINE_PAGE},
+                            {"mediaData": {"edges": _thread_edges(user, page, likes),
+                                           "page_info": {"has_next_page": start + THREADS_TIMELINE_PAGE < len(posts),
+                                                         "end_cursor": page[-1]["pk"]}}}))
+
+    for j, post in enumerate(posts):
+        edges = _thread_edges(user, [post], likes) + [
+            {"node": {"thread_items": [{"post": _threads_reply(user, post, c)}], "id": c["pk"]}} for c in post["comments"]]
+        if (j + k) % 2 == 0:
+            out.append(_graphql(f"{site}/graphql/query", "BarcelonaPostPageDirectQuery",
+                                {"postID": post["pk"], "__relay_internal__pv__BarcelonaIsLoggedInrelayprovider": True},
+                                {"data": {"edges": edges}}))
+        else:
+            out.append(Capture(f"{site}/@{user['username']}/post/{post['code']}", "text/html; charset=utf-8",
+                               _html_page(f"{user['username']} on Threads", [_bbox("BarcelonaPostPageQuery", {
+                                   "data": {"edges": edges}})], rng, spec.html_padding_kb)))
+        out.extend(_media_captures(post))
+        out.extend(_noise(rng, "threads", spec.noise))
+    return out
+
+
+def build_archives(spec: CorpusSpec, platform: str) -> list[Archive]:
+    """The spec's archives for one platform, in memory (shared by the HAR and WACZ writers)."""
+    commenter_rng = _rng(spec, platform, "commenters")
+    commenters = [_make_user(commenter_rng, 1000 + i) for i in range(spec.commenters)]
+    profiles: dict[int, dict] = {}
+    archives = []
+    for k in range(spec.archives):
+        n = k % max(1, spec.accounts)
+        if n not in profiles:
+            profiles[n] = _make_profile(spec, platform, n, commenters)
+        profile = profiles[n]
+        rng = _rng(spec, platform, "capture", k)
+        builder = _instagram_captures if platform == "instagram" else _threads_captures
+        username = profile["user"]["username"]
+        target_url = (f"https://www.instagram.com/{username}/" if platform == "instagram"
+                      else f"https://www.threads.com/@{username}")
+        archives.append(Archive(
+            platform=platform, seed=spec.seed, index=k, target_url=target_url, title=f"Synthetic {platform} capture of {username}",
+            captured_at=BASE_TIME + timedelta(days=k, minutes=7 * k), captures=builder(spec, profile, k, rng),
+        ))
+    return archives
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+_TEXT_MIMES = ("text/", "application/json", "application/javascript", "application/x-javascript")
+_REASONS = {200: "OK", 204: "No Content", 404: "Not Found"}
+
+
+def _iso(t: datetime) -> str:
+    return t.strftime("%Y-%m-%dT%H:%M:%S.") + f"{t.microsecond // 1000:03d}Z"
+
+
+def _capture_times(archive: Archive) -> list[datetime]:
+    return [archive.captured_at + timedelta(milliseconds=350 * i) for i in range(len(archive.captures))]
+
+
+def _har_entry(c: Capture, started: datetime, i: int) -> dict:
+    split = urlsplit(c.url)
+    request = {
+        "method": c.method, "url": c.url, "httpVersion": "HTTP/2.0", "cookies": [],
+        "headers": [{"name": "accept", "value": "*/*"}, {"name": "host", "value": split.hostname}],
+        "queryString": [{"name": k, "value": v} for k, v in parse_qsl(split.query, keep_blank_values=True)],
+        "headersSize": -1, "bodySize": 0,
+    }
+    if c.params is not None:
+        form = urlencode(c.params)
+        request["postData"] = {"mimeType": "application/x-www-form-urlencoded",
+                               "params": [{"name": k, "value": v} for k, v in c.params], "text": form}
+        request["bodySize"] = len(form)
+    content = {"size": len(c.body), "mimeType": c.mime}
+    if c.body:
+        if c.mime.startswith(_TEXT_MIMES):
+            content["text"] = c.body.decode("utf-8")
+        else:
+            content["text"] = base64.b64encode(c.body).decode("ascii")
+            content["encoding"] = "base64"
+    wait = 20 + (i * 37) % 180
+    return {
+        "startedDateTime": _iso(started), "time": wait + 3.5,
+        "request": request,
+        "response": {
+            "status": c.status, "statusText": _REASONS.get(c.status, ""), "httpVersion": "HTTP/2.0", "cookies": [],
+            "headers": [{"name": "content-type", "value": c.mime}, {"name": "content-length", "value": str(len(c.body))}],
+            "content": content, "redirectURL": "", "headersSize": -1, "bodySize": len(c.body),
+        },
+        "cache": {}, "timings": {"send": 0.5, "wait": wait, "receive": 3.0},
+        "serverIPAddress": "157.240.0.1", "connection": str(443 + i % 4), "pageref": "page_1",
+    }
+
+
+def _move_bodies_to_store(entries: list[dict], captures: list[Capture], archive_dir: Path) -> None:
+    """Rewrite inline bodies as body-store references, as the merge does with HAR_BODY_STORE=true."""
+    from extractors.har_body_store import BodyStore
+    store = BodyStore(archive_dir)
+    for entry, capture in zip(entries, captures):
+        content = entry["response"]["content"]
+        if not capture.body:
+            continue
+        content.pop("text", None)
+        content.pop("encoding", None)
+        content["_file"], content["_sha256"] = store.put(capture.body)
+    store.write_index()
+
+
+def write_har(archive: Archive, out_dir: Path, prefix: str = "bench", body_store: bool = False) -> Path:
+    """``body_store``: keep the response bodies in a body store (extractors/har_body_store.py)
+    instead of inline; use another prefix to write both forms side by side."""
+    archive_dir = Path(out_dir) / archive.dir_name("har", prefix)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    times = _capture_times(archive)
+    entries = [_har_entry(c, t, i) for i, (c, t) in enumerate(zip(archive.captures, times))]
+    if body_store:
+        _move_bodies_to_store(entries, archive.captures, archive_dir)
+    har = {"log": {
+        "version": "1.2",
+        "creator": {"name": "evidenceplatform benchmarks corpus", "version": "1"},
+        "pages": [{"startedDateTime": _iso(archive.captured_at), "id": "page_1", "title": archive.target_url,
+                   "pageTimings": {}}],
+        "entries": entries,
+    }}
+    # Playwright writes indented HAR files.
+    (archive_dir / "archive.har").write_text(json.dumps(har, ensure_ascii=False, indent=2), encoding="utf-8")
+    metadata = {
+        "target_url": archive.target_url,
+        "notes": archive.title,
+        # Naive local time, as the archiver records it.
+        "archiving_start_timestamp": archive.captured_at.replace(tzinfo=None).isoformat(),
+    }
+    (archive_dir / "metadata.json").write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    return archive_dir
+
+
+def _surt(url: str) -> str:
+    split = urlsplit(url)
+    host = split.hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    query = f"?{split.query}" if split.query else ""
+    return f"{','.join(reversed(host.split('.')))}){split.path or '/'}{query}".lower()
+
+
+def _warc_record(rng: random.Random, rec_type: str, url: str, date: str, block: bytes, content_type: str) -> bytes:
+    headers = (
+        f"WARC/1.1\r\nWARC-Type: {rec_type}\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.UUID(int=rng.getrandbits(128), version=4)}>\r\n"
+        f"WARC-Date: {date}\r\nWARC-Target-URI: {url}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(block)}\r\n\r\n"
+    ).encode("utf-8")
+    # One gzip member per record (mtime pinned), as Webrecorder writes them.
+    return gzip.compress(headers + block + b"\r\n\r\n", compresslevel=6, mtime=0)
+
+
+def _zip_add(zf: zipfile.ZipFile, name: str, data: bytes, compress_type: int) -> None:
+    info = zipfile.ZipInfo(name, date_time=_ZIP_DATE)
+    info.compress_type = compress_type
+    info.external_attr = 0o644 << 16
+    zf.writestr(info, data)
+
+
+def write_wacz(archive: Archive, out_dir: Path, prefix: str = "bench") -> Path:
+    archive_dir = Path(out_dir) / archive.dir_name("wacz", prefix)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(f"{archive.seed}:{archive.platform}:warc:{archive.index}")  # record ids only
+    warc = io.BytesIO()
+    cdx_lines = []
+    for c, t in zip(archive.captures, _capture_times(archive)):
+        url = c.url
+        if c.params is not None:
+            url = f"{url}?__wb_method=POST&{urlencode(c.params)}"
+        date = t.strftime("%Y-%m-%dT%H:%M:%SZ")
+        split = urlsplit(c.url)
+        form = urlencode(c.params).encode() if c.params is not None else b""
+        request = (f"{c.method} {split.path}{'?' + split.query if split.query else ''} HTTP/1.1\r\n"
+                   f"Host: {split.hostname}\r\nAccept: */*\r\n\r\n").encode() + form
+        warc.write(_warc_record(rng, "request", url, date, request, "application/http; msgtype=request"))
+        response = (f"HTTP/1.1 {c.status} {_REASONS.get(c.status, '')}\r\nContent-Type: {c.mime}\r\n"
+                    f"Content-Length: {len(c.body)}\r\n\r\n").encode() + c.body
+        offset = warc.tell()
+        record = _warc_record(rng, "response", url, date, response, "application/http; msgtype=response")
+        warc.write(record)
+        cdx_lines.append(f"{_surt(url)} {t:%Y%m%d%H%M%S} " + json.dumps({
+            "url": url, "mime": c.mime.split(";")[0], "status": str(c.status),
+            "digest": "sha1:" + hashlib.sha1(c.body).hexdigest(), "length": str(len(record)), "offset": str(offset),
+            "filename": "data.warc.gz",
+        }, separators=(",", ":")))
+
+    files = {
+        "archive/data.warc.gz": warc.getvalue(),
+        "indexes/index.cdxj": ("\n".join(sorted(cdx_lines)) + "\n").encode("utf-8"),
+        "pages/pages.jsonl": "\n".join(json.dumps(line) for line in [
+            {"format": "json-pages-1.0", "id": "pages", "title": "All Pages"},
+            {"id": f"{rng.getrandbits(64):016x}", "url": archive.target_url, "title": archive.title,
+             "ts": _iso(archive.captured_at)},
+        ]).encode("utf-8") + b"\n",
+    }
+    created = archive.captured_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+    datapackage = {
+        "profile": "data-package",
+        "resources": [{"name": name.rsplit("/", 1)[-1], "path": name, "hash": "sha256:" + hashlib.sha256(data).hexdigest(),
+                       "bytes": len(data)} for name, data in files.items()],
+        "wacz_version": "1.1.1", "software": "evidenceplatform benchmarks corpus", "created": created,
+        "modified": created, "title": archive.title, "mainPageUrl": archive.target_url, "mainPageDate": created,
+    }
+    with zipfile.ZipFile(archive_dir / "archive.wacz", "w") as zf:
+        # The WARC is stored uncompressed so indexed reads can seek straight into it.
+        _zip_add(zf, "archive/data.warc.gz", files["archive/data.warc.gz"], zipfile.ZIP_STORED)
+        for name in ("indexes/index.cdxj", "pages/pages.jsonl"):
+            _zip_add(zf, name, files[name], zipfile.ZIP_DEFLATED)
+        _zip_add(zf, "datapackage.json", json.dumps(datapackage, indent=2).encode("utf-8"), zipfile.ZIP_DEFLATED)
+    return archive_dir
+
+
+def generate_corpus(out_dir: Path, spec: CorpusSpec, platforms=PLATFORMS, formats=FORMATS,
+                    prefix: str = "bench") -> list[dict]:
+    """Write the corpus under out_dir (one directory per archive); returns one manifest row per archive."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = []
+    for platform in platforms:
+        for archive in build_archives(spec, platform):
+            for fmt in formats:
+                archive_dir = (write_har if fmt == "har" else write_wacz)(archive, out_dir, prefix)
+                archive_file = archive_dir / f"archive.{fmt}"
+                manifest.append({
+                    "name": archive_dir.name,
+                    "platform": platform,
+                    "index": archive.index,
+                    "format": fmt,
+                    "path": str(archive_dir),
+                    "entries": len(archive.captures),
+                    "bytes": archive_file.stat().st_size,
+                    "sha256": hashlib.sha256(archive_file.read_bytes()).hexdigest(),
+                })
+    return manifest
+
+
+def corpus_digest(manifest: list[dict]) -> str:
+    """One hash over the archive files, independent of where they were written or the name prefix."""
+    h = hashlib.sha256()
+    for row in sorted(manifest, key=lambda r: (r["platform"], r["format"], r["index"])):
+        h.update(f"{row['platform']}/{row['format']}/{row['sha256']}\n".encode())
+    return h.hexdigest()
+
+
+def spec_from_args(args: argparse.Namespace) -> CorpusSpec:
+    spec = SIZES[args.size]
+    overrides = {name: getattr(args, name) for name in asdict(spec) if getattr(args, name, None) is not None}
+    return replace(spec, **overrides)
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--size", choices=sorted(SIZES), default="small", help="Corpus size preset (default: small)")
+    for name, default in asdict(CorpusSpec()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=type(default), default=None,
+                            help=f"Override the preset's {name}")
+    parser.add_argument("--platform", nargs="+", choices=PLATFORMS, default=list(PLATFORMS))
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic benchmark corpus")
+    arg_parser.add_argument("out_dir", type=Path)
+    arg_parser.add_argument("--prefix", default="bench", help="Archive directory name prefix (default: bench)")
+    add_spec_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    corpus_spec = spec_from_args(args)
+    rows = generate_corpus(args.out_dir, corpus_spec, args.platform, args.format, args.prefix)
+    for r in rows:
+        print(f"{r['name']:60s} {r['entries']:6d} entries {r['bytes'] / 1e6:8.2f} MB")
+    print(f"{len(rows)} archives, digest {corpus_digest(rows)}")
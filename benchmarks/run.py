@@ -0,0 +1,378 @@
+"""
+Benchmark the ingestion pipeline and key server queries on a synthetic corpus.
+
+Writes a deterministic corpus (benchmarks/corpus.py) to a temporary directory
+and times, per platform and archive format:
+
+  offline, no database (each run on a fresh copy of every archive)
+    <platform>.har.scan           extract_data_from_har with no HAR sidecar index yet
+    <platform>.har.scan_indexed   the same with the sidecar index the first scan wrote
+    <platform>.wacz.scan          scan_wacz selecting records from the CDXJ index
+    <platform>.wacz.scan_full     scan_wacz reading every WARC record
+    <platform>.<fmt>.roundtrip    serialize the parse result and load it back, as Parts B and C do
+    <platform>.<fmt>.entities     har_data_to_entities
+
+  with --db, against a local database (once; the stages write to it, so point
+  DB_NAME at a disposable database, ideally freshly migrated for every run):
+    db.A.register, db.B.parse, db.C.extract, db.D.thumbnails, db.E.phash
+                                  the loader stages over the corpus, plus db.span.* per-step
+                                  totals from the tracer (see utils/tracing.py)
+    query.*                       search (accounts, posts, media, archive sessions), the
+                                  enriched post and account builders (uncached) and image
+                                  search (hash cache load and a lookup), --query-rounds each
+
+D.thumbnails writes into thumbnails/ like the loader does; leave it out with
+--db-stages if that matters.
+
+The results file is JSON with sorted keys: per metric the median, min, max and
+p95 seconds and items/s (db.span.* rows hold the span's total for the one run,
+so no p95), the counts each stage produced (structures, entities,
+rows, search hits), the corpus spec and digest, and the environment. With
+--baseline the results are compared against an earlier file (see
+benchmarks/compare.py) and the exit status is 1 on a regression.
+
+Run from the project root:
+
+    uv run python -m benchmarks.run [--size small|medium|large] [--runs N] [--db] [--out results.json] [--baseline baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.compare import compare_results, DEFAULT_THRESHOLD, DEFAULT_MIN_DELTA_S, load
+from benchmarks.corpus import add_spec_arguments, corpus_digest, generate_corpus, spec_from_args, SEARCH_TERMS
+from extractors.extract_photos import PhotoAcquisitionConfig
+from extractors.extract_videos import VideoAcquisitionConfig
+from extractors.har_index import index_path_for
+from extractors.structures_from_wacz import scan_wacz
+from extractors.structures_to_entities import ExtractedHarData, extract_data_from_har, har_data_to_entities, \
+    strip_media_contents
+
+DB_STAGES = ("A.register", "B.parse", "C.extract", "D.thumbnails", "E.phash")
+ENTITY_KEYS = ("accounts", "posts", "media", "comments", "likes", "account_relations", "tagged_accounts")
+DB_TABLES = ("archive_session", "account", "post", "media", "comment", "media_hash")
+# Settings that change what is being measured; recorded with the results.
+RELEVANT_ENV = ("HAR_SIDECAR_INDEX", "HAR_BODY_STORE", "WACZ_CDX_INDEX", "PARSE_CACHE_MAX_MB", "DB_STATS",
+                "LOADER_TRACE", "ENRICHED_POST_SINGLE_QUERY")
+
+# Part B's settings: parse what was captured, never download.
+NO_DOWNLOAD_VIDEOS = VideoAcquisitionConfig(
+    download_missing=False, download_media_not_in_structures=False, download_unfetched_media=False,
+    download_full_versions_of_fetched_media=False, download_highest_quality_assets_from_structures=False,
+)
+NO_DOWNLOAD_PHOTOS = PhotoAcquisitionConfig(
+    download_missing=False, download_media_not_in_structures=False, download_unfetched_media=False,
+    download_highest_quality_assets_from_structures=False,
+)
+
+
+def _metric(samples: list[float], items: Optional[int] = None) -> dict:
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    return {
+        "runs": len(ordered),
+        "median_s": round(median, 6),
+        "min_s": round(ordered[0], 6),
+        "max_s": round(ordered[-1], 6),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        "items": items,
+        "items_per_s": round(items / median, 2) if items and median > 0 else None,
+    }
+
+
+def _fresh_copy(src: Path, dst_root: Path, extra: tuple[Path, ...] = ()) -> Path:
+    """Copy just the archive file and metadata.json (plus `extra`) into a new directory."""
+    dst = dst_root / src.name
+    dst.mkdir(parents=True)
+    for name in ("archive.har", "archive.wacz", "metadata.json"):
+        if (src / name).exists():
+            shutil.copy2(src / name, dst / name)
+    for path in extra:
+        shutil.copy2(path, dst / path.name)
+    return dst
+
+
+def _entity_counts(entities) -> dict:
+    return {key: len(getattr(entities, key) or []) for key in ENTITY_KEYS}
+
+
+def run_offline(archives: list[dict], work_dir: Path, runs: int) -> tuple[dict, dict]:
+    """Time the parse and entity stages per platform/format group; returns (metrics, counts)."""
+    groups: dict[str, list[dict]] = {}
+    for row in archives:
+        groups.setdefault(f"{row['platform']}.{row['format']}", []).append(row)
+
+    metrics, counts = {}, {}
+    for group, rows in sorted(groups.items()):
+        fmt = rows[0]["format"]
+        samples: dict[str, list[float]] = {}
+        items: dict[str, int] = {}
+        group_counts: dict[str, int] = {}
+        for run in range(runs):
+            totals: dict[str, float] = {}
+            run_counts: dict[str, int] = {key: 0 for key in ENTITY_KEYS}
+            run_counts.update(structures=0, videos=0, photos=0)
+            for row in rows:
+                src = Path(row["path"])
+                run_dir = work_dir / f"{group}.{run}"
+                copy = _fresh_copy(src, run_dir / "cold")
+                if fmt == "har":
+                    har_path = copy / "archive.har"
+                    t = time.perf_counter()
+                    data = extract_data_from_har(har_path, NO_DOWNLOAD_VIDEOS, NO_DOWNLOAD_PHOTOS)
+                    totals["scan"] = totals.get("scan", 0.0) + time.perf_counter() - t
+                    index = index_path_for(har_path)
+                    if index.exists():
+                        warm = _fresh_copy(src, run_dir / "warm", extra=(index,))
+                        t = time.perf_counter()
+                        extract_data_from_har(warm / "archive.har", NO_DOWNLOAD_VIDEOS, NO_DOWNLOAD_PHOTOS)
+                        totals["scan_indexed"] = totals.get("scan_indexed", 0.0) + time.perf_counter() - t
+                    archive_path = har_path
+                else:
+                    archive_path = copy / "archive.wacz"
+                    t = time.perf_counter()
+                    structures, videos, photos = scan_wacz(archive_path, copy, use_index=True)
+                    totals["scan"] = totals.get("scan", 0.0) + time.perf_counter() - t
+                    full = _fresh_copy(src, run_dir / "full")
+                    t = time.perf_counter()
+                    scan_wacz(full / "archive.wacz", full, use_index=False)
+                    totals["scan_full"] = totals.get("scan_full", 0.0) + time.perf_counter() - t
+                    data = ExtractedHarData(structures=structures, videos=videos, photos=photos)
+                run_counts["structures"] += len(data.structures)
+                run_counts["videos"] += len(data.videos)
+                run_counts["photos"] += len(data.photos)
+
+                t = time.perf_counter()
+                strip_media_contents(data)
+                loaded = ExtractedHarData(**json.loads(json.dumps(data.model_dump(), default=str, ensure_ascii=False)))
+                totals["roundtrip"] = totals.get("roundtrip", 0.0) + time.perf_counter() - t
+
+                t = time.perf_counter()
+                entities = har_data_to_entities(archive_path, loaded.structures, loaded.videos, loaded.photos)
+                totals["entities"] = totals.get("entities", 0.0) + time.perf_counter() - t
+                for key, n in _entity_counts(entities).items():
+                    run_counts[key] += n
+            shutil.rmtree(work_dir / f"{group}.{run}", ignore_errors=True)
+
+            for stage, seconds in totals.items():
+                samples.setdefault(stage, []).append(seconds)
+            group_counts = run_counts
+            entries = sum(r["entries"] for r in rows)
+            n_entities = sum(run_counts[k] for k in ENTITY_KEYS)
+            items = {"scan": entries, "scan_indexed": entries, "scan_full": entries,
+                     "roundtrip": run_counts["structures"], "entities": n_entities}
+            print(f"  {group} run {run + 1}/{runs}: " + ", ".join(f"{k} {v:.3f}s" for k, v in totals.items()))
+
+        for stage, stage_samples in samples.items():
+            metrics[f"{group}.{stage}"] = _metric(stage_samples, items.get(stage))
+        counts[group] = group_counts
+    return metrics, counts
+
+
+def _db_row_counts() -> dict:
+    from utils import db
+    return {table: db.execute_query(f"SELECT COUNT(*) AS n FROM {table}", {}, return_type="single_row")["n"]
+            for table in DB_TABLES}
+
+
+def run_db(archives_root: Path, prefix: str, stages: list[str], query_rounds: int) -> tuple[dict, dict]:
+    """The loader stages over the corpus, then the server queries; returns (metrics, counts)."""
+    import asyncio
+    from db_loaders import archives_db_loader as loader
+    from db_loaders.phash_generator import generate_missing_hashes
+    from db_loaders.thumbnail_generator import generate_missing_thumbnails, generate_missing_part_thumbnails
+    import root_anchor
+    from utils.tracing import tracer
+
+    if os.getenv("ENVIRONMENT") == "production":
+        raise RuntimeError("Refusing to run the database benchmarks with ENVIRONMENT=production")
+
+    metrics, counts = {}, {}
+    before = _db_row_counts()
+    if before["archive_session"]:
+        print(f"WARNING: the database already holds {before['archive_session']} archive sessions; "
+              f"entity matching runs against them, so timings and counts differ from a fresh database.")
+
+    n_archives = len([d for d in archives_root.iterdir() if d.is_dir()])
+    runners: dict[str, Callable[[], object]] = {
+        "A.register": lambda: loader.register_archives(name_filter=f"{prefix}_*"),
+        "B.parse": loader.parse_archives,
+        "C.extract": loader.extract_entities,
+        "D.thumbnails": lambda: (asyncio.run(generate_missing_thumbnails()),
+                                 asyncio.run(generate_missing_part_thumbnails())),
+        "E.phash": lambda: asyncio.run(generate_missing_hashes()),
+    }
+    tracer.reset()
+    tracer.enable()
+    previous_root = root_anchor.ROOT_ARCHIVES
+    loader.set_archives_dir(archives_root)
+    try:
+        for stage in stages:
+            t = time.perf_counter()
+            runners[stage]()
+            elapsed = time.perf_counter() - t
+            metrics[f"db.{stage}"] = _metric([elapsed], n_archives)
+            print(f"  db {stage}: {elapsed:.3f}s")
+    finally:
+        loader.set_archives_dir(previous_root)
+    for name, s in tracer.summary().items():
+        # One total per span name, not a distribution over runs: a p95 of it would be
+        # meaningless, and the per-span p99 is not one (compare.py compares medians).
+        metrics[f"db.span.{name}"] = {"runs": s["count"], "median_s": s["total_s"], "min_s": s["total_s"],
+                                      "max_s": s["total_s"], "items": s["items"] or None,
+                                      "items_per_s": s["items_per_s"]}
+    after = _db_row_counts()
+    counts["db.rows_added"] = {table: after[table] - before[table] for table in DB_TABLES}
+
+    query_metrics, query_counts = run_queries(archives_root, query_rounds)
+    metrics.update(query_metrics)
+    counts.update(query_counts)
+    return metrics, counts
+
+
+def run_queries(archives_root: Path, rounds: int) -> tuple[dict, dict]:
+    from browsing_platform.server.services import enriched_entities
+    from browsing_platform.server.services.enriched_entities import EntitiesTransformConfig
+    from browsing_platform.server.services.image_search import reload_hash_cache, search_by_image_bytes
+    from browsing_platform.server.services.search import ISearchQuery, SearchResultTransform, search_base
+    from utils import db
+
+    transform = SearchResultTransform()
+    term = SEARCH_TERMS[0]
+    post_ids = [r["id"] for r in db.execute_query(
+        """SELECT p.id FROM post p LEFT JOIN comment c ON c.post_id = p.id
+           GROUP BY p.id ORDER BY COUNT(c.id) DESC, p.id LIMIT 5""", {}, return_type="rows") or []]
+    account_ids = [r["id"] for r in db.execute_query(
+        """SELECT a.id FROM account a JOIN post p ON p.account_id = a.id
+           GROUP BY a.id ORDER BY COUNT(p.id) DESC, a.id LIMIT 5""", {}, return_type="rows") or []]
+    build_post = (enriched_entities._build_enriched_post_single_query
+                  if enriched_entities.ENRICHED_POST_SINGLE_QUERY else enriched_entities._build_enriched_post)
+    config = EntitiesTransformConfig()
+    still = next(iter(sorted(archives_root.glob("*/photos/*.png"))), None)
+
+    def search(mode: str, search_term: Optional[str]):
+        return lambda i: search_base(ISearchQuery(search_term=search_term, search_mode=mode, page_number=1,
+                                                  page_size=20), transform)
+
+    queries: dict[str, Callable[[int], object]] = {
+        "query.search.accounts": search("accounts", term),
+        "query.search.posts": search("posts", term),
+        "query.search.posts_no_term": search("posts", None),
+        "query.search.media": search("media", term),
+        "query.search.archive_sessions": search("archive_sessions", None),
+    }
+    if post_ids:
+        queries["query.enriched_post"] = lambda i: build_post(post_ids[i % len(post_ids)], config)
+    if account_ids:
+        queries["query.enriched_account"] = lambda i: enriched_entities._build_enriched_account(
+            account_ids[i % len(account_ids)], config)
+    queries["query.image_search.load_cache"] = lambda i: reload_hash_cache()
+    if still is not None:
+        still_bytes = still.read_bytes()
+        queries["query.image_search.lookup"] = lambda i: search_by_image_bytes(still_bytes, 1, 20, transform)
+
+    metrics, counts = {}, {"query.results": {}}
+    for name, query in queries.items():
+        samples, result = [], None
+        for i in range(rounds):
+            t = time.perf_counter()
+            result = query(i)
+            samples.append(time.perf_counter() - t)
+        metrics[name] = _metric(samples)
+        if isinstance(result, (list, int)):
+            counts["query.results"][name.removeprefix("query.")] = result if isinstance(result, int) else len(result)
+        print(f"  {name}: median {statistics.median(samples) * 1000:.2f} ms")
+    return metrics, counts
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "git_commit": commit,
+        "env": {name: os.getenv(name) for name in RELEVANT_ENV if os.getenv(name) is not None},
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    spec = spec_from_args(args)
+    work_dir = Path(tempfile.mkdtemp(prefix="ep_bench_"))
+    corpus_dir = args.keep_corpus or work_dir / "archives"
+    # The DB stages register archives by directory name, so each run needs fresh names;
+    # the digest ignores the prefix, so results stay comparable.
+    prefix = f"bench{time.strftime('%H%M%S')}" if args.db else "bench"
+    try:
+        print(f"Generating corpus ({args.size}) in {corpus_dir}")
+        archives = generate_corpus(corpus_dir, spec, args.platform, args.format, prefix)
+        results = {
+            "schema": 1,
+            "corpus": {
+                "size": args.size,
+                "spec": asdict(spec),
+                "digest": corpus_digest(archives),
+                "archives": len(archives),
+                "entries": sum(a["entries"] for a in archives),
+                "bytes": sum(a["bytes"] for a in archives),
+            },
+            "environment": _environment(),
+            "metrics": {},
+            "counts": {},
+        }
+        print(f"Offline stages, {args.runs} run(s)")
+        metrics, counts = run_offline(archives, work_dir / "runs", args.runs)
+        results["metrics"].update(metrics)
+        results["counts"].update(counts)
+        if args.db:
+            print("Database stages and queries")
+            metrics, counts = run_db(Path(corpus_dir), prefix, args.db_stages, args.query_rounds)
+            results["metrics"].update(metrics)
+            results["counts"].update(counts)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    args.out.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        report, failures = compare_results(results, load(args.baseline), args.threshold, args.min_delta_ms / 1000)
+        print("\n".join(report))
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the pipeline and server queries on a synthetic corpus")
+    add_spec_arguments(arg_parser)
+    arg_parser.add_argument("--runs", type=int, default=3, help="Repetitions of each offline stage (default 3)")
+    arg_parser.add_argument("--db", action="store_true",
+                            help="Also run the loader stages and server queries against the configured database")
+    arg_parser.add_argument("--db-stages", nargs="+", choices=DB_STAGES, default=list(DB_STAGES))
+    arg_parser.add_argument("--query-rounds", type=int, default=20, help="Repetitions of each query (default 20)")
+    arg_parser.add_argument("--keep-corpus", type=Path, default=None,
+                            help="Write the corpus here and keep it (default: a temporary directory)")
+    arg_parser.add_argument("--out", type=Path, default=Path("bench_results.json"))
+    arg_parser.add_argument("--baseline", type=Path, default=None, help="Compare against this earlier results file")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    arg_parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_S * 1000)
+    sys.exit(main(arg_parser.parse_args()))
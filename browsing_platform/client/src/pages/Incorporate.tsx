@@ -52,6 +52,11 @@ interface LogLine {
     error?: string;
 }
 
+interface WsFrame extends LogLine {
+    messages?: LogLine[];
+    dropped?: number;
+}
+
 const STATUS_COLOR: Record<string, 'default' | 'success' | 'error' | 'warning' | 'info'> = {
     running: 'info',
     completed: 'success',
@@ -212,17 +217,28 @@ export default function IncorporatePage() {
 
         ws.onmessage = (event) => {
             try {
-                const msg: LogLine = JSON.parse(event.data);
-                if (msg.type === 'ping') return;
-                if (msg.type === 'done') {
-                    setRunning(false);
-                    setStarting(false);
-                    setStopping(false);
-                    fetchHistory();
+                const frame: WsFrame = JSON.parse(event.data);
+                if (frame.type === 'ping') return;
+                // The server batches whatever accumulated since its last send; a
+                // lone message arrives as itself.
+                const messages: LogLine[] = frame.type === 'batch' ? (frame.messages ?? []) : [frame];
+                const lines: LogLine[] = [];
+                if (frame.type === 'batch' && frame.dropped) {
+                    lines.push({type: 'log', level: 'WARNING',
+                        text: `… ${frame.dropped} messages dropped (the log fell behind)`});
                 }
-                if (msg.type === 'status' || msg.type === 'log' || msg.type === 'done') {
-                    setLogs(prev => [...prev, msg]);
+                for (const msg of messages) {
+                    if (msg.type === 'done') {
+                        setRunning(false);
+                        setStarting(false);
+                        setStopping(false);
+                        fetchHistory();
+                    }
+                    if (msg.type === 'status' || msg.type === 'log' || msg.type === 'done') {
+                        lines.push(msg);
+                    }
                 }
+                if (lines.length) setLogs(prev => [...prev, ...lines]);
             } catch {
                 // ignore malformed messages
             }
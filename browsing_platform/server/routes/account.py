@@ -11,6 +11,7 @@ from browsing_platform.server.services.enriched_entities import get_enriched_acc
     get_account_relations_by_account_id, get_interactions_by_account_id, AccountInteractions, \
     get_account_auxiliary_counts, AccountAuxiliaryCounts, AccountRelationsResponse, \
     get_account_tags_for_account_relations
+from browsing_platform.server.services.json_response import StreamingModelResponse, FastJSONResponse
 from browsing_platform.server.services.permissions import auth_entity_view_access, require_any_auth
 from browsing_platform.server.services.tag_management import get_related_account_tag_stats, ITagStat
 from db_loaders.account_merge import resolve_account_redirect
@@ -32,25 +33,25 @@ async def _resolved_account_id(item_id: int) -> int:
     return resolve_account_redirect(item_id)
 
 
-@router.get("/pk/{platform_id}/")
-@router.get("/pk/{platform_id}")
-async def get_account_by_pk(platform_id: str, req: Request) -> ExtractedEntitiesNested:
+@router.get("/pk/{platform_id}/", response_model=ExtractedEntitiesNested)
+@router.get("/pk/{platform_id}", response_model=ExtractedEntitiesNested)
+async def get_account_by_pk(platform_id: str, req: Request) -> StreamingModelResponse:
     await require_any_auth(req)
     account = get_account_by_platform_id(platform_id, include_data=False)
     if not account:
         raise HTTPException(status_code=404, detail="Account Not Found")
     await auth_entity_view_access(request=req, entity="account", entity_id=account.id)
-    return get_enriched_account_by_id(account.id, extract_entities_transform_config(req))
+    return StreamingModelResponse(get_enriched_account_by_id(account.id, extract_entities_transform_config(req)))
 
 
-@router.get("/url/{account_url:path}")
-async def get_account_by_url_path(account_url: str, req: Request) -> ExtractedEntitiesNested:
+@router.get("/url/{account_url:path}", response_model=ExtractedEntitiesNested)
+async def get_account_by_url_path(account_url: str, req: Request) -> StreamingModelResponse:
     await require_any_auth(req)
     account = get_account_by_url(account_url, include_data=False)
     if not account:
         raise HTTPException(status_code=404, detail="Account Not Found")
     await auth_entity_view_access(request=req, entity="account", entity_id=account.id)
-    return get_enriched_account_by_id(account.id, extract_entities_transform_config(req))
+    return StreamingModelResponse(get_enriched_account_by_id(account.id, extract_entities_transform_config(req)))
 
 
 @router.get("/data/{item_id:int}", dependencies=[Depends(_auth_account_view)])
@@ -59,7 +60,7 @@ async def get_account_data(item_id: int = Depends(_resolved_account_id)) -> Any:
     found, data = get_account_data_by_id(item_id)
     if not found:
         raise HTTPException(status_code=404, detail="Account Not Found")
-    return data
+    return FastJSONResponse(data)
 
 
 @router.get("/{item_id}/relations/", dependencies=[Depends(_auth_account_view)])
@@ -106,10 +107,10 @@ async def get_account_attribution_report(item_id: int = Depends(_resolved_accoun
     return report
 
 
-@router.get("/{item_id}/", dependencies=[Depends(_auth_account_view)])
-@router.get("/{item_id}", dependencies=[Depends(_auth_account_view)])
-async def get_account(req: Request, item_id: int = Depends(_resolved_account_id)) -> ExtractedEntitiesNested:
+@router.get("/{item_id}/", dependencies=[Depends(_auth_account_view)], response_model=ExtractedEntitiesNested)
+@router.get("/{item_id}", dependencies=[Depends(_auth_account_view)], response_model=ExtractedEntitiesNested)
+async def get_account(req: Request, item_id: int = Depends(_resolved_account_id)) -> StreamingModelResponse:
     account = get_enriched_account_by_id(item_id, extract_entities_transform_config(req))
     if not account:
         raise HTTPException(status_code=404, detail="Account Not Found")
-    return account
+    return StreamingModelResponse(account)
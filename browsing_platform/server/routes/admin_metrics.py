@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from browsing_platform.server.services.metrics import metrics
+from browsing_platform.server.services.permissions import auth_admin_access
+
+router = APIRouter(
+    prefix="/admin/metrics",
+    tags=["admin"],
+    dependencies=[Depends(auth_admin_access)],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/")
+@router.get("")
+async def get_metrics() -> PlainTextResponse:
+    """Server metrics in Prometheus text exposition format (see services/metrics.py)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
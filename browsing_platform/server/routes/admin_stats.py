@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+
+from browsing_platform.server.services.community import tie_graph
+from browsing_platform.server.services.entity_cache import entity_cache
+from browsing_platform.server.services.event_logger import audit_writer
+from browsing_platform.server.services.password_pool import password_pool
+from browsing_platform.server.services.permissions import auth_admin_access
+from utils.db_stats import db_stats
+
+router = APIRouter(
+    prefix="/admin/stats",
+    tags=["admin"],
+    dependencies=[Depends(auth_admin_access)],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/")
+@router.get("")
+async def get_stats() -> dict:
+    """In-process counters for the server's caches, background writers and DB access."""
+    return {
+        "entity_cache": entity_cache.stats(),
+        "audit_writer": audit_writer.stats(),
+        "password_pool": password_pool.stats(),
+        "tie_graph": tie_graph.stats(),
+        "db": db_stats.stats(),
+    }
@@ -3,9 +3,11 @@ from datetime import datetime
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from browsing_platform.server.services.password_authenticator import set_user_password
+from browsing_platform.server.services.password_pool import PasswordPoolBusy
 from browsing_platform.server.services.permissions import auth_admin_access
 from browsing_platform.server.services.token_manager import remove_all_tokens_for_user
 from browsing_platform.server.services.user_manager import delete_user as _delete_user
@@ -76,10 +78,13 @@ async def create_user(data: CreateUserRequest) -> CreatedUserResponse:
         {"e": data.email, "a": int(data.admin)}, "id"
     )
     try:
-        set_user_password(new_id, data.temp_password)
+        await run_in_threadpool(set_user_password, new_id, data.temp_password)
     except ValueError as e:
         db.execute_query("DELETE FROM user WHERE id = %(id)s", {"id": new_id}, "none")
         raise HTTPException(status_code=422, detail=str(e))
+    except PasswordPoolBusy:
+        db.execute_query("DELETE FROM user WHERE id = %(id)s", {"id": new_id}, "none")
+        raise
 
     return CreatedUserResponse(id=new_id, email=data.email)
 
@@ -112,7 +117,7 @@ async def update_user(user_id: int, data: UpdateUserRequest) -> Any:
 
     if data.temp_password:
         try:
-            set_user_password(user_id, data.temp_password)
+            await run_in_threadpool(set_user_password, user_id, data.temp_password)
             db.execute_query(
                 "UPDATE user SET force_pwd_reset = 1 WHERE id = %(uid)s",
                 {"uid": user_id}, "none"
@@ -9,7 +9,7 @@ from browsing_platform.server.services.media import get_media_by_id
 from browsing_platform.server.services.media_part import get_media_part_by_id
 from browsing_platform.server.services.permissions import auth_user_access
 from browsing_platform.server.services.post import get_post_by_id
-from utils import db
+from utils import db, entity_versions
 
 router = APIRouter(
     prefix="/annotate",
@@ -241,6 +241,7 @@ async def execute_annotation_import(
                 {"eid": entity_id, "tid": tag_id, "notes": resolved.notes},
                 return_type="none"
             )
+            entity_versions.bump(entity_type, [entity_id])
             results.append(IAnnotationImportRowResult(row_index=i, status='added'))
             summary.added += 1
 
@@ -13,6 +13,7 @@ from browsing_platform.server.services.archiving_session import ArchiveSessionWi
 from browsing_platform.server.services.enriched_entities import get_enriched_archiving_session_by_id, \
     get_archiving_sessions_by_account_id, get_archiving_sessions_by_post_id, \
     get_archiving_sessions_by_media_id
+from browsing_platform.server.services.json_response import StreamingModelResponse, FastJSONResponse
 from browsing_platform.server.services.permissions import auth_entity_view_access
 
 router = APIRouter(
@@ -32,16 +33,16 @@ async def get_archiving_session_data(item_id:int) -> Any:
     found, structures = get_archiving_session_structures(item_id)
     if not found:
         raise HTTPException(status_code=404, detail="Session Not Found")
-    return structures
+    return FastJSONResponse(structures)
 
 
-@router.get("/{item_id}/", dependencies=[Depends(_auth_archiving_session_view)])
-@router.get("/{item_id}", dependencies=[Depends(_auth_archiving_session_view)])
-async def get_archiving_session(item_id:int, req: Request) -> ArchiveSessionWithEntities:
+@router.get("/{item_id}/", dependencies=[Depends(_auth_archiving_session_view)], response_model=ArchiveSessionWithEntities)
+@router.get("/{item_id}", dependencies=[Depends(_auth_archiving_session_view)], response_model=ArchiveSessionWithEntities)
+async def get_archiving_session(item_id:int, req: Request) -> StreamingModelResponse:
     session = get_enriched_archiving_session_by_id(item_id, extract_entities_transform_config(req), extract_session_transform_config(req))
     if not session:
         raise HTTPException(status_code=404, detail="Session Not Found")
-    return session
+    return StreamingModelResponse(session)
 
 
 @router.get("/account/{item_id}/", dependencies=[Depends(_auth_account_view)])
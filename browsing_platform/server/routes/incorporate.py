@@ -29,9 +29,11 @@ class ResetStatusRequest(BaseModel):
 RESET_CONFIRMATION_PHRASE = "I am sure!"
 
 from browsing_platform.server.rate_limiter import _get_real_ip
-from browsing_platform.server.services.incorporation_service import manager, _run_incorporation, incorporation_ws, reset_incorporation_status
+from browsing_platform.server.services.incorporation_service import manager, _run_incorporation, incorporation_ws, \
+    reset_incorporation_status, IncorporationJob
 from browsing_platform.server.services.permissions import auth_admin_access
 from browsing_platform.server.services.token_manager import check_token
+from browsing_platform.server.services.ws_manager import batch_frame
 from utils import db
 
 logger = logging.getLogger(__name__)
@@ -63,24 +65,32 @@ def start(
                     "the latest already-registered archives in place (no accumulation). "
                     "Any other value is rejected with 422.",
     ),
+    archives_dir: Optional[str] = Query(
+        None,
+        description="Dev only: read this job's archives from another directory instead of ./archives.",
+    ),
     permissions=Depends(auth_admin_access),
 ):
     user_id = getattr(permissions, "user_id", None)
     client_ip = _get_real_ip(request)
     try:
-        job_id = manager.try_start(triggered_by_user_id=user_id, triggered_by_ip=client_ip)
+        job = manager.try_start(triggered_by_user_id=user_id, triggered_by_ip=client_ip, limit=limit,
+                                name_filter=name_filter, mode=mode.value, archives_dir=archives_dir)
     except RuntimeError as e:
         raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    background_tasks.add_task(_run_in_thread, job_id, limit, name_filter, mode.value)
-    return {"status": "started", "job_id": job_id}
+    background_tasks.add_task(_run_in_thread, job)
+    return {"status": "started", "job_id": job.job_id}
 
 
-def _run_in_thread(job_id: int, limit=None, name_filter=None, mode=None):
+def _run_in_thread(job: IncorporationJob):
     """Wrapper that launches the incorporation work in a daemon thread."""
     t = threading.Thread(
         target=_run_incorporation,
-        args=(job_id, limit, name_filter, mode),
+        args=(job,),
+        name=f"incorporation-{job.job_id}",
         daemon=True,
     )
     t.start()
@@ -91,10 +101,14 @@ def _run_in_thread(job_id: int, limit=None, name_filter=None, mode=None):
 # ---------------------------------------------------------------------------
 
 @router.post("/stop")
-def stop(_=Depends(auth_admin_access)):
-    if not manager.is_running():
-        raise HTTPException(status_code=409, detail="No incorporation job is currently running")
-    manager.request_cancel()
+def stop(
+    job_id: Optional[int] = Query(None, description="Job to stop. Omit to stop every running job."),
+    _=Depends(auth_admin_access),
+):
+    if not manager.request_cancel(job_id):
+        detail = ("No incorporation job is currently running" if job_id is None
+                  else f"Incorporation job {job_id} is not running")
+        raise HTTPException(status_code=409, detail=detail)
     return {"status": "cancel_requested"}
 
 
@@ -153,15 +167,17 @@ def reset_status(body: ResetStatusRequest, request: Request, permissions=Depends
 
 @router.get("/status")
 def status(_=Depends(auth_admin_access)):
-    job_id = manager.current_job_id()
-    if manager.is_running() and job_id is not None:
-        row = db.execute_query(
-            "SELECT * FROM incorporation_job WHERE id = %(id)s",
-            {"id": job_id},
-            return_type="single_row",
-        )
-        return {"running": True, "job": row}
-    return {"running": False, "job": None}
+    # `job` (the oldest running job) is kept for clients that only follow one job.
+    job_ids = [j.job_id for j in manager.running_jobs()]
+    rows = []
+    if job_ids:
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        rows = db.execute_query(
+            f"SELECT * FROM incorporation_job WHERE id IN ({placeholders}) ORDER BY id",
+            job_ids,
+            return_type="rows",
+        ) or []
+    return {"running": bool(rows), "job": rows[0] if rows else None, "jobs": rows, "max_jobs": manager.max_jobs}
 
 
 # ---------------------------------------------------------------------------
@@ -183,7 +199,8 @@ def history(_=Depends(auth_admin_access)):
 # ---------------------------------------------------------------------------
 
 @router.websocket("/ws")
-async def ws_endpoint(websocket: WebSocket):
+async def ws_endpoint(websocket: WebSocket, job_id: Optional[int] = None):
+    # ?job_id=N follows one job; without it the client gets every job's messages.
     # Accept first so we can send a proper close frame if auth fails.
     # Tokens must NOT be passed in the URL (they appear in server logs); instead
     # the client sends {"token": "<value>"} as its very first message.
@@ -201,20 +218,25 @@ async def ws_endpoint(websocket: WebSocket):
         if not perms.valid or not perms.admin:
             await websocket.close(code=4003)
             return
-    q = incorporation_ws.subscribe()
+    # Filtered before buffering, so another job's messages neither fill this
+    # client's buffer nor count as dropped for it.
+    sub = incorporation_ws.subscribe(None if job_id is None else (lambda m: m.get("job_id") == job_id))
     try:
         while True:
-            try:
-                msg = await asyncio.wait_for(q.get(), timeout=30)
-                await websocket.send_text(json.dumps(msg))
-            except asyncio.TimeoutError:
+            # Everything buffered since the last send goes out as one frame; a
+            # client that can't keep up loses the oldest lines (reported as
+            # "dropped") rather than growing the server's buffers.
+            messages, dropped = await sub.next_batch(timeout=30)
+            if not messages and not dropped:
                 try:
                     await websocket.send_text(json.dumps({"type": "ping"}))
                 except Exception:
                     break
+                continue
+            await websocket.send_text(json.dumps(batch_frame(messages, dropped)))
     except WebSocketDisconnect:
         pass
     except Exception as e:
         logger.debug(f"WebSocket error: {e}")
     finally:
-        incorporation_ws.unsubscribe(q)
+        incorporation_ws.unsubscribe(sub)
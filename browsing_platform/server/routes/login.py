@@ -4,6 +4,7 @@ import re
 import traceback
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from browsing_platform.server.rate_limiter import limiter
@@ -13,6 +14,7 @@ from browsing_platform.server.services.password_authenticator import (
     LoginStepResponse,
     login_with_password,
 )
+from browsing_platform.server.services.password_pool import PasswordPoolBusy
 from browsing_platform.server.services.permissions import parse_token_from_header
 from browsing_platform.server.services.pre_auth_manager import consume_pre_auth_token
 from browsing_platform.server.services.token_manager import AuthTokenResponse, generate_token, remove_token
@@ -45,9 +47,12 @@ class Verify2FARequest(BaseModel):
 @limiter.limit("10/15minutes")
 async def login_with_pass(data: LoginCredentialsPass, request: Request) -> LoginStepResponse:
     try:
-        return login_with_password(data.email, data.password)
+        # Off the event loop: the argon2 verify waits for a password pool worker.
+        return await run_in_threadpool(login_with_password, data.email, data.password)
     except AccountLockedException as e:
         raise HTTPException(status_code=403, detail=str(e))
+    except PasswordPoolBusy:
+        raise
     except Exception:
         logger.error(f"Login error: {traceback.format_exc()}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -4,6 +4,7 @@ from browsing_platform.server.routes.fast_api_request_processor import extract_s
 from browsing_platform.server.services.image_search import (
     reload_hash_cache, search_by_image_bytes,
 )
+from browsing_platform.server.services.json_response import StreamingModelResponse
 from browsing_platform.server.services.permissions import auth_user_access
 from browsing_platform.server.services.search import ISearchQuery, SearchResult, search_base
 
@@ -15,9 +16,9 @@ router = APIRouter(
 )
 
 
-@router.post("/", dependencies=[Depends(auth_user_access)])
-async def search_data(query: ISearchQuery, req: Request) -> list[SearchResult]:
-    return search_base(query, extract_search_results_config(req))
+@router.post("/", dependencies=[Depends(auth_user_access)], response_model=list[SearchResult])
+async def search_data(query: ISearchQuery, req: Request) -> StreamingModelResponse:
+    return StreamingModelResponse(search_base(query, extract_search_results_config(req)))
 
 
 @router.post("/image", dependencies=[Depends(auth_user_access)])
@@ -1,6 +1,7 @@
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
@@ -93,7 +94,7 @@ async def patch_share_link_password(entity: T_Entities, entity_id: int, body: Se
     if not existing:
         raise HTTPException(status_code=404, detail="No share link found for this entity")
     try:
-        set_link_password(existing.link_suffix, body.password)
+        await run_in_threadpool(set_link_password, existing.link_suffix, body.password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"success": True}
@@ -107,7 +108,7 @@ class VerifyPasswordRequest(BaseModel):
 @public_router.post("/verify_password/")
 @limiter.limit("5/minute")
 async def verify_password_endpoint(request: Request, body: VerifyPasswordRequest) -> Any:
-    token = verify_share_link_password(body.link_suffix, body.password)
+    token = await run_in_threadpool(verify_share_link_password, body.link_suffix, body.password)
     if token is None:
         raise HTTPException(status_code=401, detail="Invalid password")
     return {"token": token}
@@ -3,6 +3,7 @@ import logging
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from browsing_platform.server.services import upload_service
@@ -15,6 +16,7 @@ router = APIRouter(prefix="/upload", tags=["upload"])
 MAX_UPLOAD_LENGTH = 10 * 1024 * 1024 * 1024  # 10 GB per file
 TUS_VERSION = "1.0.0"
 TUS_EXTENSIONS = "creation,termination"
+PATCH_WRITE_BUFFER = 4 * 1024 * 1024
 
 
 def _tus_headers(extra: Optional[dict] = None) -> dict:
@@ -137,15 +139,29 @@ async def tus_patch(
     if upload_offset is None:
         raise HTTPException(status_code=400, detail="Upload-Offset header required")
 
-    data = await request.body()
-
     try:
-        new_offset = upload_service.patch_upload(file_id, upload_offset, data)
+        writer = await run_in_threadpool(upload_service.open_patch, file_id, upload_offset)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Upload not found")
     except ValueError as e:
         raise HTTPException(status_code=409, detail=str(e))
 
+    # Stream the body to disk in PATCH_WRITE_BUFFER slices instead of holding the
+    # whole chunk in memory; file writes and hashing run off the event loop.
+    buffer = bytearray()
+    try:
+        async for piece in request.stream():
+            buffer += piece
+            if len(buffer) >= PATCH_WRITE_BUFFER:
+                await run_in_threadpool(writer.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(writer.write, bytes(buffer))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    finally:
+        new_offset = await run_in_threadpool(writer.close)
+
     return Response(
         status_code=204,
         headers=_tus_headers({"Upload-Offset": str(new_offset)}),
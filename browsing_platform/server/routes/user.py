@@ -3,6 +3,7 @@ import logging
 from typing import Union
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from browsing_platform.server.services.event_logger import log_event
@@ -53,7 +54,7 @@ async def change_password_preauth(
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     try:
-        new_hash, alg = hash_password(data.new_password)
+        new_hash, alg = await run_in_threadpool(hash_password, data.new_password)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
@@ -101,7 +102,7 @@ async def change_password(
     if not user_row:
         raise HTTPException(status_code=401)
 
-    ok = verify_password(user_row["password_hash"], data.current_password)
+    ok = await run_in_threadpool(verify_password, user_row["password_hash"], data.current_password)
     if not ok:
         raise HTTPException(status_code=401, detail="Current password is incorrect")
 
@@ -109,7 +110,7 @@ async def change_password(
         raise HTTPException(status_code=400, detail="Invalid TOTP code")
 
     try:
-        new_hash, alg = hash_password(data.new_password)
+        new_hash, alg = await run_in_threadpool(hash_password, data.new_password)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
@@ -0,0 +1,103 @@
+"""
+Compare the single-statement and multi-query enriched post builders.
+Checks both produce identical payloads (the full serialized page, with and
+without tags, reporting the first differing field), then reports per-call latency.
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_enriched_post.py [--posts N] [--rounds R]
+
+Picks the N posts with the most comments (the worst case for round trips).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from browsing_platform.server.services.enriched_entities import EntitiesTransformConfig, \
+    _build_enriched_post, _build_enriched_post_single_query
+from utils import db
+
+
+def _first_difference(a, b, path: str = "") -> Optional[str]:
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in sorted(set(a) | set(b), key=str):
+            if key not in a or key not in b:
+                return f"{path}.{key}: only in {'multi' if key in a else 'single'}-query output"
+            diff = _first_difference(a[key], b[key], f"{path}.{key}")
+            if diff:
+                return diff
+        return None
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return f"{path}: {len(a)} vs {len(b)} items"
+        for i, (x, y) in enumerate(zip(a, b)):
+            diff = _first_difference(x, y, f"{path}[{i}]")
+            if diff:
+                return diff
+        return None
+    return None if a == b else f"{path}: {a!r} vs {b!r}"
+
+
+def _timed(build, post_id: int, config: EntitiesTransformConfig, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        build(post_id, config)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"median {statistics.median(ordered):7.2f} ms  p95 {p95:7.2f} ms"
+
+
+def main(n_posts: int, rounds: int):
+    rows = db.execute_query(
+        """SELECT p.id FROM post p LEFT JOIN comment c ON c.post_id = p.id
+           GROUP BY p.id ORDER BY COUNT(c.id) DESC LIMIT %(n)s""",
+        {"n": n_posts}, "rows"
+    )
+    post_ids = [r["id"] for r in rows]
+    if not post_ids:
+        print("No posts in the database.")
+        sys.exit(1)
+
+    mismatches = 0
+    for include_tags in (True, False):
+        check_config = EntitiesTransformConfig(include_tags=include_tags)
+        for post_id in post_ids:
+            multi = _build_enriched_post(post_id, check_config).model_dump(mode="json")
+            single = _build_enriched_post_single_query(post_id, check_config).model_dump(mode="json")
+            diff = _first_difference(multi, single)
+            if diff:
+                mismatches += 1
+                print(f"MISMATCH on post {post_id} (include_tags={include_tags}) at {diff}")
+    print(f"Checked {len(post_ids)} posts, {mismatches} mismatches")
+
+    config = EntitiesTransformConfig(include_tags=True)
+
+    multi_samples, single_samples = [], []
+    for post_id in post_ids:
+        multi_samples += _timed(_build_enriched_post, post_id, config, rounds)
+        single_samples += _timed(_build_enriched_post_single_query, post_id, config, rounds)
+    print(f"multi-query  : {_summary(multi_samples)}")
+    print(f"single-query : {_summary(single_samples)}")
+    speedup = statistics.median(multi_samples) / statistics.median(single_samples)
+    print(f"median speedup: {speedup:.2f}x")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    main(args.posts, args.rounds)
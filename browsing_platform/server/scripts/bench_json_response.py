@@ -0,0 +1,88 @@
+"""
+Measure serialisation cost of the largest account pages: FastAPI's default
+path (jsonable_encoder + JSONResponse) against StreamingModelResponse.
+Reports time-to-first-byte, total time and peak Python heap during encoding,
+and checks both produce the same JSON.
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_json_response.py [--accounts N]
+
+Accounts are ranked by post count. The enriched model is built once per account
+(and excluded from the measurements) since both paths start from it.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from browsing_platform.server.services.enriched_entities import EntitiesTransformConfig, get_enriched_account_by_id
+from browsing_platform.server.services.json_response import iter_json_chunks
+from utils import db
+
+
+def _measure(encode) -> tuple[float, float, int]:
+    """Returns (ttfb_ms, total_ms, peak_bytes). Chunks are dropped as soon as they
+    are produced, as they would be once handed to the socket."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    ttfb = None
+    for _chunk in encode():
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb * 1000, total * 1000, peak
+
+
+def _default_path(model):
+    def encode():
+        yield JSONResponse(jsonable_encoder(model)).body
+    return encode
+
+
+def _streaming_path(model):
+    def encode():
+        yield from iter_json_chunks(model)
+    return encode
+
+
+def main(n_accounts: int):
+    rows = db.execute_query(
+        """SELECT account_id AS id, COUNT(*) AS posts FROM post
+           GROUP BY account_id ORDER BY posts DESC LIMIT %(n)s""",
+        {"n": n_accounts}, "rows"
+    )
+    if not rows:
+        print("No accounts with posts in the database.")
+        sys.exit(1)
+
+    config = EntitiesTransformConfig(include_tags=True)
+    print(f"{'account':>8} {'posts':>6} {'MiB':>7} | {'path':<9} {'ttfb ms':>9} {'total ms':>9} {'peak MiB':>9}")
+    for row in rows:
+        model = get_enriched_account_by_id(row["id"], config)
+        default_body = JSONResponse(jsonable_encoder(model)).body
+        streamed_body = b"".join(iter_json_chunks(model))
+        if json.loads(default_body) != json.loads(streamed_body):
+            print(f"MISMATCH on account {row['id']}")
+        size_mib = len(default_body) / 2 ** 20
+        for label, encode in (("default", _default_path(model)), ("streaming", _streaming_path(model))):
+            ttfb, total, peak = _measure(encode)
+            print(f"{row['id']:>8} {row['posts']:>6} {size_mib:>7.2f} | {label:<9} {ttfb:>9.1f} {total:>9.1f} "
+                  f"{peak / 2 ** 20:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=5)
+    args = parser.parse_args()
+    main(args.accounts)
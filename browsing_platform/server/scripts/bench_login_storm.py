@@ -0,0 +1,123 @@
+"""
+Show how a burst of logins affects the latency of other requests: --logins
+concurrent argon2 verifications (the work of POST /api/login/ for a wrong
+password or an unknown email) are fired at once while a probe measures how
+long a trivial async handler takes to get a turn on the event loop, every
+--probe-ms milliseconds.
+
+Two modes, each on a fresh event loop:
+
+  inline  the previous behaviour: the async login handler calls argon2 directly,
+          so every verification blocks the event loop
+  pool    the current behaviour: the handler awaits run_in_threadpool, and the
+          verification itself waits for a PasswordPool worker; calls beyond the
+          pool's queue limit are rejected at once (a 503 in the server)
+
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_login_storm.py [--logins N] [--workers N] [--queue-max N]
+
+No server or DB is involved. The hasher uses the same parameters as
+password_authenticator, with a throwaway password.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from argon2 import PasswordHasher, exceptions as argon_exc
+from fastapi.concurrency import run_in_threadpool
+
+from browsing_platform.server.services.password_pool import PasswordPool, PasswordPoolBusy
+
+# Keep in step with password_authenticator._ph (importing it would open a DB pool).
+_ph = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1, hash_len=32, salt_len=16)
+
+
+def _verify(stored_hash: str, provided: str) -> bool:
+    try:
+        return _ph.verify(stored_hash, provided)
+    except argon_exc.VerifyMismatchError:
+        return False
+
+
+async def _probe(stop: asyncio.Event, interval_s: float, samples: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def _storm(mode: str, args, stored_hash: str) -> dict:
+    pool = PasswordPool(workers=args.workers, queue_max=args.queue_max, queue_timeout_s=args.queue_timeout_s)
+    outcomes = {"ok": 0, "rejected": 0}
+    latencies: list[float] = []
+
+    async def login(i: int) -> None:
+        started = time.perf_counter()
+        try:
+            if mode == "inline":
+                _verify(stored_hash, f"wrong-{i}")
+            else:
+                await run_in_threadpool(pool.run, _verify, stored_hash, f"wrong-{i}")
+            outcomes["ok"] += 1
+        except PasswordPoolBusy:
+            outcomes["rejected"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, args.probe_ms / 1000, lags))
+    await asyncio.sleep(0.1)  # baseline probe samples before the burst
+    started = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.1)
+    stop.set()
+    await probe
+    pool.shutdown()
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "ok": outcomes["ok"],
+        "rejected": outcomes["rejected"],
+        "login_p50_s": statistics.median(latencies),
+        "lag_p50_s": statistics.median(lags),
+        "lag_p99_s": lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+        "lag_max_s": lags[-1],
+        "probes": len(lags),
+        "pool": pool.stats(),
+    }
+
+
+def main(args):
+    stored_hash = _ph.hash("correct horse battery staple")
+    t = time.perf_counter()
+    _verify(stored_hash, "warm-up")
+    single_ms = (time.perf_counter() - t) * 1000
+    print(f"{args.logins} concurrent logins, one verify = {single_ms:.1f} ms, "
+          f"pool: {args.workers} workers, queue {args.queue_max}, probe every {args.probe_ms} ms")
+    for mode in args.modes:
+        r = asyncio.run(_storm(mode, args, stored_hash))
+        print(f"  {mode:6s} burst {r['elapsed_s']:6.2f}s  ok {r['ok']:4d}  rejected {r['rejected']:4d}  "
+              f"login p50 {r['login_p50_s'] * 1000:7.1f} ms  |  other requests wait: "
+              f"p50 {r['lag_p50_s'] * 1000:6.1f} ms  p99 {r['lag_p99_s'] * 1000:7.1f} ms  "
+              f"max {r['lag_max_s'] * 1000:7.1f} ms  ({r['probes']} probes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-max", type=int, default=16)
+    parser.add_argument("--queue-timeout-s", type=float, default=10.0)
+    parser.add_argument("--probe-ms", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", choices=("inline", "pool"), default=["inline", "pool"])
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+"""
+Measure the per-request cost of MetricsMiddleware: drive --requests requests
+through a trivial ASGI app (returns a small body, sets scope["route"] like
+FastAPI does) with and without the middleware and report the difference, next
+to the overhead the middleware measures itself (http_metrics_overhead_seconds).
+
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_metrics_overhead.py [--requests N] [--routes N]
+
+No server, DB or network is involved; the numbers are an upper bound on what a
+real request pays, since real handlers do far more work than the dummy app.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from browsing_platform.server.services.metrics import MetricsMiddleware, metrics
+
+
+class _Route:
+    def __init__(self, path: str):
+        self.path = path
+
+
+def _make_app(routes: list[_Route]):
+    async def app(scope, receive, send):
+        scope["route"] = routes[hash(scope["path"]) % len(routes)]
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok": true}'})
+    return app
+
+
+async def _drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message):
+        pass
+
+    started = time.perf_counter()
+    for i in range(n):
+        await app({"type": "http", "method": "GET", "path": f"/api/item/{i % 997}"}, receive, send)
+    return time.perf_counter() - started
+
+
+def main(args):
+    routes = [_Route(f"/api/route_{i}/{{item_id}}") for i in range(args.routes)]
+    bare = _make_app(routes)
+    wrapped = MetricsMiddleware(bare)
+    asyncio.run(_drive(wrapped, 1000))  # warm up series creation
+    bare_s = min(asyncio.run(_drive(bare, args.requests)) for _ in range(args.runs))
+    wrapped_s = min(asyncio.run(_drive(wrapped, args.requests)) for _ in range(args.runs))
+    per_request_us = (wrapped_s - bare_s) / args.requests * 1e6
+    series = metrics.overhead._series.get(())
+    self_measured_us = series[-1] / sum(series[:-1]) * 1e6 if series else 0.0
+    render_started = time.perf_counter()
+    page = metrics.render()
+    render_ms = (time.perf_counter() - render_started) * 1000
+    print(f"{args.requests} requests, {args.routes} route templates, best of {args.runs}")
+    print(f"  bare app:          {bare_s / args.requests * 1e6:7.2f} us/request")
+    print(f"  with middleware:   {wrapped_s / args.requests * 1e6:7.2f} us/request")
+    print(f"  added:             {per_request_us:7.2f} us/request")
+    print(f"  self-measured:     {self_measured_us:7.2f} us/request (http_metrics_overhead_seconds)")
+    print(f"  /admin/metrics render: {render_ms:.1f} ms, {len(page) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--routes", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=3)
+    main(parser.parse_args())
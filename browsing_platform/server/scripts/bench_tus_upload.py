@@ -0,0 +1,129 @@
+"""
+Measure the TUS upload path: the per-PATCH cost (lookup, write, state
+bookkeeping) and the verify step, for the current upload_service against the
+previous behaviour (scan every staging directory to find the upload, rewrite
+the state JSON after each chunk, re-read the whole file to hash it at verify).
+
+Two scenarios, each run in a throwaway staging directory:
+
+  parallel  --uploads N files of --file-mb MiB uploaded by --threads threads in
+            --chunk-mb chunks, with --idle-archives unrelated staging archives
+            present (the directory scan grows with them)
+  large     one --large-gb GiB file in --chunk-mb chunks, then verify
+
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_tus_upload.py [--scenario parallel|large|both]
+
+The HTTP layer is left out: both paths receive the same bytes objects, so what
+is measured is the service-side work per chunk and at verify.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from browsing_platform.server.services import upload_service
+
+
+def _legacy_patch(file_id: str, offset: int, data: bytes) -> int:
+    state_file = upload_service._find_state_file(file_id)
+    state = json.loads(state_file.read_text(encoding="utf-8"))
+    if state["offset"] != offset:
+        raise ValueError("Offset mismatch")
+    file_path = upload_service._safe_staging_file_path(state["archive_name"], state["relative_path"])
+    with open(file_path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+    state["offset"] = offset + len(data)
+    state_file.write_text(json.dumps(state), encoding="utf-8")
+    return state["offset"]
+
+
+def _legacy_verify(archive_name: str) -> dict:
+    # The previous verify_archive: always hash from disk.
+    results = []
+    for state_file in (upload_service.get_staging_dir() / archive_name / upload_service._TUS_STATE_DIR).glob("*.json"):
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+        sha256 = hashlib.sha256()
+        with open(upload_service._safe_staging_file_path(archive_name, state["relative_path"]), "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                sha256.update(chunk)
+        results.append(sha256.hexdigest() == state["file_hash"])
+    return {"status": "pass" if all(results) else "fail"}
+
+
+def _fresh_staging(root: str, idle_archives: int) -> None:
+    staging = os.path.join(root, "staging")
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.environ["UPLOAD_STAGING_DIR"] = staging
+    for i in range(idle_archives):
+        os.makedirs(os.path.join(staging, f"idle_{i}", upload_service._TUS_STATE_DIR))
+    upload_service.load_upload_index()
+
+
+def _upload(archive_name: str, payload: bytes, chunk: bytes, patch) -> None:
+    file_id = upload_service.create_upload(archive_name, "data.bin", len(payload),
+                                           hashlib.sha256(payload).hexdigest())
+    offset = 0
+    while offset < len(payload):
+        offset = patch(file_id, offset, chunk[: min(len(chunk), len(payload) - offset)])
+
+
+def _run(label: str, archives: list[str], payload: bytes, chunk: bytes, patch, verify, threads: int) -> None:
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda name: _upload(name, payload, chunk, patch), archives))
+    upload_s = time.perf_counter() - t
+    t = time.perf_counter()
+    statuses = {verify(name)["status"] for name in archives}
+    verify_s = time.perf_counter() - t
+    total_mib = len(archives) * len(payload) / (1 << 20)
+    print(f"  {label:8s} upload {upload_s:7.2f}s ({total_mib / upload_s:7.1f} MiB/s)  "
+          f"verify {verify_s:7.2f}s  status={','.join(sorted(statuses))}")
+
+
+def _scenario(name: str, root: str, archives: int, file_bytes: int, chunk_bytes: int, threads: int,
+              idle_archives: int) -> None:
+    print(f"{name}: {archives} upload(s) x {file_bytes / (1 << 20):.0f} MiB, "
+          f"{chunk_bytes / (1 << 20):.0f} MiB chunks, {threads} thread(s), {idle_archives} idle staging archive(s)")
+    # The payload repeats one chunk; content does not affect the cost being measured.
+    chunk = os.urandom(chunk_bytes)
+    payload = (chunk * (-(-file_bytes // chunk_bytes)))[:file_bytes]
+    names = [f"bench_{i}" for i in range(archives)]
+    _fresh_staging(root, idle_archives)
+    _run("legacy", names, payload, chunk, _legacy_patch, _legacy_verify, threads)
+    _fresh_staging(root, idle_archives)
+    _run("current", names, payload, chunk, upload_service.patch_upload, upload_service.verify_archive, threads)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as root:
+        if args.scenario in ("parallel", "both"):
+            _scenario("parallel", root, args.uploads, args.file_mb << 20, args.chunk_mb << 20, args.threads,
+                      args.idle_archives)
+        if args.scenario in ("large", "both"):
+            _scenario("large", root, 1, int(args.large_gb * (1 << 30)), args.chunk_mb << 20, 1, 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=["parallel", "large", "both"], default="both")
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--file-mb", type=int, default=8)
+    parser.add_argument("--chunk-mb", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--idle-archives", type=int, default=500)
+    parser.add_argument("--large-gb", type=float, default=4.0)
+    parser.add_argument("--tmp-dir", default=None, help="Where to stage (needs room for the large scenario).")
+    main(parser.parse_args())
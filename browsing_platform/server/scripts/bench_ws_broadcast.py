@@ -0,0 +1,153 @@
+"""
+Show what a chatty loader costs the event loop and memory: a thread broadcasts
+--rate messages/s for --seconds to --fast subscribers that send as soon as they
+can and --slow ones that take --slow-ms per frame (a stalled browser tab), while
+a probe measures how long a trivial handler waits for a turn on the event loop.
+
+Two modes, each on a fresh event loop:
+
+  queue  the previous behaviour: one unbounded asyncio.Queue per subscriber, fed
+         by a call_soon_threadsafe per message, one frame per message
+  ring   the current behaviour: ws_manager.BroadcastManager with per-subscriber
+         ring buffers, coalescing of progress lines for subscribers that fall
+         WS_COALESCE_HIGH_WATER messages behind, and batched frames
+
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_ws_broadcast.py [--rate N] [--seconds S] [--slow N]
+
+No server or DB is involved; "sending" a frame is json.dumps plus the sleep.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from browsing_platform.server.services import ws_manager
+
+
+def _message(i: int) -> tuple[dict, object]:
+    # Mostly per-item progress, like Part B/C/D; every 50th line is a stage line.
+    if i % 50 == 0:
+        return {"type": "status", "text": f"Part C — stage line {i}", "job_id": 1}, None
+    return {"type": "status", "text": f"Part C — extracted session_{i}", "job_id": 1}, (1, "Part C")
+
+
+def _produce(rate: int, seconds: float, publish) -> None:
+    total = int(rate * seconds)
+    started = time.perf_counter()
+    for i in range(total):
+        msg, key = _message(i)
+        publish(msg, key)
+        ahead = started + (i + 1) / rate - time.perf_counter()
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+async def _probe(stop: asyncio.Event, interval_s: float, samples: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def _run(mode: str, args) -> dict:
+    loop = asyncio.get_running_loop()
+    ws_manager.set_event_loop(loop)
+    stop = asyncio.Event()
+    counters = {"frames": 0, "messages": 0, "dropped": 0, "peak_depth": 0}
+    delays = [0.0] * args.fast + [args.slow_ms / 1000] * args.slow
+
+    if mode == "queue":
+        queues = [asyncio.Queue() for _ in delays]
+
+        def publish(msg, _key):
+            for q in queues:
+                loop.call_soon_threadsafe(q.put_nowait, msg)
+
+        async def consume(i: int, delay: float):
+            q = queues[i]
+            while not (stop.is_set() and q.empty()):
+                try:
+                    msg = await asyncio.wait_for(q.get(), timeout=0.2)
+                except asyncio.TimeoutError:
+                    continue
+                counters["peak_depth"] = max(counters["peak_depth"], q.qsize())
+                json.dumps(msg)
+                counters["frames"] += 1
+                counters["messages"] += 1
+                if delay:
+                    await asyncio.sleep(delay)
+    else:
+        manager = ws_manager.BroadcastManager(name=f"bench-{mode}")
+        subs = [manager.subscribe() for _ in delays]
+
+        def publish(msg, key):
+            manager.broadcast(msg, coalesce_key=key)
+
+        async def consume(i: int, delay: float):
+            sub = subs[i]
+            while not (stop.is_set() and sub.depth() == 0):
+                counters["peak_depth"] = max(counters["peak_depth"], sub.depth())
+                messages, dropped = await sub.next_batch(timeout=0.2)
+                if not messages and not dropped:
+                    continue
+                json.dumps(ws_manager.batch_frame(messages, dropped))
+                counters["frames"] += 1
+                counters["messages"] += len(messages)
+                counters["dropped"] += dropped
+                if delay:
+                    await asyncio.sleep(delay)
+
+    lags: list[float] = []
+    probe = asyncio.create_task(_probe(stop, args.probe_ms / 1000, lags))
+    consumers = [asyncio.create_task(consume(i, d)) for i, d in enumerate(delays)]
+    producer = threading.Thread(target=_produce, args=(args.rate, args.seconds, publish))
+    started = time.perf_counter()
+    producer.start()
+    await asyncio.to_thread(producer.join)
+    produced_s = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(probe, *consumers)
+    drained_s = time.perf_counter() - started
+    lags.sort()
+    return {
+        "produced_s": produced_s,
+        "drained_s": drained_s,
+        "lag_p50_s": statistics.median(lags),
+        "lag_p99_s": lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+        **counters,
+    }
+
+
+def main(args):
+    total = int(args.rate * args.seconds)
+    print(f"{total} messages at {args.rate}/s to {args.fast} fast + {args.slow} slow "
+          f"({args.slow_ms} ms/frame) subscribers, probe every {args.probe_ms} ms")
+    for mode in args.modes:
+        r = asyncio.run(_run(mode, args))
+        print(f"  {mode:5s} produced {r['produced_s']:5.2f}s  drained {r['drained_s']:6.2f}s  "
+              f"frames {r['frames']:7d}  delivered {r['messages']:7d}  dropped {r['dropped']:6d}  "
+              f"peak depth {r['peak_depth']:6d}  |  loop wait p50 {r['lag_p50_s'] * 1000:5.1f} ms  "
+              f"p99 {r['lag_p99_s'] * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fast", type=int, default=2)
+    parser.add_argument("--slow", type=int, default=2)
+    parser.add_argument("--slow-ms", type=float, default=20.0)
+    parser.add_argument("--probe-ms", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", choices=("queue", "ring"), default=["queue", "ring"])
+    main(parser.parse_args())
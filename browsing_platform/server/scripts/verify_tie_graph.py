@@ -0,0 +1,104 @@
+"""
+Check the in-memory community tie graph against the SQL scoring and time both.
+Builds the graph, then for random kernels (drawn from well-connected accounts)
+and a few weight settings compares candidate and kernel-mode scores.
+Run from the project root:
+
+    uv run browsing_platform/server/scripts/verify_tie_graph.py [--kernels N] [--kernel-size K]
+
+Candidate lists are compared as {id: (score, kernel_connections)}; SQL orders
+equal scores arbitrarily, so the last few entries at the TOP_N boundary may
+legitimately differ when several candidates share the cut-off score.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from browsing_platform.server.services.community import TOP_N, TieWeights, _build_score_sql, _weight_args, tie_graph
+from utils import db
+
+WEIGHT_SETTINGS = [
+    TieWeights(),
+    TieWeights(follow=2.0, suggested=0.5, like=0.25, comment=1.5, tag=3.0),
+    TieWeights(follow=0.0, suggested=0.0, like=1.0, comment=0.0, tag=0.0),
+]
+
+
+def _sql_scores(kernel_ids: list[int], filter_ids: list[int], in_filter: bool, weights: TieWeights,
+                limited: bool) -> dict[int, tuple[float, int]]:
+    k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
+    k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
+    f_args = {f"f_{i}": fid for i, fid in enumerate(filter_ids)}
+    f_in = ", ".join(f"%(f_{i})s" for i in range(len(filter_ids)))
+    op = "IN" if in_filter else "NOT IN"
+    rows = db.execute_query(
+        _build_score_sql(k_in, lambda col: f"{col} {op} ({f_in})", limited=limited),
+        {**k_args, **f_args, **_weight_args(weights), "top_n": TOP_N},
+        "rows"
+    )
+    return {r["candidate_id"]: (float(r["score"]), int(r["kernel_connections"])) for r in rows}
+
+
+def _graph_scores(kernel_ids, filter_ids, in_filter, weights, limited) -> dict[int, tuple[float, int]]:
+    scored = tie_graph.snapshot().score(kernel_ids, filter_ids, in_filter, weights.model_dump(),
+                                        TOP_N if limited else None)
+    return {cid: (score, conn) for cid, score, conn in scored}
+
+
+def _same(a: dict, b: dict) -> bool:
+    if a.keys() != b.keys():
+        return False
+    return all(abs(a[k][0] - b[k][0]) < 1e-6 and a[k][1] == b[k][1] for k in a)
+
+
+def main(n_kernels: int, kernel_size: int, seed: int):
+    started = time.perf_counter()
+    tie_graph.rebuild()
+    print(f"Graph build: {time.perf_counter() - started:.2f}s  {tie_graph.stats()}")
+
+    pool = [r["id"] for r in db.execute_query(
+        """SELECT follower_account_id AS id FROM account_relation
+           GROUP BY follower_account_id ORDER BY COUNT(*) DESC LIMIT 500""", {}, "rows")]
+    if not pool:
+        print("No account relations in the database.")
+        sys.exit(1)
+
+    rng = random.Random(seed)
+    sql_ms, graph_ms, mismatches = [], [], 0
+    for _ in range(n_kernels):
+        kernel = rng.sample(pool, min(kernel_size, len(pool)))
+        for weights in WEIGHT_SETTINGS:
+            for in_filter, limited in ((False, True), (True, False)):
+                t0 = time.perf_counter()
+                expected = _sql_scores(kernel, kernel, in_filter, weights, limited)
+                t1 = time.perf_counter()
+                actual = _graph_scores(kernel, kernel, in_filter, weights, limited)
+                t2 = time.perf_counter()
+                sql_ms.append((t1 - t0) * 1000)
+                graph_ms.append((t2 - t1) * 1000)
+                if not _same(expected, actual):
+                    mismatches += 1
+                    mode = "kernel" if in_filter else "candidates"
+                    print(f"MISMATCH ({mode}, {weights.model_dump()}) kernel={kernel[:5]}...: "
+                          f"{len(set(expected) ^ set(actual))} ids differ")
+
+    print(f"Comparisons: {len(sql_ms)}, mismatches: {mismatches}")
+    print(f"SQL   median {statistics.median(sql_ms):8.2f} ms  max {max(sql_ms):8.2f} ms")
+    print(f"graph median {statistics.median(graph_ms):8.2f} ms  max {max(graph_ms):8.2f} ms")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kernels", type=int, default=20)
+    parser.add_argument("--kernel-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    main(args.kernels, args.kernel_size, args.seed)
@@ -19,12 +19,17 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from browsing_platform.server.rate_limiter import limiter
 from browsing_platform.server.routes import account, post, media, media_part, archiving_session, login, search, \
     permissions, tags, annotate, share, upload, incorporate, tag_management, tag_import, annotation_import, \
-    twofa, user as user_route, admin_users, community
+    twofa, user as user_route, admin_users, admin_stats, admin_metrics, community
 from browsing_platform.server.routes.share import public_router as share_public_router
 from browsing_platform.server.services.file_tokens import decrypt_file_token, FileTokenError
+from browsing_platform.server.services.metrics import MetricsMiddleware, SERVER_METRICS_ENABLED, \
+    start_loop_lag_monitor, stop_loop_lag_monitor
+from browsing_platform.server.services.password_pool import password_pool, PasswordPoolBusy
 from browsing_platform.server.services.sharing_manager import get_link_permissions
 from browsing_platform.server.services.token_manager import check_token
+from utils import entity_versions
 from utils.db import DbError
+from utils.db_stats import db_stats
 
 load_dotenv()
 is_production = os.getenv("ENVIRONMENT") == "production"
@@ -104,12 +109,33 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     from browsing_platform.server.services import ws_manager
+    from browsing_platform.server.services.community import tie_graph
+    from browsing_platform.server.services.event_logger import start_audit_writer, stop_audit_writer
     from browsing_platform.server.services.incorporation_service import cleanup_stale_jobs
+    from browsing_platform.server.services.password_authenticator import warm_dummy_hash
     from browsing_platform.server.services.pre_auth_manager import cleanup_expired_pre_auth_tokens
+    from browsing_platform.server.services.upload_service import load_upload_index
     ws_manager.set_event_loop(asyncio.get_event_loop())
+    # Turn on per-entity version tracking so writes invalidate the enriched-entity cache.
+    entity_versions.enable()
+    start_audit_writer()
+    # Before the first login, so an unknown email never pays for building it.
+    warm_dummy_hash()
+    # Builds in the background; community scoring uses SQL until the first build lands.
+    tie_graph.start()
     cleanup_stale_jobs()
     cleanup_expired_pre_auth_tokens()
+    load_upload_index()
+    # Periodic top-N statement report in the log when DB_STATS_REPORT_S > 0.
+    db_stats.start_reporter()
+    start_loop_lag_monitor()
     yield
+    stop_loop_lag_monitor()
+    db_stats.stop_reporter()
+    tie_graph.stop()
+    password_pool.shutdown()
+    # Flush queued audit events so a clean shutdown doesn't lose the tail of the log.
+    stop_audit_writer()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -123,6 +149,13 @@ async def db_error_handler(request: Request, exc: DbError):
     return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy):
+    logger.warning("Rejected %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please try again shortly"},
+                        headers={"Retry-After": "5"})
+
+
 # CORS configuration
 ALLOWED_ORIGINS = [
     "http://localhost:3000",      # Local React dev server
@@ -208,6 +241,9 @@ class StaticFilesAuthMiddleware(BaseHTTPMiddleware):
 
 
 app.add_middleware(StaticFilesAuthMiddleware)
+# Added last so it is outermost: timings include the auth middleware and its 401s.
+if SERVER_METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 for r in [
     account.router,
     post.router,
@@ -229,6 +265,8 @@ for r in [
     twofa.router,
     user_route.router,
     admin_users.router,
+    admin_stats.router,
+    admin_metrics.router,
     community.router,
 ]:
     app.include_router(r, prefix="/api")
@@ -3,7 +3,7 @@ from typing import Any, Optional
 
 from browsing_platform.server.services.annotation import Annotation
 from extractors.entity_types import Account
-from utils import db
+from utils import db, entity_versions
 
 
 def account_exists(account_id: int) -> bool:
@@ -85,4 +85,5 @@ def annotate_account(account_id: int, annotation: Annotation) -> None:
                 """INSERT INTO account_tag (account_id, tag_id, notes) VALUES (%(account_id)s, %(tag_id)s, %(notes)s)""",
                 {"account_id": account_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    entity_versions.bump("account", [account_id])
@@ -4,7 +4,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 
 from browsing_platform.server.services.tag import ENTITY_TAG_TABLES, normalize_entity_for_affinity
-from utils import db
+from utils import db, entity_versions
 
 
 def validate_tags_entity_affinity(tag_ids: list[int], entity_type: str) -> list[int]:
@@ -49,6 +49,7 @@ def add_tags_batch(entity_type: str, entity_ids: list[int], tags: list[TagWithNo
                 {"eid": entity_id, "tid": tag.id, "notes": tag.notes},
                 return_type="none"
             )
+    entity_versions.bump(entity_type, entity_ids)
 
 
 def remove_tag_from_entity(entity_type: str, entity_id: int, tag_id: int) -> None:
@@ -60,3 +61,4 @@ def remove_tag_from_entity(entity_type: str, entity_id: int, tag_id: int) -> Non
         {"eid": entity_id, "tid": tag_id},
         return_type="none"
     )
+    entity_versions.bump(entity_type, [entity_id])
@@ -7,6 +7,7 @@ from browsing_platform.server.services.media import get_media_thumbnail_path
 from browsing_platform.server.services.search import SearchResultTransform, Thumbnail, sign_thumbnail_path
 from browsing_platform.server.services.tag import ITagWithType
 from browsing_platform.server.services.tag_management import IQuickAccessTypeDropdown, ITagHierarchyEntry
+from browsing_platform.server.services.tie_graph import TieGraph
 from utils import db
 
 TOP_N = 50
@@ -20,6 +21,11 @@ DEFAULT_TIE_WEIGHTS: dict[str, float] = {
 }
 
 
+# Precomputed tie graph (tie_graph.py); scoring falls back to _build_score_sql
+# until its first build has finished.
+tie_graph = TieGraph(SUGGESTED_RELATION_TYPE)
+
+
 class TieWeights(BaseModel):
     follow: float = DEFAULT_TIE_WEIGHTS['follow']
     suggested: float = DEFAULT_TIE_WEIGHTS['suggested']
@@ -264,6 +270,25 @@ def _parse_score_rows(score_rows) -> tuple[list[int], dict[int, float], dict[int
     return ids, score_map, connections_map
 
 
+def _graph_scores(
+        kernel_ids: list[int],
+        filter_ids: list[int],
+        candidates_in_filter: bool,
+        weights: TieWeights,
+        top_n: Optional[int],
+) -> Optional[tuple[list[int], dict[int, float], dict[int, int]]]:
+    """Score against the in-memory tie graph; None if it isn't built yet."""
+    snapshot = tie_graph.snapshot()
+    if snapshot is None:
+        return None
+    scored = snapshot.score(kernel_ids, filter_ids, candidates_in_filter, weights.model_dump(), top_n)
+    return (
+        [cid for cid, _, _ in scored],
+        {cid: score for cid, score, _ in scored},
+        {cid: connections for cid, _, connections in scored},
+    )
+
+
 def _hydrate_accounts(
         ids: list[int],
         score_map: dict[int, float],
@@ -375,6 +400,13 @@ def compute_candidates(
     kernel_ids = req.kernel_ids
     all_excluded = list(set(kernel_ids) | set(req.excluded_ids))
 
+    graph_scores = _graph_scores(kernel_ids, all_excluded, False, req.weights, TOP_N)
+    if graph_scores is not None:
+        top_ids, score_map, connections_map = graph_scores
+        return CommunityCandidatesResponse(
+            candidates=_hydrate_accounts(top_ids, score_map, connections_map, transform),
+        )
+
     k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
     k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
     ex_args = {f"ex_{i}": eid for i, eid in enumerate(all_excluded)}
@@ -413,6 +445,13 @@ def compute_kernel_scores(
         return CommunityCandidatesResponse(candidates=[])
 
     kernel_ids = req.kernel_ids
+    graph_scores = _graph_scores(kernel_ids, kernel_ids, True, req.weights, None)
+    if graph_scores is not None:
+        _, score_map, connections_map = graph_scores
+        return CommunityCandidatesResponse(
+            candidates=_hydrate_accounts(kernel_ids, score_map, connections_map, transform),
+        )
+
     k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
     k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
 
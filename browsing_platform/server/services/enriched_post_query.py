@@ -0,0 +1,254 @@
+"""
+Single-statement assembly of the enriched post graph.
+
+The multi-query path in enriched_entities.py fetches a post page with roughly
+nine round trips: post, account, media, comments, tagged accounts, tags per
+entity type, account tags for commenters and for tagged accounts. Here the same
+rows come back from ONE UNION ALL statement. Every branch emits
+``(kind, entity_id, seq, payload)`` where payload is a JSON_OBJECT carrying
+exactly the columns the per-entity query selects, so the decoded dicts feed the
+same pydantic models and the result is indistinguishable from the multi-query
+path.
+
+Column conversions inside JSON_OBJECT preserve what mysql-connector would have
+returned for a plain SELECT:
+- JSON columns (data, identifiers, entity_affinity) are CAST to text, so the
+  models' ``parse_*`` validators see the same string they always did;
+- DATETIME/TIMESTAMP are formatted as ISO strings with microseconds (parsed
+  back to the same naive datetimes by pydantic);
+- FLOAT columns are CAST to text — JSON would widen them to double and expose
+  float32 noise (0.3 -> 0.30000001192092896).
+
+Comments, tagged accounts and tags are ``SELECT x.*`` plus joined columns in
+the multi-query path, so their payloads are built from the table's columns in
+information_schema (once per process) rather than from a fixed list, and a
+column added by a migration shows up here as it does there. The joined columns
+are overlaid afterwards, the way select_results lets a later column of the same
+name win.
+
+Row order within a kind mirrors the multi-query path: comments by
+publication_date, everything else by primary key.
+
+Requires MySQL 8 (window functions), already a dependency of search.py.
+"""
+
+import json
+import threading
+from typing import Optional
+
+from browsing_platform.server.services.tag import ITagWithType
+from extractors.entity_types import Account, Post, Media, Comment, TaggedAccount
+from utils import db
+
+
+def _dt(expr: str) -> str:
+    return f"DATE_FORMAT({expr}, '%%Y-%%m-%%dT%%H:%%i:%%s.%%f')"
+
+
+def _json_text(expr: str) -> str:
+    return f"CAST({expr} AS CHAR)"
+
+
+def _obj(fields: list[tuple[str, str]]) -> str:
+    return "JSON_OBJECT(" + ", ".join(f"'{k}', {v}" for k, v in fields) + ")"
+
+
+def _account_fields(a: str, include_data: bool) -> list[tuple[str, str]]:
+    return [
+        ("id", f"{a}.id"), ("id_on_platform", f"{a}.id_on_platform"), ("url_suffix", f"{a}.url_suffix"),
+        ("platform", f"{a}.platform"), ("identifiers", _json_text(f"{a}.identifiers")),
+        ("display_name", f"{a}.display_name"), ("bio", f"{a}.bio"),
+        ("data", _json_text(f"{a}.data") if include_data else "NULL"),
+    ]
+
+
+def _post_fields(p: str, include_data: bool) -> list[tuple[str, str]]:
+    return [
+        ("id", f"{p}.id"), ("id_on_platform", f"{p}.id_on_platform"), ("url_suffix", f"{p}.url_suffix"),
+        ("platform", f"{p}.platform"), ("account_id", f"{p}.account_id"),
+        ("publication_date", _dt(f"{p}.publication_date")), ("caption", f"{p}.caption"),
+        ("data", _json_text(f"{p}.data") if include_data else "NULL"),
+    ]
+
+
+def _media_fields(m: str, include_data: bool) -> list[tuple[str, str]]:
+    return [
+        ("id", f"{m}.id"), ("id_on_platform", f"{m}.id_on_platform"), ("url_suffix", f"{m}.url_suffix"),
+        ("platform", f"{m}.platform"), ("post_id", f"{m}.post_id"), ("local_url", f"{m}.local_url"),
+        ("media_type", f"{m}.media_type"), ("data", _json_text(f"{m}.data") if include_data else "NULL"),
+        ("annotation", f"{m}.annotation"), ("thumbnail_path", f"{m}.thumbnail_path"),
+        ("aspect_ratio", f"{m}.aspect_ratio"), ("thumbnail_status", f"{m}.thumbnail_status"),
+    ]
+
+
+def _column_expr(expr: str, data_type: str) -> str:
+    """JSON_OBJECT value for a column of the given information_schema DATA_TYPE."""
+    if data_type in ("datetime", "timestamp"):
+        return _dt(expr)
+    if data_type == "date":
+        return f"DATE_FORMAT({expr}, '%%Y-%%m-%%d')"
+    if data_type in ("json", "float", "double", "decimal", "time"):
+        return _json_text(expr)
+    return expr
+
+
+_columns_lock = threading.Lock()
+_columns: dict[str, list[tuple[str, str]]] = {}
+
+
+def _table_columns(table: str) -> list[tuple[str, str]]:
+    """(column name, data type) of ``table`` in ordinal order, looked up once per process."""
+    with _columns_lock:
+        cached = _columns.get(table)
+    if cached is not None:
+        return cached
+    rows = db.execute_query(
+        """SELECT COLUMN_NAME AS name, DATA_TYPE AS data_type FROM information_schema.COLUMNS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %(table)s ORDER BY ORDINAL_POSITION""",
+        {"table": table},
+        return_type="rows"
+    ) or []
+    columns = [(r["name"], r["data_type"].lower()) for r in rows]
+    with _columns_lock:
+        _columns[table] = columns
+    return columns
+
+
+def _star_fields(table: str, alias: str, overlay: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Fields of ``SELECT alias.*, <overlay>``: later names replace earlier ones."""
+    fields = {name: _column_expr(f"{alias}.{name}", data_type) for name, data_type in _table_columns(table)}
+    fields.update(overlay)
+    return list(fields.items())
+
+
+def _comment_fields() -> list[tuple[str, str]]:
+    # Mirrors get_comments_by_post_ids (a.platform shadows c.platform there too).
+    return _star_fields("comment", "c", [
+        ("account_url_suffix", "a.url_suffix"), ("platform", "a.platform"),
+        ("account_id_on_platform", "a.id_on_platform"), ("account_display_name", "a.display_name"),
+        ("post_url_suffix", "p.url_suffix"), ("post_id_on_platform", "p.id_on_platform"),
+    ])
+
+
+def _tagged_account_fields() -> list[tuple[str, str]]:
+    # Mirrors get_tagged_accounts_by_post_ids.
+    return _star_fields("tagged_account", "ta", [
+        ("tagged_account_url_suffix", "a.url_suffix"), ("platform", "a.platform"),
+        ("tagged_account_id_on_platform", "a.id_on_platform"), ("tagged_account_display_name", "a.display_name"),
+    ])
+
+
+def _tag_fields() -> list[tuple[str, str]]:
+    # Mirrors get_tags_by_entity_ids / _ACCOUNT_TAG_SELECT.
+    return _star_fields("tag", "t", [
+        ("assignment_notes", "te.notes"),
+        ("tag_type_name", "tt.name"), ("tag_type_description", "tt.description"),
+        ("tag_type_notes", "tt.notes"), ("tag_type_entity_affinity", _json_text("tt.entity_affinity")),
+    ])
+
+
+def _tag_branch(kind: int, table: str, id_col: str, where: str, tag_join: str = "LEFT JOIN") -> str:
+    # get_tags_by_entity_ids LEFT JOINs tag; the account-tag helpers in enriched_entities use an inner JOIN
+    return (f"SELECT {kind}, te.{id_col}, te.id, {_obj(_tag_fields())} "
+            f"FROM {table} AS te {tag_join} tag AS t ON te.tag_id = t.id "
+            f"LEFT JOIN tag_type AS tt ON t.tag_type_id = tt.id WHERE {where}")
+
+
+# Kind codes double as the output ordering.
+K_POST, K_ACCOUNT, K_MEDIA, K_COMMENT, K_TAGGED = 1, 2, 3, 4, 5
+K_POST_TAG, K_ACCOUNT_TAG, K_MEDIA_TAG, K_COMMENTER_TAG, K_TAGGED_ACCOUNT_TAG = 6, 7, 8, 9, 10
+
+
+_sql_lock = threading.Lock()
+_sql_cache: dict[tuple[bool, bool], str] = {}
+
+
+def _post_graph_sql(include_data: bool, include_tags: bool) -> str:
+    key = (include_data, include_tags)
+    with _sql_lock:
+        sql = _sql_cache.get(key)
+    if sql is None:
+        sql = _build_post_graph_sql(include_data, include_tags)
+        with _sql_lock:
+            _sql_cache[key] = sql
+    return sql
+
+
+def _build_post_graph_sql(include_data: bool, include_tags: bool) -> str:
+    branches = [
+        f"SELECT {K_POST} AS kind, p.id AS entity_id, 0 AS seq, {_obj(_post_fields('p', include_data))} AS payload "
+        f"FROM post p WHERE p.id = %(post_id)s",
+        f"SELECT {K_ACCOUNT}, a.id, 0, {_obj(_account_fields('a', include_data))} "
+        f"FROM post p JOIN account a ON a.id = p.account_id WHERE p.id = %(post_id)s",
+        f"SELECT {K_MEDIA}, m.id, m.id, {_obj(_media_fields('m', include_data))} "
+        f"FROM media m WHERE m.post_id = %(post_id)s",
+        f"SELECT {K_COMMENT}, c.id, ROW_NUMBER() OVER (ORDER BY c.publication_date, c.id), {_obj(_comment_fields())} "
+        f"FROM comment c LEFT JOIN account a ON c.account_id = a.id LEFT JOIN post p ON c.post_id = p.id "
+        f"WHERE c.post_id = %(post_id)s",
+        f"SELECT {K_TAGGED}, ta.id, ta.id, {_obj(_tagged_account_fields())} "
+        f"FROM tagged_account ta LEFT JOIN account a ON ta.tagged_account_id = a.id "
+        f"WHERE ta.post_id = %(post_id)s",
+        _tag_branch(K_COMMENTER_TAG, "account_tag", "account_id",
+                    "te.account_id IN (SELECT c.account_id FROM comment c WHERE c.post_id = %(post_id)s)", "JOIN"),
+        _tag_branch(K_TAGGED_ACCOUNT_TAG, "account_tag", "account_id",
+                    "te.account_id IN (SELECT ta.tagged_account_id FROM tagged_account ta "
+                    "WHERE ta.post_id = %(post_id)s)", "JOIN"),
+    ]
+    if include_tags:
+        branches += [
+            _tag_branch(K_POST_TAG, "post_tag", "post_id", "te.post_id = %(post_id)s"),
+            _tag_branch(K_ACCOUNT_TAG, "account_tag", "account_id",
+                        "te.account_id = (SELECT p.account_id FROM post p WHERE p.id = %(post_id)s)"),
+            _tag_branch(K_MEDIA_TAG, "media_tag", "media_id",
+                        "te.media_id IN (SELECT m.id FROM media m WHERE m.post_id = %(post_id)s)"),
+        ]
+    return "\nUNION ALL\n".join(branches) + "\nORDER BY kind, seq"
+
+
+class PostGraph:
+    """Decoded rows of the post-graph statement, grouped the way the multi-query path returns them."""
+
+    def __init__(self):
+        self.post: Optional[Post] = None
+        self.account: Optional[Account] = None
+        self.media: list[Media] = []
+        self.comments: list[Comment] = []
+        self.tagged_accounts: list[TaggedAccount] = []
+        # entity type -> entity id -> tags; shape of get_tags_by_entity_ids per type
+        self.tags: dict[str, dict[int, list[ITagWithType]]] = {"account": {}, "post": {}, "media": {}}
+        self.commenter_account_tags: dict[int, list[ITagWithType]] = {}
+        self.tagged_account_tags: dict[int, list[ITagWithType]] = {}
+
+
+def fetch_post_graph(post_id: int, include_data: bool, include_tags: bool) -> Optional[PostGraph]:
+    rows = db.execute_query(
+        _post_graph_sql(include_data, include_tags),
+        {"post_id": post_id},
+        return_type="rows"
+    )
+    graph = PostGraph()
+    tag_targets = {
+        K_POST_TAG: graph.tags["post"],
+        K_ACCOUNT_TAG: graph.tags["account"],
+        K_MEDIA_TAG: graph.tags["media"],
+        K_COMMENTER_TAG: graph.commenter_account_tags,
+        K_TAGGED_ACCOUNT_TAG: graph.tagged_account_tags,
+    }
+    for row in rows:
+        kind = row["kind"]
+        payload = json.loads(row["payload"])
+        if kind == K_POST:
+            graph.post = Post(**payload)
+        elif kind == K_ACCOUNT:
+            graph.account = Account(**payload)
+        elif kind == K_MEDIA:
+            graph.media.append(Media(**payload))
+        elif kind == K_COMMENT:
+            graph.comments.append(Comment(**payload))
+        elif kind == K_TAGGED:
+            graph.tagged_accounts.append(TaggedAccount(**payload))
+        else:
+            tag_targets[kind].setdefault(row["entity_id"], []).append(ITagWithType(**payload))
+    if graph.post is None:
+        return None
+    return graph
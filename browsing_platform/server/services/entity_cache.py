@@ -0,0 +1,127 @@
+"""
+Versioned cache for the read-only enriched entity views (get_enriched_*_by_id).
+
+An entry is keyed by (entity_type, entity_id, transform fingerprint) and holds
+the nested result *before* per-user file-token signing, so every viewer of the
+same page shares one entry. Alongside the value each entry records the
+version of every entity that contributed to it (see utils/entity_versions.py);
+a lookup is a hit only if none of those versions — nor the global epoch — has
+moved since the entry was built.
+
+Writers invalidate simply by bumping versions: ingestion
+(incorporate_structures_into_db), annotate_* and the tag routes. Changes made
+by another process (e.g. a CLI loader run) can't reach these counters, so
+entries additionally expire after ENTITY_CACHE_TTL_S.
+
+Callers receive a deep copy, so signing or filtering the result never mutates
+the cached value.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from utils import entity_versions
+
+ENTITY_CACHE_MAX_ENTRIES = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "2000"))
+ENTITY_CACHE_TTL_S = float(os.getenv("ENTITY_CACHE_TTL_S", "600"))
+
+T = TypeVar("T", bound=BaseModel)
+
+DepKey = tuple[str, int]
+
+
+class _Entry:
+    __slots__ = ("value", "deps", "epoch", "created_at")
+
+    def __init__(self, value: BaseModel, deps: tuple[tuple[DepKey, int], ...], epoch: int):
+        self.value = value
+        self.deps = deps
+        self.epoch = epoch
+        self.created_at = time.monotonic()
+
+
+class EntityCache:
+    def __init__(self, max_entries: int = ENTITY_CACHE_MAX_ENTRIES, ttl_s: float = ENTITY_CACHE_TTL_S):
+        self._max_entries = max_entries
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def _is_fresh(self, entry: _Entry) -> bool:
+        if entry.epoch != entity_versions.epoch():
+            return False
+        if time.monotonic() - entry.created_at > self._ttl_s:
+            return False
+        return all(entity_versions.get(t, i) == v for (t, i), v in entry.deps)
+
+    def get_or_build(
+            self,
+            key: tuple,
+            build: Callable[[], Optional[T]],
+            deps_of: Callable[[T], set[DepKey]],
+    ) -> Optional[T]:
+        """Return a private copy of the cached value for `key`, building it on a miss.
+
+        If any entity version moves while the value is being built, the value is
+        returned but not cached: its dependency versions are only known after
+        the build, so caching it could pair pre-write data with post-write
+        versions. None results are not cached.
+        """
+        if not entity_versions.is_enabled() or self._max_entries <= 0:
+            return build()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_fresh(entry):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry.value.model_copy(deep=True)
+                del self._entries[key]
+                self._stale += 1
+            self._misses += 1
+            epoch = entity_versions.epoch()
+            write_seq = entity_versions.write_seq()
+
+        value = build()
+        if value is None:
+            return None
+        deps = tuple((dep, entity_versions.get(*dep)) for dep in deps_of(value))
+        if entity_versions.write_seq() != write_seq:
+            return value
+        with self._lock:
+            self._entries[key] = _Entry(value.model_copy(deep=True), deps, epoch)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "version_counters": entity_versions.tracked(),
+            }
+
+
+# Module-level singleton
+entity_cache = EntityCache()
@@ -1,13 +1,162 @@
+"""
+Audit event logging into the ``error_log`` table.
+
+``log_event`` no longer writes synchronously: events are pushed onto a bounded
+in-process queue and a single background thread drains it, writing each batch
+as one multi-row INSERT. This keeps the audit trail off the request path and
+collapses N per-request round trips into one.
+
+Lifecycle
+---------
+- ``start_audit_writer()`` — called from the server lifespan on startup.
+- ``stop_audit_writer()``  — called from the lifespan on shutdown; flushes
+  whatever is still queued before returning.
+
+When the writer is not running (CLI scripts, tests, or before startup)
+``log_event`` falls back to the original synchronous insert so no caller ever
+loses events just because it runs outside the server.
+
+If the queue is full the event is dropped rather than blocking the request;
+``dropped_event_count()`` reports how many were lost since startup.
+"""
+
+import logging
+import os
+import queue
+import threading
 from typing import Literal, Optional
 
 from utils import db
 
+logger = logging.getLogger(__name__)
+
+T_EventType = Literal["server_call", "sql_error", "scraping_error", "scraping_progress", "unknown_error",
+                      "unauthorized_access", "login_attempt", "2fa_attempt", "password_change"]
+
+# Bounded so a stalled DB can't grow the queue without limit. Each entry is a
+# small tuple (details/args are already truncated by the callers that log bodies).
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_BATCH_MAX = int(os.getenv("AUDIT_BATCH_MAX", "200"))
+# How long the writer waits for more events before flushing a partial batch.
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_FLUSH_INTERVAL_S", "1.0"))
+
+_COLUMNS = ["event_type", "user_id", "details", "args"]
+
+
+class AuditWriter:
+    """Background thread that batches audit events into multi-row INSERTs."""
+
+    def __init__(self, max_queue: int = AUDIT_QUEUE_MAX, batch_max: int = AUDIT_BATCH_MAX,
+                 flush_interval_s: float = AUDIT_FLUSH_INTERVAL_S):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._batch_max = batch_max
+        self._flush_interval_s = flush_interval_s
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counter_lock = threading.Lock()
+        self._dropped = 0
+        self._written = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_s: float = 10.0) -> None:
+        """Signal the writer to stop, then wait for it to drain the queue."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout_s)
+            if self._thread.is_alive():
+                logger.warning(f"Audit writer did not finish within {timeout_s}s; "
+                               f"{self._queue.qsize()} events left unwritten")
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def enqueue(self, row: tuple) -> bool:
+        """Queue one row. Returns False (and counts a drop) when the queue is full."""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            with self._counter_lock:
+                self._dropped += 1
+                dropped = self._dropped
+            # Log on powers of two so a sustained overflow doesn't flood the log file.
+            if dropped & (dropped - 1) == 0:
+                logger.warning(f"Audit queue full; {dropped} events dropped so far")
+            return False
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            return {"queued": self._queue.qsize(), "dropped": self._dropped, "written": self._written}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _drain_batch(self, first: tuple) -> list[tuple]:
+        batch = [first]
+        while len(batch) < self._batch_max:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[tuple]) -> None:
+        try:
+            with db.transaction_batch():
+                db.batch_insert("error_log", _COLUMNS, batch)
+            with self._counter_lock:
+                self._written += len(batch)
+        except Exception as e:
+            # The audit trail must never take the writer thread down; the batch is lost.
+            logger.error(f"Audit writer failed to insert {len(batch)} events: {e}")
+            with self._counter_lock:
+                self._dropped += len(batch)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self._flush_interval_s)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    return
+                continue
+            self._write(self._drain_batch(first))
+
+
+# Module-level singleton
+audit_writer = AuditWriter()
+
+
+def start_audit_writer() -> None:
+    audit_writer.start()
+
+
+def stop_audit_writer() -> None:
+    audit_writer.stop()
+
+
+def dropped_event_count() -> int:
+    return audit_writer.stats()["dropped"]
+
 
-def log_event(event_type: Literal["server_call", "sql_error", "scraping_error", "scraping_progress", "unknown_error",  "unauthorized_access", "login_attempt", "2fa_attempt", "password_change"],
-              user_id: Optional[int], details: str, args: Optional[str]):
+def log_event(event_type: T_EventType, user_id: Optional[int], details: str, args: Optional[str]):
+    if audit_writer.is_running():
+        return audit_writer.enqueue((event_type, user_id, details, args))
     return db.execute_query(
         '''
-        INSERT INTO error_log (event_type, user_id, details, args) 
+        INSERT INTO error_log (event_type, user_id, details, args)
         VALUES (%(event_type)s, %(user_id)s, %(details)s, %(args)s);
         '''
         , {"event_type": event_type, "user_id": user_id, "details": details, "args": args}, "id"
@@ -9,19 +9,19 @@ Why a RAM cache: the popcount itself is the "tens of ms at 3M" the architecture
 re-reading millions of hash rows from MySQL on every query is not. So the (media_id, phash) columns
 are loaded once into two NumPy arrays resident in RAM (the DB stays the source of truth; the arrays
 are a rebuildable cache, mirroring S3's philosophy for vectors). Call reload_hash_cache() after an
-indexing run to pick up new hashes without restarting the server.
+indexing run to pick up new hashes without restarting the server. NumPy and PIL are imported with
+the cache on the first search, not when the server starts.
 
 Video matching falls out for free: a video contributes many hash rows (one per kept frame), all
 pointing at the same media_id, so a screenshot from any indexed moment matches that video.
 """
 
+from __future__ import annotations
+
 import io
 import logging
 import threading
-from typing import Optional
-
-import numpy as np
-from PIL import Image
+from typing import TYPE_CHECKING, Optional
 
 from browsing_platform.server.services.media import get_media_thumbnail_path
 from browsing_platform.server.services.search import (
@@ -31,6 +31,9 @@ from db_loaders.phash_generator import _phash_int, _dhash_int  # identical hashe
 from extractors.entity_types import reconstruct_url
 from utils import db
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = logging.getLogger(__name__)
 
 # Fixed, deliberately generous Hamming tolerance (out of 64 bits). pHash already survives resize,
@@ -50,6 +53,7 @@ _dhashes: Optional[np.ndarray] = None     # uint64
 def _load_cache() -> None:
     """Load (media_id, phash, dhash) from media_hash into NumPy arrays. Caller holds _cache_lock."""
     global _media_ids, _phashes, _dhashes
+    import numpy as np
     rows = db.execute_query("SELECT media_id, phash, dhash FROM media_hash", {}, return_type="rows") or []
     if not rows:
         _media_ids = np.empty(0, dtype=np.int64)
@@ -139,6 +143,9 @@ def search_by_image_bytes(
     """Decode the uploaded image, hash it, and return media within `threshold` Hamming bits (of the
     closer of its pHash/dHash), nearest first, paginated. Per media we keep its single best
     (smallest-distance) frame match."""
+    import numpy as np
+    from PIL import Image
+
     _ensure_cache()
     if _phashes is None or len(_phashes) == 0:
         return []
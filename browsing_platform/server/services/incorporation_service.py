@@ -1,10 +1,27 @@
 """
-IncorporationManager — manages the lifecycle of a single incorporation job
-(concurrency gate, cancel flag, DB records).
+IncorporationManager — runs incorporation jobs (concurrency limit, per-job
+cancel flags, per-archive claims, DB records).
+
+Each job gets an immutable ``IncorporationJob`` when it starts: its archives
+root, scope (mode / limit / filter) and cancel token. Up to
+INCORPORATION_MAX_JOBS jobs run at once, each in its own thread:
+
+- The archives root is applied with ``root_anchor.use_archives_root()``, a
+  context variable, so a job reading a dev fixture directory doesn't redirect
+  the other jobs (``set_archives_dir`` would change it process-wide).
+- Part A (register / requeue) runs one job at a time. Under that lock the job
+  picks its cohort (the sessions Part A registered or requeued, plus, for
+  register-mode jobs on the default root, sessions an earlier run left pending
+  or parsed) and claims it. Sessions claimed by another running job are
+  skipped, so two jobs never touch the same session.
+- Parts B, C and D then run concurrently, each limited to the job's cohort.
 
 WebSocket broadcasting is handled by the module-level ``incorporation_ws``
-BroadcastManager instance. Only messages that are explicitly intended for the
-client should be passed to it; backend logging stays in the standard logger.
+BroadcastManager instance. Every message carries the job_id so a client can
+follow one job (``/api/incorporate/ws?job_id=N``); per-item progress lines are
+coalesced per stage for clients that fall behind. Only messages that are
+explicitly intended for the client should be passed to it; backend logging
+stays in the standard logger.
 """
 
 import asyncio
@@ -12,59 +29,86 @@ import logging
 import os
 import threading
 import traceback
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
 import root_anchor
 from browsing_platform.server.services.ws_manager import BroadcastManager
-from db_loaders.archives_db_loader import (
-    register_archives,
-    requeue_archives,
-    parse_archives,
-    extract_entities,
-    set_archives_dir,
-)
-from db_loaders.thumbnail_generator import generate_missing_thumbnails
 from utils import db
+from utils.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+INCORPORATION_MAX_JOBS = max(1, int(os.getenv("INCORPORATION_MAX_JOBS", "2")))
+
 # One broadcast channel dedicated to incorporation progress.
 # Import this in routes/incorporate.py for the WebSocket endpoint.
-incorporation_ws = BroadcastManager()
+incorporation_ws = BroadcastManager(name="incorporation")
+
+
+@dataclass(frozen=True)
+class IncorporationJob:
+    """Everything one incorporation run needs, fixed when it starts."""
+    job_id: int
+    archives_root: Path
+    mode: str
+    limit: Optional[int]
+    name_filter: Optional[str]
+    cancel_event: threading.Event = field(default_factory=threading.Event, compare=False, repr=False)
+
+    def is_cancel_requested(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def describe(self) -> str:
+        return (
+            f"mode={self.mode}, limit={'∞' if self.limit is None else self.limit}"
+            + (f", filter='{self.name_filter}'" if self.name_filter else "")
+        )
 
 
 class IncorporationManager:
-    def __init__(self):
+    def __init__(self, max_jobs: int = INCORPORATION_MAX_JOBS):
+        self.max_jobs = max_jobs
         self._lock = threading.Lock()
-        self._running = False
-        self._current_job_id: Optional[int] = None
-        self._cancel_event = threading.Event()
+        self._jobs: dict[int, IncorporationJob] = {}
+        self._claims: dict[int, int] = {}  # archive_session id -> job_id
+        # Held while a job runs Part A and claims its cohort.
+        self.part_a_lock = threading.Lock()
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
-    def try_start(self, triggered_by_user_id: Optional[int], triggered_by_ip: Optional[str]) -> int:
-        """Start an incorporation run. Returns the new job_id.
+    def try_start(self, triggered_by_user_id: Optional[int], triggered_by_ip: Optional[str],
+                  limit: Optional[int] = None, name_filter: Optional[str] = None,
+                  mode: Optional[str] = None, archives_dir: Optional[str] = None) -> IncorporationJob:
+        """Start an incorporation run. Returns the new job.
 
-        Raises RuntimeError if a job is already running.
+        Raises RuntimeError if max_jobs jobs are already running, ValueError if
+        ``archives_dir`` is not allowed or doesn't exist.
         """
+        limit, name_filter, mode = _resolve_scope(limit, name_filter, mode)
+        archives_root = _resolve_archives_dir_override(archives_dir) or root_anchor.ROOT_ARCHIVES
         with self._lock:
-            if self._running:
-                raise RuntimeError("An incorporation job is already running")
+            if len(self._jobs) >= self.max_jobs:
+                raise RuntimeError(
+                    f"{len(self._jobs)} incorporation job(s) already running (limit {self.max_jobs})"
+                )
             job_id = db.execute_query(
                 "INSERT INTO incorporation_job (status, triggered_by_user_id, triggered_by_ip, started_at) "
                 "VALUES ('running', %(user_id)s, %(ip)s, NOW())",
                 {"user_id": triggered_by_user_id, "ip": triggered_by_ip},
                 return_type="id",
             )
-            self._current_job_id = job_id
-            self._running = True
-            self._cancel_event.clear()
-            incorporation_ws.clear_buffer()
-        return job_id
+            job = IncorporationJob(job_id=job_id, archives_root=archives_root, mode=mode, limit=limit,
+                                   name_filter=name_filter)
+            if not self._jobs:
+                # Only start a fresh replay buffer when no other job is still streaming into it.
+                incorporation_ws.clear_buffer()
+            self._jobs[job_id] = job
+        return job
 
     def finish(self, job_id: int, status: str, error_message: Optional[str] = None):
         db.execute_query(
@@ -80,23 +124,40 @@ class IncorporationManager:
             return_type="none",
         )
         with self._lock:
-            self._running = False
-            self._current_job_id = None
+            self._jobs.pop(job_id, None)
+            self._claims = {sid: jid for sid, jid in self._claims.items() if jid != job_id}
 
     def is_running(self) -> bool:
         with self._lock:
-            return self._running
+            return bool(self._jobs)
 
-    def current_job_id(self) -> Optional[int]:
+    def running_jobs(self) -> list[IncorporationJob]:
         with self._lock:
-            return self._current_job_id
+            return sorted(self._jobs.values(), key=lambda j: j.job_id)
 
-    def request_cancel(self):
-        """Signal the running job to stop after the current archive completes."""
-        self._cancel_event.set()
+    def request_cancel(self, job_id: Optional[int] = None) -> int:
+        """Signal one job (or every running job when job_id is None) to stop after
+        the current archive completes. Returns the number of jobs signalled."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if job_id is None or j.job_id == job_id]
+        for job in jobs:
+            job.cancel_event.set()
+        return len(jobs)
+
+    def claim(self, job: IncorporationJob, session_ids) -> set[int]:
+        """Claim the given sessions for ``job``; returns the ones it got (those not
+        already claimed by another running job)."""
+        claimed = set()
+        with self._lock:
+            for sid in session_ids:
+                owner = self._claims.setdefault(sid, job.job_id)
+                if owner == job.job_id:
+                    claimed.add(sid)
+        return claimed
 
-    def is_cancel_requested(self) -> bool:
-        return self._cancel_event.is_set()
+    def claimed_by_others(self, job: IncorporationJob) -> set[int]:
+        with self._lock:
+            return {sid for sid, jid in self._claims.items() if jid != job.job_id}
 
 
 # Module-level singleton
@@ -141,22 +202,26 @@ def _resolve_scope(limit: Optional[int], name_filter: Optional[str], mode: Optio
     return limit, name_filter, mode
 
 
-def _resolve_archives_dir_override() -> Optional[Path]:
+def _resolve_archives_dir_override(requested: Optional[str] = None) -> Optional[Path]:
     """Return an alternate archives root for dev ingestion, or None.
 
-    Honored only in dev (BROWSING_PLATFORM_DEV=1). DEV_ARCHIVES_DIR lets the
-    incorporation pipeline read from a small curated fixture folder instead of the
-    full ./archives corpus. Returns None when unset, empty, or pointing at the
-    default ROOT_ARCHIVES — in which case ingestion proceeds against ./archives
-    with the newest-first / limit / filter behaviour fully in effect.
+    Honored only in dev (BROWSING_PLATFORM_DEV=1). The job's ``requested``
+    directory, else DEV_ARCHIVES_DIR, lets the incorporation pipeline read from a
+    small curated fixture folder instead of the full ./archives corpus. Returns
+    None when unset, empty, or pointing at the default ROOT_ARCHIVES — in which
+    case ingestion proceeds against ./archives with the newest-first / limit /
+    filter behaviour fully in effect. A directory requested outside dev raises
+    ValueError rather than being silently ignored.
 
     NB: this only redirects the ingestion *read* path. The browsing platform still
     serves media from the statically mounted ./archives, so a separate fixture dir
     is for verifying ingestion, not for browsing its media.
     """
     if os.getenv("BROWSING_PLATFORM_DEV") != "1":
+        if requested:
+            raise ValueError("A per-job archives directory is only allowed in dev")
         return None
-    raw = os.getenv("DEV_ARCHIVES_DIR")
+    raw = requested or os.getenv("DEV_ARCHIVES_DIR")
     if not raw:
         return None
     candidate = Path(raw).expanduser()
@@ -166,96 +231,144 @@ def _resolve_archives_dir_override() -> Optional[Path]:
     except OSError:
         pass
     if not candidate.is_dir():
+        if requested:
+            raise ValueError(f"Archives directory {raw!r} does not exist")
         logger.warning(f"DEV_ARCHIVES_DIR={raw!r} is not an existing directory; ignoring")
         return None
     return candidate
 
 
-def _run_incorporation(job_id: int, limit: Optional[int] = None, name_filter: Optional[str] = None, mode: Optional[str] = None):
+def _leftover_session_ids() -> set[int]:
+    """Sessions an earlier (interrupted or failed-to-finish) run left pending or parsed."""
+    rows = db.execute_query(
+        "SELECT id FROM archive_session "
+        "WHERE incorporation_status IN ('pending', 'parsed') AND source_type IN ('local_har', 'local_wacz')",
+        {},
+        return_type="rows",
+    ) or []
+    return {r["id"] for r in rows}
+
+
+def _select_cohort(job: IncorporationJob, emit, progress) -> set[int]:
+    """Part A, then claim the sessions this job will run B→C→D over.
+
+    Runs under manager.part_a_lock, so no other job registers, requeues or claims
+    sessions in between.
+    """
+    from db_loaders.archives_db_loader import register_archives, requeue_archives
+    cancel = job.is_cancel_requested
+    if job.mode == "rerun":
+        emit("Part A — re-queuing latest archives")
+        selected = requeue_archives(limit=job.limit, cancel_check=cancel, emit=progress, name_filter=job.name_filter,
+                                    exclude_ids=manager.claimed_by_others(job))
+        emit(f"Part A — {len(selected)} archives re-queued")
+    else:
+        emit("Part A — registering archives")
+        selected = register_archives(limit=job.limit, cancel_check=cancel, emit=progress, name_filter=job.name_filter)
+
+    # The scope is bounded by Part A (which rows it registered / requeued), not by
+    # `limit` on B/C/D: their queues have no ORDER BY, so a slice could pick unrelated
+    # rows, and the thumbnail `limit` counts media rows, not archives. Jobs on the
+    # default root also pick up sessions an earlier interrupted run left pending or
+    # parsed, so those get finished. Jobs on a dev fixture root don't: those rows may
+    # belong to a different root and would fail to resolve against this one.
+    cohort = set(selected)
+    if job.archives_root == root_anchor.ROOT_ARCHIVES:
+        cohort |= _leftover_session_ids()
+    claimed = manager.claim(job, cohort)
+    if len(claimed) < len(cohort):
+        emit(f"Skipping {len(cohort) - len(claimed)} archives another incorporation job is processing")
+    return claimed
+
+
+def _run_incorporation(job: IncorporationJob):
     """Entry point for the background thread.
 
     Only messages explicitly passed to incorporation_ws.broadcast() will reach
     the client. All other log output stays server-side.
     """
-    def emit(text: str, msg_type: str = "status"):
-        logger.info(text)
-        incorporation_ws.broadcast({"type": msg_type, "text": text})
+    # The loader pulls in every extractor and its pydantic models; import it with the
+    # first job rather than with the server.
+    from db_loaders.archives_db_loader import parse_archives, extract_entities
+    from db_loaders.thumbnail_generator import generate_missing_thumbnails
 
-    cancel = manager.is_cancel_requested
+    def emit(text: str, msg_type: str = "status"):
+        logger.info(f"[incorporation job {job.job_id}] {text}")
+        incorporation_ws.broadcast({"type": msg_type, "text": text, "job_id": job.job_id})
+
+    def progress(text: str):
+        """Per-archive / per-media lines from the loaders. A client that falls behind
+        gets the latest line per stage instead of the backlog; errors always get through."""
+        logger.info(f"[incorporation job {job.job_id}] {text}")
+        stage = text.split(" — ", 1)[0]
+        coalesce_key = None if "error" in text.lower() else (job.job_id, stage)
+        incorporation_ws.broadcast({"type": "status", "text": text, "job_id": job.job_id},
+                                   coalesce_key=coalesce_key)
+
+    def done(status: str, error: Optional[str] = None):
+        msg = {"type": "done", "status": status, "job_id": job.job_id}
+        if error is not None:
+            msg["error"] = error
+        incorporation_ws.broadcast(msg)
+
+    cancel = job.is_cancel_requested
     error_message = None
     status = "completed"
-
-    limit, name_filter, mode = _resolve_scope(limit, name_filter, mode)
-    scope_desc = (
-        f"mode={mode}, limit={'∞' if limit is None else limit}"
-        + (f", filter='{name_filter}'" if name_filter else "")
-    )
-
-    # #3 — optional dev fixture directory. Applied for the duration of the job and
-    # restored afterwards so other code paths keep seeing the default ./archives.
-    archives_override = _resolve_archives_dir_override()
-    original_archives_dir = root_anchor.ROOT_ARCHIVES
+    if tracer.enabled and len(manager.running_jobs()) == 1:
+        # Spans of earlier jobs would otherwise pile up in this long-lived process
+        # (LOADER_TRACE=true). Left alone while another job is still recording.
+        tracer.reset()
 
     try:
-        emit(f"Starting incorporation pipeline… ({scope_desc})")
-
-        if archives_override is not None:
-            set_archives_dir(archives_override)
-            emit(f"Dev archives directory: {archives_override}")
-
-        if mode == "rerun":
-            emit("Part A — re-queuing latest archives")
-            requeued = requeue_archives(limit=limit, cancel_check=cancel, emit=emit, name_filter=name_filter)
-            emit(f"Part A — {requeued} archives re-queued")
-        else:
-            emit("Part A — registering archives")
-            register_archives(limit=limit, cancel_check=cancel, emit=emit, name_filter=name_filter)
-
-        # The scope is bounded entirely by Part A (which rows are 'pending'); B/C/D
-        # then drain whatever is pending/parsed. We must NOT pass `limit` to B/C/D:
-        # their queues have no ORDER BY, so a slice could process unrelated leftover
-        # rows and skip the cohort A just selected — and the thumbnail `limit` counts
-        # media rows, not archives, so it would under-generate. Draining is also what
-        # lets archives left pending by an earlier interrupted run get finished.
-        emit("Part B — parsing HAR files")
-        parse_archives(cancel_check=cancel, emit=emit)
-
-        emit("Part C — extracting entities")
-        extract_entities(cancel_check=cancel, emit=emit)
-
-        emit("Part D — generating thumbnails")
-        # Use a manually managed loop instead of asyncio.run() to avoid blocking
-        # on shutdown_default_executor(). asyncio.run() waits for ALL executor
-        # threads to finish before returning — including any cv2 threads that
-        # survived an asyncio.wait_for timeout and are still running. Those
-        # zombie threads would hang the pipeline indefinitely.
-        _loop = asyncio.new_event_loop()
-        try:
-            _loop.run_until_complete(generate_missing_thumbnails(cancel_check=cancel, emit=emit))
-        finally:
-            _loop.close()
+        # The job's archives root (the default ./archives, or a dev fixture directory)
+        # applies to this thread and the tasks it starts, not to other jobs.
+        with root_anchor.use_archives_root(job.archives_root):
+            emit(f"Starting incorporation pipeline… ({job.describe()})")
+            if job.archives_root != root_anchor.ROOT_ARCHIVES:
+                emit(f"Dev archives directory: {job.archives_root}")
+
+            with manager.part_a_lock:
+                cohort = _select_cohort(job, emit, progress)
+            emit(f"{len(cohort)} archives in this job")
+
+            emit("Part B — parsing HAR files")
+            parse_archives(cancel_check=cancel, emit=progress, session_ids=cohort)
+
+            emit("Part C — extracting entities")
+            extract_entities(cancel_check=cancel, emit=progress, session_ids=cohort)
+
+            emit("Part D — generating thumbnails")
+            # Use a manually managed loop instead of asyncio.run() to avoid blocking
+            # on shutdown_default_executor(). asyncio.run() waits for ALL executor
+            # threads to finish before returning — including any cv2 threads that
+            # survived an asyncio.wait_for timeout and are still running. Those
+            # zombie threads would hang the pipeline indefinitely.
+            _loop = asyncio.new_event_loop()
+            try:
+                _loop.run_until_complete(
+                    generate_missing_thumbnails(cancel_check=cancel, emit=progress, session_ids=cohort)
+                )
+            finally:
+                _loop.close()
 
         emit("Incorporation complete.")
-        incorporation_ws.broadcast({"type": "done", "status": "completed"})
+        done("completed")
 
     except InterruptedError:
         error_message = "Cancelled by user"
         status = "failed"
-        logger.info(f"Incorporation job {job_id} cancelled by user")
+        logger.info(f"Incorporation job {job.job_id} cancelled by user")
         emit("Job cancelled by user.")
-        incorporation_ws.broadcast({"type": "done", "status": "failed", "error": error_message})
+        done("failed", error_message)
     except Exception as e:
         error_message = str(e)
         status = "failed"
-        logger.error(f"Incorporation job {job_id} failed: {e}")
+        logger.error(f"Incorporation job {job.job_id} failed: {e}")
         traceback.print_exc()
         emit(f"ERROR: {e}")
-        incorporation_ws.broadcast({"type": "done", "status": "failed", "error": error_message})
+        done("failed", error_message)
     finally:
-        # Restore the default archives root so file serving / later jobs are unaffected.
-        if archives_override is not None:
-            set_archives_dir(original_archives_dir)
-        manager.finish(job_id, status, error_message)
+        manager.finish(job.job_id, status, error_message)
 
 
 def cleanup_stale_jobs():
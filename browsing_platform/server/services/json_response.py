@@ -0,0 +1,96 @@
+"""
+JSON response classes for large payloads.
+
+FastAPI's default path for a route returning a pydantic model is
+model -> jsonable_encoder() dict tree -> json.dumps() string -> bytes, all held
+at once; for a big account (thousands of posts, each with media and comments)
+peak memory is several times the final body, and nothing is sent until the
+last byte is encoded.
+
+StreamingModelResponse walks the top levels of the model tree (models, lists,
+dicts) and serialises each subtree on its own, yielding ~64 KiB chunks. Only
+one subtree's encoding is alive at a time, the body goes out as it is produced,
+and the work runs in Starlette's threadpool instead of on the event loop. The
+output is the same JSON the default path produces (field order, computed
+fields, None values included, non-ASCII left unescaped).
+
+FastJSONResponse is for payloads that are plain dicts/lists (raw ``data``
+columns) and still need whole-object encoding: it uses orjson when installed
+and pydantic-core's Rust encoder otherwise, skipping jsonable_encoder.
+
+Routes returning these must declare ``response_model=`` on the decorator so the
+OpenAPI schema (and the generated frontend types) are unchanged; FastAPI skips
+response-model validation for Response instances.
+"""
+
+from typing import Any, Iterator
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic-core's encoder is used instead
+    orjson = None
+
+_CHUNK_BYTES = 64 * 1024
+# Below this depth subtrees are encoded in one call; going deeper only adds
+# per-call overhead without lowering the peak meaningfully.
+_STREAM_DEPTH = 3
+
+
+def _encode(value: Any) -> bytes:
+    return to_json(value)
+
+
+def _iter_pieces(value: Any, depth: int) -> Iterator[bytes]:
+    if depth >= _STREAM_DEPTH:
+        yield _encode(value)
+    elif isinstance(value, BaseModel):
+        cls = type(value)
+        names = list(cls.model_fields) + list(cls.model_computed_fields)
+        yield b"{"
+        for i, name in enumerate(names):
+            yield (b',"' if i else b'"') + name.encode() + b'":'
+            yield from _iter_pieces(getattr(value, name), depth + 1)
+        yield b"}"
+    elif isinstance(value, (list, tuple)):
+        yield b"["
+        for i, item in enumerate(value):
+            if i:
+                yield b","
+            yield from _iter_pieces(item, depth + 1)
+        yield b"]"
+    elif isinstance(value, dict):
+        yield b"{"
+        for i, (key, item) in enumerate(value.items()):
+            yield (b"," if i else b"") + _encode(str(key)) + b":"
+            yield from _iter_pieces(item, depth + 1)
+        yield b"}"
+    else:
+        yield _encode(value)
+
+
+def iter_json_chunks(value: Any, chunk_bytes: int = _CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield the JSON encoding of ``value`` in chunks of roughly ``chunk_bytes``."""
+    buffer = bytearray()
+    for piece in _iter_pieces(value, 0):
+        buffer += piece
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class StreamingModelResponse(StreamingResponse):
+    def __init__(self, content: Any, status_code: int = 200, **kwargs):
+        super().__init__(iter_json_chunks(content), status_code=status_code, media_type="application/json", **kwargs)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return to_json(content)
@@ -3,7 +3,7 @@ from typing import Any, Optional
 
 from browsing_platform.server.services.annotation import Annotation
 from extractors.entity_types import Post, Media
-from utils import db
+from utils import db, entity_versions
 
 
 def media_exists(media_id: int) -> bool:
@@ -97,4 +97,5 @@ def annotate_media(media_id: int, annotation: Annotation) -> None:
                 """INSERT INTO media_tag (media_id, tag_id, notes) VALUES (%(media_id)s, %(tag_id)s, %(notes)s)""",
                 {"media_id": media_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    entity_versions.bump("media", [media_id])
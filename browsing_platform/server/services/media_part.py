@@ -3,7 +3,7 @@ from typing import Optional
 
 from browsing_platform.server.services.annotation import Annotation
 from extractors.entity_types import Media, MediaPart
-from utils import db
+from utils import db, entity_versions
 
 
 def get_media_part_by_id(media_part_id: int) -> Optional[MediaPart]:
@@ -29,6 +29,7 @@ def insert_media_part(media_part: MediaPart) -> int:
         },
         return_type="id"
     )
+    entity_versions.bump("media", [media_part.media_id])
     return insert_result
 
 
@@ -50,6 +51,8 @@ def update_media_part(media_part: MediaPart) -> None:
         },
         "none"
     )
+    entity_versions.bump("media_part", [media_part.id])
+    entity_versions.bump("media", [media_part.media_id])
     return media_part.id
 
 
@@ -59,6 +62,7 @@ def delete_media_part(media_part_id: int) -> None:
         {"id": media_part_id},
         "none"
     )
+    entity_versions.bump("media_part", [media_part_id])
 
 
 def get_media_part_by_media(media: list[Media]) -> list[MediaPart]:
@@ -87,4 +91,5 @@ def annotate_media_part(media_part_id: int, annotation: Annotation) -> None:
                 """INSERT INTO media_part_tag (media_part_id, tag_id, notes) VALUES (%(media_part_id)s, %(tag_id)s, %(notes)s)""",
                 {"media_part_id": media_part_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    entity_versions.bump("media_part", [media_part_id])
@@ -0,0 +1,338 @@
+"""
+In-process server metrics, exposed in Prometheus text format on
+GET /api/admin/metrics (admin only).
+
+What is recorded
+----------------
+- ``MetricsMiddleware`` (pure ASGI, outermost): per request, latency and
+  response-size histograms labelled by method, route template (e.g.
+  ``/api/post/{post_id}``, ``/archives`` for the static mounts) and status
+  class, an in-flight gauge, and static-file hits per mount and status.
+  Templates come from the matched route, so label cardinality is bounded by
+  the route table; unmatched paths share one ``<unmatched>`` label.
+- ``loop_lag_monitor()``: a task that sleeps LOOP_LAG_INTERVAL_S and records
+  how late it woke up — time the event loop spent blocked on something else.
+- Collected at scrape time: the worker thread pools (anyio's limiter used by
+  sync routes and run_in_threadpool, and the loop's default executor used by
+  asyncio.to_thread), every ws_manager.BroadcastManager's subscribers and
+  queue depths, the entity cache / audit writer / password pool counters, the
+  password pool's queue-wait and run-time histograms, and utils.db_stats (pool
+  and per-statement totals).
+
+Overhead
+--------
+The middleware times its own bookkeeping per request and exports it as
+``http_metrics_overhead_seconds`` (sum/count), so the cost is visible in
+production; ``scripts/bench_metrics_overhead.py`` measures it offline against
+a bare ASGI app. SERVER_METRICS=false removes the middleware entirely.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVER_METRICS_ENABLED = os.getenv("SERVER_METRICS", "true").lower() in ("1", "true", "yes")
+LOOP_LAG_INTERVAL_S = float(os.getenv("LOOP_LAG_INTERVAL_S", "0.5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1 << 20, 4 << 20, 16 << 20, 64 << 20)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+OVERHEAD_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001)
+
+STATIC_MOUNTS = ("/archives", "/thumbnails")
+_UNMATCHED = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Labelled histogram with fixed buckets; observe() is O(log buckets) under one lock."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [per-bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for i, bound in enumerate(self.buckets + (float("inf"),)):
+                cumulative += series[i]
+                le = 'le="' + _format_value(float(bound)) + '"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_format_value(series[-1])}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._series: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            snapshot = dict(self._series)
+        for labels, value in sorted(snapshot.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+def _gauge(name: str, help_text: str, samples: Iterable[tuple[tuple, tuple, float]]) -> Iterable[str]:
+    """Render a gauge from (label_names, label_values, value) samples collected at scrape time."""
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} gauge"
+    for names, values, value in samples:
+        yield f"{name}{_labels(names, values)} {_format_value(value)}"
+
+
+class ServerMetrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.requests = Histogram("http_request_duration_seconds", "Request latency by route template.",
+                                  ("method", "route", "status"), LATENCY_BUCKETS)
+        self.response_size = Histogram("http_response_size_bytes", "Response body size by route template.",
+                                       ("method", "route", "status"), SIZE_BUCKETS)
+        self.static_hits = Counter("http_static_requests_total", "Requests to the static file mounts.",
+                                   ("mount", "status"))
+        self.loop_lag = Histogram("event_loop_lag_seconds", "How late the loop-lag probe woke up.", (), LAG_BUCKETS)
+        self.overhead = Histogram("http_metrics_overhead_seconds", "Time the metrics middleware itself spends "
+                                  "per request.", (), OVERHEAD_BUCKETS)
+        self.last_loop_lag_s = 0.0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def request_started(self) -> None:
+        with self._in_flight_lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        with self._in_flight_lock:
+            self.in_flight -= 1
+        labels = (method, route, f"{status // 100}xx")
+        self.requests.observe(labels, seconds)
+        self.response_size.observe(labels, size)
+        if route in STATIC_MOUNTS:
+            self.static_hits.inc((route, str(status)))
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in (self.requests, self.response_size, self.static_hits, self.loop_lag, self.overhead):
+            lines.extend(metric.render())
+        lines.extend(_gauge("http_requests_in_flight", "Requests currently being handled.",
+                            [((), (), self.in_flight)]))
+        lines.extend(_gauge("process_uptime_seconds", "Seconds since the metrics were initialised.",
+                            [((), (), round(time.time() - self.started_at, 1))]))
+        lines.extend(_gauge("event_loop_lag_last_seconds", "Most recent loop-lag probe.",
+                            [((), (), self.last_loop_lag_s)]))
+        lines.extend(self._thread_pool_lines())
+        lines.extend(self._ws_lines())
+        lines.extend(self._service_lines())
+        lines.extend(self._password_lines())
+        lines.extend(self._db_lines())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _thread_pool_lines() -> Iterable[str]:
+        samples = []
+        try:
+            import anyio.to_thread
+            limiter = anyio.to_thread.current_default_thread_limiter()
+            samples += [(("pool",), ("anyio",), limiter.borrowed_tokens),
+                        (("pool",), ("anyio_limit",), limiter.total_tokens)]
+        except Exception as e:  # only available from inside the event loop
+            logger.debug(f"anyio thread limiter unavailable: {e}")
+        try:
+            executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+            if executor is not None:
+                samples += [(("pool",), ("asyncio_threads",), len(getattr(executor, "_threads", ()))),
+                            (("pool",), ("asyncio_limit",), getattr(executor, "_max_workers", 0)),
+                            (("pool",), ("asyncio_queued",), executor._work_queue.qsize())]
+        except Exception as e:
+            logger.debug(f"default executor stats unavailable: {e}")
+        return _gauge("worker_threads", "Worker thread pools: busy/started threads, limits and queued work.",
+                      samples)
+
+    @staticmethod
+    def _ws_lines() -> Iterable[str]:
+        from browsing_platform.server.services import ws_manager
+        managers = [(m.name, m.stats()) for m in ws_manager.all_managers()]
+        for key, help_text in (("subscribers", "Connected WebSocket subscribers per channel."),
+                               ("buffered", "Messages in the channel's replay buffer."),
+                               ("queued_total", "Messages waiting in all subscriber queues."),
+                               ("queued_max", "Deepest subscriber queue."),
+                               ("dropped_total", "Messages dropped because a subscriber fell behind.")):
+            yield from _gauge(f"ws_{key}", help_text,
+                              [(("channel",), (name, ), stats[key]) for name, stats in managers])
+
+    @staticmethod
+    def _service_lines() -> Iterable[str]:
+        from browsing_platform.server.services.entity_cache import entity_cache
+        from browsing_platform.server.services.event_logger import audit_writer
+        from browsing_platform.server.services.password_pool import password_pool
+        samples = [(("service", "stat"), ("entity_cache", k), v) for k, v in entity_cache.stats().items()
+                   if isinstance(v, (int, float))]
+        samples += [(("service", "stat"), ("audit_writer", k), v) for k, v in audit_writer.stats().items()]
+        samples += [(("service", "stat"), ("password_pool", k), v) for k, v in password_pool.stats().items()]
+        return _gauge("service_stat", "Counters reported by in-process services (see /api/admin/stats).", samples)
+
+    @staticmethod
+    def _password_lines() -> Iterable[str]:
+        from browsing_platform.server.services.password_pool import password_pool
+        yield from password_pool.queue_wait.render()
+        yield from password_pool.run_time.render()
+
+    @staticmethod
+    def _db_lines() -> Iterable[str]:
+        from utils.db_stats import db_stats, LATENCY_BUCKETS as DB_BUCKETS
+        if not db_stats.enabled:
+            return
+        h = db_stats.histograms()
+        yield from _gauge("db_connections_in_use", "Pooled connections checked out.", [((), (), h["in_use"])])
+        yield "# HELP db_pool_exhausted_total Checkouts that failed because the pool was exhausted."
+        yield "# TYPE db_pool_exhausted_total counter"
+        yield f"db_pool_exhausted_total {h['exhausted']}"
+        for key, name, help_text in (("checkout_wait", "db_checkout_seconds", "Time to get a pooled connection."),
+                                     ("hold", "db_connection_hold_seconds", "Time a connection was held.")):
+            yield f"# HELP {name} {help_text}"
+            yield f"# TYPE {name} histogram"
+            cumulative = 0
+            for bound, n in zip(DB_BUCKETS + (float("inf"),), h[key]["buckets"]):
+                cumulative += n
+                yield f'{name}_bucket{{le="{_format_value(float(bound))}"}} {cumulative}'
+            yield f"{name}_count {h[key]['count']}"
+            yield f"{name}_sum {_format_value(h[key]['sum'])}"
+        # Per-statement totals only: full histograms for every fingerprint would dwarf the rest of the page.
+        statements = h["statements"]
+        for field, name, help_text in (("count", "db_statements_total", "Statements executed per fingerprint."),
+                                       ("sum", "db_statement_seconds_total", "Time spent per fingerprint."),
+                                       ("rows", "db_statement_rows_total", "Rows returned/affected per fingerprint."),
+                                       ("errors", "db_statement_errors_total", "Failed statements per fingerprint.")):
+            yield f"# HELP {name} {help_text}"
+            yield f"# TYPE {name} counter"
+            for fp, s in sorted(statements.items()):
+                yield f'{name}{{statement="{_escape(fp)}"}} {_format_value(s[field])}'
+
+
+metrics = ServerMetrics()
+
+
+def _route_template(scope: dict) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope.get("path", "")
+    for mount in STATIC_MOUNTS:
+        if path == mount or path.startswith(mount + "/"):
+            return mount
+    return _UNMATCHED
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request Request object or task) recording ServerMetrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        metrics.request_started()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        bookkeeping = time.perf_counter() - started
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = time.perf_counter()
+            metrics.request_finished(scope["method"], _route_template(scope), status, finished - started, size)
+            metrics.overhead.observe((), bookkeeping + time.perf_counter() - finished)
+
+
+async def loop_lag_monitor(interval_s: float = LOOP_LAG_INTERVAL_S) -> None:
+    """Run forever (cancel on shutdown): record how late each sleep(interval_s) returns."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        lag = max(0.0, loop.time() - expected)
+        metrics.last_loop_lag_s = lag
+        metrics.loop_lag.observe((), lag)
+
+
+_lag_task: Optional[asyncio.Task] = None
+
+
+def start_loop_lag_monitor() -> None:
+    global _lag_task
+    if SERVER_METRICS_ENABLED and LOOP_LAG_INTERVAL_S > 0 and _lag_task is None:
+        _lag_task = asyncio.get_running_loop().create_task(loop_lag_monitor())
+
+
+def stop_loop_lag_monitor() -> None:
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
@@ -1,6 +1,8 @@
 import json
 import re
-from typing import Literal
+import secrets
+import threading
+from typing import Literal, Optional
 
 from argon2 import PasswordHasher, exceptions as argon_exc
 from pydantic import BaseModel
@@ -16,6 +18,7 @@ class AccountLockedException(Exception):
     pass
 
 from browsing_platform.server.services.event_logger import log_event
+from browsing_platform.server.services.password_pool import password_pool
 from utils import db
 
 
@@ -53,7 +56,7 @@ def _check_password_strength(password: str) -> None:
 
 def hash_raw(password: str) -> tuple[str, str]:
     """Hash a password without enforcing strength requirements. Use when the caller validates strength."""
-    h = _ph.hash(password)
+    h = password_pool.run(_ph.hash, password)
     return h, "argon2id"
 
 
@@ -61,12 +64,16 @@ def hash_password(password: str) -> tuple[str, str]:
     if len(password) < 14 or len(password) > 512:
         raise ValueError("Password length invalid (14-512 chars required)")
     _check_password_strength(password)
-    h = _ph.hash(password)
+    h = password_pool.run(_ph.hash, password)
     return h, "argon2id"
 
 def verify_password(stored_hash: str, provided: str) -> bool | str:
     """Verify a password. Returns True on match, False on mismatch, or a new hash string
-    if the hash needs to be upgraded (caller must persist it)."""
+    if the hash needs to be upgraded (caller must persist it).
+    Runs on the password pool; raises PasswordPoolBusy when it is saturated."""
+    return password_pool.run(_verify, stored_hash, provided)
+
+def _verify(stored_hash: str, provided: str) -> bool | str:
     try:
         _ph.verify(stored_hash, provided)
         if _ph.check_needs_rehash(stored_hash):
@@ -77,6 +84,26 @@ def verify_password(stored_hash: str, provided: str) -> bool | str:
     except argon_exc.InvalidHash:
         return False
 
+_dummy_hash_value: Optional[str] = None
+_dummy_hash_lock = threading.Lock()
+
+
+def warm_dummy_hash() -> str:
+    """Compute the dummy hash unknown emails are verified against. Called from the
+    server lifespan, so no login request pays for the extra argon2 hash (a one-off
+    timing difference on exactly the path meant to hide whether the email exists)."""
+    global _dummy_hash_value
+    with _dummy_hash_lock:
+        if _dummy_hash_value is None:
+            # Hashed with the live parameters so verifying against it costs the same as
+            # verifying a real user's password.
+            _dummy_hash_value = _ph.hash(secrets.token_urlsafe(16))
+        return _dummy_hash_value
+
+
+def _dummy_hash() -> str:
+    return _dummy_hash_value or warm_dummy_hash()
+
 def set_user_password(user_id: int, new_password: str):
     h, alg = hash_password(new_password)
     db.execute_query(
@@ -100,10 +127,7 @@ def login_with_password(email: str, password: str, max_failures: int = 10) -> Lo
     )
     if not user:
         # fake verify to equalize timing
-        verify_password(
-            "$argon2id$v=19$m=65536,t=3,p=4$abcdefghijklmnopqrstuv$01234567890123456789012345678901",
-            password
-        )
+        verify_password(_dummy_hash(), password)
         raise AuthenticationError("Invalid credentials")
     if user["locked"]:
         raise AccountLockedException("Too many failed login attempts. Please ask the system admin to unlock your account.")
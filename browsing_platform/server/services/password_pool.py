@@ -0,0 +1,152 @@
+"""
+Bounded executor for argon2 password hashing and verification.
+
+Each argon2 call costs tens of milliseconds of CPU and its full memory_cost in
+RAM. Run inline in an async route it blocks the event loop for every other
+request; run in the shared worker pool a login burst can occupy every worker
+thread and multiply the memory. Password work therefore goes through this
+executor instead:
+
+- at most PASSWORD_WORKERS calls run at once, which caps the CPU and memory a
+  burst can take;
+- at most PASSWORD_QUEUE_MAX more may wait for a worker; beyond that ``run``
+  raises ``PasswordPoolBusy`` immediately, which the server turns into a 503,
+  so a credential-stuffing burst is shed instead of queued without bound;
+- a call that is still waiting after PASSWORD_QUEUE_TIMEOUT_S is withdrawn and
+  also raises ``PasswordPoolBusy``.
+
+The workers are threads: argon2-cffi releases the GIL while hashing, so they run
+in parallel with the event loop and each other. A process pool would add
+nothing but the cost of starting processes that re-import the server module.
+
+``run`` blocks the calling thread until the result is ready, so async routes
+call the password functions through ``run_in_threadpool``; at most
+PASSWORD_WORKERS + PASSWORD_QUEUE_MAX of those threads can be waiting here at
+any time. Time spent queued and running is exported on /api/admin/metrics and
+the counters on /api/admin/stats. ``scripts/bench_login_storm.py`` shows the
+effect on other routes' latency during a burst of logins.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional, TypeVar
+
+from browsing_platform.server.services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "16"))
+PASSWORD_QUEUE_TIMEOUT_S = float(os.getenv("PASSWORD_QUEUE_TIMEOUT_S", "10"))
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+T = TypeVar("T")
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when password work is rejected because the executor is saturated."""
+    pass
+
+
+class PasswordPool:
+    """Fixed-size worker pool with a bounded wait queue and fast rejection."""
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_max: int = PASSWORD_QUEUE_MAX,
+                 queue_timeout_s: float = PASSWORD_QUEUE_TIMEOUT_S):
+        self.workers = max(1, workers)
+        self.queue_max = max(0, queue_max)
+        self.queue_timeout_s = queue_timeout_s
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_max)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self.queue_wait = Histogram("password_queue_wait_seconds", "Time password work waited for a worker.",
+                                    (), WAIT_BUCKETS)
+        self.run_time = Histogram("password_run_seconds", "Time a worker spent on one argon2 call.",
+                                  (), WAIT_BUCKETS)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` on a worker and return its result (or raise its exception).
+
+        Raises PasswordPoolBusy without waiting when the workers and the queue are
+        all taken, and when the call is still queued after queue_timeout_s."""
+        if not self._slots.acquire(blocking=False):
+            with self._counter_lock:
+                self._rejected += 1
+                rejected = self._rejected
+            # Log on powers of two so a sustained burst doesn't flood the log file.
+            if rejected & (rejected - 1) == 0:
+                logger.warning(f"Password pool saturated; {rejected} requests rejected so far")
+            raise PasswordPoolBusy("Too many password checks in progress")
+        with self._counter_lock:
+            self._pending += 1
+        enqueued = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self.queue_wait.observe((), started - enqueued)
+            try:
+                return fn(*args)
+            finally:
+                self.run_time.observe((), time.perf_counter() - started)
+
+        try:
+            future = self._get_executor().submit(task)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.queue_timeout_s)
+        except FutureTimeoutError:
+            # Still queued: withdraw it. Already running: it finishes soon, so wait for it.
+            if future.cancel():
+                with self._counter_lock:
+                    self._timed_out += 1
+                raise PasswordPoolBusy(f"Password check still queued after {self.queue_timeout_s}s")
+            return future.result()
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            return {"workers": self.workers, "queue_max": self.queue_max, "pending": self._pending,
+                    "completed": self._completed, "rejected": self._rejected, "timed_out": self._timed_out}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use so CLI scripts that import the password helpers
+        # but never hash anything don't start threads.
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+            return self._executor
+
+    def _release(self, future: Optional[Future]) -> None:
+        with self._counter_lock:
+            self._pending -= 1
+            if future is not None and not future.cancelled():
+                self._completed += 1
+        self._slots.release()
+
+
+password_pool = PasswordPool()
@@ -31,7 +31,10 @@ async def get_auth_permissions(request: Request):
     token = parse_token_from_header(auth_header)
     if not token:
         return None
-    return check_token(token)
+    token_permissions = check_token(token)
+    # Remember the result so log_server_call doesn't hit the token table a second time.
+    request.state.token_permissions = token_permissions
+    return token_permissions
 
 
 async def _log_body_snippet(request: Request) -> str:
@@ -162,18 +165,22 @@ async def log_server_call(request: Request):
     """Log server call with user info if available"""
     logger.debug(f"Server call: {request.scope['route'].path}")
     user_id = None
-    auth_header = request.headers.get("Authorization")
-    token = parse_token_from_header(auth_header)
-    if token:
-        try:
-            token_permissions = check_token(token)
-            user_id = token_permissions.user_id
-        except Exception:  # nosec B110 - optional enrichment for logging; failure is non-fatal
-            pass
-    body = await request.body()
+    token_permissions = getattr(request.state, "token_permissions", None)
+    if token_permissions is None:
+        auth_header = request.headers.get("Authorization")
+        token = parse_token_from_header(auth_header)
+        if token:
+            try:
+                token_permissions = check_token(token)
+            except Exception:  # nosec B110 - optional enrichment for logging; failure is non-fatal
+                pass
+    if token_permissions is not None:
+        user_id = token_permissions.user_id
+    # Only a short excerpt is kept: the full body would be buffered just to be truncated in the DB.
+    body_snippet = await _log_body_snippet(request)
     log_event(
         "server_call", user_id,
         request.scope['root_path'] + request.scope['route'].path,
-        json.dumps({"body": body.decode("utf-8"), "path_params": request.path_params})
+        json.dumps({"body": body_snippet, "path_params": request.path_params})
     )
     return True
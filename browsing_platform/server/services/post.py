@@ -3,7 +3,7 @@ from typing import Any, Optional
 
 from browsing_platform.server.services.annotation import Annotation
 from extractors.entity_types import Account, Post
-from utils import db
+from utils import db, entity_versions
 
 
 def post_exists(post_id: int) -> bool:
@@ -95,4 +95,5 @@ def annotate_post(post_id: int, annotation: Annotation) -> None:
                 """INSERT INTO post_tag (post_id, tag_id, notes) VALUES (%(post_id)s, %(tag_id)s, %(notes)s)""",
                 {"post_id": post_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    entity_versions.bump("post", [post_id])
@@ -4,7 +4,7 @@ from typing import Optional
 from pydantic import BaseModel
 
 from browsing_platform.server.services.tag import ITagWithType, normalize_entity_for_affinity
-from utils import db
+from utils import db, entity_versions
 
 
 # ── Models ────────────────────────────────────────────────────────────────────
@@ -101,6 +101,8 @@ def update_tag_type(tag_type_id: int, name: str, description: Optional[str], not
         {"id": tag_type_id, "name": name, "description": description, "notes": notes, "entity_affinity": ea_json, "quick_access": quick_access},
         return_type="none"
     )
+    # Tag type names are embedded in every tagged entity view; not worth enumerating them.
+    entity_versions.bump_all()
     return True
 
 
@@ -284,6 +286,7 @@ def update_tag(tag_id: int, name: str, description: Optional[str], tag_type_id:
         {"id": tag_id, "name": name, "description": description, "tag_type_id": tag_type_id, "quick_access": quick_access, "omit_from_tag_type_dropdown": omit_from_tag_type_dropdown, "notes_recommended": notes_recommended},
         return_type="none"
     )
+    entity_versions.bump_all()
     return True
 
 
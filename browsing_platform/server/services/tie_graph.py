@@ -0,0 +1,312 @@
+"""
+In-memory account tie graph for community scoring.
+
+community._build_score_sql answers every candidates/kernel-details request with a
+12-branch UNION ALL over account_relation, post_like, comment and tagged_account,
+and analysts re-run it each time they tweak the kernel or the TieWeights sliders.
+Every branch of that query is one of five tie types read in both directions, so
+the whole thing collapses into an undirected graph whose edges carry a bitmask of
+the tie types seen between the two accounts:
+
+    nodes    int64[n]    account ids, sorted
+    indptr   int64[n+1]  CSR row offsets
+    indices  int32[2E]   neighbour positions in ``nodes``
+    masks    uint8[2E]   OR of (1 << TIE_*) over every tie between the pair
+
+Scoring mirrors the SQL stages exactly: pair strength = MAX(weight) over the tie
+types present (a 32-entry lookup table indexed by mask), score = SUM of pair
+strengths per candidate, kernel_connections = number of kernel neighbours,
+``HAVING score > 0``. Sums are rounded to 9 decimals so float64 accumulation
+agrees with MySQL's DECIMAL arithmetic on the weight literals; ties in score are
+broken by account id (the SQL leaves their order unspecified).
+
+The graph is rebuilt from scratch every COMMUNITY_GRAPH_REBUILD_S and topped up
+every COMMUNITY_GRAPH_REFRESH_S from rows whose id is past the last build's
+watermark. Appends are all ingestion produces; deletions and re-pointed rows
+(account merges) are picked up by the next full rebuild. Until the first build
+finishes, score() returns None and callers fall back to SQL.
+
+Auto-increment ids are handed out at insert time, not in commit order, so with
+concurrent loader transactions a row can become visible after a higher id was
+already read. Each top-up therefore also re-reads the last
+COMMUNITY_GRAPH_REFRESH_OVERLAP_IDS ids below the watermark (merging is
+idempotent, and only pairs that add something trigger a new snapshot). A row is
+missed by the top-ups only if more than that many ids were allocated in its
+table between its insert and the first refresh after its commit; it then shows
+up at the next full rebuild, so such a tie is at most COMMUNITY_GRAPH_REBUILD_S
+late, like a deletion.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+TIE_FOLLOW, TIE_SUGGESTED, TIE_LIKE, TIE_COMMENT, TIE_TAG = 0, 1, 2, 3, 4
+TIE_TYPES = ("follow", "suggested", "like", "comment", "tag")  # index = TIE_* constant
+
+ENABLED = os.getenv("COMMUNITY_TIE_GRAPH", "true").lower() in ("1", "true", "yes")
+REFRESH_INTERVAL_S = float(os.getenv("COMMUNITY_GRAPH_REFRESH_S", "60"))
+REBUILD_INTERVAL_S = float(os.getenv("COMMUNITY_GRAPH_REBUILD_S", "3600"))
+REFRESH_OVERLAP_IDS = int(os.getenv("COMMUNITY_GRAPH_REFRESH_OVERLAP_IDS", "20000"))
+
+_WATERMARK_TABLES = ("account_relation", "post_like", "comment", "tagged_account")
+
+# Each source yields (a, b, tie type) rows; direction is irrelevant because every
+# tie type is scored from both ends. Null endpoints are dropped as in the SQL.
+_SOURCE_QUERIES = {
+    "account_relation": """
+        SELECT follower_account_id AS a, followed_account_id AS b,
+               IF(relation_type = %(suggested_type)s, {suggested}, {follow}) AS t
+        FROM account_relation
+        WHERE id > %(after)s AND id <= %(upto)s""",
+    "post_like": """
+        SELECT pl.account_id AS a, p.account_id AS b, {like} AS t
+        FROM post_like pl JOIN post p ON pl.post_id = p.id
+        WHERE pl.id > %(after)s AND pl.id <= %(upto)s
+          AND pl.account_id IS NOT NULL AND p.account_id IS NOT NULL""",
+    "comment": """
+        SELECT c.account_id AS a, p.account_id AS b, {comment} AS t
+        FROM comment c JOIN post p ON c.post_id = p.id
+        WHERE c.id > %(after)s AND c.id <= %(upto)s
+          AND c.account_id IS NOT NULL AND p.account_id IS NOT NULL""",
+    "tagged_account": """
+        SELECT ta.tagged_account_id AS a, p.account_id AS b, {tag} AS t
+        FROM tagged_account ta JOIN post p ON ta.post_id = p.id
+        WHERE ta.id > %(after)s AND ta.id <= %(upto)s
+          AND ta.tagged_account_id IS NOT NULL AND p.account_id IS NOT NULL
+        UNION ALL
+        SELECT ta.tagged_account_id, m.account_id, {tag}
+        FROM tagged_account ta JOIN media m ON ta.media_id = m.id
+        WHERE ta.id > %(after)s AND ta.id <= %(upto)s
+          AND ta.tagged_account_id IS NOT NULL AND m.account_id IS NOT NULL""",
+}
+_TIE_LITERALS = {name: i for i, name in enumerate(TIE_TYPES)}
+
+
+def _read_watermarks() -> dict[str, int]:
+    row = db.execute_query(
+        "SELECT " + ", ".join(f"(SELECT COALESCE(MAX(id), 0) FROM {t}) AS {t}" for t in _WATERMARK_TABLES),
+        {},
+        return_type="single_row"
+    )
+    return {t: int(row[t]) for t in _WATERMARK_TABLES}
+
+
+def _fetch_pairs(after: dict[str, int], upto: dict[str, int], suggested_type: str) -> tuple[np.ndarray, np.ndarray]:
+    """Load ties added in (after, upto] as deduplicated (pair key, type mask) arrays."""
+    keys, masks = [], []
+    for table, template in _SOURCE_QUERIES.items():
+        if upto[table] <= after[table]:
+            continue
+        rows = db.execute_query(
+            f"SELECT a, b, BIT_OR(1 << t) AS mask FROM ({template.format(**_TIE_LITERALS)}) ties "
+            f"WHERE a != b GROUP BY a, b",
+            {"after": after[table], "upto": upto[table], "suggested_type": suggested_type},
+            return_type="rows"
+        )
+        if not rows:
+            continue
+        a = np.fromiter((r["a"] for r in rows), dtype=np.int64, count=len(rows))
+        b = np.fromiter((r["b"] for r in rows), dtype=np.int64, count=len(rows))
+        keys.append(_pair_keys(a, b))
+        masks.append(np.fromiter((r["mask"] for r in rows), dtype=np.uint8, count=len(rows)))
+    if not keys:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+    return _reduce_pairs(np.concatenate(keys), np.concatenate(masks))
+
+
+def _pair_keys(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Undirected pair -> single int64 (account ids are INT, so 32 bits each).
+    return (np.minimum(a, b) << 32) | np.maximum(a, b)
+
+
+def _reduce_pairs(keys: np.ndarray, masks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sort by key and OR together the masks of duplicate keys."""
+    if len(keys) == 0:
+        return keys, masks
+    order = np.argsort(keys, kind="stable")
+    keys, masks = keys[order], masks[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.bitwise_or.reduceat(masks, starts)
+
+
+class TieGraphSnapshot:
+    """Immutable CSR view of the tie graph; replaced wholesale on every update."""
+
+    def __init__(self, pair_keys: np.ndarray, pair_masks: np.ndarray, watermarks: dict[str, int]):
+        self.pair_keys = pair_keys
+        self.pair_masks = pair_masks
+        self.watermarks = watermarks
+        self.built_at = time.time()
+
+        lo = pair_keys >> 32
+        hi = pair_keys & 0xFFFFFFFF
+        self.nodes = np.unique(np.concatenate([lo, hi]))
+        src = np.searchsorted(self.nodes, np.concatenate([lo, hi]))
+        dst = np.searchsorted(self.nodes, np.concatenate([hi, lo])).astype(np.int32)
+        order = np.argsort(src, kind="stable")
+        self.indices = dst[order]
+        self.masks = np.concatenate([pair_masks, pair_masks])[order]
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(self.nodes)), out=self.indptr[1:])
+
+    def novel(self, keys: np.ndarray, masks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """The (key, mask) pairs that would change this graph: unseen pairs, or
+        known pairs gaining a tie type. ``keys`` must be unique (as _fetch_pairs returns)."""
+        if len(keys) == 0 or len(self.pair_keys) == 0:
+            return keys, masks
+        pos = np.minimum(np.searchsorted(self.pair_keys, keys), len(self.pair_keys) - 1)
+        known = self.pair_keys[pos] == keys
+        adds = ~known | ((self.pair_masks[pos] | masks) != self.pair_masks[pos])
+        return keys[adds], masks[adds]
+
+    def merged_with(self, keys: np.ndarray, masks: np.ndarray, watermarks: dict[str, int]) -> "TieGraphSnapshot":
+        merged_keys, merged_masks = _reduce_pairs(
+            np.concatenate([self.pair_keys, keys]), np.concatenate([self.pair_masks, masks]))
+        return TieGraphSnapshot(merged_keys, merged_masks, watermarks)
+
+    def score(
+            self,
+            kernel_ids: list[int],
+            candidate_filter_ids: list[int],
+            candidates_in_filter: bool,
+            weights: dict[str, float],
+            top_n: Optional[int],
+    ) -> list[tuple[int, float, int]]:
+        """Return [(candidate_id, score, kernel_connections)] best-first.
+
+        candidates_in_filter=False ranks accounts NOT in candidate_filter_ids
+        (candidate mode, filter = kernel + exclusions); True restricts candidates
+        to the filter (kernel mode, filter = kernel)."""
+        if len(self.nodes) == 0:
+            return []
+        kernel = np.unique(np.asarray(kernel_ids, dtype=np.int64))
+        pos = np.searchsorted(self.nodes, kernel)
+        pos = pos[(pos < len(self.nodes)) & (self.nodes[np.minimum(pos, len(self.nodes) - 1)] == kernel)]  # drop ids with no ties
+        if len(pos) == 0:
+            return []
+
+        starts = self.indptr[pos]
+        lengths = self.indptr[pos + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return []
+        # Flattened positions of every kernel member's adjacency slice.
+        edge_idx = np.arange(total) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        candidates = self.nodes[self.indices[edge_idx]]
+        strengths = _strength_table(weights)[self.masks[edge_idx]]
+
+        keep = np.isin(candidates, np.asarray(candidate_filter_ids, dtype=np.int64))
+        if not candidates_in_filter:
+            keep = ~keep
+        candidates, strengths = candidates[keep], strengths[keep]
+        if len(candidates) == 0:
+            return []
+
+        # Each (kernel, candidate) pair occurs once in the CSR, so counting rows
+        # per candidate is COUNT(DISTINCT kernel_id).
+        unique_ids, inverse = np.unique(candidates, return_inverse=True)
+        scores = np.round(np.bincount(inverse, weights=strengths), 9)
+        connections = np.bincount(inverse)
+        positive = scores > 0
+        unique_ids, scores, connections = unique_ids[positive], scores[positive], connections[positive]
+        order = np.lexsort((unique_ids, -scores))
+        if top_n is not None:
+            order = order[:top_n]
+        return [(int(unique_ids[i]), float(scores[i]), int(connections[i])) for i in order]
+
+
+def _strength_table(weights: dict[str, float]) -> np.ndarray:
+    """MAX(weight) over the tie types set in each possible mask."""
+    table = np.zeros(1 << len(TIE_TYPES), dtype=np.float64)
+    for mask in range(1, len(table)):
+        table[mask] = max(weights[name] for i, name in enumerate(TIE_TYPES) if mask & (1 << i))
+    return table
+
+
+class TieGraph:
+    def __init__(self, suggested_type: str):
+        self._suggested_type = suggested_type
+        self._snapshot: Optional[TieGraphSnapshot] = None
+        self._update_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_full_build = 0.0
+        self._last_build_s: Optional[float] = None
+
+    def start(self) -> None:
+        if not ENABLED or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tie-graph", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_s: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout_s)
+            self._thread = None
+
+    def snapshot(self) -> Optional[TieGraphSnapshot]:
+        return self._snapshot
+
+    def rebuild(self) -> None:
+        with self._update_lock:
+            started = time.perf_counter()
+            upto = _read_watermarks()
+            keys, masks = _fetch_pairs({t: 0 for t in _WATERMARK_TABLES}, upto, self._suggested_type)
+            self._snapshot = TieGraphSnapshot(keys, masks, upto)
+            self._last_full_build = time.time()
+            self._last_build_s = time.perf_counter() - started
+        logger.info("Tie graph rebuilt: %d accounts, %d pairs in %.2fs",
+                    len(self._snapshot.nodes), len(keys), self._last_build_s)
+
+    def refresh(self) -> None:
+        """Fold in ties added since the last build, re-reading the overlap window below
+        the watermark for rows committed late; no-op if nothing new turned up."""
+        with self._update_lock:
+            current = self._snapshot
+            if current is None:
+                return
+            upto = _read_watermarks()
+            after = {t: max(0, min(current.watermarks[t], upto[t]) - REFRESH_OVERLAP_IDS)
+                     for t in _WATERMARK_TABLES}
+            keys, masks = current.novel(*_fetch_pairs(after, upto, self._suggested_type))
+            if len(keys) == 0 and upto == current.watermarks:
+                return
+            self._snapshot = current.merged_with(keys, masks, upto)
+        logger.debug("Tie graph refreshed: +%d pairs", len(keys))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._snapshot is None or time.time() - self._last_full_build >= REBUILD_INTERVAL_S:
+                    self.rebuild()
+                else:
+                    self.refresh()
+            except Exception as e:
+                logger.error("Tie graph update failed: %s", e)
+            self._stop.wait(REFRESH_INTERVAL_S)
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        if snap is None:
+            return {"enabled": ENABLED, "ready": False}
+        return {
+            "enabled": ENABLED,
+            "ready": True,
+            "accounts": int(len(snap.nodes)),
+            "pairs": int(len(snap.pair_keys)),
+            "bytes": int(snap.pair_keys.nbytes + snap.pair_masks.nbytes + snap.nodes.nbytes
+                         + snap.indptr.nbytes + snap.indices.nbytes + snap.masks.nbytes),
+            "age_s": round(time.time() - snap.built_at, 1),
+            "last_full_build_s": round(self._last_build_s, 3) if self._last_build_s is not None else None,
+        }
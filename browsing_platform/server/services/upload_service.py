@@ -1,3 +1,4 @@
+import errno
 import hashlib
 import json
 import logging
@@ -5,8 +6,9 @@ import os
 import re
 import shutil
 import socket
-import sys
 import tarfile as _tarfile
+import threading
+import time
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
@@ -18,6 +20,7 @@ logger = logging.getLogger(__name__)
 
 _ARCHIVE_NAME_RE = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9_\-]*$')
 _TUS_STATE_DIR = ".tus_state"
+_MAX_MANIFEST_BYTES = 64 * 1024 * 1024
 
 
 def get_staging_dir() -> Path:
@@ -55,6 +58,74 @@ def check_conflicts(archive_names: list[str]) -> dict[str, bool]:
     return {name: (Path("archives") / name).exists() for name in archive_names}
 
 
+class _Upload:
+    """In-memory record of one TUS upload.
+
+    The state JSON is written once at creation and once on completion; between
+    the two the current offset lives here (and, after a restart, is recovered
+    from the staging file's size). ``hasher`` has consumed the first
+    ``hashed_offset`` bytes of the file, so the digest is ready the moment the
+    last chunk lands instead of costing a full re-read at verify time.
+    """
+
+    def __init__(self, state: dict, state_file: Path):
+        self.state = state
+        self.state_file = state_file
+        self.offset = state["offset"]
+        self.hasher = None
+        self.hashed_offset = 0
+        self.lock = threading.Lock()  # one PATCH at a time per upload
+
+    def snapshot(self) -> dict:
+        return {**self.state, "offset": self.offset}
+
+
+_uploads: dict[str, _Upload] = {}
+_uploads_lock = threading.Lock()
+_index_loaded = False
+
+
+def _load_upload(state_file: Path) -> Optional[_Upload]:
+    try:
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+        file_path = _safe_staging_file_path(state["archive_name"], state["relative_path"])
+    except Exception:
+        logger.warning("Could not load TUS state file %s", state_file)
+        return None
+    upload = _Upload(state, state_file)
+    if not state.get("sha256"):
+        # Bytes written by PATCHes since creation are on disk even though the
+        # state file was not rewritten for them; resume from the file's size.
+        size = file_path.stat().st_size if file_path.exists() else 0
+        upload.offset = min(size, state["upload_length"])
+    return upload
+
+
+def load_upload_index() -> int:
+    """Rebuild the upload-id index from the staging state files. Called at server
+    startup; returns the number of uploads found."""
+    global _index_loaded
+    index = {}
+    staging = get_staging_dir()
+    if staging.exists():
+        for state_file in staging.glob(f"*/{_TUS_STATE_DIR}/*.json"):
+            upload = _load_upload(state_file)
+            if upload is not None:
+                index[upload.state["file_id"]] = upload
+    with _uploads_lock:
+        _uploads.clear()
+        _uploads.update(index)
+        _index_loaded = True
+    logger.info(f"Loaded {len(index)} in-progress upload(s) from {staging}")
+    return len(index)
+
+
+def _forget_archive(archive_name: str):
+    with _uploads_lock:
+        for file_id in [k for k, u in _uploads.items() if u.state["archive_name"] == archive_name]:
+            del _uploads[file_id]
+
+
 def create_upload(archive_name: str, relative_path: str, upload_length: int, file_hash: Optional[str], upload_mode: str = "") -> str:
     """Create a new TUS upload session. Returns the file_id.
 
@@ -81,7 +152,12 @@ def create_upload(archive_name: str, relative_path: str, upload_length: int, fil
         "offset": 0,
         "upload_mode": upload_mode,  # "tar" for tar uploads, "" for individual files
     }
-    (state_dir / f"{file_id}.json").write_text(json.dumps(state), encoding="utf-8")
+    state_file = state_dir / f"{file_id}.json"
+    state_file.write_text(json.dumps(state), encoding="utf-8")
+    upload = _Upload(state, state_file)
+    upload.hasher = hashlib.sha256()
+    with _uploads_lock:
+        _uploads[file_id] = upload
     return file_id
 
 
@@ -98,46 +174,169 @@ def _find_state_file(file_id: str) -> Optional[Path]:
     return None
 
 
-def get_upload_state(file_id: str) -> Optional[dict]:
+def _get_upload(file_id: str) -> Optional[_Upload]:
+    if not _index_loaded:
+        load_upload_index()
+    with _uploads_lock:
+        upload = _uploads.get(file_id)
+    if upload is not None and upload.state_file.exists():
+        return upload
+    # Index miss (or stale entry): fall back to the directory scan so uploads
+    # created outside this process are still found, then remember the result.
     state_file = _find_state_file(file_id)
-    return json.loads(state_file.read_text(encoding="utf-8")) if state_file else None
+    upload = _load_upload(state_file) if state_file else None
+    with _uploads_lock:
+        if upload is None:
+            _uploads.pop(file_id, None)
+        else:
+            upload = _uploads.setdefault(file_id, upload)
+    return upload
 
 
-def patch_upload(file_id: str, offset: int, data: bytes) -> int:
-    """Append a chunk. Returns the new offset."""
-    state_file = _find_state_file(file_id)
-    if state_file is None:
-        raise FileNotFoundError(f"Upload {file_id} not found")
+def get_upload_state(file_id: str) -> Optional[dict]:
+    upload = _get_upload(file_id)
+    return upload.snapshot() if upload else None
 
-    state = json.loads(state_file.read_text(encoding="utf-8"))
-    if state["offset"] != offset:
-        raise ValueError(f"Offset mismatch: expected {state['offset']}, got {offset}")
 
-    file_path = _safe_staging_file_path(state["archive_name"], state["relative_path"])
-    with open(file_path, "r+b") as f:
-        f.seek(offset)
-        f.write(data)
+def _catch_up_hash(upload: _Upload, f) -> None:
+    """Hash bytes already on disk that the in-memory hasher has not seen (only
+    after a restart, when the hasher state was lost)."""
+    if upload.hasher is None:
+        upload.hasher = hashlib.sha256()
+        upload.hashed_offset = 0
+    if upload.hashed_offset == upload.offset:
+        return
+    f.seek(upload.hashed_offset)
+    remaining = upload.offset - upload.hashed_offset
+    while remaining:
+        block = f.read(min(remaining, 1 << 20))
+        if not block:
+            raise ValueError("Staging file is shorter than the recorded offset")
+        upload.hasher.update(block)
+        remaining -= len(block)
+    upload.hashed_offset = upload.offset
+
+
+class PatchWriter:
+    """Streams one PATCH request body into the staging file.
+
+    Holds the upload's lock from open_patch() until close(), so concurrent
+    PATCHes for the same upload are refused rather than interleaved. Every
+    write() lands on disk and in the running hash immediately; if the client
+    disconnects mid-body, close() still records what arrived and the client
+    resumes from there (HEAD reports the new offset).
+    """
 
-    new_offset = offset + len(data)
-    state["offset"] = new_offset
-    state_file.write_text(json.dumps(state), encoding="utf-8")
+    def __init__(self, upload: _Upload):
+        self.upload = upload
+        file_path = _safe_staging_file_path(upload.state["archive_name"], upload.state["relative_path"])
+        self._file = open(file_path, "r+b")
+        try:
+            _catch_up_hash(upload, self._file)
+        except Exception:
+            self._file.close()
+            raise
+        self._file.seek(upload.offset)
+
+    def write(self, data: bytes) -> None:
+        upload = self.upload
+        if upload.offset + len(data) > upload.state["upload_length"]:
+            raise ValueError("Chunk exceeds Upload-Length")
+        self._file.write(data)
+        upload.hasher.update(data)
+        upload.offset += len(data)
+        upload.hashed_offset = upload.offset
+
+    def close(self) -> int:
+        """Flush, record completion if this was the last chunk, release the upload. Returns the new offset."""
+        upload = self.upload
+        try:
+            self._file.close()
+            if upload.offset == upload.state["upload_length"] and not upload.state.get("sha256"):
+                upload.state["offset"] = upload.offset
+                upload.state["sha256"] = upload.hasher.hexdigest()
+                upload.state_file.write_text(json.dumps(upload.state), encoding="utf-8")
+        finally:
+            upload.lock.release()
+        return upload.offset
+
+
+def open_patch(file_id: str, offset: int) -> PatchWriter:
+    """Start a PATCH at ``offset``. Raises FileNotFoundError for an unknown upload
+    and ValueError for an offset mismatch or a PATCH already in progress."""
+    upload = _get_upload(file_id)
+    if upload is None:
+        raise FileNotFoundError(f"Upload {file_id} not found")
+    if not upload.lock.acquire(blocking=False):
+        raise ValueError("Another PATCH for this upload is in progress")
+    try:
+        if upload.offset != offset:
+            raise ValueError(f"Offset mismatch: expected {upload.offset}, got {offset}")
+        return PatchWriter(upload)
+    except Exception:
+        upload.lock.release()
+        raise
+
+
+def patch_upload(file_id: str, offset: int, data: bytes) -> int:
+    """Append a chunk. Returns the new offset."""
+    writer = open_patch(file_id, offset)
+    try:
+        writer.write(data)
+    finally:
+        new_offset = writer.close()
     return new_offset
 
 
 def delete_upload(file_id: str):
     """Cancel an in-progress upload and delete its staging file."""
-    state_file = _find_state_file(file_id)
-    if state_file is None:
+    upload = _get_upload(file_id)
+    if upload is None:
         return
-    state = json.loads(state_file.read_text(encoding="utf-8"))
-    file_path = _safe_staging_file_path(state["archive_name"], state["relative_path"])
+    with _uploads_lock:
+        _uploads.pop(file_id, None)
+    file_path = _safe_staging_file_path(upload.state["archive_name"], upload.state["relative_path"])
     if file_path.exists():
         file_path.unlink()
-    state_file.unlink()
+    upload.state_file.unlink(missing_ok=True)
+
+
+def _completed_sha256(state: dict, file_path: Path) -> Optional[str]:
+    """The digest recorded when the upload's last chunk landed, if the file is
+    still exactly the uploaded length; None means hash it from disk."""
+    recorded = state.get("sha256")
+    if recorded and file_path.stat().st_size == state["upload_length"]:
+        return recorded
+    return None
+
+
+def get_extract_dir() -> Path:
+    """Where tar uploads are unpacked (as <archive_name>.extracting/). Put this on
+    the same filesystem as archives/ so commit_archive is a single rename."""
+    custom = os.getenv("UPLOAD_EXTRACT_DIR")
+    return Path(custom) if custom else get_staging_dir()
+
+
+def _extracted_dir(archive_name: str) -> Path:
+    # Archive names cannot contain '.', so this never collides with a staging archive.
+    return get_extract_dir() / f"{archive_name}.extracting"
+
+
+def _tar_failure(path: str, status: str, extracted: Path, stats: dict) -> dict:
+    if extracted.exists():
+        shutil.rmtree(extracted)
+    return {"status": "fail", "results": [{"path": path, "status": status}], "stats": stats}
 
 
 def _extract_and_verify_tar(archive_name: str) -> dict:
-    """Extract _upload.tar in staging, verify contents against embedded _manifest.json."""
+    """Extract _upload.tar in one streaming pass, hashing each member as it is written.
+
+    The client writes _manifest.json as the first member, so every later member
+    is checked against its declared hash the moment it has been written, and the
+    upload is rejected on the first mismatch without extracting the rest. Only
+    regular files with safe relative paths are accepted; links, devices,
+    directories, traversal paths and duplicate names fail the upload.
+    """
     staging = get_staging_dir()
     archive_dir = staging / archive_name
     tar_path = archive_dir / "_upload.tar"
@@ -151,81 +350,105 @@ def _extract_and_verify_tar(archive_name: str) -> dict:
         )
         return {"status": "fail", "results": [{"path": "_upload.tar", "status": "missing"}]}
 
+    extracted = _extracted_dir(archive_name)
+    if extracted.exists():
+        shutil.rmtree(extracted)  # leftover from an earlier verify attempt
+    extracted.mkdir(parents=True)
+    archives_root = Path("archives")
+    if archives_root.exists() and extracted.stat().st_dev != archives_root.stat().st_dev:
+        logger.warning(
+            "Upload extract dir %s is on a different filesystem from archives/; commit will copy "
+            "instead of rename. Set UPLOAD_EXTRACT_DIR to a directory on the archives filesystem.",
+            get_extract_dir(),
+        )
+
+    base = extracted.resolve()
+    manifest: Optional[dict[str, str]] = None
+    actual_hashes: dict[str, str] = {}
+    stats = {"files": 0, "bytes": 0, "seconds": 0.0, "mib_per_s": 0.0}
+    started = time.monotonic()
+
     try:
-        with _tarfile.open(tar_path, "r:") as tf:
-            members = tf.getmembers()
-            # Validate all paths before extracting anything
-            for member in members:
+        with _tarfile.open(tar_path, "r|") as tf:
+            for member in tf:
                 if member.name == "_manifest.json":
-                    continue  # internal manifest file — always permitted
+                    if manifest is not None or not member.isreg() or member.size > _MAX_MANIFEST_BYTES:
+                        return _tar_failure(member.name, "invalid_manifest", extracted, stats)
+                    try:
+                        manifest = json.loads(tf.extractfile(member).read())
+                        if not isinstance(manifest, dict):
+                            raise ValueError("manifest is not an object")
+                    except Exception as exc:
+                        return _tar_failure(member.name, f"parse_error: {exc}", extracted, stats)
+                    # Hashes of members that came before the manifest (older clients).
+                    for rel, actual in actual_hashes.items():
+                        expected = manifest.get(rel)
+                        if expected is not None and actual != str(expected).lower():
+                            return _tar_failure(rel, "fail", extracted, stats)
+                    continue
                 if not member.isreg():
-                    return {
-                        "status": "fail",
-                        "results": [{"path": member.name, "status": "not_a_regular_file"}],
-                    }
+                    return _tar_failure(member.name, "not_a_regular_file", extracted, stats)
                 if not validate_file_path(member.name):
-                    return {
-                        "status": "fail",
-                        "results": [{"path": member.name, "status": "invalid_path"}],
-                    }
-            # Extract safely
-            if sys.version_info >= (3, 12):
-                tf.extractall(archive_dir, filter="data")
-            else:
-                tf.extractall(archive_dir)  # nosec B202 - all members pre-validated: isreg() + validate_file_path()
-    except _tarfile.TarError as exc:
-        return {"status": "fail", "results": [{"path": "_upload.tar", "status": f"tar_error: {exc}"}]}
+                    return _tar_failure(member.name, "invalid_path", extracted, stats)
+                if member.name in actual_hashes:
+                    return _tar_failure(member.name, "duplicate_path", extracted, stats)
+                target = (base / member.name).resolve()
+                if not target.is_relative_to(base) or target == base:
+                    return _tar_failure(member.name, "invalid_path", extracted, stats)
+
+                target.parent.mkdir(parents=True, exist_ok=True)
+                sha256 = hashlib.sha256()
+                source = tf.extractfile(member)
+                with open(target, "xb") as out:
+                    for chunk in iter(lambda: source.read(1 << 20), b""):
+                        sha256.update(chunk)
+                        out.write(chunk)
+                os.utime(target, (member.mtime, member.mtime))
+                actual = sha256.hexdigest()
+                actual_hashes[member.name] = actual
+                stats["files"] += 1
+                stats["bytes"] += member.size
+
+                expected = manifest.get(member.name) if manifest is not None else None
+                if expected is not None and actual != str(expected).lower():
+                    logger.warning(
+                        f"Hash mismatch for {archive_name}/{member.name}: expected={expected} actual={actual}"
+                    )
+                    return _tar_failure(member.name, "fail", extracted, stats)
+    except (_tarfile.TarError, OSError) as exc:
+        return _tar_failure("_upload.tar", f"tar_error: {exc}", extracted, stats)
+    finally:
+        stats["seconds"] = round(time.monotonic() - started, 3)
+        stats["mib_per_s"] = round(stats["bytes"] / (1 << 20) / max(stats["seconds"], 1e-9), 1)
+
+    logger.info(
+        f"Extracted {stats['files']} file(s), {stats['bytes'] / (1 << 20):.1f} MiB for '{archive_name}' "
+        f"in {stats['seconds']:.2f}s ({stats['mib_per_s']} MiB/s)"
+    )
 
     # Remove the tar file now that extraction is complete
     tar_path.unlink()
 
-    # Read manifest
-    manifest_path = archive_dir / "_manifest.json"
-    if not manifest_path.exists():
+    if manifest is None:
         # Extraction succeeded but no hash manifest — treat as no_checksum_file
-        return {"status": "no_checksum_file", "results": []}
-
-    try:
-        manifest: dict[str, str] = json.loads(manifest_path.read_text(encoding="utf-8"))
-    except Exception as exc:
-        return {"status": "fail", "results": [{"path": "_manifest.json", "status": f"parse_error: {exc}"}]}
+        return {"status": "no_checksum_file", "results": [], "stats": stats}
+    (extracted / "_manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
 
-    # Verify each extracted file against its declared hash
+    # Every member was checked as it landed; what remains is declared files the tar lacked.
     results = []
-    all_pass = True
-
-    for rel_path, expected_hash in manifest.items():
-        try:
-            file_path = _safe_staging_file_path(archive_name, rel_path)
-        except ValueError:
+    for rel_path in manifest:
+        if rel_path in actual_hashes:
+            results.append({"path": rel_path, "status": "pass"})
+        elif not validate_file_path(rel_path):
             results.append({"path": rel_path, "status": "invalid_path"})
-            all_pass = False
-            continue
-
-        if not file_path.exists():
+        else:
             results.append({"path": rel_path, "status": "missing"})
-            all_pass = False
-            continue
-
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                sha256.update(chunk)
-
-        actual = sha256.hexdigest()
-        ok = actual == expected_hash.lower()
-        results.append({"path": rel_path, "status": "pass" if ok else "fail"})
-        if not ok:
-            all_pass = False
-            logger.warning(
-                f"Hash mismatch for {archive_name}/{rel_path}: "
-                f"expected={expected_hash} actual={actual}"
-            )
 
     if not results:
-        return {"status": "no_checksum_file", "results": []}
+        return {"status": "no_checksum_file", "results": [], "stats": stats}
 
-    return {"status": "pass" if all_pass else "fail", "results": results}
+    all_pass = all(r["status"] == "pass" for r in results)
+    return {"status": "pass" if all_pass else "fail", "results": results, "stats": stats}
 
 
 def verify_archive(archive_name: str) -> dict:
@@ -276,12 +499,14 @@ def verify_archive(archive_name: str) -> dict:
             all_pass = False
             continue
 
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                sha256.update(chunk)
+        actual = _completed_sha256(state, file_path)
+        if actual is None:
+            sha256 = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    sha256.update(chunk)
+            actual = sha256.hexdigest()
 
-        actual = sha256.hexdigest()
         ok = actual == expected_hash.lower()
         results.append({"path": rel_path, "status": "pass" if ok else "fail"})
         if not ok:
@@ -315,11 +540,32 @@ def _collect_tus_records(archive_name: str) -> list[dict]:
     return sorted(records, key=lambda r: r["relative_path"])
 
 
+def _move_into_place(src: Path, dst: Path):
+    # os.rename() fails on Linux if dst already exists and is non-empty (ENOTEMPTY).
+    # This happens on overwrite uploads where the archive already exists in archives/.
+    # Delete the existing archives/<archive_name> folder before moving the new
+    # staging copy into place. Safe to do here because commit is only reached
+    # after verify passes — the staging copy is complete and checksummed.
+    if dst.exists():
+        shutil.rmtree(dst)
+    try:
+        os.rename(src, dst)
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+        # Cross-device (e.g. staging on main disk, archives on a separately
+        # mounted data disk): fall back to copy+delete.
+        shutil.move(str(src), str(dst))
+
+
 def commit_archive(archive_name: str, uploader_info: dict):
     """Move a verified archive from staging to the archives directory,
     then write chain-of-custody checksum and metadata files."""
     staging = get_staging_dir()
-    src = staging / archive_name
+    # Tar uploads were unpacked next to the staging dir by verify; individual
+    # files were written straight into the staging archive dir.
+    extracted = _extracted_dir(archive_name)
+    src = extracted if extracted.exists() else staging / archive_name
     dst = Path("archives") / archive_name
 
     # Collect per-file records for chain-of-custody.
@@ -350,21 +596,14 @@ def commit_archive(archive_name: str, uploader_info: dict):
             "timezone": "UTC",
         }
 
-    tus_state = src / _TUS_STATE_DIR
+    tus_state = staging / archive_name / _TUS_STATE_DIR
     if tus_state.exists():
         shutil.rmtree(tus_state)
+    _forget_archive(archive_name)
 
-    # os.rename() fails on Linux if dst already exists and is non-empty (ENOTEMPTY).
-    # This happens on overwrite uploads where the archive already exists in archives/.
-    # Delete the existing archives/<archive_name> folder before moving the new
-    # staging copy into place. Safe to do here because commit is only reached
-    # after verify passes — the staging copy is complete and checksummed.
-    if dst.exists():
-        shutil.rmtree(dst)
-    # shutil.move handles cross-device moves (e.g. staging on main disk, archives on
-    # a separately mounted data disk) by falling back to copy+delete when os.rename
-    # raises EXDEV (errno 18 "Invalid cross-device link").
-    shutil.move(str(src), str(dst))
+    _move_into_place(src, dst)
+    if src == extracted and (staging / archive_name).exists():
+        shutil.rmtree(staging / archive_name)
 
     # Reset DB incorporation status so the pipeline re-processes a re-uploaded archive.
     # For new archives this matches 0 rows (harmless); for overrides it resets the record.
@@ -416,6 +655,10 @@ def cleanup_staging_archive(archive_name: str):
     """Delete a staging archive (cancel / discard)."""
     staging = get_staging_dir()
     archive_dir = staging / archive_name
+    _forget_archive(archive_name)
+    extracted = _extracted_dir(archive_name)
+    if extracted.exists():
+        shutil.rmtree(extracted)
     if archive_dir.exists():
         shutil.rmtree(archive_dir)
         logger.info(f"Cleaned up staging for archive '{archive_name}'")
@@ -8,19 +8,49 @@ Usage
    incorporation, one for uploads, …).
 3. Call ``instance.broadcast(msg)`` from any thread to push a dict to every
    connected WebSocket subscriber.
-4. In the WebSocket route, call ``instance.subscribe()`` to get a per-client
-   asyncio.Queue, and ``instance.unsubscribe(q)`` in the finally block.
+4. In the WebSocket route, call ``instance.subscribe(accept)`` to get a
+   ``Subscription``, send what ``await sub.next_batch()`` returns (see
+   ``batch_frame``), and call ``instance.unsubscribe(sub)`` in the finally block.
 
 All ``BroadcastManager`` instances automatically share the single event loop
 registered via ``set_event_loop()``.
+
+Backpressure
+------------
+A loader can emit thousands of messages a minute and a browser tab can stall,
+so nothing here grows without bound or costs the event loop per message:
+
+- Each subscriber has a ring buffer of WS_SUBSCRIBER_BUFFER messages. When it is
+  full the oldest message is dropped and counted; the count goes to the client
+  with the next frame so it can show that lines are missing.
+- ``broadcast(msg, coalesce_key=...)``: once a subscriber has WS_COALESCE_HIGH_WATER
+  messages waiting, a message replaces the still-undelivered one with the same key
+  instead of being added, so a subscriber that falls behind on progress updates
+  gets the latest one rather than the backlog. A subscriber that keeps up gets
+  every line. Each replaced message counts as dropped. The replay buffer for late
+  joiners is never coalesced.
+- A subscriber's ``accept`` filter (e.g. one job's messages) is applied before
+  its ring, so only messages it would have been sent fill it and count as dropped.
+- The reader is woken once when its buffer goes from empty to non-empty, not
+  once per message, and takes everything buffered (up to WS_BATCH_MAX, after
+  waiting WS_BATCH_WINDOW_S for more to arrive) as one WebSocket frame.
 """
 
 import asyncio
+import os
 import threading
-from typing import Optional
+import weakref
+from collections import deque
+from typing import Callable, Optional
 
 _loop: Optional[asyncio.AbstractEventLoop] = None
 _BUFFER_MAX_DEFAULT = 500
+SUBSCRIBER_BUFFER_MAX = int(os.getenv("WS_SUBSCRIBER_BUFFER", "1000"))
+BATCH_MAX = int(os.getenv("WS_BATCH_MAX", "200"))
+BATCH_WINDOW_S = float(os.getenv("WS_BATCH_WINDOW_S", "0.05"))
+COALESCE_HIGH_WATER = int(os.getenv("WS_COALESCE_HIGH_WATER", "100"))
+# Every live BroadcastManager, for the metrics endpoint.
+_managers: "weakref.WeakSet[BroadcastManager]" = weakref.WeakSet()
 
 
 def set_event_loop(loop: asyncio.AbstractEventLoop) -> None:
@@ -29,47 +59,195 @@ def set_event_loop(loop: asyncio.AbstractEventLoop) -> None:
     _loop = loop
 
 
+class _Ring:
+    """Bounded FIFO of messages with drop-oldest and, at or above ``coalesce_from``
+    entries, coalescing by key (None: never). Not locked; the owner holds its own lock."""
+
+    def __init__(self, maxlen: int, coalesce_from: Optional[int] = None):
+        self.maxlen = max(1, maxlen)
+        self.coalesce_from = None if coalesce_from is None else min(max(0, coalesce_from), self.maxlen)
+        self.entries: deque = deque()  # [coalesce_key, msg] pairs, mutable so a coalesced update lands in place
+        self.by_key: dict = {}  # coalesce_key -> its newest entry
+        self.dropped = 0
+
+    def push(self, msg: dict, coalesce_key=None) -> bool:
+        """Add (or coalesce) a message. Returns True if the ring was empty before."""
+        if coalesce_key is not None and self.coalesce_from is not None and len(self.entries) >= self.coalesce_from:
+            entry = self.by_key.get(coalesce_key)
+            if entry is not None:
+                entry[1] = msg
+                self.dropped += 1  # the replaced message is never delivered
+                return False
+        was_empty = not self.entries
+        if len(self.entries) >= self.maxlen:
+            self._forget(self.entries.popleft())
+            self.dropped += 1
+        entry = [coalesce_key, msg]
+        self.entries.append(entry)
+        if coalesce_key is not None:
+            self.by_key[coalesce_key] = entry
+        return was_empty
+
+    def _forget(self, entry: list) -> None:
+        # An older entry with the same key may leave while a newer one is still queued.
+        if entry[0] is not None and self.by_key.get(entry[0]) is entry:
+            del self.by_key[entry[0]]
+
+    def take(self, n: int) -> list[dict]:
+        out = []
+        while self.entries and len(out) < n:
+            entry = self.entries.popleft()
+            self._forget(entry)
+            out.append(entry[1])
+        return out
+
+    def messages(self) -> list[dict]:
+        return [msg for _, msg in self.entries]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.by_key.clear()
+
+
+class Subscription:
+    """One subscriber's ring buffer; written from any thread, read by its WebSocket task.
+    Messages ``accept`` rejects are never buffered."""
+
+    def __init__(self, buffer_max: int = SUBSCRIBER_BUFFER_MAX, coalesce_from: int = COALESCE_HIGH_WATER,
+                 accept: Optional[Callable[[dict], bool]] = None):
+        self._lock = threading.Lock()
+        self._ring = _Ring(buffer_max, coalesce_from)
+        self._accept = accept
+        self._event = asyncio.Event()
+        self._reported_dropped = 0
+
+    def push(self, msg: dict, coalesce_key=None) -> None:
+        if self._accept is not None and not self._accept(msg):
+            return
+        with self._lock:
+            wake = self._ring.push(msg, coalesce_key)
+        if wake:
+            if _loop is None:
+                return
+            try:
+                _loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+    async def next_batch(self, timeout: float, max_messages: int = BATCH_MAX,
+                         window_s: float = BATCH_WINDOW_S) -> tuple[list[dict], int]:
+        """Wait up to ``timeout`` for messages; returns (messages, dropped since the
+        last batch). Both are empty/0 on timeout."""
+        with self._lock:
+            ready = bool(self._ring.entries)
+        if not ready:
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return [], self._take_dropped()
+            if window_s > 0:
+                # Let a burst accumulate so it goes out as one frame.
+                await asyncio.sleep(window_s)
+        with self._lock:
+            messages = self._ring.take(max_messages)
+            if self._ring.entries:
+                # More than one frame's worth: make sure the next call doesn't wait.
+                self._event.set()
+        return messages, self._take_dropped()
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._ring.entries)
+
+    def dropped(self) -> int:
+        with self._lock:
+            return self._ring.dropped
+
+    def _take_dropped(self) -> int:
+        with self._lock:
+            new = self._ring.dropped - self._reported_dropped
+            self._reported_dropped = self._ring.dropped
+        return new
+
+
+def batch_frame(messages: list[dict], dropped: int) -> dict:
+    """The WebSocket frame for one batch: a lone message is sent as itself, anything
+    else as {"type": "batch", "messages": [...], "dropped": n}."""
+    if len(messages) == 1 and not dropped:
+        return messages[0]
+    return {"type": "batch", "messages": messages, "dropped": dropped}
+
+
 class BroadcastManager:
     """
     Thread-safe pub/sub hub for one logical WebSocket channel.
 
-    - ``subscribe()``   — returns an asyncio.Queue pre-loaded with buffered
-                          messages so late-joining clients get context.
-    - ``unsubscribe()`` — removes the queue and stops delivery.
+    - ``subscribe()``   — returns a Subscription pre-loaded with buffered
+                          messages so late-joining clients get context;
+                          ``accept`` limits it to the messages it returns True for.
+    - ``unsubscribe()`` — removes the subscription and stops delivery.
     - ``broadcast()``   — pushes a message to all current subscribers; safe to
-                          call from any thread (uses call_soon_threadsafe).
+                          call from any thread.
     - ``clear_buffer()``— wipe the replay buffer (e.g. at the start of a new job).
     """
 
-    def __init__(self, buffer_max: int = _BUFFER_MAX_DEFAULT):
-        self._buffer_max = buffer_max
+    def __init__(self, buffer_max: int = _BUFFER_MAX_DEFAULT, name: str = "default",
+                 subscriber_buffer_max: int = SUBSCRIBER_BUFFER_MAX,
+                 coalesce_high_water: int = COALESCE_HIGH_WATER):
+        self.name = name
+        self._subscriber_buffer_max = subscriber_buffer_max
+        self._coalesce_high_water = coalesce_high_water
         self._lock = threading.Lock()
-        self._subscribers: set[asyncio.Queue] = set()
-        self._buffer: list[dict] = []
+        self._subscribers: set[Subscription] = set()
+        self._buffer = _Ring(buffer_max)
+        self._dropped_by_departed = 0
+        _managers.add(self)
 
-    def subscribe(self) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue()
+    def subscribe(self, accept: Optional[Callable[[dict], bool]] = None) -> Subscription:
+        sub = Subscription(self._subscriber_buffer_max, self._coalesce_high_water, accept)
         with self._lock:
-            self._subscribers.add(q)
-            for msg in self._buffer:
-                q.put_nowait(msg)
-        return q
+            self._subscribers.add(sub)
+            for msg in self._buffer.messages():
+                sub.push(msg)
+        return sub
 
-    def unsubscribe(self, q: asyncio.Queue) -> None:
+    def unsubscribe(self, sub: Subscription) -> None:
         with self._lock:
-            self._subscribers.discard(q)
+            if sub in self._subscribers:
+                self._subscribers.discard(sub)
+                self._dropped_by_departed += sub.dropped()
 
-    def broadcast(self, msg: dict) -> None:
+    def broadcast(self, msg: dict, coalesce_key=None) -> None:
+        """Send ``msg`` to every subscriber. Messages with the same ``coalesce_key``
+        replace each other while undelivered in the ring of a subscriber that has
+        fallen behind (use it for progress updates, never for errors or results)."""
         with self._lock:
-            self._buffer.append(msg)
-            if len(self._buffer) > self._buffer_max:
-                self._buffer = self._buffer[-self._buffer_max:]
-            queues = list(self._subscribers)
-        if _loop is None:
-            return
-        for q in queues:
-            _loop.call_soon_threadsafe(q.put_nowait, msg)
+            self._buffer.push(msg)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.push(msg, coalesce_key)
 
     def clear_buffer(self) -> None:
         with self._lock:
-            self._buffer = []
+            self._buffer.clear()
+
+    def stats(self) -> dict:
+        """Subscriber count, replay-buffer size, the depth of the subscribers' buffers
+        and how many messages were dropped because a subscriber fell behind."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            buffered = len(self._buffer.entries)
+            dropped = self._dropped_by_departed
+        depths = [s.depth() for s in subscribers]
+        return {
+            "subscribers": len(depths),
+            "buffered": buffered,
+            "queued_total": sum(depths),
+            "queued_max": max(depths, default=0),
+            "dropped_total": dropped + sum(s.dropped() for s in subscribers),
+        }
+
+
+def all_managers() -> list[BroadcastManager]:
+    return sorted(_managers, key=lambda m: m.name)
@@ -71,6 +71,10 @@ USAGE:
     • clear_errors   - Clear extraction_error field to retry failed archives
                       Use this after fixing issues that caused failures
 
+    To run B → E on several worker processes or hosts at once, use the job queue
+    instead (db_loaders/job_queue.py): `enqueue` queues the pending/parsed sessions,
+    each `worker` process leases and runs one (session, stage) at a time.
+
 REGENERATING THUMBNAILS:
     To regenerate ALL thumbnails (e.g., to change size or fix corrupted images):
 
@@ -123,6 +127,10 @@ EXAMPLE WORKFLOWS:
     uv run db_loaders/archives_db_loader.py register
     uv run db_loaders/archives_db_loader.py parse
     uv run db_loaders/archives_db_loader.py extract
+
+    # Profile a run: per-archive and per-step spans, p50/p90/p99 and items/s
+    # (see utils/tracing.py; LOADER_TRACE=true logs the summary without writing files)
+    uv run db_loaders/archives_db_loader.py full --limit 20 --trace-json trace.json --trace-chrome trace.chrome.json
 """
 
 import asyncio
@@ -132,6 +140,7 @@ import logging
 import re
 import sys
 import os
+import threading
 import time
 import traceback
 from logging.handlers import RotatingFileHandler
@@ -145,15 +154,19 @@ from tzlocal import get_localzone_name
 import root_anchor
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS, LOCAL_WACZ_ARCHIVES_DIR_ALIAS
 from db_loaders.db_intake import incorporate_structures_into_db
+from db_loaders.parse_cache import parse_cache
 from db_loaders.thumbnail_generator import generate_missing_thumbnails, generate_missing_part_thumbnails
 from db_loaders.phash_generator import generate_missing_hashes, project_runtime, dump_profile, MAX_CONCURRENT
 from extractors.extract_photos import PhotoAcquisitionConfig
 from extractors.extract_videos import VideoAcquisitionConfig
 from extractors.session_attachments import get_session_attachments
 from extractors.structures_from_wacz import scan_wacz
-from extractors.structures_to_entities import extract_data_from_har, ExtractedHarData, har_data_to_entities
+from extractors.structures_to_entities import extract_data_from_har, ExtractedHarData, har_data_to_entities, \
+    strip_media_contents
 from extractors.wacz_metadata import extract_wacz_metadata
 from utils import db
+from utils.db_stats import db_stats
+from utils.tracing import tracer, traced
 
 logger = logging.getLogger(__name__)
 
@@ -161,6 +174,16 @@ logger = logging.getLogger(__name__)
 _REGISTER_FETCH_BATCH = 5_000   # rows per page when loading existing registrations
 _REGISTER_INSERT_BATCH = 500    # archives per transaction when inserting new ones
 
+# Step C3 (matching entities to canonical rows and inserting the new ones) runs one
+# archive at a time. Concurrent incorporation jobs, or job-queue workers on other
+# processes/hosts, extracting archives that mention the same account/post would
+# otherwise race on the canonical tables' unique keys and fail one of the archives.
+# The thread lock orders this process's threads; the MySQL named lock orders
+# processes. C1/C2 (deserialize, har_data_to_entities) still run in parallel.
+_intake_lock = threading.Lock()
+_INTAKE_DB_LOCK = "evidenceplatform.loader_intake"
+_INTAKE_DB_LOCK_TIMEOUT_S = int(os.getenv("LOADER_INTAKE_LOCK_TIMEOUT_S", "900"))
+
 
 # Archive directories are named "{profile}_{YYYYMMDD}_{HHMMSS}" (see archiver/archive.py),
 # i.e. the capture timestamp is always the trailing \d{8}_\d{6}. Sorting by the raw
@@ -203,9 +226,10 @@ def set_archives_dir(path) -> Path:
     automatically. Returns the new path.
 
     NOTE: this mutates process-wide global state and is NOT thread-safe. It is
-    intended for the single-job incorporation pipeline (and the CLI), where no
-    other archive ingestion runs concurrently. The caller is responsible for
-    restoring the original path when done (see incorporation_service).
+    intended for the CLI and offline tools, where no other archive ingestion runs
+    concurrently; the caller is responsible for restoring the original path when
+    done. Server incorporation jobs use ``root_anchor.use_archives_root()``
+    instead, which only affects the job's own thread and tasks.
     """
     path = Path(path)
     old = root_anchor.ROOT_ARCHIVES
@@ -222,10 +246,11 @@ def set_archives_dir(path) -> Path:
     return path
 
 
-def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None, name_filter: Optional[str] = None):
+@traced("A.register")
+def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None, name_filter: Optional[str] = None) -> list[int]:
     """
     Part A of full - scans directory, puts in an archive_session record for each
-    unregistered archive.
+    unregistered archive. Returns the ids of the sessions it inserted.
 
     Optimised: fetches all already-registered external_ids in paginated batches,
     builds a set, then bulk-inserts only the new ones (also in batches).
@@ -241,12 +266,12 @@ def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callab
     # content ingests). The directory name is the tiebreaker for determinism.
     # An optional `name_filter` narrows the set to specific archives (substring or glob).
     archive_dirs = sorted(
-        (d for d in root_anchor.ROOT_ARCHIVES.iterdir() if d.is_dir() and _name_matches(d.name, name_filter)),
+        (d for d in root_anchor.archives_root().iterdir() if d.is_dir() and _name_matches(d.name, name_filter)),
         key=lambda d: (_archive_timestamp_key(d.name), d.name),
         reverse=True,
     )
     logger.info(
-        f"Part A - Found {len(archive_dirs)} archive directories in {root_anchor.ROOT_ARCHIVES}"
+        f"Part A - Found {len(archive_dirs)} archive directories in {root_anchor.archives_root()}"
         + (f" matching filter '{name_filter}'" if name_filter else "")
     )
 
@@ -295,7 +320,7 @@ def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callab
     logger.info(f"Part A - {len(to_register)} new archives to register")
 
     # --- Step 4: insert new archives in batches inside a single transaction ---
-    registered_count = 0
+    registered_ids: list[int] = []
     for batch_start in range(0, len(to_register), _REGISTER_INSERT_BATCH):
         batch = to_register[batch_start: batch_start + _REGISTER_INSERT_BATCH]
         with db.transaction_batch():
@@ -326,15 +351,18 @@ def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callab
                     logger.info(f"Registered new archive: {archive_dir.name} ({source_type})")
                     if emit:
                         emit(f"Part A — registered {archive_dir.name}")
-                    registered_count += 1
+                    registered_ids.append(new_id)
                 else:
                     logger.debug(f"Archive already registered (race), skipped insert: {archive_dir.name}")
 
     elapsed = time.time() - start_time
-    logger.info(f"Part A register_archives complete in {elapsed:.1f}s (registered {registered_count} new archives)")
+    logger.info(f"Part A register_archives complete in {elapsed:.1f}s (registered {len(registered_ids)} new archives)")
+    return registered_ids
 
 
-def requeue_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None, name_filter: Optional[str] = None) -> int:
+@traced("A.requeue")
+def requeue_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None, name_filter: Optional[str] = None,
+                     exclude_ids: Optional[set[int]] = None) -> list[int]:
     """Re-incorporation entry point (alternative to Part A).
 
     Instead of registering *new* archive folders, this resets the
@@ -348,7 +376,8 @@ def requeue_archives(limit: Optional[int] = None, cancel_check: Optional[Callabl
     directory name (consistent with register_archives — NOT by session id, which
     reflects registration order, not capture time) and bounded by ``limit``;
     ``name_filter`` narrows to specific archives by directory name (substring or
-    glob). Returns the number of sessions requeued.
+    glob). Sessions in ``exclude_ids`` (those another incorporation job is
+    working on) are left alone. Returns the ids of the sessions requeued.
     """
     start_time = time.time()
 
@@ -372,6 +401,8 @@ def requeue_archives(limit: Optional[int] = None, cancel_check: Optional[Callabl
     if name_filter:
         # Match on the archive directory name, consistent with how register_archives filters.
         rows = [r for r in rows if _name_matches(_dir_name(r), name_filter)]
+    if exclude_ids:
+        rows = [r for r in rows if r["id"] not in exclude_ids]
 
     # Newest-first by capture timestamp; id is the deterministic tiebreaker.
     rows.sort(key=lambda r: (_archive_timestamp_key(_dir_name(r)), r["id"]), reverse=True)
@@ -406,7 +437,7 @@ def requeue_archives(limit: Optional[int] = None, cancel_check: Optional[Callabl
 
     elapsed = time.time() - start_time
     logger.info(f"Re-incorporate requeue complete in {elapsed:.1f}s (requeued {requeued} archives)")
-    return requeued
+    return ids
 
 
 # ---------------------------------------------------------------------------
@@ -451,20 +482,13 @@ PARSING_ALGORITHM_VERSION = 1
 ENTITY_EXTRACTION_ALGORITHM_VERSION = 3
 
 
-def strip_media_contents(data: ExtractedHarData) -> None:
-    for v in data.videos:
-        if v and v.fetched_tracks:
-            for t in v.fetched_tracks:
-                v.fetched_tracks[t].segments = []
-    for p in data.photos:
-        if p:
-            p.fetched_assets = None
-
-
-def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None):
+@traced("B")
+def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None,
+                   session_ids: Optional[set[int]] = None):
     """
     Part B of full — queries archive_session where incorporation_status = 'pending'
-    for both HAR (local_har) and WACZ (local_wacz) source types.
+    for both HAR (local_har) and WACZ (local_wacz) source types. ``session_ids``
+    restricts the run to those sessions (an incorporation job's cohort).
 
     HAR path:  reads metadata.json + archive.har
     WACZ path: reads archive.wacz, extracts metadata with extract_wacz_metadata(),
@@ -485,6 +509,8 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
         {},
         return_type="rows",
     ) or []
+    if session_ids is not None:
+        queue = [e for e in queue if e["id"] in session_ids]
     if limit is not None:
         queue = queue[:limit]
     logger.info(f"Part B - {len(queue)} archives to parse")
@@ -493,113 +519,182 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
         if cancel_check and cancel_check():
             raise InterruptedError("Cancelled by user")
         try:
-            # Reconstruct the archive directory; path alias differs by source type.
-            source_type = entry.get('source_type', 'local_har')
-            if source_type == 'local_wacz':
-                archive_name = entry['archive_location'].split(f"{LOCAL_WACZ_ARCHIVES_DIR_ALIAS}/")[1]
-            else:
-                archive_name = entry['archive_location'].split(f"{LOCAL_ARCHIVES_DIR_ALIAS}/")[1]
-
-            entry_id = entry['external_id'] or entry['id']
-            logger.info(f"Parsing archive: {entry_id} ({source_type})")
+            parse_archive(entry, emit)
+            parsed_count += 1
+        except Exception as e:
+            traceback.print_exc()
+            # Record the error in the database so this archive is skipped on future runs
+            db.execute_query(
+                'UPDATE archive_session SET incorporation_status = %(s)s, extraction_error = %(extraction_error)s WHERE id = %(id)s',
+                {"s": "parse_failed", "extraction_error": str(e), "id": entry['id']},
+                return_type="none"
+            )
+            logger.error(f"Error processing archive {entry['external_id'] or entry['id']}: {e}")
             if emit:
-                emit(f"Part B — parsing {entry_id}")
+                emit(f"Part B — error parsing {entry['external_id'] or entry['id']}: {e}")
+            error_count += 1
+
+    elapsed = time.time() - start_time
+    logger.info(f"Part B complete: {parsed_count} archives parsed, {error_count} errors in {elapsed:.1f}s")
+    if parse_cache.enabled:
+        stats = parse_cache.stats()
+        logger.info(
+            f"Part B parse cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['uncacheable']} without manifest, {stats['evictions']} evicted, hit rate {stats['hit_rate']}"
+        )
 
-            archive_dir = root_anchor.ROOT_ARCHIVES / archive_name
 
-            iso_timestamp = None
-            archived_url = None
-            notes = None
-            metadata = {}
-
-            if source_type == 'local_wacz':
-                # ---------------------------------------------------------- #
-                # WACZ path: extract metadata from archive.wacz, write to
-                # metadata.json, then scan the WARC records for structures.
-                # ---------------------------------------------------------- #
-                wacz_path = archive_dir / "archive.wacz"
-                if not wacz_path.exists():
-                    raise Exception(f"WACZ file {wacz_path} does not exist")
-
-                # --- Step 1: Extract and persist metadata ---
-                logger.debug(f"Extracting WACZ metadata for {entry_id}")
-                try:
-                    metadata = extract_wacz_metadata(wacz_path)
-                    metadata_path = archive_dir / "metadata.json"
-                    metadata_path.write_text(
-                        json.dumps(metadata, ensure_ascii=False, default=str, indent=2),
-                        encoding="utf-8",
-                    )
-                    logger.debug(f"Wrote metadata.json for {entry_id}")
-                except Exception as e:
-                    traceback.print_exc()
-                    raise Exception(f"Error extracting WACZ metadata for {entry_id}: {e}")
-
-                archived_url = metadata.get("primary_url")
-                notes = metadata.get("title")
-
-                # WACZ timestamps are always UTC ISO 8601 with Z suffix
-                created_ts = metadata.get("created")
-                if created_ts:
-                    try:
-                        dt = parser.isoparse(created_ts)
-                        iso_timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    except Exception:
-                        logger.warning(f"Could not parse WACZ created timestamp for {entry_id}")
-                logger.debug(f"WACZ metadata: url={archived_url}, ts={iso_timestamp}")
-
-                # --- Step 2: Scan WACZ WARC records ---
-                logger.debug(f"Scanning WACZ records for {entry_id}")
-                try:
-                    structures, videos, photos = scan_wacz(wacz_path, archive_dir)
-                    extracted_data = ExtractedHarData(
-                        structures=structures, videos=videos, photos=photos
-                    )
-                    strip_media_contents(extracted_data)
-                    logger.debug(
-                        f"WACZ scan: {len(structures)} structures, "
-                        f"{len(videos)} videos, {len(photos)} photos"
-                    )
-                except Exception as e:
-                    traceback.print_exc()
-                    raise Exception(f"Error scanning WACZ file {wacz_path}: {e}")
+def _cached_media_present(structures_json: str) -> bool:
+    """Whether every media file a cached Part B result points at is still on disk."""
+    try:
+        data = json.loads(structures_json)
+    except ValueError:
+        return False
+    for item in (data.get("videos") or []) + (data.get("photos") or []):
+        for local_file in (item or {}).get("local_files") or []:
+            if not Path(local_file).exists():
+                return False
+    return True
 
-            else:
-                # ---------------------------------------------------------- #
-                # HAR path (existing logic, unchanged)
-                # ---------------------------------------------------------- #
 
-                # --- Step 1: Read metadata.json ---
-                logger.debug(f"Extracting metadata...")
+def parse_archive(entry: dict, emit: Optional[Callable[[str], None]] = None,
+                  cancel_check: Optional[Callable[[], bool]] = None) -> None:
+    """
+    Part B for one archive_session row (id, external_id, archive_location, source_type):
+    parse its HAR/WACZ and store the structures, marking it 'parsed'. Raises on
+    failure without recording it; parse_archives marks the session parse_failed,
+    a job-queue worker (db_loaders/job_queue.py) retries it first. If
+    ``cancel_check`` returns True once parsing is done (a job-queue worker that
+    lost its lease), raises InterruptedError instead of storing the result.
+    """
+    archive_span = tracer.start("B.archive", archive=str(entry['external_id'] or entry['id']),
+                                source=entry.get('source_type', 'local_har'))
+    steps = tracer.steps()
+    try:
+        # Reconstruct the archive directory; path alias differs by source type.
+        source_type = entry.get('source_type', 'local_har')
+        if source_type == 'local_wacz':
+            archive_name = entry['archive_location'].split(f"{LOCAL_WACZ_ARCHIVES_DIR_ALIAS}/")[1]
+        else:
+            archive_name = entry['archive_location'].split(f"{LOCAL_ARCHIVES_DIR_ALIAS}/")[1]
+
+        entry_id = entry['external_id'] or entry['id']
+        logger.info(f"Parsing archive: {entry_id} ({source_type})")
+        if emit:
+            emit(f"Part B — parsing {entry_id}")
+
+        archive_dir = root_anchor.archives_root() / archive_name
+
+        iso_timestamp = None
+        archived_url = None
+        notes = None
+        metadata = {}
+
+        if source_type == 'local_wacz':
+            # ---------------------------------------------------------- #
+            # WACZ path: extract metadata from archive.wacz, write to
+            # metadata.json, then scan the WARC records for structures.
+            # ---------------------------------------------------------- #
+            wacz_path = archive_dir / "archive.wacz"
+            if not wacz_path.exists():
+                raise Exception(f"WACZ file {wacz_path} does not exist")
+
+            # --- Step 1: Extract and persist metadata ---
+            steps.step("B.metadata")
+            logger.debug(f"Extracting WACZ metadata for {entry_id}")
+            try:
+                metadata = extract_wacz_metadata(wacz_path)
                 metadata_path = archive_dir / "metadata.json"
+                metadata_path.write_text(
+                    json.dumps(metadata, ensure_ascii=False, default=str, indent=2),
+                    encoding="utf-8",
+                )
+                logger.debug(f"Wrote metadata.json for {entry_id}")
+            except Exception as e:
+                traceback.print_exc()
+                raise Exception(f"Error extracting WACZ metadata for {entry_id}: {e}")
+
+            archived_url = metadata.get("primary_url")
+            notes = metadata.get("title")
+
+            # WACZ timestamps are always UTC ISO 8601 with Z suffix
+            created_ts = metadata.get("created")
+            if created_ts:
                 try:
-                    with open(metadata_path, "r", encoding="utf-8") as f:
-                        metadata = json.loads(f.read())
-                    archived_url = metadata.get("target_url", None) if isinstance(metadata, dict) else None
-                    notes = metadata.get("notes", None) if isinstance(metadata, dict) else None
-                    timestamp = metadata.get("archiving_start_timestamp", None) if isinstance(metadata, dict) else None
-
-                    # Convert timestamp to UTC if present
-                    timezone = get_localzone_name()
-                    if timestamp is not None:
-                        dt = parser.isoparse(timestamp)
-                        if dt.tzinfo is None:
-                            try:
-                                tz = pytz_timezone(timezone)
-                                dt = tz.localize(dt)
-                                iso_timestamp = dt.astimezone(pytz_timezone("UTC")).strftime("%Y-%m-%d %H:%M:%S")
-                            except Exception:
-                                logger.warning(f"Could not parse timezone for {entry_id}")
-                    logger.debug(f"Loaded metadata for {entry_id}: url={archived_url}")
+                    dt = parser.isoparse(created_ts)
+                    iso_timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
                 except Exception:
-                    raise Exception(f"Metadata file {metadata_path} is not valid JSON or does not exist")
-                logger.debug(f"Metadata for {entry_id} extracted: {metadata}")
-
-                # --- Step 2: Parse the HAR file ---
-                logger.debug(f"Parsing HAR for {entry_id}")
-                har_path = archive_dir / "archive.har"
-                if not har_path.exists():
-                    raise Exception(f"HAR file {har_path} does not exist")
+                    logger.warning(f"Could not parse WACZ created timestamp for {entry_id}")
+            logger.debug(f"WACZ metadata: url={archived_url}, ts={iso_timestamp}")
+
+            # --- Step 2: Scan WACZ WARC records ---
+            steps.step("B.wacz_scan")
+            logger.debug(f"Scanning WACZ records for {entry_id}")
+            try:
+                structures, videos, photos = scan_wacz(wacz_path, archive_dir)
+                extracted_data = ExtractedHarData(
+                    structures=structures, videos=videos, photos=photos
+                )
+                strip_media_contents(extracted_data)
+                logger.debug(
+                    f"WACZ scan: {len(structures)} structures, "
+                    f"{len(videos)} videos, {len(photos)} photos"
+                )
+            except Exception as e:
+                traceback.print_exc()
+                raise Exception(f"Error scanning WACZ file {wacz_path}: {e}")
+            steps.step("B.serialize")
+            structures_json = json.dumps(extracted_data.model_dump(), default=str, ensure_ascii=False)
+
+        else:
+            # ---------------------------------------------------------- #
+            # HAR path (existing logic, unchanged)
+            # ---------------------------------------------------------- #
+
+            # --- Step 1: Read metadata.json ---
+            steps.step("B.metadata")
+            logger.debug(f"Extracting metadata...")
+            metadata_path = archive_dir / "metadata.json"
+            try:
+                with open(metadata_path, "r", encoding="utf-8") as f:
+                    metadata = json.loads(f.read())
+                archived_url = metadata.get("target_url", None) if isinstance(metadata, dict) else None
+                notes = metadata.get("notes", None) if isinstance(metadata, dict) else None
+                timestamp = metadata.get("archiving_start_timestamp", None) if isinstance(metadata, dict) else None
+
+                # Convert timestamp to UTC if present
+                timezone = get_localzone_name()
+                if timestamp is not None:
+                    dt = parser.isoparse(timestamp)
+                    if dt.tzinfo is None:
+                        try:
+                            tz = pytz_timezone(timezone)
+                            dt = tz.localize(dt)
+                            iso_timestamp = dt.astimezone(pytz_timezone("UTC")).strftime("%Y-%m-%d %H:%M:%S")
+                        except Exception:
+                            logger.warning(f"Could not parse timezone for {entry_id}")
+                logger.debug(f"Loaded metadata for {entry_id}: url={archived_url}")
+            except Exception:
+                raise Exception(f"Metadata file {metadata_path} is not valid JSON or does not exist")
+            logger.debug(f"Metadata for {entry_id} extracted: {metadata}")
+
+            # --- Step 2: Parse the HAR file ---
+            steps.step("B.har_parse")
+            logger.debug(f"Parsing HAR for {entry_id}")
+            har_path = archive_dir / "archive.har"
+            if not har_path.exists():
+                raise Exception(f"HAR file {har_path} does not exist")
+            cache_key = parse_cache.key_for(har_path, PARSING_ALGORITHM_VERSION)
+            cached = parse_cache.get(cache_key)
+            if cached and not _cached_media_present(cached["structures"]):
+                logger.debug(f"Parse cache entry for {entry_id} refers to missing media; re-parsing")
+                parse_cache.discard(cache_key)
+                cached = None
+            steps.current.attrs["cached"] = bool(cached)
+            if cached:
+                logger.debug(f"Parse cache hit for {entry_id}")
+                structures_json = cached["structures"]
+            else:
                 try:
                     logger.debug(f"Extracting data from HAR file: {har_path}")
                     extracted_data = extract_data_from_har(
@@ -623,76 +718,74 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
                 except Exception as e:
                     traceback.print_exc()
                     raise Exception(f"Error extracting data from HAR file {har_path}: {e}")
-
-            # --- Step 3 (shared): Get session attachments (screen recordings, etc.) ---
-            logger.debug(f"Collecting session attachments for {entry_id}")
-            try:
-                session_attachments = get_session_attachments(archive_dir).model_dump()
-                logger.debug(f"Found {len(session_attachments)} attachments for {entry_id}")
-            except Exception as e:
-                logger.warning(f"Could not get session attachments for {archive_name}: {e}")
-                traceback.print_exc()
-                session_attachments = dict()
-
-            # --- Step 4: Save parsed content to database ---
-            try:
-                logger.debug(f"Storing extracted structures...")
+                steps.step("B.serialize")
                 structures_json = json.dumps(extracted_data.model_dump(), default=str, ensure_ascii=False)
-                db.execute_query(
-                    '''
-                    UPDATE archive_session
-                    SET
-                        parse_algorithm_version = %(parsing_code_version)s,
-                        incorporation_status = 'parsed',
-                        structures = %(structures)s,
-                        metadata = %(metadata)s,
-                        extraction_error = NULL,
-                        attachments = %(attachments)s,
-                        archived_url_suffix = %(archived_url_suffix)s,
-                        archiving_timestamp = %(archiving_timestamp)s,
-                        notes = %(notes)s
-                    WHERE id = %(id)s
-                    ''',
-                    {
-                        "id": entry['id'],
-                        "structures": structures_json,
-                        "parsing_code_version": PARSING_ALGORITHM_VERSION,
-                        "metadata": json.dumps(metadata, ensure_ascii=False, default=str),
-                        "attachments": json.dumps(session_attachments, ensure_ascii=False, default=str),
-                        "archived_url_suffix": archived_url,
-                        "archiving_timestamp": iso_timestamp,
-                        "notes": notes,
-                    },
-                    'none'
-                )
-                logger.info(f"Successfully parsed archive: {entry_id}")
-                if emit:
-                    emit(f"Part B — parsed {entry_id}")
-                parsed_count += 1
-            except Exception as e:
-                traceback.print_exc()
-                raise Exception(f"Error saving parsed content to database for archive {entry_id}: {e}")
+                parse_cache.put(cache_key, {"structures": structures_json})
 
+        # --- Step 3 (shared): Get session attachments (screen recordings, etc.) ---
+        steps.step("B.attachments")
+        logger.debug(f"Collecting session attachments for {entry_id}")
+        try:
+            session_attachments = get_session_attachments(archive_dir).model_dump()
+            logger.debug(f"Found {len(session_attachments)} attachments for {entry_id}")
         except Exception as e:
+            logger.warning(f"Could not get session attachments for {archive_name}: {e}")
             traceback.print_exc()
-            # Record the error in the database so this archive is skipped on future runs
+            session_attachments = dict()
+
+        # --- Step 4: Save parsed content to database ---
+        steps.step("B.db_update")
+        if cancel_check is not None and cancel_check():
+            raise InterruptedError("Cancelled before storing the parse result")
+        try:
+            logger.debug(f"Storing extracted structures...")
             db.execute_query(
-                'UPDATE archive_session SET incorporation_status = %(s)s, extraction_error = %(extraction_error)s WHERE id = %(id)s',
-                {"s": "parse_failed", "extraction_error": str(e), "id": entry['id']},
-                return_type="none"
+                '''
+                UPDATE archive_session
+                SET
+                    parse_algorithm_version = %(parsing_code_version)s,
+                    incorporation_status = 'parsed',
+                    structures = %(structures)s,
+                    metadata = %(metadata)s,
+                    extraction_error = NULL,
+                    attachments = %(attachments)s,
+                    archived_url_suffix = %(archived_url_suffix)s,
+                    archiving_timestamp = %(archiving_timestamp)s,
+                    notes = %(notes)s
+                WHERE id = %(id)s
+                ''',
+                {
+                    "id": entry['id'],
+                    "structures": structures_json,
+                    "parsing_code_version": PARSING_ALGORITHM_VERSION,
+                    "metadata": json.dumps(metadata, ensure_ascii=False, default=str),
+                    "attachments": json.dumps(session_attachments, ensure_ascii=False, default=str),
+                    "archived_url_suffix": archived_url,
+                    "archiving_timestamp": iso_timestamp,
+                    "notes": notes,
+                },
+                'none'
             )
-            logger.error(f"Error processing archive {entry['external_id'] or entry['id']}: {e}")
+            logger.info(f"Successfully parsed archive: {entry_id}")
             if emit:
-                emit(f"Part B — error parsing {entry['external_id'] or entry['id']}: {e}")
-            error_count += 1
-
-    elapsed = time.time() - start_time
-    logger.info(f"Part B complete: {parsed_count} archives parsed, {error_count} errors in {elapsed:.1f}s")
-
-
-def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None):
+                emit(f"Part B — parsed {entry_id}")
+        except Exception as e:
+            traceback.print_exc()
+            raise Exception(f"Error saving parsed content to database for archive {entry_id}: {e}")
+    except Exception as e:
+        archive_span.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        steps.end()
+        archive_span.end()
+
+
+@traced("C")
+def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None,
+                     session_ids: Optional[set[int]] = None):
     """
-    Part C of full - does db inserts for main entities... extraction error if a problem in archive_session
+    Part C of full - does db inserts for main entities... extraction error if a problem in archive_session.
+    ``session_ids`` restricts the run to those sessions (an incorporation job's cohort).
     """
     import time
     start_time = time.time()
@@ -716,6 +809,8 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
         {},
         return_type="rows",
     ) or []
+    if session_ids is not None:
+        queue = [e for e in queue if e["id"] in session_ids]
     if limit is not None:
         queue = queue[:limit]
     logger.info(f"Part C - {len(queue)} archives to extract")
@@ -723,83 +818,18 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
     for stub in queue:
         if cancel_check and cancel_check():
             raise InterruptedError("Cancelled by user")
-        # PK lookup — fast, and loads the large structures JSON only when needed
-        entry = db.execute_query(
-            "SELECT * FROM archive_session WHERE id = %(id)s",
-            {"id": stub["id"]},
-            return_type="single_row",
-        )
-        if entry is None:
-            continue
-
-        entry_id = entry['external_id'] or entry['id']
-        entry_start = time.time()
+        entry_id = stub['external_id'] or stub['id']
         try:
-            logger.info(f"Extracting entities for: {entry_id}")
-            if emit:
-                emit(f"Part C — extracting {entry_id}")
-
-            # Resolve the archive directory path from the stored location
-            source_type = entry.get('source_type', 'local_har')
-            if source_type == 'local_wacz':
-                archive_name = entry['archive_location'].split(f"{LOCAL_WACZ_ARCHIVES_DIR_ALIAS}/")[1]
-                archive_path = root_anchor.ROOT_ARCHIVES / archive_name / "archive.wacz"
-            else:
-                archive_name = entry['archive_location'].split(f"{LOCAL_ARCHIVES_DIR_ALIAS}/")[1]
-                archive_path = root_anchor.ROOT_ARCHIVES / archive_name / "archive.har"
-            archive_dir = root_anchor.ROOT_ARCHIVES / archive_name
-            har_path = archive_path  # name kept for compatibility with downstream calls
-
-            # Step C1: Deserialize the parsed structures from Part B (stored as JSON in the DB)
-            step_start = time.time()
-            har_data = ExtractedHarData(**json.loads(entry['structures']))
-            c1_time = time.time() - step_start
-            total_c1_time += c1_time
-            logger.debug(f"  C1 deserialize structures: {c1_time:.2f}s")
-
-            # Step C2: Convert raw HAR structures into normalized entity objects (accounts, posts, media)
-            step_start = time.time()
-            entities = har_data_to_entities(
-                har_path,
-                har_data.structures,
-                har_data.videos,
-                har_data.photos
-            )
-            c2_time = time.time() - step_start
-            total_c2_time += c2_time
-            total_entities["accounts"] += len(entities.accounts)
-            total_entities["posts"] += len(entities.posts)
-            total_entities["media"] += len(entities.media)
-            logger.debug(
-                f"  C2 har_data_to_entities: {c2_time:.2f}s "
-                f"(accounts={len(entities.accounts)}, posts={len(entities.posts)}, media={len(entities.media)})"
-            )
-
-            # Step C3: Insert/update entities in the database tables (account, post, media, etc.)
-            # Also links entities to this archive_session
-            step_start = time.time()
-            incorporate_structures_into_db(entities, entry['id'], archive_dir)
-            c3_time = time.time() - step_start
-            total_c3_time += c3_time
-            logger.debug(f"  C3 incorporate_structures_into_db: {c3_time:.2f}s")
-
-            # Step C4: Mark this archive session as successfully processed
-            step_start = time.time()
-            db.execute_query(
-                "UPDATE archive_session SET incorporation_status = 'done', extract_algorithm_version = %(v)s WHERE external_id = %(id)s",
-                {"id": entry_id, "v": ENTITY_EXTRACTION_ALGORITHM_VERSION},
-                return_type="none"
-            )
-            c4_time = time.time() - step_start
-            total_c4_time += c4_time
-            logger.debug(f"  C4 update archive_session: {c4_time:.2f}s")
-
-            entry_elapsed = time.time() - entry_start
-            logger.info(f"Successfully extracted entities for: {entry_id} in {entry_elapsed:.1f}s")
-            if emit:
-                emit(f"Part C — extracted {entry_id}")
+            result = extract_archive(stub["id"], emit)
+            if result is None:
+                continue
+            total_c1_time += result["c1"]
+            total_c2_time += result["c2"]
+            total_c3_time += result["c3"]
+            total_c4_time += result["c4"]
+            for key in total_entities:
+                total_entities[key] += result[key]
             extracted_count += 1
-
         except Exception as e:
             # Record error in DB so this archive is skipped on future runs
             logger.error(f"Error extracting entities for {entry_id}: {e}")
@@ -830,6 +860,101 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
     )
 
 
+def extract_archive(session_id: int, emit: Optional[Callable[[str], None]] = None) -> Optional[dict]:
+    """
+    Part C for one parsed archive_session: turn its structures into entities and mark
+    it 'done'. Returns the step timings (c1..c4, seconds) and entity counts, or None
+    if the row is gone. Raises on failure without recording it; extract_entities marks
+    the session extract_failed, a job-queue worker retries it first.
+    """
+    # PK lookup — fast, and loads the large structures JSON only when needed
+    entry = db.execute_query(
+        "SELECT * FROM archive_session WHERE id = %(id)s",
+        {"id": session_id},
+        return_type="single_row",
+    )
+    if entry is None:
+        return None
+
+    entry_id = entry['external_id'] or entry['id']
+    entry_start = time.time()
+    archive_span = tracer.start("C.archive", archive=str(entry_id))
+    try:
+        logger.info(f"Extracting entities for: {entry_id}")
+        if emit:
+            emit(f"Part C — extracting {entry_id}")
+
+        # Resolve the archive directory path from the stored location
+        source_type = entry.get('source_type', 'local_har')
+        if source_type == 'local_wacz':
+            archive_name = entry['archive_location'].split(f"{LOCAL_WACZ_ARCHIVES_DIR_ALIAS}/")[1]
+            archive_path = root_anchor.archives_root() / archive_name / "archive.wacz"
+        else:
+            archive_name = entry['archive_location'].split(f"{LOCAL_ARCHIVES_DIR_ALIAS}/")[1]
+            archive_path = root_anchor.archives_root() / archive_name / "archive.har"
+        archive_dir = root_anchor.archives_root() / archive_name
+        har_path = archive_path  # name kept for compatibility with downstream calls
+
+        # Step C1: Deserialize the parsed structures from Part B (stored as JSON in the DB)
+        step_start = time.time()
+        with tracer.span("C.json_loads"):
+            raw_structures = json.loads(entry['structures'])
+        with tracer.span("C.validate"):
+            har_data = ExtractedHarData(**raw_structures)
+        del raw_structures
+        c1_time = time.time() - step_start
+        logger.debug(f"  C1 deserialize structures: {c1_time:.2f}s")
+
+        # Step C2: Convert raw HAR structures into normalized entity objects (accounts, posts, media)
+        step_start = time.time()
+        with tracer.span("C.har_data_to_entities", items=len(har_data.structures)):
+            entities = har_data_to_entities(
+                har_path,
+                har_data.structures,
+                har_data.videos,
+                har_data.photos
+            )
+        c2_time = time.time() - step_start
+        archive_span.items = len(entities.accounts) + len(entities.posts) + len(entities.media)
+        logger.debug(
+            f"  C2 har_data_to_entities: {c2_time:.2f}s "
+            f"(accounts={len(entities.accounts)}, posts={len(entities.posts)}, media={len(entities.media)})"
+        )
+
+        # Step C3: Insert/update entities in the database tables (account, post, media, etc.)
+        # Also links entities to this archive_session
+        step_start = time.time()
+        with _intake_lock, db.named_lock(_INTAKE_DB_LOCK, _INTAKE_DB_LOCK_TIMEOUT_S):
+            incorporate_structures_into_db(entities, entry['id'], archive_dir)
+        c3_time = time.time() - step_start
+        logger.debug(f"  C3 incorporate_structures_into_db: {c3_time:.2f}s")
+
+        # Step C4: Mark this archive session as successfully processed
+        step_start = time.time()
+        with tracer.span("C.update_status"):
+            db.execute_query(
+                "UPDATE archive_session SET incorporation_status = 'done', extract_algorithm_version = %(v)s WHERE external_id = %(id)s",
+                {"id": entry_id, "v": ENTITY_EXTRACTION_ALGORITHM_VERSION},
+                return_type="none"
+            )
+        c4_time = time.time() - step_start
+        logger.debug(f"  C4 update archive_session: {c4_time:.2f}s")
+
+        entry_elapsed = time.time() - entry_start
+        logger.info(f"Successfully extracted entities for: {entry_id} in {entry_elapsed:.1f}s")
+        if emit:
+            emit(f"Part C — extracted {entry_id}")
+        return {
+            "c1": c1_time, "c2": c2_time, "c3": c3_time, "c4": c4_time,
+            "accounts": len(entities.accounts), "posts": len(entities.posts), "media": len(entities.media),
+        }
+    except Exception as e:
+        archive_span.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        archive_span.end()
+
+
 def clear_extraction_errors():
     db.execute_query(
         "UPDATE archive_session SET incorporation_status = 'pending', extraction_error = NULL "
@@ -862,7 +987,7 @@ def add_missing_attachments():
         try:
             print("Adding attachments for entry", entry_id)
             archive_name = entry['archive_location'].split(f"{LOCAL_ARCHIVES_DIR_ALIAS}/")[1]
-            archive_dir = root_anchor.ROOT_ARCHIVES / archive_name
+            archive_dir = root_anchor.archives_root() / archive_name
             session_attachments = get_session_attachments(archive_dir).model_dump()
             db.execute_query(
                 "UPDATE archive_session SET attachments = %(attachments)s WHERE id = %(id)s",
@@ -896,7 +1021,7 @@ def add_missing_metadata():
         try:
             print("Adding metadata for entry", entry_id)
             archive_name = entry['archive_location'].split(f"{LOCAL_ARCHIVES_DIR_ALIAS}/")[1]
-            archive_dir = root_anchor.ROOT_ARCHIVES / archive_name
+            archive_dir = root_anchor.archives_root() / archive_name
             metadata_path = archive_dir / "metadata.json"
             iso_timestamp = None
             archived_url = None
@@ -1003,8 +1128,17 @@ if __name__ == "__main__":
     arg_parser.add_argument("--project-videos", type=int, default=None,
                             help="(phash stage) Extrapolate the measured per-video time to this many "
                                  "production videos and print the estimated indexing runtime.")
+    arg_parser.add_argument("--trace-json", type=str, default=None,
+                            help="Record per-archive/per-step timing spans and write them, with a "
+                                 "percentile and items/s summary, to this JSON file.")
+    arg_parser.add_argument("--trace-chrome", type=str, default=None,
+                            help="Record timing spans and write them as a Chrome trace file "
+                                 "(open offline in chrome://tracing or ui.perfetto.dev).")
     args = arg_parser.parse_args()
 
+    if args.trace_json or args.trace_chrome:
+        tracer.enable()
+
     if args.archives_dir:
         archives_path = Path(args.archives_dir)
         if not archives_path.exists():
@@ -1094,4 +1228,12 @@ if __name__ == "__main__":
     else:
         print(f"Unknown stage: {stage}")
         print(f"Valid stages: {', '.join(valid_stages)}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+    db_stats.log_report()
+    if tracer.enabled:
+        tracer.log_summary(logger)
+        if args.trace_json:
+            logger.info(f"Wrote trace spans and summary to {tracer.export_json(Path(args.trace_json))}")
+        if args.trace_chrome:
+            logger.info(f"Wrote Chrome trace to {tracer.export_chrome_trace(Path(args.trace_chrome))}")
\ No newline at end of file
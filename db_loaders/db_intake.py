@@ -8,8 +8,9 @@ from pydantic import BaseModel, ConfigDict
 from db_loaders.account_merge import auto_merge_shadowed_stubs, is_valid_identifier as _is_valid_identifier
 from extractors.entity_types import EntityBase, ExtractedEntitiesFlattened, Account, Post, Media, Comment, Like, TaggedAccount, AccountRelation
 from extractors.reconcile_entities import reconcile_accounts, reconcile_posts, reconcile_media, reconcile_comments, reconcile_likes, reconcile_tagged_accounts, reconcile_account_relations, synthesize_from_archives, reconcile_primitives
-from root_anchor import ROOT_ARCHIVES
-from utils import db
+from root_anchor import archives_root
+from utils import db, entity_versions
+from utils.tracing import tracer, traced
 
 logger = logging.getLogger(__name__)
 
@@ -393,6 +394,7 @@ def batch_store_new_comment_archives(new_comments: list, canonical_ids: list, ar
     return db.batch_insert('comment_archive', columns, rows)
 
 
+@traced("C.incorporate")
 def incorporate_structures_into_db(
         structures: ExtractedEntitiesFlattened,
         archive_session_id: int,
@@ -410,9 +412,11 @@ def incorporate_structures_into_db(
     """
     logger.debug(f"Incorporating structures into DB for archive session {archive_session_id}")
 
+    phases = tracer.steps()
     with db.transaction_batch():
         for entity_config in entity_types:
             entities: list = getattr(structures, entity_config.key, [])
+            phases.step(f"C3.{entity_config.key}.0_filter", items=len(entities))
 
             # Posts without an id_on_platform cannot be identified or deduplicated.
             if entity_config.key == "posts":
@@ -449,6 +453,7 @@ def incorporate_structures_into_db(
                 entities = valid_entities
 
             if not entities:
+                phases.end()
                 logger.info(f"Processed {entity_config.key}: 0 new, 0 updated")
                 continue
 
@@ -461,6 +466,7 @@ def incorporate_structures_into_db(
                 auto_merge_shadowed_stubs(entities, archive_session_id)
 
             # --- Phase 1: Batch-fetch existing canonicals (1-2 queries instead of N) ---
+            phases.step(f"C3.{entity_config.key}.1_canonicals", items=len(entities))
             if entity_config.batch_get_canonicals:
                 existing_canonicals = entity_config.batch_get_canonicals(entities)
             else:
@@ -501,6 +507,7 @@ def incorporate_structures_into_db(
 
             # --- Phase 2: Batch-fetch archive records; then fetch all archives only for
             #              entities being re-processed. First-time processing uses O(1) merge instead. ---
+            phases.step(f"C3.{entity_config.key}.2_archives", items=len(existing_pairs))
             if entity_config.batch_get_archive_records and existing_canonical_ids:
                 this_session_archive_by_canonical = entity_config.batch_get_archive_records(existing_canonical_ids, archive_session_id)
             else:
@@ -518,6 +525,7 @@ def incorporate_structures_into_db(
                 all_archives_by_canonical = {}
 
             # --- Phase 3: Process new entities ---
+            phases.step(f"C3.{entity_config.key}.3_new", items=len(new_entities))
             new_count = 0
             if entity_config.batch_store_new_entities and entity_config.batch_store_new_entity_archives and new_entities:
                 # Batch path: preprocess all, then multi-row INSERT for canonicals + archives
@@ -543,6 +551,7 @@ def incorporate_structures_into_db(
                     new_count += 1
 
             # --- Phase 4: Process existing entities ---
+            phases.step(f"C3.{entity_config.key}.4_existing", items=len(existing_pairs))
             updated_count = 0
             for entity, existing_canonical in existing_pairs:
                 existing_canonical_id = existing_canonical.id
@@ -584,9 +593,11 @@ def incorporate_structures_into_db(
                 entity_config.store_entity(updated_canonical, existing_canonical, archive_location)
                 updated_count += 1
 
+            phases.end()
             logger.info(f"Processed {entity_config.key}: {new_count} new, {updated_count} updated")
 
         # Keep account.post_count in sync for every account whose posts were touched.
+        phases.step("C3.sync_counts")
         db.execute_query(
             """UPDATE account a
                INNER JOIN (
@@ -616,6 +627,49 @@ def incorporate_structures_into_db(
             {"session_id": archive_session_id},
             return_type="none"
         )
+        phases.step("C3.commit")
+    phases.end()
+
+    with tracer.span("C3.bump_versions"):
+        _bump_session_entity_versions(archive_session_id)
+
+
+def _bump_session_entity_versions(archive_session_id: int) -> None:
+    """Invalidate cached views of every canonical entity this session touched.
+
+    Besides the entities archived in the session itself, the parents whose
+    views list them (the account of each post, the post of each media item and
+    comment) change too. Only runs when a reader has enabled version tracking,
+    i.e. inside the browsing server; CLI loader runs skip the extra query.
+    """
+    if not entity_versions.is_enabled():
+        return
+    rows = db.execute_query(
+        """SELECT 'account' AS t, canonical_id AS id FROM account_archive WHERE archive_session_id = %(s)s
+           UNION ALL
+           SELECT 'post', canonical_id FROM post_archive WHERE archive_session_id = %(s)s
+           UNION ALL
+           SELECT 'account', p.account_id FROM post_archive pa JOIN post p ON pa.canonical_id = p.id
+             WHERE pa.archive_session_id = %(s)s
+           UNION ALL
+           SELECT 'media', canonical_id FROM media_archive WHERE archive_session_id = %(s)s
+           UNION ALL
+           SELECT 'post', m.post_id FROM media_archive ma JOIN media m ON ma.canonical_id = m.id
+             WHERE ma.archive_session_id = %(s)s
+           UNION ALL
+           SELECT 'post', c.post_id FROM comment_archive ca JOIN comment c ON ca.canonical_id = c.id
+             WHERE ca.archive_session_id = %(s)s
+           UNION ALL
+           SELECT 'archive_session', %(s)s""",
+        {"s": archive_session_id},
+        return_type="rows"
+    )
+    ids_by_type: dict[str, set] = {}
+    for row in rows:
+        if row["id"] is not None:
+            ids_by_type.setdefault(row["t"], set()).add(row["id"])
+    for entity_type, ids in ids_by_type.items():
+        entity_versions.bump(entity_type, ids)
 
 
 def preserve_canonical_identifiers(synthesized: EntityBase, existing_canonical: EntityBase) -> None:
@@ -930,7 +984,7 @@ def preprocess_media(media: Media, _: Optional[int], archive_location: Optional[
     if archive_location is not None and media.local_url is not None:
         media.local_url = (
             f"{LOCAL_ARCHIVES_DIR_ALIAS}/"
-            + (archive_location / media.local_url).relative_to(ROOT_ARCHIVES).as_posix()
+            + (archive_location / media.local_url).relative_to(archives_root()).as_posix()
         )
     return media
 
@@ -0,0 +1,539 @@
+"""
+DB-backed work queue for the archive loader (table ``loader_task``, migration V046).
+
+Without it, each loader run picks its work by selecting ``archive_session`` rows on
+``incorporation_status``, so two loaders started at once can both parse the same
+session, and a loader killed mid-archive leaves nothing that says the work was in
+progress. Here every (session, stage) pair is a row that one worker at a time owns:
+
+- Stages are ``parse`` (Part B), ``extract`` (Part C), ``thumbnails`` (Part D) and
+  ``phash`` (Part E). Finishing a stage queues the next one for that session in
+  the same transaction. Media-part thumbnails are not per-session and stay with
+  the ``full`` CLI run.
+- ``claim()`` takes the next due row with ``SELECT … FOR UPDATE SKIP LOCKED``, so
+  workers never wait on each other's row locks or claim the same row, and gives
+  the worker a lease of LOADER_TASK_LEASE_S seconds.
+- While a task runs, a heartbeat thread extends the lease. A worker that dies
+  stops heartbeating; the next worker to call ``reap_expired_leases()`` puts the
+  task back in the queue. Completing or failing a task only counts while the
+  worker still owns the lease, and a worker whose lease was taken over is told to
+  stop through its cancel check.
+- A failed attempt (including a lease that expired) is retried after an
+  exponential backoff with jitter, up to LOADER_TASK_MAX_ATTEMPTS attempts. After
+  that the row is ``dead`` (the dead letter) with its last error, and a parse or
+  extract session is marked parse_failed / extract_failed as a normal run would.
+  ``retry_dead()`` puts dead rows back in the queue and, in the same transaction,
+  their sessions back in the status the stage's handler picks up.
+
+Workers can run as threads in one process, as several processes, or on several
+hosts that share the database and the archives filesystem. C3 (entity intake) is
+serialized across all of them by a MySQL named lock in archives_db_loader.
+
+Usage (from the project root):
+
+    uv run db_loaders/job_queue.py enqueue [--register] [--limit N] [--filter PATTERN]
+    uv run db_loaders/job_queue.py worker [--workers N] [--stages parse extract ...] [--until-empty]
+    uv run db_loaders/job_queue.py status
+    uv run db_loaders/job_queue.py retry_dead [--stages ...]
+
+``db_loaders/soak_job_queue.py`` runs workers against a local MySQL and kills them
+at random, then checks that every task finished or was dead-lettered and that no
+task ran on two workers at once. Delivery is at-least-once: a worker killed after
+finishing a task but before recording it leaves the task to run again, which the
+stages tolerate (they re-check the session's status first, or are idempotent).
+"""
+
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+LEASE_S = float(os.getenv("LOADER_TASK_LEASE_S", "120"))
+HEARTBEAT_S = LEASE_S / 4
+MAX_ATTEMPTS = int(os.getenv("LOADER_TASK_MAX_ATTEMPTS", "5"))
+BACKOFF_S = float(os.getenv("LOADER_TASK_BACKOFF_S", "30"))
+BACKOFF_MAX_S = float(os.getenv("LOADER_TASK_BACKOFF_MAX_S", "3600"))
+POLL_S = float(os.getenv("LOADER_TASK_POLL_S", "5"))
+_REAP_INTERVAL_S = LEASE_S / 2
+_ENQUEUE_BATCH = 500
+
+STAGES = ("parse", "extract", "thumbnails", "phash")
+NEXT_STAGE = {"parse": "extract", "extract": "thumbnails", "thumbnails": "phash"}
+# A parse/extract task that is dead-lettered leaves its session in the status a
+# failed Part B/C run would, so it shows up in the UI and clear_errors retries it.
+_FAILED_SESSION_STATUS = {"parse": ("pending", "parse_failed"), "extract": ("parsed", "extract_failed")}
+
+
+@dataclass(frozen=True)
+class LoaderTask:
+    id: int
+    archive_session_id: int
+    stage: str
+    attempts: int
+    max_attempts: int
+
+
+# ---------------------------------------------------------------------------
+# Stage handlers: run one stage for one session. Return True when the session
+# should move on to the next stage; raise to fail the attempt.
+# ---------------------------------------------------------------------------
+
+def _run_async(coro):
+    # A private loop, not asyncio.run(): that waits for every executor thread on
+    # shutdown, including cv2 calls that outlived their timeout (see incorporation_service).
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _session(session_id: int) -> Optional[dict]:
+    return db.execute_query(
+        "SELECT id, external_id, archive_location, source_type, incorporation_status "
+        "FROM archive_session WHERE id = %(id)s",
+        {"id": session_id}, return_type="single_row",
+    )
+
+
+def _handle_parse(task: LoaderTask, cancel_check: Callable[[], bool]) -> bool:
+    from db_loaders.archives_db_loader import parse_archive
+    entry = _session(task.archive_session_id)
+    if entry is None:
+        return False
+    if entry["incorporation_status"] != "pending":
+        # Parsed by something else since it was queued (a CLI run, another job).
+        logger.info(f"Task {task.id}: session {entry['id']} is already {entry['incorporation_status']}")
+        return entry["incorporation_status"] in ("parsed", "done")
+    if cancel_check():
+        raise InterruptedError("Lease lost before parsing")
+    # Checked again before the result is written: another worker may own the task by then.
+    parse_archive(entry, cancel_check=cancel_check)
+    return True
+
+
+def _handle_extract(task: LoaderTask, cancel_check: Callable[[], bool]) -> bool:
+    from db_loaders.archives_db_loader import extract_archive
+    entry = _session(task.archive_session_id)
+    if entry is None:
+        return False
+    if entry["incorporation_status"] != "parsed":
+        logger.info(f"Task {task.id}: session {entry['id']} is {entry['incorporation_status']}, not parsed")
+        return entry["incorporation_status"] == "done"
+    if cancel_check():
+        raise InterruptedError("Lease lost before extraction")
+    return extract_archive(entry["id"]) is not None
+
+
+def _handle_thumbnails(task: LoaderTask, cancel_check: Callable[[], bool]) -> bool:
+    from db_loaders.thumbnail_generator import generate_missing_thumbnails
+    _run_async(generate_missing_thumbnails(cancel_check=cancel_check, session_ids={task.archive_session_id}))
+    return True
+
+
+def _handle_phash(task: LoaderTask, cancel_check: Callable[[], bool]) -> bool:
+    from db_loaders.phash_generator import generate_missing_hashes
+    _run_async(generate_missing_hashes(cancel_check=cancel_check, session_ids={task.archive_session_id}))
+    return True
+
+
+HANDLERS: dict[str, Callable[[LoaderTask, Callable[[], bool]], bool]] = {
+    "parse": _handle_parse,
+    "extract": _handle_extract,
+    "thumbnails": _handle_thumbnails,
+    "phash": _handle_phash,
+}
+
+
+# ---------------------------------------------------------------------------
+# Queue operations
+# ---------------------------------------------------------------------------
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(stage: str, session_ids: Iterable[int], requeue: bool = True,
+            max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Queue ``stage`` for each session. Rows that are queued or running are left
+    alone; with ``requeue``, done and dead rows are queued again with a fresh
+    attempt count (a session that was requeued for re-incorporation). Returns
+    MySQL's affected-row count: 1 per new row, 2 per reset one."""
+    ids = sorted(set(session_ids))
+    # MySQL applies the assignments left to right, so `status` goes last: the
+    # conditions above it still see the row's old status.
+    on_duplicate = (
+        "attempts = IF(status IN ('done', 'dead'), 0, attempts), "
+        "max_attempts = IF(status IN ('done', 'dead'), VALUES(max_attempts), max_attempts), "
+        "available_at = IF(status IN ('done', 'dead'), NOW(3), available_at), "
+        "last_error = IF(status IN ('done', 'dead'), NULL, last_error), "
+        "status = IF(status IN ('done', 'dead'), 'queued', status)"
+        if requeue else "id = id"
+    )
+    changed = 0
+    for i in range(0, len(ids), _ENQUEUE_BATCH):
+        chunk = ids[i:i + _ENQUEUE_BATCH]
+        args = []
+        for session_id in chunk:
+            args += [session_id, stage, max_attempts]
+        changed += db.execute_query(
+            "INSERT INTO loader_task (archive_session_id, stage, max_attempts) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * len(chunk))
+            + f" ON DUPLICATE KEY UPDATE {on_duplicate}",
+            args, return_type="rowcount",
+        ) or 0
+    return changed
+
+
+def enqueue_from_sessions() -> dict[str, int]:
+    """Queue parse for every 'pending' session and extract for every 'parsed' one:
+    what Part B and Part C of a full run would pick up."""
+    queued = {}
+    for stage, status in (("parse", "pending"), ("extract", "parsed")):
+        rows = db.execute_query(
+            "SELECT id FROM archive_session WHERE incorporation_status = %(s)s "
+            "AND source_type IN ('local_har', 'local_wacz')",
+            {"s": status}, return_type="rows",
+        ) or []
+        queued[stage] = enqueue(stage, [r["id"] for r in rows])
+    return queued
+
+
+def _stage_filter(stages: Optional[Iterable[str]]) -> tuple[str, list]:
+    if not stages:
+        return "", []
+    stages = list(stages)
+    return f" AND stage IN ({', '.join(['%s'] * len(stages))})", stages
+
+
+def claim(worker_id: str, stages: Optional[Iterable[str]] = None) -> Optional[LoaderTask]:
+    """Take the next due task (optionally only of ``stages``) and lease it to ``worker_id``."""
+    stage_sql, stage_args = _stage_filter(stages)
+    with db.transaction_batch():
+        row = db.execute_query(
+            "SELECT id, archive_session_id, stage, attempts, max_attempts FROM loader_task "
+            f"WHERE status = 'queued' AND available_at <= NOW(3){stage_sql} "
+            "ORDER BY available_at, id LIMIT 1 FOR UPDATE SKIP LOCKED",
+            stage_args, return_type="single_row",
+        )
+        if row is None:
+            return None
+        db.execute_query(
+            "UPDATE loader_task SET status = 'running', attempts = attempts + 1, lease_owner = %(owner)s, "
+            "lease_expires_at = NOW(3) + INTERVAL %(lease)s SECOND, heartbeat_at = NOW(3) WHERE id = %(id)s",
+            {"owner": worker_id, "lease": LEASE_S, "id": row["id"]}, return_type="none",
+        )
+    return LoaderTask(id=row["id"], archive_session_id=row["archive_session_id"], stage=row["stage"],
+                      attempts=row["attempts"] + 1, max_attempts=row["max_attempts"])
+
+
+def _backoff_s(attempts: int) -> float:
+    return min(BACKOFF_MAX_S, BACKOFF_S * 2 ** max(0, attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+def _release_failed(task: LoaderTask, error: str) -> str:
+    """Record a failed attempt on a row this transaction holds: back to the queue after
+    a backoff, or dead-lettered once out of attempts. Returns the new status."""
+    if task.attempts >= task.max_attempts:
+        db.execute_query(
+            "UPDATE loader_task SET status = 'dead', last_error = %(e)s, lease_owner = NULL, "
+            "lease_expires_at = NULL WHERE id = %(id)s",
+            {"e": error, "id": task.id}, return_type="none",
+        )
+        session_status = _FAILED_SESSION_STATUS.get(task.stage)
+        if session_status:
+            db.execute_query(
+                "UPDATE archive_session SET incorporation_status = %(failed)s, extraction_error = %(e)s "
+                "WHERE id = %(id)s AND incorporation_status = %(expected)s",
+                {"failed": session_status[1], "expected": session_status[0], "e": error,
+                 "id": task.archive_session_id},
+                return_type="none",
+            )
+        return "dead"
+    db.execute_query(
+        "UPDATE loader_task SET status = 'queued', last_error = %(e)s, lease_owner = NULL, lease_expires_at = NULL, "
+        "available_at = NOW(3) + INTERVAL %(delay)s SECOND WHERE id = %(id)s",
+        {"e": error, "delay": round(_backoff_s(task.attempts), 3), "id": task.id}, return_type="none",
+    )
+    return "queued"
+
+
+def _lock_owned(task: LoaderTask, worker_id: str) -> bool:
+    """Lock the task's row for this transaction; False if ``worker_id`` no longer holds its lease."""
+    row = db.execute_query(
+        "SELECT id FROM loader_task WHERE id = %(id)s AND status = 'running' AND lease_owner = %(owner)s FOR UPDATE",
+        {"id": task.id, "owner": worker_id}, return_type="single_row",
+    )
+    return row is not None
+
+
+def complete(task: LoaderTask, worker_id: str, advance: bool = True) -> bool:
+    """Mark the task done and, with ``advance``, queue the session's next stage.
+    False if the lease was lost in the meantime (another worker owns the task now)."""
+    with db.transaction_batch():
+        if not _lock_owned(task, worker_id):
+            return False
+        db.execute_query(
+            "UPDATE loader_task SET status = 'done', last_error = NULL, lease_owner = NULL, "
+            "lease_expires_at = NULL WHERE id = %(id)s",
+            {"id": task.id}, return_type="none",
+        )
+        next_stage = NEXT_STAGE.get(task.stage)
+        if advance and next_stage:
+            enqueue(next_stage, [task.archive_session_id])
+    return True
+
+
+def fail(task: LoaderTask, worker_id: str, error: str) -> Optional[str]:
+    """Record a failed attempt. Returns 'queued' or 'dead', or None if the lease was lost."""
+    with db.transaction_batch():
+        if not _lock_owned(task, worker_id):
+            return None
+        return _release_failed(task, error)
+
+
+def reap_expired_leases() -> int:
+    """Put running tasks whose lease expired (their worker died or hung) back in the
+    queue, or dead-letter them if that was their last attempt. Safe to call from any
+    number of workers at once."""
+    with db.transaction_batch():
+        rows = db.execute_query(
+            "SELECT id, archive_session_id, stage, attempts, max_attempts, lease_owner FROM loader_task "
+            "WHERE status = 'running' AND lease_expires_at < NOW(3) FOR UPDATE SKIP LOCKED",
+            {}, return_type="rows",
+        ) or []
+        for row in rows:
+            task = LoaderTask(id=row["id"], archive_session_id=row["archive_session_id"], stage=row["stage"],
+                              attempts=row["attempts"], max_attempts=row["max_attempts"])
+            status = _release_failed(task, f"lease expired (worker {row['lease_owner']} stopped heartbeating)")
+            logger.warning(f"Task {task.id} ({task.stage}, session {task.archive_session_id}): lease of "
+                           f"{row['lease_owner']} expired, now {status}")
+    return len(rows)
+
+
+def retry_dead(stages: Optional[Iterable[str]] = None, session_ids: Optional[Iterable[int]] = None) -> int:
+    """Queue dead-lettered tasks (of ``session_ids``, default every session) again with
+    a fresh attempt count. A parse or extract session that dead-lettering marked
+    parse_failed / extract_failed goes back to pending / parsed in the same
+    transaction, or the handler would find it failed and skip it."""
+    stages = list(stages) if stages else None
+    args, where = {}, "t.status = 'dead'"
+    if stages:
+        args = {f"st{i}": stage for i, stage in enumerate(stages)}
+        where += f" AND t.stage IN ({', '.join(f'%({k})s' for k in args)})"
+    if session_ids is not None:
+        ids = {f"id{i}": sid for i, sid in enumerate(session_ids)}
+        if not ids:
+            return 0
+        args.update(ids)
+        where += f" AND t.archive_session_id IN ({', '.join(f'%({k})s' for k in ids)})"
+    with db.transaction_batch():
+        for stage, (expected, failed) in _FAILED_SESSION_STATUS.items():
+            if stages and stage not in stages:
+                continue
+            db.execute_query(
+                "UPDATE archive_session s JOIN loader_task t ON t.archive_session_id = s.id "
+                "SET s.incorporation_status = %(expected)s, s.extraction_error = NULL "
+                f"WHERE {where} AND t.stage = %(stage)s AND s.incorporation_status = %(failed)s",
+                dict(args, stage=stage, expected=expected, failed=failed), return_type="none",
+            )
+        return db.execute_query(
+            f"UPDATE loader_task t SET t.status = 'queued', t.attempts = 0, t.available_at = NOW(3) WHERE {where}",
+            args, return_type="rowcount",
+        ) or 0
+
+
+def outstanding(stages: Optional[Iterable[str]] = None) -> int:
+    """Tasks queued (due or backing off) or running."""
+    stage_sql, stage_args = _stage_filter(stages)
+    row = db.execute_query(
+        f"SELECT COUNT(*) AS n FROM loader_task WHERE status IN ('queued', 'running'){stage_sql}",
+        stage_args, return_type="single_row",
+    )
+    return row["n"] if row else 0
+
+
+def stats() -> dict:
+    """Task counts per stage and status."""
+    rows = db.execute_query(
+        "SELECT stage, status, COUNT(*) AS n FROM loader_task GROUP BY stage, status",
+        {}, return_type="rows",
+    ) or []
+    out: dict[str, dict[str, int]] = {}
+    for row in rows:
+        out.setdefault(row["stage"], {})[row["status"]] = row["n"]
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+class _Lease:
+    """Heartbeat thread that extends a task's lease while it runs. ``lost`` is set if
+    the lease was taken over (it expired and another worker reaped it)."""
+
+    def __init__(self, task: LoaderTask, worker_id: str):
+        self.task = task
+        self.worker_id = worker_id
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"lease-{task.id}", daemon=True)
+
+    def __enter__(self) -> "_Lease":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self) -> None:
+        while not self._stop.wait(HEARTBEAT_S):
+            try:
+                renewed = db.execute_query(
+                    "UPDATE loader_task SET lease_expires_at = NOW(3) + INTERVAL %(lease)s SECOND, "
+                    "heartbeat_at = NOW(3) WHERE id = %(id)s AND status = 'running' AND lease_owner = %(owner)s",
+                    {"lease": LEASE_S, "id": self.task.id, "owner": self.worker_id}, return_type="rowcount",
+                )
+            except Exception as e:
+                # Keep trying: the lease only runs out after LEASE_S without a renewal.
+                logger.warning(f"Heartbeat for task {self.task.id} failed: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Task {self.task.id}: lease lost to another worker")
+                self.lost.set()
+                return
+
+
+def run_task(task: LoaderTask, worker_id: str) -> str:
+    """Run one claimed task to completion or failure. Returns its outcome."""
+    handler = HANDLERS.get(task.stage)
+    logger.info(f"[{worker_id}] task {task.id}: {task.stage} session {task.archive_session_id} "
+                f"(attempt {task.attempts}/{task.max_attempts})")
+    started = time.monotonic()
+    with _Lease(task, worker_id) as lease:
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for stage {task.stage!r}")
+            advance = handler(task, lease.lost.is_set)
+        except Exception as e:
+            outcome = fail(task, worker_id, f"{type(e).__name__}: {e}")
+            logger.error(f"[{worker_id}] task {task.id} failed ({outcome or 'lease lost'}): {e}")
+            return outcome or "lost"
+    if not complete(task, worker_id, advance=bool(advance)):
+        logger.warning(f"[{worker_id}] task {task.id} finished after its lease was lost; result not recorded")
+        return "lost"
+    logger.info(f"[{worker_id}] task {task.id} done in {time.monotonic() - started:.1f}s")
+    return "done"
+
+
+def run_worker(worker_id: Optional[str] = None, stages: Optional[Iterable[str]] = None,
+               stop: Optional[threading.Event] = None, until_empty: bool = False) -> int:
+    """Claim and run tasks until ``stop`` is set (or, with ``until_empty``, until no
+    task of ``stages`` is queued or running). Returns the number of tasks run."""
+    worker_id = worker_id or default_worker_id()
+    stop = stop or threading.Event()
+    stages = list(stages) if stages else None
+    processed = 0
+    last_reap = 0.0
+    while not stop.is_set():
+        if time.monotonic() - last_reap >= _REAP_INTERVAL_S:
+            try:
+                reap_expired_leases()
+            except Exception as e:
+                logger.warning(f"[{worker_id}] reaping expired leases failed: {e}")
+            last_reap = time.monotonic()
+        try:
+            task = claim(worker_id, stages)
+        except Exception as e:
+            logger.error(f"[{worker_id}] claim failed: {e}")
+            stop.wait(POLL_S)
+            continue
+        if task is None:
+            if until_empty and outstanding(stages) == 0:
+                break
+            stop.wait(POLL_S)
+            continue
+        try:
+            run_task(task, worker_id)
+        except Exception as e:
+            # Recording the outcome failed (DB unreachable?); the lease runs out and
+            # the task is reaped like a crashed worker's.
+            logger.error(f"[{worker_id}] task {task.id}: could not record outcome: {e}")
+        processed += 1
+    logger.info(f"[{worker_id}] stopping after {processed} tasks")
+    return processed
+
+
+def run_workers(count: int, stages: Optional[Iterable[str]] = None, until_empty: bool = False) -> int:
+    """Run ``count`` worker threads in this process until SIGINT/SIGTERM (which let
+    the current tasks finish) or, with ``until_empty``, until the queue drains."""
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    base_id = default_worker_id()
+    counts = [0] * count
+
+    def work(i: int) -> None:
+        counts[i] = run_worker(f"{base_id}:{i}", stages, stop, until_empty)
+
+    threads = [threading.Thread(target=work, args=(i,), name=f"loader-worker-{i}") for i in range(count)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(timeout=0.5)
+    return sum(counts)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(name)s:%(lineno)d - %(threadName)s - %(levelname)s - %(message)s")
+
+    arg_parser = argparse.ArgumentParser(description="Archive loader job queue")
+    arg_parser.add_argument("command", choices=["enqueue", "worker", "status", "retry_dead"])
+    arg_parser.add_argument("--register", action="store_true",
+                            help="(enqueue) Run Part A first, registering new archive directories")
+    arg_parser.add_argument("--limit", type=int, default=None, help="(enqueue --register) Passed to Part A")
+    arg_parser.add_argument("--filter", type=str, default=None, help="(enqueue --register) Passed to Part A")
+    arg_parser.add_argument("--archives-dir", type=str, default=None,
+                            help="Override the archives directory path (default: archives/ in project root)")
+    arg_parser.add_argument("--workers", type=int, default=1, help="(worker) Worker threads in this process")
+    arg_parser.add_argument("--stages", nargs="+", choices=STAGES, default=None,
+                            help="(worker, retry_dead) Only these stages")
+    arg_parser.add_argument("--until-empty", action="store_true",
+                            help="(worker) Exit once nothing is queued or running")
+    args = arg_parser.parse_args()
+
+    if args.archives_dir:
+        from db_loaders.archives_db_loader import set_archives_dir
+        set_archives_dir(args.archives_dir)
+
+    if args.command == "enqueue":
+        if args.register:
+            from db_loaders.archives_db_loader import register_archives
+            register_archives(limit=args.limit, name_filter=args.filter)
+        logger.info(f"Queued: {enqueue_from_sessions()}")
+    elif args.command == "worker":
+        total = run_workers(max(1, args.workers), args.stages, args.until_empty)
+        logger.info(f"Workers ran {total} tasks")
+    elif args.command == "retry_dead":
+        logger.info(f"Re-queued {retry_dead(args.stages)} dead tasks")
+    for stage, counts in sorted(stats().items()):
+        print(f"  {stage:10s} " + "  ".join(f"{status} {n}" for status, n in sorted(counts.items())))
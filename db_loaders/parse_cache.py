@@ -0,0 +1,207 @@
+"""
+Content-keyed on-disk cache of Part B parse output.
+
+Re-running parse_archives (after a crash, after resetting incorporation_status,
+or on a staging copy of production) used to re-parse every HAR even when neither
+the file nor PARSING_ALGORITHM_VERSION had changed.
+
+Part B output is not a function of the HAR alone: media extraction writes the
+photos/ and videos/ next to it, consults downloaded_media_log.json there, and
+records absolute paths to the saved files. So an entry is scoped to the
+directory it was produced in as well, and cached under
+
+    <PARSE_CACHE_DIR>/<sha[:2]>/<sha256>-<dir hash>-v<parsing version>.json.gz
+
+where sha256 is the archive file's whole_file_sha256 from its integrity manifest
+(``<asset>.manifest.json``, written at archive time) and dir hash identifies the
+resolved archive directory. A staging copy, an --archives-dir override or a
+duplicate HAR elsewhere gets its own entry (and its own media). The caller also
+checks that the media files a hit refers to still exist before using it. The
+manifest is only trusted when its recorded size matches the file on disk;
+archives without a manifest (including every WACZ, which the archiver never
+writes) are parsed normally and not cached, since hashing them here would cost
+a full read, which is most of what the cache saves.
+
+Entries are gzip'd JSON. Each hit touches the file's mtime, and after every
+write the oldest-mtime entries are evicted until the cache fits in
+PARSE_CACHE_MAX_MB, i.e. least recently used first. The cache is disposable:
+deleting the directory only costs re-parsing.
+
+Set PARSE_CACHE_MAX_MB=0 to disable.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+import root_anchor
+from utils.integrity.chunk_manifest import read_manifest
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST_SUFFIX = ".manifest.json"
+
+
+def _cache_dir() -> Path:
+    custom = os.getenv("PARSE_CACHE_DIR")
+    return Path(custom) if custom else Path(root_anchor.ROOT_DIR) / ".parse_cache"
+
+
+def archive_content_hash(archive_path: Path) -> Optional[str]:
+    """whole_file_sha256 from the archive's integrity manifest, if it still describes the file."""
+    manifest_path = archive_path.with_suffix(archive_path.suffix + _MANIFEST_SUFFIX)
+    try:
+        manifest = read_manifest(manifest_path)
+        if manifest.get("size") != archive_path.stat().st_size:
+            logger.debug(f"Manifest size mismatch for {archive_path}; not using parse cache")
+            return None
+        return manifest.get("whole_file_sha256") or None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable manifest {manifest_path}: {e}")
+        return None
+
+
+class ParseCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key_for(self, archive_path: Path, parser_version: int) -> Optional[str]:
+        """Cache key for an archive in its directory, or None (counted as uncacheable)
+        when it has no usable manifest."""
+        if not self.enabled:
+            return None
+        sha256 = archive_content_hash(archive_path)
+        if sha256 is None:
+            self._count("uncacheable")
+            return None
+        scope = hashlib.sha256(str(archive_path.parent.resolve()).encode("utf-8")).hexdigest()[:16]
+        return f"{sha256}-{scope}-v{parser_version}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def get(self, key: Optional[str]) -> Optional[dict]:
+        if key is None:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # LRU: recency is the file's mtime
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except (OSError, ValueError, EOFError) as e:
+            logger.warning(f"Discarding corrupt parse cache entry {path}: {e}")
+            self._remove(path)
+            self._count("misses")
+            return None
+        self._count("hits")
+        return value
+
+    def _count(self, counter: str) -> None:
+        # Lookups come from several worker threads; += on an attribute is not atomic.
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def discard(self, key: Optional[str]) -> None:
+        """Drop an entry the caller found unusable; counted as a miss instead of a hit."""
+        if key is None:
+            return
+        removed = self._remove(self._path(key))
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+            if self._total_bytes is not None:
+                self._total_bytes -= removed
+
+    def put(self, key: Optional[str], value: dict) -> None:
+        if key is None:
+            return
+        path = self._path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A temp name of its own: another worker or process may be writing the same key.
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=5) as f:
+                json.dump(value, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"Could not write parse cache entry {path}: {e}")
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+        self._evict()
+
+    def _remove(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            return size
+        except OSError:
+            return 0
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        out = []
+        for path in self.root.glob("*/*.json.gz"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+            for _, _, path in sorted(self._entries()):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._total_bytes -= self._remove(path)
+                self.evictions += 1
+                logger.debug(f"Evicted parse cache entry {path.name}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, uncacheable, evictions = self.hits, self.misses, self.uncacheable, self.evictions
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "dir": str(self.root),
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "uncacheable": uncacheable,
+            "evictions": evictions,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+parse_cache = ParseCache(_cache_dir(), int(float(os.getenv("PARSE_CACHE_MAX_MB", "2048")) * 1024 * 1024))
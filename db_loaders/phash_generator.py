@@ -49,6 +49,8 @@ USAGE:
             --project-images 1500000 --project-videos 1500000
 """
 
+from __future__ import annotations
+
 import asyncio
 import json
 import logging
@@ -60,15 +62,18 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from pathlib import Path
 from time import perf_counter, sleep
-from typing import Callable, Optional
-
-import imagehash
-from PIL import Image
+from typing import TYPE_CHECKING, Callable, Optional
 
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS
 from extractors.entity_types import Media
-from root_anchor import ROOT_DIR, ROOT_ARCHIVES
+from root_anchor import ROOT_DIR, archives_root
 from utils import db
+from utils.tracing import tracer, traced
+
+if TYPE_CHECKING:
+    # imagehash (numpy, scipy, PIL) is imported where hashes are computed, so the server
+    # and loader pay for it on the first hash rather than at startup.
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
@@ -103,10 +108,12 @@ def _to_signed64(v: Optional[int]) -> Optional[int]:
 
 def _phash_int(img: Image.Image) -> int:
     """imagehash.phash (8x8 DCT → 64 bits) as an unsigned int."""
+    import imagehash
     return int(str(imagehash.phash(img)), 16)
 
 
 def _dhash_int(img: Image.Image) -> int:
+    import imagehash
     return int(str(imagehash.dhash(img)), 16)
 
 
@@ -118,13 +125,16 @@ def _hamming(a: int, b: int) -> int:
 # Image / video hashing (CPU work — run inside asyncio.to_thread)
 # ---------------------------------------------------------------------------
 
+@traced("E.image_hash")
 def _hash_image_file(path: str) -> tuple[int, int]:
     """Open an image file and compute (phash, dhash). Runs in a thread."""
+    from PIL import Image
     with Image.open(path) as img:
         img.load()
         return _phash_int(img), _dhash_int(img)
 
 
+@traced("E.ffprobe")
 def _probe_duration(path: str) -> Optional[float]:
     """Video duration in seconds via ffprobe (None if it can't be determined). Runs in a thread."""
     result = subprocess.run(
@@ -149,6 +159,7 @@ def _sample_interval(duration: Optional[float]) -> float:
     return duration / n
 
 
+@traced("E.ffmpeg_frames")
 async def _extract_frames(path: str, interval: float, out_dir: str) -> None:
     """Single ffmpeg decode pass: emit downscaled JPEG frames at 1/interval fps into out_dir.
     Killable on timeout (unlike the cv2 thread the thumbnail generator uses)."""
@@ -169,10 +180,12 @@ async def _extract_frames(path: str, interval: float, out_dir: str) -> None:
         raise Exception(f"ffmpeg frame extraction failed (exit {proc.returncode})")
 
 
+@traced("E.frame_hash")
 def _collapse_frames(out_dir: str, interval: float) -> tuple[list[tuple[float, int, int]], int]:
     """Hash sampled frames in order, keeping only those that differ from the last kept frame by
     more than COLLAPSE_HAMMING bits. Returns (kept=[(frame_time, phash, dhash)], frames_decoded).
     Runs in a thread."""
+    from PIL import Image
     frame_paths = sorted(Path(out_dir).glob("f_*.jpg"))
     kept: list[tuple[float, int, int]] = []
     last_kept_phash: Optional[int] = None
@@ -319,6 +332,7 @@ def _is_deadlock(e: Exception) -> bool:
 PERSIST_MAX_ATTEMPTS = 10
 
 
+@traced("E.db_write")
 def _persist_hashes(media_id: int, hashes: list[tuple[Optional[float], int, int]]) -> None:
     """Replace this media's hash rows and mark it generated, in one transaction (idempotent).
     Retries on transient deadlock with desynchronising backoff."""
@@ -352,7 +366,7 @@ async def process_one_media(
     stats: PhashStats,
 ) -> bool:
     """Compute and persist perceptual hash(es) for one media item. Returns True on success."""
-    async with semaphore:
+    async with semaphore, tracer.span("E.hash", items=1, media_type=media_row.get("media_type")):
         media = Media(**media_row)
         t0 = perf_counter()
         decode_ms = hash_ms = 0.0
@@ -373,7 +387,7 @@ async def process_one_media(
                 stats.add(MediaTiming(media.id, media.media_type, 'not_needed',
                                       total_ms=(perf_counter() - t0) * 1000))
                 return True
-            local_path = ROOT_ARCHIVES / media.local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
+            local_path = archives_root() / media.local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
 
             if media.media_type == 'image':
                 th0 = perf_counter()
@@ -426,17 +440,27 @@ async def process_one_media(
             return False
 
 
+@traced("E")
 async def generate_missing_hashes(
     limit: int | None = None,
     cancel_check=None,
     emit: Optional[Callable[[str], None]] = None,
+    session_ids: Optional[set[int]] = None,
 ) -> PhashStats:
     """Status-gated, resumable pass that hashes all media with phash_status='pending'.
-    Mirrors generate_missing_thumbnails(). Returns a PhashStats with timing for extrapolation."""
+    Mirrors generate_missing_thumbnails(), including the ``session_ids`` scope.
+    Returns a PhashStats with timing for extrapolation."""
     semaphore = asyncio.Semaphore(MAX_CONCURRENT)
     stats = PhashStats()
     wall0 = perf_counter()
     processed = 0
+    scope_sql, scope_args = "", []
+    if session_ids is not None:
+        if not session_ids:
+            return stats
+        scope_sql = (" AND id IN (SELECT canonical_id FROM media_archive WHERE archive_session_id IN ("
+                     + ", ".join(["%s"] * len(session_ids)) + "))")
+        scope_args = sorted(session_ids)
     while True:
         if cancel_check and cancel_check():
             raise InterruptedError("Cancelled by user")
@@ -446,8 +470,8 @@ async def generate_missing_hashes(
             break
 
         rows = db.execute_query(
-            f"SELECT * FROM media WHERE phash_status = 'pending' LIMIT {fetch_count}",
-            {}, return_type="rows"
+            f"SELECT * FROM media WHERE phash_status = 'pending'{scope_sql} LIMIT {fetch_count}",
+            scope_args, return_type="rows"
         ) or []
         if not rows:
             break
@@ -0,0 +1,236 @@
+"""
+Soak test for the loader job queue (db_loaders/job_queue.py) against a local MySQL:
+start --workers worker processes, SIGKILL one at random every --kill-every seconds
+(and start a replacement), and once the queue drains check that:
+
+- every task ended 'done' or 'dead', none is left queued or running;
+- no two runs of a task overlapped unless the earlier run's worker was killed
+  (its run never finished);
+- no task used more attempts than it was allowed;
+- a parse task whose worker is killed on its last attempt is dead-lettered with
+  its session parse_failed, and after retry_dead() the session is pending again
+  and the task runs to done (the parse itself is replaced by a check of the
+  status the real handler requires, so no archive is read).
+
+Delivery is at-least-once: a worker killed after its handler finished but before
+it recorded the result has the task run again. Those repeats are counted in the
+summary, not reported as failures.
+
+The tasks use a synthetic 'soak' stage (sleep, then fail --fail-rate of the time)
+on existing archive_session ids, so no archives are read and nothing outside
+loader_task and the scratch table loader_soak_run is written. Both are cleaned up
+at the end unless --keep is given. The retry_dead check borrows one session that
+has no parse task, and puts its status back afterwards. Run it against a development database with the
+V046 migration applied, from the project root:
+
+    uv run db_loaders/soak_job_queue.py [--tasks 200] [--workers 6] [--kill-every 1.5] [--lease-s 3]
+"""
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db_loaders import job_queue
+from utils import db
+
+SOAK_STAGE = "soak"
+
+
+def _soak_handler(task: job_queue.LoaderTask, cancel_check) -> bool:
+    run_id = db.execute_query(
+        "INSERT INTO loader_soak_run (task_id, worker_pid, started_at) VALUES (%(t)s, %(p)s, NOW(6))",
+        {"t": task.id, "p": os.getpid()}, return_type="id",
+    )
+    deadline = time.monotonic() + random.uniform(0.05, float(os.getenv("SOAK_MAX_TASK_S", "1.0")))
+    while time.monotonic() < deadline:
+        if cancel_check():
+            raise InterruptedError("lease lost")
+        time.sleep(0.02)
+    if random.random() < float(os.getenv("SOAK_FAIL_RATE", "0.1")):
+        raise RuntimeError("injected failure")
+    db.execute_query("UPDATE loader_soak_run SET finished_at = NOW(6) WHERE id = %(id)s",
+                     {"id": run_id}, return_type="none")
+    return False
+
+
+def _worker_main() -> None:
+    job_queue.HANDLERS[SOAK_STAGE] = _soak_handler
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    job_queue.run_worker(stages=[SOAK_STAGE])
+
+
+def _spawn(args) -> subprocess.Popen:
+    env = dict(os.environ,
+               LOADER_TASK_LEASE_S=str(args.lease_s),
+               LOADER_TASK_BACKOFF_S="0.2",
+               LOADER_TASK_BACKOFF_MAX_S="2",
+               LOADER_TASK_POLL_S="0.2",
+               SOAK_FAIL_RATE=str(args.fail_rate),
+               SOAK_MAX_TASK_S=str(args.max_task_s))
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _setup(args) -> list[int]:
+    db.execute_query("DELETE FROM loader_task WHERE stage = %(s)s", {"s": SOAK_STAGE}, return_type="none")
+    db.execute_query("DROP TABLE IF EXISTS loader_soak_run", {}, return_type="none")
+    db.execute_query(
+        "CREATE TABLE loader_soak_run (id int auto_increment PRIMARY KEY, task_id bigint NOT NULL, "
+        "worker_pid int NOT NULL, started_at datetime(6) NOT NULL, finished_at datetime(6) NULL)",
+        {}, return_type="none",
+    )
+    rows = db.execute_query("SELECT id FROM archive_session ORDER BY id LIMIT %(n)s",
+                            {"n": args.tasks}, return_type="rows") or []
+    ids = [r["id"] for r in rows]
+    job_queue.enqueue(SOAK_STAGE, ids, max_attempts=args.max_attempts)
+    return ids
+
+
+def _check() -> list[str]:
+    problems = []
+    leftover = db.execute_query(
+        "SELECT status, COUNT(*) AS n FROM loader_task WHERE stage = %(s)s AND status NOT IN ('done', 'dead') "
+        "GROUP BY status", {"s": SOAK_STAGE}, return_type="rows") or []
+    for row in leftover:
+        problems.append(f"{row['n']} tasks still {row['status']}")
+    over = db.execute_query(
+        "SELECT id, attempts, max_attempts FROM loader_task WHERE stage = %(s)s AND attempts > max_attempts",
+        {"s": SOAK_STAGE}, return_type="rows") or []
+    for row in over:
+        problems.append(f"task {row['id']} used {row['attempts']} of {row['max_attempts']} attempts")
+    overlapping = db.execute_query(
+        "SELECT a.task_id, a.worker_pid AS pid_a, b.worker_pid AS pid_b FROM loader_soak_run a "
+        "JOIN loader_soak_run b ON a.task_id = b.task_id AND a.id < b.id "
+        "WHERE a.finished_at IS NOT NULL AND b.started_at < a.finished_at",
+        {}, return_type="rows") or []
+    for row in overlapping:
+        problems.append(f"task {row['task_id']} ran in pids {row['pid_a']} and {row['pid_b']} at once")
+    return problems
+
+
+def _check_retry_dead() -> list[str]:
+    row = db.execute_query(
+        "SELECT s.id, s.incorporation_status, s.extraction_error FROM archive_session s "
+        "LEFT JOIN loader_task t ON t.archive_session_id = s.id AND t.stage = 'parse' "
+        "WHERE t.id IS NULL ORDER BY s.id LIMIT 1", {}, return_type="single_row")
+    if row is None:
+        return ["retry_dead: no archive_session without a parse task to borrow"]
+    session_id, problems = row["id"], []
+    real_handler = job_queue.HANDLERS["parse"]
+    seen = []
+
+    def status_is(expected: str) -> Optional[str]:
+        status = job_queue._session(session_id)["incorporation_status"]
+        return None if status == expected else f"session {session_id} is {status}, expected {expected}"
+
+    def parse_stand_in(task, cancel_check) -> bool:
+        # What _handle_parse checks before parsing: it only parses a pending session.
+        status = job_queue._session(task.archive_session_id)["incorporation_status"]
+        seen.append(status)
+        return status == "pending"
+
+    try:
+        db.execute_query("UPDATE archive_session SET incorporation_status = 'pending', extraction_error = NULL "
+                         "WHERE id = %(id)s", {"id": session_id}, return_type="none")
+        job_queue.enqueue("parse", [session_id], max_attempts=1)
+        task = job_queue.claim("soak-victim", ["parse"])
+        if task is None or task.archive_session_id != session_id:
+            return [f"retry_dead: claimed {task} instead of the parse task of session {session_id}"]
+        # The worker is killed mid-task: its lease runs out and the reaper dead-letters it.
+        db.execute_query("UPDATE loader_task SET lease_expires_at = NOW(3) - INTERVAL 1 SECOND WHERE id = %(id)s",
+                         {"id": task.id}, return_type="none")
+        job_queue.reap_expired_leases()
+        problems += filter(None, [status_is("parse_failed")])
+        if job_queue.retry_dead(["parse"], [session_id]) < 1:
+            problems.append("retry_dead re-queued nothing")
+        problems += filter(None, [status_is("pending")])
+        job_queue.HANDLERS["parse"] = parse_stand_in
+        task = job_queue.claim("soak-retry", ["parse"])
+        outcome = job_queue.run_task(task, "soak-retry") if task else None
+        if outcome != "done" or seen != ["pending"]:
+            problems.append(f"retried parse task ended {outcome} having seen session status {seen}")
+    finally:
+        job_queue.HANDLERS["parse"] = real_handler
+        db.execute_query("DELETE FROM loader_task WHERE archive_session_id = %(id)s AND stage IN ('parse', 'extract')",
+                         {"id": session_id}, return_type="none")
+        db.execute_query("UPDATE archive_session SET incorporation_status = %(st)s, extraction_error = %(e)s "
+                         "WHERE id = %(id)s",
+                         {"st": row["incorporation_status"], "e": row["extraction_error"], "id": session_id},
+                         return_type="none")
+    return [f"retry_dead: {p}" for p in problems]
+
+
+def _summary() -> str:
+    counts = job_queue.stats().get(SOAK_STAGE, {})
+    runs = db.execute_query(
+        "SELECT COUNT(*) AS runs, SUM(finished_at IS NULL) AS unfinished FROM loader_soak_run",
+        {}, return_type="single_row") or {}
+    repeats = db.execute_query(
+        "SELECT COUNT(*) AS n FROM (SELECT task_id FROM loader_soak_run WHERE finished_at IS NOT NULL "
+        "GROUP BY task_id HAVING COUNT(*) > 1) t", {}, return_type="single_row") or {}
+    return (f"tasks: {counts}  runs: {runs.get('runs')} "
+            f"({runs.get('unfinished')} killed, failed or lost before finishing; "
+            f"{repeats.get('n')} tasks finished more than once)")
+
+
+def main(args) -> int:
+    ids = _setup(args)
+    if not ids:
+        print("No archive_session rows to attach soak tasks to")
+        return 1
+    print(f"{len(ids)} soak tasks, {args.workers} workers, killing one every ~{args.kill_every}s, "
+          f"lease {args.lease_s}s, fail rate {args.fail_rate}")
+    workers = [_spawn(args) for _ in range(args.workers)]
+    kills = 0
+    started = time.monotonic()
+    try:
+        next_kill = time.monotonic() + random.uniform(0.5, 1.5) * args.kill_every
+        while job_queue.outstanding([SOAK_STAGE]):
+            if time.monotonic() - started > args.timeout_s:
+                print(f"Timed out after {args.timeout_s}s")
+                break
+            if time.monotonic() >= next_kill:
+                victim = random.randrange(len(workers))
+                workers[victim].kill()
+                workers[victim].wait()
+                workers[victim] = _spawn(args)
+                kills += 1
+                next_kill = time.monotonic() + random.uniform(0.5, 1.5) * args.kill_every
+            time.sleep(0.1)
+    finally:
+        for w in workers:
+            w.terminate()
+        for w in workers:
+            w.wait()
+    print(f"Drained in {time.monotonic() - started:.1f}s with {kills} workers killed; {_summary()}")
+    problems = _check() + _check_retry_dead()
+    for problem in problems:
+        print(f"  FAIL: {problem}")
+    if not args.keep:
+        db.execute_query("DELETE FROM loader_task WHERE stage = %(s)s", {"s": SOAK_STAGE}, return_type="none")
+        db.execute_query("DROP TABLE IF EXISTS loader_soak_run", {}, return_type="none")
+    print("OK" if not problems else f"{len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        _worker_main()
+        sys.exit(0)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument("--kill-every", type=float, default=1.5)
+    parser.add_argument("--lease-s", type=float, default=3.0)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--max-task-s", type=float, default=1.0)
+    parser.add_argument("--max-attempts", type=int, default=8)
+    parser.add_argument("--timeout-s", type=float, default=600)
+    parser.add_argument("--keep", action="store_true", help="Keep the soak tasks and run log for inspection")
+    sys.exit(main(parser.parse_args()))
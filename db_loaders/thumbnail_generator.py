@@ -51,20 +51,25 @@ DEPENDENCIES:
     - MySQL database with media table
 """
 
+from __future__ import annotations
+
 import asyncio
 import logging
 import os
 from hashlib import md5
 from pathlib import Path
-from typing import Callable, Optional
-
-import cv2
-from PIL import Image
+from typing import TYPE_CHECKING, Callable, Optional
 
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS
 from extractors.entity_types import Media
-from root_anchor import ROOT_DIR, ROOT_ARCHIVES
-from utils import db
+from root_anchor import ROOT_DIR, archives_root
+from utils import db, entity_versions
+from utils.tracing import tracer, traced
+
+if TYPE_CHECKING:
+    # cv2 and PIL are imported where frames and images are decoded: the server and
+    # CLI tools import this module for its path constants and should not pay for them.
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
@@ -72,11 +77,13 @@ ROOT_THUMBNAILS = Path(ROOT_DIR) / "thumbnails"
 LOCAL_THUMBNAILS_DIR_ALIAS = 'local_thumbnails'
 
 
+@traced("D.video_frame")
 def _read_video_frame(path: str, seek_seconds: float = 0.0) -> Image.Image:
     """Extract a frame from a video file for use as a thumbnail. When seek_seconds > 0 the
     capture is seeked to that timestamp first (used for media-part thumbnails, which preview the
     part's start frame); if the seek read fails it falls back to the first usable frame."""
-    import os
+    import cv2
+    from PIL import Image
 
     # Check file exists and get size
     if not os.path.exists(path):
@@ -174,13 +181,16 @@ BATCH_SIZE = 1000
 MAX_CONCURRENT = 8
 
 
+@traced("D.image_decode")
 def load_image_and_thumbnail(path: str, size: tuple) -> Image.Image:
     """Open an image file and resize it in-place. Runs in a thread."""
+    from PIL import Image
     img = Image.open(path)
     img.thumbnail(size)
     return img
 
 
+@traced("D.save")
 def save_image(img: Image.Image, out_path: Path) -> None:
     """Save a PIL image to disk. Runs in a thread."""
     os.makedirs(out_path.parent, exist_ok=True)
@@ -194,9 +204,9 @@ async def process_one_media(
     emit: Optional[Callable[[str], None]],
 ) -> bool:
     """Generate and persist a thumbnail for one media item. Returns True on success."""
-    async with semaphore:
+    async with semaphore, tracer.span("D.thumbnail", items=1, media_type=media_row.get("media_type")):
         media = Media(**media_row)
-        local_path = ROOT_ARCHIVES / media.local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
+        local_path = archives_root() / media.local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
         try:
             logger.info(f"Generating thumbnail for media ID {media.id} at {local_path}")
             if media.media_type == 'image':
@@ -240,9 +250,20 @@ async def process_one_media(
         return True
 
 
-async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | None = None, cancel_check=None, emit: Optional[Callable[[str], None]] = None):
+@traced("D.thumbnails")
+async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | None = None, cancel_check=None, emit: Optional[Callable[[str], None]] = None,
+                                      session_ids: Optional[set[int]] = None):
+    """Generate thumbnails for media still 'pending'. With ``session_ids``, only for
+    media linked to those archive sessions (an incorporation job's cohort)."""
     semaphore = asyncio.Semaphore(MAX_CONCURRENT)
     generated_count = 0
+    scope_sql, scope_args = "", []
+    if session_ids is not None:
+        if not session_ids:
+            return
+        scope_sql = (" AND id IN (SELECT canonical_id FROM media_archive WHERE archive_session_id IN ("
+                     + ", ".join(["%s"] * len(session_ids)) + "))")
+        scope_args = sorted(session_ids)
     while True:
         if cancel_check and cancel_check():
             raise InterruptedError("Cancelled by user")
@@ -252,8 +273,8 @@ async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | No
             break
 
         rows = db.execute_query(
-            f"SELECT * FROM media WHERE thumbnail_status = 'pending' LIMIT {fetch_count}",
-            {}, return_type="rows"
+            f"SELECT * FROM media WHERE thumbnail_status = 'pending'{scope_sql} LIMIT {fetch_count}",
+            scope_args, return_type="rows"
         ) or []
         if not rows:
             break
@@ -308,7 +329,7 @@ def _render_part_thumbnail(part_row: dict, thumbnail_size: tuple) -> Image.Image
     local_url = part_row["local_url"]
     if not local_url:
         raise Exception("Parent media has no local_url")
-    local_path = ROOT_ARCHIVES / local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
+    local_path = archives_root() / local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
     crop_area = part_row.get("crop_area")
     if isinstance(crop_area, str):
         import json
@@ -318,6 +339,7 @@ def _render_part_thumbnail(part_row: dict, thumbnail_size: tuple) -> Image.Image
             crop_area = None
     media_type = part_row["media_type"]
     if media_type == "image":
+        from PIL import Image
         img = Image.open(str(local_path))
     elif media_type == "video":
         img = _read_video_frame(str(local_path), seek_seconds=part_row.get("timestamp_range_start") or 0.0)
@@ -371,11 +393,13 @@ def generate_media_part_thumbnail(media_part_id: int, thumbnail_size=(128, 128))
     if row is None:
         logger.warning(f"generate_media_part_thumbnail: media_part {media_part_id} not found")
         return False
-    return _persist_part_thumbnail(row, thumbnail_size)
+    persisted = _persist_part_thumbnail(row, thumbnail_size)
+    entity_versions.bump("media_part", [media_part_id])
+    return persisted
 
 
 async def _process_one_media_part(part_row: dict, thumbnail_size: tuple, semaphore: asyncio.Semaphore) -> bool:
-    async with semaphore:
+    async with semaphore, tracer.span("D.part_thumbnail", items=1):
         try:
             return await asyncio.wait_for(
                 asyncio.to_thread(_persist_part_thumbnail, part_row, thumbnail_size), timeout=15
@@ -385,6 +409,7 @@ async def _process_one_media_part(part_row: dict, thumbnail_size: tuple, semapho
             return False
 
 
+@traced("D.part_thumbnails")
 async def generate_missing_part_thumbnails(thumbnail_size=(128, 128), limit: int | None = None,
                                            cancel_check=None, emit: Optional[Callable[[str], None]] = None):
     """Batch-generate thumbnails for media_parts in 'pending' status (pipeline stage D)."""
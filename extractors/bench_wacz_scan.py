@@ -0,0 +1,104 @@
+"""
+Compare scan_wacz reading every WARC record (full warcio scan) against reading
+only the records the WACZ's CDX index selects, and check that both produce the
+same structures, videos and photos (including the bytes of the saved media).
+
+Run from the project root on one WACZ or on an archives directory (every
+*/archive.wacz below it is used):
+
+    uv run python -m extractors.bench_wacz_scan <file.wacz | archives_dir> [--runs N] [--limit N]
+
+Outputs go to a temporary directory; the archives are only read. Exits non-zero
+if any WACZ's outputs differ between the two modes.
+"""
+import argparse
+import hashlib
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from extractors.structures_from_wacz import scan_wacz
+
+
+def _file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else "missing"
+
+
+def _fingerprint(scan) -> str:
+    structures, videos, photos = scan
+    return json.dumps({
+        "structures": [s.model_dump() for s in structures],
+        "videos": [
+            {
+                "xpv_asset_id": v.xpv_asset_id,
+                "tracks": sorted((v.fetched_tracks or {}).keys()),
+                "full_asset": v.full_asset,
+                "cover_photo_url": v.cover_photo_url,
+                "requested_in_session": v.requested_in_session,
+                "local_files": [(p.name, _file_digest(p)) for p in v.local_files or []],
+            }
+            for v in videos
+        ],
+        "photos": [
+            {
+                "asset_id": p.asset_id,
+                "url": p.url,
+                "fetched": {k: hashlib.sha256(b).hexdigest() for k, b in (p.fetched_assets or {}).items()},
+                "local_files": [(f.name, _file_digest(f)) for f in p.local_files or []],
+            }
+            for p in photos
+        ],
+    }, sort_keys=True, default=str)
+
+
+def _timed_scan(wacz_path: Path, out_dir: Path, use_index: bool) -> tuple[float, str]:
+    t = time.perf_counter()
+    scan = scan_wacz(wacz_path, out_dir, use_index=use_index)
+    elapsed = time.perf_counter() - t
+    return elapsed, _fingerprint(scan)
+
+
+def main(target: Path, runs: int, limit: int):
+    waczs = [target] if target.is_file() else sorted(target.glob("*/archive.wacz"))
+    if limit:
+        waczs = waczs[:limit]
+    if not waczs:
+        print(f"No WACZ files under {target}")
+        sys.exit(2)
+    totals = {"full scan": 0.0, "indexed": 0.0}
+    total_mb = 0.0
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, wacz_path in enumerate(waczs):
+            size_mb = wacz_path.stat().st_size / (1 << 20)
+            total_mb += size_mb
+            times = {"full scan": [], "indexed": []}
+            prints = {}
+            for run in range(runs):
+                for mode, use_index in (("full scan", False), ("indexed", True)):
+                    elapsed, prints[mode] = _timed_scan(wacz_path, Path(tmp) / f"{i}_{run}_{use_index}", use_index)
+                    times[mode].append(elapsed)
+            medians = {mode: statistics.median(values) for mode, values in times.items()}
+            for mode, median in medians.items():
+                totals[mode] += median
+            same = prints["full scan"] == prints["indexed"]
+            if not same:
+                failed.append(wacz_path)
+            print(f"{wacz_path} ({size_mb:.1f} MiB): full scan {medians['full scan']:.2f}s, "
+                  f"indexed {medians['indexed']:.2f}s{'' if same else '  MISMATCH'}")
+    for mode, total in totals.items():
+        print(f"{mode:10s} total {total:8.2f}s  ({total_mb / max(total, 1e-9):7.1f} MiB/s over {len(waczs)} WACZ)")
+    print("outputs identical" if not failed else f"OUTPUTS DIFFER for {len(failed)} WACZ")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target", type=Path)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=0, help="Use at most N WACZ files (0 = all).")
+    args = parser.parse_args()
+    main(args.target, args.runs, args.limit)
@@ -7,11 +7,11 @@ from pathlib import Path
 from typing import Literal, Optional
 from urllib import parse as urllib_parse
 
-import ijson
 import requests
 from pydantic import BaseModel
 
 from archiver.summarizers import download_log as dl
+from extractors.har_index import iter_har_entries
 from extractors.structures_extraction import StructureType
 from extractors.structures_extraction import structures_from_har
 from extractors.instagram.structures_extraction_api_v1 import ApiV1Response
@@ -96,27 +96,26 @@ def download_file(url: str) -> Optional[bytes]:
 
 def extract_photo_maps(har_path: Path) -> list[Photo]:
     photos_dict: dict[int, Photo] = {}
-    with open(har_path, 'rb') as f:
-        for entry in ijson.items(f, 'log.entries.item'):
+    for entry in iter_har_entries(har_path, lambda e: _is_image_request(e.url) and e.has_body):
+        try:
+            url = entry['request']['url']
+            if not _is_image_request(url):
+                continue
+            content_obj = entry.get('response', {}).get('content', {})
+            if 'text' not in content_obj:
+                continue
+            raw_b64 = content_obj['text']
             try:
-                url = entry['request']['url']
-                if not _is_image_request(url):
-                    continue
-                content_obj = entry.get('response', {}).get('content', {})
-                if 'text' not in content_obj:
-                    continue
-                raw_b64 = content_obj['text']
-                try:
-                    data = base64.b64decode(raw_b64)
-                except Exception:
-                    continue
-                asset_id = extract_xpv_asset_id(url) or hash(url)
-                filename = url.split('/')[-1].split('?')[0]
-                if asset_id not in photos_dict:
-                    photos_dict[asset_id] = Photo(asset_id=asset_id, fetched_assets={}, url=url)
-                photos_dict[asset_id].fetched_assets[filename] = data
+                data = base64.b64decode(raw_b64)
             except Exception:
                 continue
+            asset_id = extract_xpv_asset_id(url) or hash(url)
+            filename = url.split('/')[-1].split('?')[0]
+            if asset_id not in photos_dict:
+                photos_dict[asset_id] = Photo(asset_id=asset_id, fetched_assets={}, url=url)
+            photos_dict[asset_id].fetched_assets[filename] = data
+        except Exception:
+            continue
     return list(photos_dict.values())
 
 
@@ -10,11 +10,11 @@ from pathlib import Path
 from typing import Optional, Literal
 from urllib import parse as urllib_parse
 
-import ijson
 import requests
 from pydantic import BaseModel, field_validator
 
 from archiver.summarizers import download_log as dl
+from extractors.har_index import har_entry_urls, iter_har_entries
 from extractors.instagram.models import VideoVersion
 from extractors.structures_extraction import StructureType, structures_from_har
 
@@ -402,18 +402,17 @@ def extract_video_maps(har_path: Path) -> list[Video]:
     fallback_dict: dict[str, Video] = {}
     filename_to_xpv: dict[str, str] = {}
 
-    with open(har_path, 'rb') as file:
-        for entry in ijson.items(file, 'log.entries.item'):
-            try:
-                if '.mp4' in entry['request']['url'] and 'text' in entry['response']['content']:
-                    url = entry['request']['url']
-                    body = base64.b64decode(entry['response']['content']['text'])
-                    accumulate_video_segment(url, body, real_xpv_dict, fallback_dict, filename_to_xpv,
-                                             byte_range=byte_range_from_har_entry(entry))
-            except Exception as e:
-                print(f'Error processing entry: {e}')
-                traceback.print_exc()
-                continue
+    for entry in iter_har_entries(har_path, lambda e: '.mp4' in e.url):
+        try:
+            if '.mp4' in entry['request']['url'] and 'text' in entry['response']['content']:
+                url = entry['request']['url']
+                body = base64.b64decode(entry['response']['content']['text'])
+                accumulate_video_segment(url, body, real_xpv_dict, fallback_dict, filename_to_xpv,
+                                         byte_range=byte_range_from_har_entry(entry))
+        except Exception as e:
+            print(f'Error processing entry: {e}')
+            traceback.print_exc()
+            continue
 
     # Reconcile without structures; acquire_videos does a second pass with structures.
     return list(reconcile_video_dicts(real_xpv_dict, fallback_dict, filename_to_xpv).values())
@@ -1027,10 +1026,9 @@ def acquire_videos(
     if requested_mp4_urls is None:
         requested_mp4_urls = set()
         try:
-            with open(har_path, 'rb') as f:
-                for url in ijson.items(f, 'log.entries.item.request.url'):
-                    if isinstance(url, str) and '.mp4' in url:
-                        requested_mp4_urls.add(url)
+            for url in har_entry_urls(har_path):
+                if '.mp4' in url:
+                    requested_mp4_urls.add(url)
         except Exception as e:
             print(f"[acquire] requested-asset scan failed (treating none as requested): {e}")
     requested_xpv = _requested_xpvs_from_urls(requested_mp4_urls, struct_filename_to_xpv)
@@ -0,0 +1,246 @@
+"""
+Content-addressed response-body store for HARs (opt-in: HAR_BODY_STORE=true).
+
+By default merge_har_attachments base64-inlines every response body into
+archive.har, inflating it by about a third and making every later pass decode
+the bodies again. With the store enabled the merge writes each body once, under
+its SHA-256, and the HAR entry refers to it:
+
+    <archive>/archive.har          content: {"_file": "bodies/ab/<sha256>", "_sha256": "<sha256>", ...}
+    <archive>/bodies/ab/<sha256>   raw body bytes, one file per distinct body
+    <archive>/bodies.json          {sha256: size} of every stored body
+
+``_file`` is Playwright's own attachment key (a path relative to the HAR's
+directory), so route_from_har replay reads these HARs as they are. Readers going
+through extractors.har_index (Part B, photo/video maps, the summary) get the
+body resolved back into ``content.text``/``encoding`` exactly as the inline merge
+would have written it (resolve_body_ref), so parse output does not depend on the
+layout. utils/har_to_warc.py inlines the bodies into a temporary HAR for har2warc.
+
+Identical bodies within a session are stored once. Across sessions, bodies are
+hard-linked from a shared pool (HAR_BODY_POOL_DIR, default .body_pool in the
+project root; set it empty to disable), so the disk holds one copy. Falls back
+to a plain copy when the pool is on another filesystem.
+
+The trade-off: archives that share a body share its inode. Each archive
+directory still holds every file it needs (moving or copying it elsewhere
+breaks nothing), but its copy is not independent: an in-place write or a bad
+sector changes that body in every archive linking it. Stored bodies are made
+read-only (0444) so an in-place write needs a deliberate chmod first; media
+damage is what each archive's own bodies.par2 recovery set repairs (a repair
+writes a fresh file, which unshares it). Set HAR_BODY_POOL_DIR empty where
+independent copies matter more than disk.
+
+Pool entries outlive the archives that linked them, so deleting archives frees
+nothing until the pool is collected:
+
+    uv run python -m extractors.har_body_store gc
+
+which removes every pool entry no archive links any more (link count 1).
+
+Integrity: bodies.json is protected and sealed like any other asset, and every
+body's file name is its hash, so verify_body_store (run by utils.integrity.verify
+for archive directories) detects any missing or altered body. The archiver also
+writes one PAR2 recovery set over the bodies/ tree (bodies.par2 and
+bodies.vol*.par2 beside it), which utils.integrity.verify uses to repair them,
+the coverage the bodies had inside the PAR2-protected HAR when inlined.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import stat
+from pathlib import Path
+from typing import Callable, Optional
+
+import root_anchor
+
+logger = logging.getLogger(__name__)
+
+BODY_DIR = "bodies"
+INDEX_FILENAME = "bodies.json"
+INDEX_VERSION = 1
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+ENABLED = os.getenv("HAR_BODY_STORE", "false").lower() in ("1", "true", "yes")
+
+
+def _pool_dir() -> Optional[Path]:
+    custom = os.getenv("HAR_BODY_POOL_DIR")
+    if custom is None:
+        return Path(root_anchor.ROOT_DIR) / ".body_pool"
+    return Path(custom) if custom else None
+
+
+def encode_body(body: bytes, mime: str) -> tuple[str, Optional[str]]:
+    """HAR ``content.text`` (and ``encoding``) for a body, as the inline merge writes it."""
+    is_text = (
+        mime.startswith('text/') or
+        'json' in mime or
+        'xml' in mime or
+        'javascript' in mime
+    )
+    if is_text:
+        try:
+            return body.decode('utf-8'), None
+        except UnicodeDecodeError:
+            pass
+    return base64.b64encode(body).decode('ascii'), 'base64'
+
+
+def resolve_body_ref(content: Optional[dict], base_dir: Path) -> None:
+    """Replace a ``_file`` body reference in a HAR content object with the inline text.
+
+    Paths that escape ``base_dir`` (e.g. ``../../.env`` in an uploaded HAR) and
+    missing files are left unresolved, i.e. the entry reads as bodyless.
+    """
+    if not content or '_file' not in content or 'text' in content:
+        return
+    base = base_dir.resolve()
+    path = (base / content['_file']).resolve()
+    if not path.is_relative_to(base):
+        logger.warning(f"Ignoring HAR body reference outside {base}: {content['_file']}")
+        return
+    try:
+        body = path.read_bytes()
+    except OSError:
+        return
+    text, encoding = encode_body(body, content.get('mimeType', ''))
+    content.pop('_file')
+    content.pop('_sha256', None)
+    content['text'] = text
+    if encoding:
+        content['encoding'] = encoding
+
+
+class BodyStore:
+    """Writer side, used by merge_har_attachments for one archive directory."""
+
+    def __init__(self, archive_dir: Path):
+        self.archive_dir = archive_dir
+        self.pool = _pool_dir()
+        self.bodies: dict[str, int] = {}
+        self.pooled = 0
+
+    def put(self, body: bytes) -> tuple[str, str]:
+        """Store a body; returns (path relative to the archive dir, sha256)."""
+        sha256 = hashlib.sha256(body).hexdigest()
+        rel = f"{BODY_DIR}/{sha256[:2]}/{sha256}"
+        if sha256 not in self.bodies:
+            path = self.archive_dir / rel
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if not self._link_from_pool(sha256, path):
+                    tmp_path = path.with_name(path.name + ".tmp")
+                    tmp_path.write_bytes(body)
+                    os.chmod(tmp_path, _READ_ONLY)  # shared with the pool (and other archives) once linked
+                    os.replace(tmp_path, path)
+                    self._add_to_pool(sha256, path)
+            self.bodies[sha256] = len(body)
+        return rel, sha256
+
+    def _pool_path(self, sha256: str) -> Optional[Path]:
+        return self.pool / sha256[:2] / sha256 if self.pool else None
+
+    def _link_from_pool(self, sha256: str, path: Path) -> bool:
+        pooled = self._pool_path(sha256)
+        if pooled is None or not pooled.exists():
+            return False
+        try:
+            os.link(pooled, path)
+        except OSError:
+            return False
+        self.pooled += 1
+        return True
+
+    def _add_to_pool(self, sha256: str, path: Path) -> None:
+        pooled = self._pool_path(sha256)
+        if pooled is None:
+            return
+        try:
+            pooled.parent.mkdir(parents=True, exist_ok=True)
+            os.link(path, pooled)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            logger.debug(f"Body pool link failed for {sha256}: {e}")
+
+    def write_index(self) -> Path:
+        index_path = self.archive_dir / INDEX_FILENAME
+        payload = {"version": INDEX_VERSION, "algorithm": "sha256", "bodies": dict(sorted(self.bodies.items()))}
+        index_path.write_bytes(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        return index_path
+
+
+def gc_body_pool(pool: Optional[Path] = None) -> tuple[int, int]:
+    """Remove pool entries no archive links any more (link count 1). Returns (files
+    removed, bytes freed). A body linked from the pool while this runs keeps its
+    archive's link either way; the next archive to store it writes it afresh."""
+    pool = pool if pool is not None else _pool_dir()
+    removed = freed = 0
+    if pool is None or not pool.is_dir():
+        return removed, freed
+    for path in pool.glob("*/*"):
+        try:
+            st = path.stat()
+            if not stat.S_ISREG(st.st_mode) or st.st_nlink != 1:
+                continue
+            try:
+                path.unlink()
+            except PermissionError:
+                os.chmod(path, st.st_mode | stat.S_IWUSR)  # read-only files can't be deleted on Windows
+                path.unlink()
+        except OSError as e:
+            logger.debug(f"Body pool gc skipped {path}: {e}")
+            continue
+        removed += 1
+        freed += st.st_size
+    return removed, freed
+
+
+def uses_body_store(archive_dir: Path) -> bool:
+    return (archive_dir / INDEX_FILENAME).exists()
+
+
+def read_body_index(archive_dir: Path) -> dict[str, int]:
+    """{sha256: size} of every body bodies.json lists."""
+    return json.loads((archive_dir / INDEX_FILENAME).read_text(encoding="utf-8"))["bodies"]
+
+
+def verify_body_store(archive_dir: Path) -> list[str]:
+    """Re-hash every body listed in bodies.json; returns a description of each problem."""
+    return verify_bodies(archive_dir, read_body_index(archive_dir))
+
+
+def verify_bodies(archive_dir: Path, bodies: dict[str, int],
+                  on_read: Optional[Callable[[int], None]] = None) -> list[str]:
+    """Re-hash ``bodies`` ({sha256: size}, a slice of the index); ``on_read`` is called
+    with the size of every block read (fleet_verify's rate limit)."""
+    problems = []
+    for sha256, size in bodies.items():
+        path = archive_dir / BODY_DIR / sha256[:2] / sha256
+        h = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    if on_read is not None:
+                        on_read(len(block))
+                    h.update(block)
+        except OSError:
+            problems.append(f"missing body {sha256}")
+            continue
+        if h.hexdigest() != sha256 or path.stat().st_size != size:
+            problems.append(f"altered body {sha256}")
+    return problems
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Maintain the shared HAR body pool")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--pool", type=Path, help="Pool directory (default HAR_BODY_POOL_DIR)")
+    args = parser.parse_args()
+    files, size = gc_body_pool(args.pool)
+    logger.info(f"Removed {files} unreferenced pool bodies, {size / (1024 * 1024):.1f} MiB freed")
@@ -0,0 +1,294 @@
+"""
+Byte-offset sidecar index for HAR entries.
+
+Every stage that reads a HAR (Part B parsing, resolve_har_domains, video/photo
+map extraction, the entities summary) used to stream the whole file through
+ijson, base64 bodies and all, even when it only wanted the URLs or a handful of
+entries. The index, written next to the HAR as ``<har>.index.json``, records for
+each entry of ``log.entries``:
+
+    [offset, length, method, status, mime, body_size, has_body, url]
+
+so a consumer can filter on URL/MIME first and then seek straight to the bytes of
+the entries it needs. It is a derived cache: safe to delete, never part of the
+integrity manifests (it does not match ``*.manifest.json``).
+
+Staleness: the index stores the HAR's size, mtime and SHA-256. A size/mtime
+match is trusted; otherwise the HAR is re-hashed and the index is used only if
+the hash still matches (and its mtime refreshed), so any content change
+invalidates it.
+
+Entry boundaries are found with a small structural scanner over an mmap of the
+file (regex jumps over string contents, so large base64 bodies cost one C-level
+search each). Entries are decoded with ``json.loads``; ``use_float=False`` maps
+non-integer numbers to Decimal exactly like ijson's default, so callers get the
+same objects they got from ``ijson.items(f, 'log.entries.item')``.
+
+Entries whose body lives in the content-addressed store (har_body_store.py)
+are yielded with the body resolved back into ``content.text``.
+
+Set HAR_SIDECAR_INDEX=false to disable building/using the index.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple, Optional
+
+import ijson
+
+from extractors.har_body_store import resolve_body_ref
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+ENABLED = os.getenv("HAR_SIDECAR_INDEX", "true").lower() in ("1", "true", "yes")
+
+_STRUCTURAL = re.compile(rb'["{}\[\]]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_HASH_BLOCK = 1 << 20
+
+
+class HarIndexEntry(NamedTuple):
+    offset: int
+    length: int
+    method: Optional[str]
+    status: Optional[int]
+    mime: Optional[str]
+    body_size: Optional[int]
+    has_body: bool
+    url: str
+
+
+def index_path_for(har_path: Path) -> Path:
+    return har_path.with_name(har_path.name + INDEX_SUFFIX)
+
+
+def har_index_entry(entry: dict, offset: int, length: int) -> HarIndexEntry:
+    request = entry.get("request") or {}
+    response = entry.get("response") or {}
+    content = response.get("content") or {}
+    size = content.get("size")
+    return HarIndexEntry(
+        offset=offset,
+        length=length,
+        method=request.get("method"),
+        status=response.get("status"),
+        mime=content.get("mimeType"),
+        body_size=int(size) if size is not None else None,
+        has_body="text" in content or "_file" in content,
+        url=request.get("url", ""),
+    )
+
+
+def _iter_entry_spans(buf) -> Iterator[tuple[int, int]]:
+    """Yield (offset, length) of each object in the top-level ``log.entries`` array."""
+    depth = 0
+    entries_depth = None
+    entry_start = None
+    last_string: dict[int, bytes] = {}
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        m = _STRUCTURAL.search(buf, pos)
+        if m is None:
+            return
+        i = m.start()
+        c = buf[i]
+        if c == 0x22:  # '"' - skip to the closing quote, honouring escapes
+            j = i + 1
+            while True:
+                s = _STRING_SPECIAL.search(buf, j)
+                if s is None:
+                    return
+                if buf[s.start()] == 0x5C:  # backslash
+                    j = s.start() + 2
+                    continue
+                j = s.start()
+                break
+            if depth <= 2:
+                last_string[depth] = bytes(buf[i + 1:j])
+            pos = j + 1
+            continue
+        if c in (0x7B, 0x5B):  # '{' or '['
+            if entries_depth is not None and depth == entries_depth and c == 0x7B:
+                entry_start = i
+            depth += 1
+            if c == 0x5B and depth == 3 and last_string.get(2) == b"entries" and last_string.get(1) == b"log":
+                entries_depth = depth
+        else:  # '}' or ']'
+            depth -= 1
+            if entries_depth is not None:
+                if depth == entries_depth and c == 0x7D and entry_start is not None:
+                    yield entry_start, i + 1 - entry_start
+                    entry_start = None
+                elif depth < entries_depth:
+                    return
+        pos = i + 1
+
+
+def _decode(raw: bytes, use_float: bool) -> dict:
+    return json.loads(raw) if use_float else json.loads(raw, parse_float=Decimal)
+
+
+def _with_body(entry: dict, base_dir: Path) -> dict:
+    resolve_body_ref((entry.get("response") or {}).get("content"), base_dir)
+    return entry
+
+
+def _sha256_of(buf) -> str:
+    h = hashlib.sha256()
+    for start in range(0, len(buf), _HASH_BLOCK):
+        h.update(buf[start:start + _HASH_BLOCK])
+    return h.hexdigest()
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class HarIndex:
+    def __init__(self, har_path: Path, entries: list[HarIndexEntry], sha256: str, size: int, mtime_ns: int):
+        self.har_path = har_path
+        self.entries = entries
+        self.sha256 = sha256
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def urls(self) -> list[str]:
+        return [e.url for e in self.entries]
+
+    def iter_entries(
+            self,
+            wanted: Optional[Callable[[HarIndexEntry], bool]] = None,
+            use_float: bool = False,
+    ) -> Iterator[dict]:
+        """Decode and yield the selected entries in HAR order."""
+        with open(self.har_path, "rb") as f:
+            for e in self.entries:
+                if wanted is not None and not wanted(e):
+                    continue
+                f.seek(e.offset)
+                yield _with_body(_decode(f.read(e.length), use_float), self.har_path.parent)
+
+    def write(self) -> None:
+        payload = {
+            "version": INDEX_VERSION,
+            "har": {"name": self.har_path.name, "size": self.size, "mtime_ns": self.mtime_ns,
+                    "sha256": self.sha256},
+            "entries": [list(e) for e in self.entries],
+        }
+        out_path = index_path_for(self.har_path)
+        tmp_path = None
+        try:
+            # A temp name of its own: another process may be indexing the same HAR.
+            fd, tmp_path = tempfile.mkstemp(dir=out_path.parent, prefix=out_path.name + ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+            os.replace(tmp_path, out_path)
+        except OSError as e:
+            logger.warning("Could not write HAR index %s: %s", out_path, e)
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+
+
+def load_har_index(har_path: Path) -> Optional[HarIndex]:
+    """Return the sidecar index if present and still matching the HAR, else None."""
+    har_path = Path(har_path)
+    idx_path = index_path_for(har_path)
+    if not ENABLED or not idx_path.exists() or not har_path.exists():
+        return None
+    try:
+        payload = json.loads(idx_path.read_text(encoding="utf-8"))
+        if payload.get("version") != INDEX_VERSION:
+            return None
+        meta = payload["har"]
+        st = har_path.stat()
+        if meta["size"] != st.st_size:
+            return None
+        index = HarIndex(har_path, [HarIndexEntry(*e) for e in payload["entries"]],
+                         meta["sha256"], meta["size"], meta["mtime_ns"])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring unreadable HAR index %s: %s", idx_path, e)
+        return None
+    if index.mtime_ns != st.st_mtime_ns:
+        # Touched (copied, restored from backup...) - trust it only if the bytes are unchanged.
+        if _sha256_file(har_path) != index.sha256:
+            return None
+        index.mtime_ns = st.st_mtime_ns
+        index.write()
+    return index
+
+
+def iter_har_entries(
+        har_path: Path,
+        wanted: Optional[Callable[[HarIndexEntry], bool]] = None,
+        use_float: bool = False,
+) -> Iterator[dict]:
+    """Yield ``log.entries`` items of a HAR, skipping those ``wanted`` rejects.
+
+    Uses the sidecar index when valid. Otherwise makes one pass that serves the
+    caller and builds the index as it goes (written once the pass completes), so
+    the next consumer of the same HAR can seek. With the index disabled, falls
+    back to plain ijson streaming.
+    """
+    har_path = Path(har_path)
+    index = load_har_index(har_path)
+    if index is not None:
+        yield from index.iter_entries(wanted, use_float)
+        return
+    if not ENABLED or har_path.stat().st_size == 0:
+        with open(har_path, "rb") as f:
+            for entry in ijson.items(f, "log.entries.item", use_float=use_float):
+                if wanted is None or wanted(har_index_entry(entry, 0, 0)):
+                    yield _with_body(entry, har_path.parent)
+        return
+
+    st = har_path.stat()
+    entries: list[HarIndexEntry] = []
+    with open(har_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        for offset, length in _iter_entry_spans(buf):
+            entry = _decode(buf[offset:offset + length], use_float)
+            meta = har_index_entry(entry, offset, length)
+            entries.append(meta)
+            if wanted is None or wanted(meta):
+                yield _with_body(entry, har_path.parent)
+        sha256 = _sha256_of(buf)
+    HarIndex(har_path, entries, sha256, st.st_size, st.st_mtime_ns).write()
+
+
+def build_har_index(har_path: Path) -> Optional[HarIndex]:
+    """Write the sidecar index for a HAR unless a valid one already exists."""
+    for _ in iter_har_entries(har_path, wanted=lambda e: False):
+        pass
+    return load_har_index(har_path)
+
+
+def har_entry_urls(har_path: Path) -> list[str]:
+    """Request URL of every entry, from the index when available."""
+    index = load_har_index(har_path)
+    if index is not None:
+        return index.urls()
+    urls = []
+    with open(har_path, "rb") as f:
+        for url in ijson.items(f, "log.entries.item.request.url"):
+            if isinstance(url, str):
+                urls.append(url)
+    return urls
+
+
+if __name__ == "__main__":
+    har_file = input("Input path to HAR file: ").strip().strip('"').strip("'")
+    built = build_har_index(Path(har_file))
+    print(f"Indexed {len(built.entries) if built else 0} entries -> {index_path_for(Path(har_file))}")
@@ -1,17 +1,21 @@
+from __future__ import annotations
+
 from typing import Literal
 
 from pydantic import BaseModel
 
 supported_page_types = Literal["highlight", "story", "reel", "post", "profile"]
 import json
-from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
 from extractors.instagram.models import HighlightsReelConnection, CommentsConnection, \
     ProfileTimeline, MediaShortcode, StoriesFeed
 from extractors.instagram.models_graphql import ReelsMediaConnection
 from extractors.models_har import HarRequest
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
 
 
 def find_json_by_keyword(data: dict, keyword: str) -> List[dict]:
@@ -110,6 +114,7 @@ def extract_data_from_html_response(soup: BeautifulSoup) -> Optional[PageRespons
 
 
 def extract_data_from_html_entry(html_data: str, req: HarRequest) -> Optional[PageResponse]:
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_data, "html.parser")
     #html_type = infer_post_type_from_url(req.url)
     data = extract_data_from_html_response(soup)
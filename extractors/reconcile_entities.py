@@ -4,7 +4,7 @@ from pathlib import Path
 from typing import Optional, Callable, TypeVar, Any
 
 from extractors.entity_types import Account, Post, Media, Comment, Like, TaggedAccount, AccountRelation
-from root_anchor import ROOT_DIR, ROOT_ARCHIVES
+from root_anchor import ROOT_DIR, archives_root
 
 T = TypeVar('T')
 
@@ -221,6 +221,6 @@ def _local_url_size(local_url: Optional[str]) -> int:
     if len(parts) < 2:
         return 0
     try:
-        return (ROOT_ARCHIVES / parts[1]).stat().st_size
+        return (archives_root() / parts[1]).stat().st_size
     except OSError:
         return 0
@@ -19,6 +19,7 @@ from urllib.parse import urlparse
 
 import ijson
 
+from extractors.har_index import iter_har_entries
 from extractors.instagram import structures_extraction as _ig
 from extractors.threads import structures_extraction as _th
 from extractors.instagram.structures_extraction_graphql import GraphQLResponse
@@ -46,33 +47,44 @@ def extract_structure_from_entry(entry: dict) -> Optional[StructureType]:
     return None
 
 
+def may_contain_structure(url: str) -> bool:
+    """Cheap pre-filter: False when extract_structure_from_entry would return None
+    for any entry with this URL (no platform detector claims the host)."""
+    host = _entry_host(url)
+    return _ig.is_instagram_host(host) or _th.is_threads_host(host)
+
+
+def _wants_entry(e) -> bool:
+    return may_contain_structure(e.url)
+
+
 def structures_from_har(har_path: Path) -> list[StructureType]:
+    """Every recognized structure in a HAR (inline or body-store bodies alike)."""
     structures: list[StructureType] = []
-    with open(har_path, "rb") as f:
-        for entry in ijson.items(f, "log.entries.item"):
-            try:
-                structure = extract_structure_from_entry(entry)
-                if structure:
-                    structures.append(structure)
-            except Exception as e:
-                print(f"Error processing entry: {e}")
-                traceback.print_exc()
+    for entry in iter_har_entries(har_path, _wants_entry):
+        try:
+            structure = extract_structure_from_entry(entry)
+            if structure:
+                structures.append(structure)
+        except Exception as e:
+            print(f"Error processing entry: {e}")
+            traceback.print_exc()
     return structures
 
 
 def keep_only_requests_for_known_structures(har_path: Path, clean_original: bool = False):
     """Filter a HAR down to only the entries that carry a recognized structure
-    (any supported platform), writing ``{stem}_filtered.har``."""
-    with open(har_path, "rb") as f:
-        relevant_entries = []
-        for entry in ijson.items(f, "log.entries.item"):
-            try:
-                if extract_structure_from_entry(entry):
-                    relevant_entries.append(entry)
-            except Exception as e:
-                print(f"Error processing entry: {e}")
-                traceback.print_exc()
-        filtered_har_path = har_path.with_name(har_path.stem + "_filtered.har")
+    (any supported platform), writing ``{stem}_filtered.har``. Body-store bodies
+    are inlined, so the filtered HAR stands on its own."""
+    relevant_entries = []
+    for entry in iter_har_entries(har_path, _wants_entry):
+        try:
+            if extract_structure_from_entry(entry):
+                relevant_entries.append(entry)
+        except Exception as e:
+            print(f"Error processing entry: {e}")
+            traceback.print_exc()
+    filtered_har_path = har_path.with_name(har_path.stem + "_filtered.har")
 
     with open(har_path, "rb") as f_meta:
         with open(filtered_har_path, "w", encoding="utf-8") as f_filtered:
@@ -1,11 +1,26 @@
+"""
+Part B parsing of WACZ archives: structures, video segments and photos from the
+WARC response records.
+
+Only a fraction of a WACZ's records can matter (text-shaped responses, video/*
+segments, images with a 200/206 status); stylesheets, fonts, error responses and
+the like are decoded by a full warcio scan only to be discarded. When the WACZ
+carries a CDX(J) index (indexes/*.cdx, *.cdxj or *.cdx.gz), the records are
+chosen from the index by URL, MIME type and status and read by seeking straight
+to their offsets inside the WARC; the same per-record checks then run on the
+real HTTP headers, in WARC order, so the output is identical to the full scan.
+The selection is deliberately a superset (an unknown MIME type or status is
+kept). Without an index, or with WACZ_CDX_INDEX=false, the full scan runs.
+"""
 import gzip
+import io
 import json
+import os
+import struct
 import traceback
 import zipfile
 from pathlib import Path
-from typing import Optional
-
-from warcio.archiveiterator import ArchiveIterator
+from typing import IO, Iterator, Optional
 
 from extractors.extract_photos import Photo, extract_xpv_asset_id as _extract_photo_asset_id
 from extractors.extract_videos import (
@@ -14,6 +29,12 @@ from extractors.extract_videos import (
 )
 from extractors.structures_extraction import StructureType, extract_structure_from_entry
 
+CDX_INDEX_ENABLED = os.getenv("WACZ_CDX_INDEX", "true").lower() in ("1", "true", "yes")
+
+_STRUCTURE_MIME_PREFIXES = ('text/html', 'application/json', 'text/javascript', 'application/x-javascript')
+_UNKNOWN_MIMES = ('', '-', 'unk', 'unknown', 'application/octet-stream')
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
 
 def _make_har_entry(url: str, mime: str, text: str) -> dict:
     """Wrap a WARC response as the minimal HAR-entry shape ``extract_structure_from_entry``
@@ -44,9 +65,136 @@ def _decode_response_body(record) -> Optional[bytes]:
         return None
 
 
-def scan_wacz(wacz_path: Path, output_dir: Path) -> tuple[list[StructureType], list[Video], list[Photo]]:
+def _warc_names(zf: zipfile.ZipFile) -> list[str]:
+    # Webrecorder stores WARCs under archive/ (wacz 1.x) or data/ (older)
+    return [
+        n for n in zf.namelist()
+        if (n.startswith('archive/') or n.startswith('data/'))
+        and (n.endswith('.warc') or n.endswith('.warc.gz'))
+    ]
+
+
+def _cdx_wanted(entry: dict) -> bool:
+    """Could scan_wacz use this record? False only when the index rules it out."""
+    url = entry.get('url') or ''
+    if not url or url.startswith('urn:'):
+        return False
+    status = str(entry.get('status') or '')
+    if status.isdigit() and status not in ('200', '206'):
+        return False
+    if 'graphql' in url or '/api/' in url:
+        return True
+    mime = (entry.get('mime') or '').lower()
+    return (
+        mime.startswith(_STRUCTURE_MIME_PREFIXES) or mime.startswith('video/') or mime.startswith('image/')
+        or mime in _UNKNOWN_MIMES
+    )
+
+
+def _iter_cdx_lines(zf: zipfile.ZipFile, name: str) -> Iterator[bytes]:
+    with zf.open(name) as raw:
+        # *.cdx.gz (ZipNum) is a series of gzip members; GzipFile reads through all of them.
+        stream = gzip.GzipFile(fileobj=raw) if name.endswith('.gz') else raw
+        for line in stream:
+            yield line
+
+
+def _select_from_index(zf: zipfile.ZipFile, warc_names: list[str]) -> Optional[list[tuple[str, int, int]]]:
+    """(warc member, offset, length) of every record worth reading, in WARC order,
+    or None when the WACZ has no usable index. The index must cover every WARC in
+    the WACZ: records of a WARC it never mentions (a partial or stale index) would
+    otherwise be skipped, so that also falls back to a full scan."""
+    index_names = [
+        n for n in zf.namelist()
+        if n.startswith('indexes/') and n.endswith(('.cdx', '.cdxj', '.cdx.gz', '.cdxj.gz'))
+    ]
+    if not index_names:
+        return None
+    by_basename = {n.rsplit('/', 1)[-1]: n for n in warc_names}
+    order = {n: i for i, n in enumerate(warc_names)}
+    selected: set[tuple[str, int, int]] = set()
+    covered: set[str] = set()
+    total = 0
+    try:
+        for index_name in index_names:
+            for line in _iter_cdx_lines(zf, index_name):
+                parts = line.split(b' ', 2)
+                if len(parts) < 3 or not parts[2].lstrip().startswith(b'{'):
+                    continue
+                entry = json.loads(parts[2])
+                total += 1
+                warc_name = by_basename.get(str(entry.get('filename', '')).rsplit('/', 1)[-1])
+                if warc_name is None:
+                    print(f"[wacz] Index refers to unknown WARC {entry.get('filename')!r}; using full scan")
+                    return None
+                covered.add(warc_name)
+                if not _cdx_wanted(entry):
+                    continue
+                selected.add((warc_name, int(entry['offset']), int(entry['length'])))
+    except (KeyError, ValueError, OSError, zipfile.BadZipFile) as e:
+        print(f"[wacz] Unusable CDX index ({e}); using full scan")
+        return None
+    if total == 0:
+        return None
+    unindexed = [n for n in warc_names if n not in covered]
+    if unindexed:
+        print(f"[wacz] Index does not cover {', '.join(unindexed)}; using full scan")
+        return None
+    print(f"[wacz] Index: {len(selected)} of {total} records selected")
+    return sorted(selected, key=lambda r: (order[r[0]], r[1]))
+
+
+def _member_data_offset(fp: IO[bytes], info: zipfile.ZipInfo) -> int:
+    """Absolute offset of a stored (uncompressed) zip member's data."""
+    fp.seek(info.header_offset)
+    header = _ZIP_LOCAL_HEADER.unpack(fp.read(_ZIP_LOCAL_HEADER.size))
+    return info.header_offset + _ZIP_LOCAL_HEADER.size + header[9] + header[10]
+
+
+def _iter_indexed_records(zf: zipfile.ZipFile, wacz_path: Path, selected: list[tuple[str, int, int]]):
+    """Read each selected record by seeking to its offset. WARCs are normally
+    stored uncompressed in the WACZ, so the raw file is seeked directly; a
+    deflated WARC falls back to ZipExtFile.seek (forward-only here, as records
+    are sorted by offset)."""
+    from warcio.archiveiterator import ArchiveIterator
+    with open(wacz_path, 'rb') as raw:
+        opened: dict[str, IO[bytes]] = {}
+        data_offsets: dict[str, int] = {}
+        try:
+            for warc_name, offset, length in selected:
+                info = zf.getinfo(warc_name)
+                if info.compress_type == zipfile.ZIP_STORED:
+                    if warc_name not in data_offsets:
+                        data_offsets[warc_name] = _member_data_offset(raw, info)
+                    raw.seek(data_offsets[warc_name] + offset)
+                    chunk = raw.read(length)
+                else:
+                    if warc_name not in opened:
+                        opened[warc_name] = zf.open(warc_name)
+                    member = opened[warc_name]
+                    member.seek(offset)
+                    chunk = member.read(length)
+                for record in ArchiveIterator(io.BytesIO(chunk)):
+                    yield record
+                    break
+        finally:
+            for member in opened.values():
+                member.close()
+
+
+def _iter_all_records(zf: zipfile.ZipFile, warc_names: list[str]):
+    from warcio.archiveiterator import ArchiveIterator
+    for warc_name in warc_names:
+        print(f"[wacz] Processing {warc_name}")
+        with zf.open(warc_name) as warc_file:
+            yield from ArchiveIterator(warc_file)
+
+
+def scan_wacz(wacz_path: Path, output_dir: Path,
+              use_index: Optional[bool] = None) -> tuple[list[StructureType], list[Video], list[Photo]]:
     """
-    Single pass over all WARC records in a WACZ file, simultaneously extracting:
+    Single pass over the WARC records in a WACZ file (all of them, or those the
+    CDX index selects; see the module docstring), simultaneously extracting:
     - structures (GraphQL / API v1 / HTML responses)
     - video segment maps (.mp4 entries by bytestart/byteend)
     - photo maps (image/* responses)
@@ -56,6 +204,8 @@ def scan_wacz(wacz_path: Path, output_dir: Path) -> tuple[list[StructureType], l
 
     Returns (structures, videos, photos), mirroring the structure/video/photo
     outputs of _scan_har_once() in structures_to_entities.py.
+
+    use_index: override WACZ_CDX_INDEX (None = use the env setting).
     """
     structures: list[StructureType] = []
     real_xpv_dict: dict[str, Video] = {}
@@ -69,86 +219,82 @@ def scan_wacz(wacz_path: Path, output_dir: Path) -> tuple[list[StructureType], l
     photos_dir.mkdir(parents=True, exist_ok=True)
 
     with zipfile.ZipFile(wacz_path) as zf:
-        # Webrecorder stores WARCs under archive/ (wacz 1.x) or data/ (older)
-        warc_names = [
-            n for n in zf.namelist()
-            if (n.startswith('archive/') or n.startswith('data/'))
-            and (n.endswith('.warc') or n.endswith('.warc.gz'))
-        ]
-
-        for warc_name in warc_names:
-            print(f"[wacz] Processing {warc_name}")
-            with zf.open(warc_name) as warc_file:
-                for record in ArchiveIterator(warc_file):
-                    if record.rec_type != 'response':
-                        continue
-
-                    url: str = record.rec_headers.get_header('WARC-Target-URI', '')
-                    if not url or url.startswith('urn:'):
-                        continue
-
-                    ct: str = record.http_headers.get_header('Content-Type', '') or ''
-                    status_code = record.http_headers.get_statuscode()
-                    if status_code and str(status_code) not in ('200', '206'):
-                        continue
-
-                    # Webrecorder encodes POST requests as GET with ?__wb_method=POST&...
-                    # Strip that prefix to restore the original URL for matching.
-                    clean_url = url.split('?__wb_method=')[0] if '?__wb_method=' in url else url
-
-                    # --- Structures (host-routed: Instagram, Threads, ...) ---
-                    # Only text-shaped responses can carry a structure; skip
-                    # decoding binary media bodies (handled below by content-type).
-                    is_structurey = (
-                        'graphql' in clean_url or '/api/' in clean_url
-                        or ct.startswith('text/html') or ct.startswith('application/json')
-                        or ct.startswith('text/javascript') or ct.startswith('application/x-javascript')
-                    )
-                    if is_structurey:
-                        try:
-                            body = _decode_response_body(record)
-                            if body:
-                                entry = _make_har_entry(clean_url, ct, body.decode('utf-8', errors='replace'))
-                                structure = extract_structure_from_entry(entry)
-                                if structure:
-                                    structures.append(structure)
-                        except Exception as e:
-                            print(f"[wacz] Structure processing error for {clean_url}: {e}")
-                            traceback.print_exc()
-
-                    # --- Video segments (.mp4 with video/mp4 content-type) ---
-                    try:
-                        if '.mp4' in url and ct.startswith('video/'):
-                            body = _decode_response_body(record)
-                            if body:
-                                # Threads/Barcelona uses ranged HTTP requests; the
-                                # response Content-Range states which bytes this body
-                                # covers (Instagram instead puts it in the URL).
-                                br = _parse_content_range(
-                                    record.http_headers.get_header('Content-Range')
-                                )
-                                accumulate_video_segment(
-                                    url, body, real_xpv_dict, fallback_dict, filename_to_xpv,
-                                    byte_range=br,
-                                )
-                    except Exception as e:
-                        print(f"[wacz] Video segment error for {url}: {e}")
-                        traceback.print_exc()
-
-                    # --- Images (image/* content-type; CDN URLs have no extension) ---
-                    try:
-                        if ct.startswith('image/'):
-                            body = _decode_response_body(record)
-                            if body:
-                                asset_id = _extract_photo_asset_id(url) or url.split('/')[-1].split('?')[0]
-                                img_filename = url.split('/')[-1].split('?')[0]
-                                if asset_id not in photos_dict:
-                                    photos_dict[asset_id] = Photo(
-                                        asset_id=str(asset_id), url=url, fetched_assets={}
-                                    )
-                                photos_dict[asset_id].fetched_assets[img_filename] = body
-                    except Exception as e:
-                        print(f"[wacz] Image error for {url}: {e}")
+        warc_names = _warc_names(zf)
+        selected = _select_from_index(zf, warc_names) if (
+            CDX_INDEX_ENABLED if use_index is None else use_index) else None
+        records = (_iter_indexed_records(zf, wacz_path, selected) if selected is not None
+                   else _iter_all_records(zf, warc_names))
+
+        for record in records:
+            if record.rec_type != 'response':
+                continue
+
+            url: str = record.rec_headers.get_header('WARC-Target-URI', '')
+            if not url or url.startswith('urn:'):
+                continue
+
+            ct: str = record.http_headers.get_header('Content-Type', '') or ''
+            status_code = record.http_headers.get_statuscode()
+            if status_code and str(status_code) not in ('200', '206'):
+                continue
+
+            # Webrecorder encodes POST requests as GET with ?__wb_method=POST&...
+            # Strip that prefix to restore the original URL for matching.
+            clean_url = url.split('?__wb_method=')[0] if '?__wb_method=' in url else url
+
+            # --- Structures (host-routed: Instagram, Threads, ...) ---
+            # Only text-shaped responses can carry a structure; skip
+            # decoding binary media bodies (handled below by content-type).
+            is_structurey = (
+                'graphql' in clean_url or '/api/' in clean_url
+                or ct.startswith('text/html') or ct.startswith('application/json')
+                or ct.startswith('text/javascript') or ct.startswith('application/x-javascript')
+            )
+            if is_structurey:
+                try:
+                    body = _decode_response_body(record)
+                    if body:
+                        entry = _make_har_entry(clean_url, ct, body.decode('utf-8', errors='replace'))
+                        structure = extract_structure_from_entry(entry)
+                        if structure:
+                            structures.append(structure)
+                except Exception as e:
+                    print(f"[wacz] Structure processing error for {clean_url}: {e}")
+                    traceback.print_exc()
+
+            # --- Video segments (.mp4 with video/mp4 content-type) ---
+            try:
+                if '.mp4' in url and ct.startswith('video/'):
+                    body = _decode_response_body(record)
+                    if body:
+                        # Threads/Barcelona uses ranged HTTP requests; the
+                        # response Content-Range states which bytes this body
+                        # covers (Instagram instead puts it in the URL).
+                        br = _parse_content_range(
+                            record.http_headers.get_header('Content-Range')
+                        )
+                        accumulate_video_segment(
+                            url, body, real_xpv_dict, fallback_dict, filename_to_xpv,
+                            byte_range=br,
+                        )
+            except Exception as e:
+                print(f"[wacz] Video segment error for {url}: {e}")
+                traceback.print_exc()
+
+            # --- Images (image/* content-type; CDN URLs have no extension) ---
+            try:
+                if ct.startswith('image/'):
+                    body = _decode_response_body(record)
+                    if body:
+                        asset_id = _extract_photo_asset_id(url) or url.split('/')[-1].split('?')[0]
+                        img_filename = url.split('/')[-1].split('?')[0]
+                        if asset_id not in photos_dict:
+                            photos_dict[asset_id] = Photo(
+                                asset_id=str(asset_id), url=url, fetched_assets={}
+                            )
+                        photos_dict[asset_id].fetched_assets[img_filename] = body
+            except Exception as e:
+                print(f"[wacz] Image error for {url}: {e}")
 
     # --- Reconcile filename-keyed video entries (cascade steps 2-3) ---
     reconcile_video_dicts(real_xpv_dict, fallback_dict, filename_to_xpv, structures=structures)
@@ -13,7 +13,6 @@ import traceback
 from pathlib import Path
 from typing import Any, Callable, Optional, TypeVar
 
-import ijson
 from pydantic import BaseModel
 
 from archiver.summarizers import download_log as dl
@@ -25,8 +24,9 @@ from extractors.extract_photos import acquire_photos, PhotoAcquisitionConfig, Ph
 from extractors.extract_videos import acquire_videos, VideoAcquisitionConfig, Video, \
     accumulate_video_segment, reconcile_video_dicts, byte_range_from_har_entry
 from extractors.extraction_helpers import canonical_cdn_url, extend_flattened_entities
+from extractors.har_index import HarIndexEntry, iter_har_entries
 from extractors.reconcile_entities import reconcile_accounts, reconcile_posts, reconcile_media
-from extractors.structures_extraction import StructureType, extract_structure_from_entry
+from extractors.structures_extraction import StructureType, extract_structure_from_entry, may_contain_structure
 from extractors.instagram.structures_extraction_graphql import GraphQLResponse
 from extractors.instagram.structures_extraction_api_v1 import ApiV1Response
 from extractors.instagram.structures_extraction_html import PageResponse
@@ -41,70 +41,107 @@ class ExtractedHarData(BaseModel):
     photos: list[Photo]
 
 
-def _scan_har_once(har_path: Path) -> tuple[list[StructureType], list[Video], list[Photo], set[str]]:
+def strip_media_contents(data: ExtractedHarData) -> None:
+    """Drop the media bytes (already saved to disk) before the data is serialized for the DB."""
+    for v in data.videos:
+        if v and v.fetched_tracks:
+            for t in v.fetched_tracks:
+                v.fetched_tracks[t].segments = []
+    for p in data.photos:
+        if p:
+            p.fetched_assets = None
+
+
+HarScanResult = tuple[list[StructureType], list[Video], list[Photo], set[str]]
+
+
+class HarScanner:
     """
-    Single streaming pass over a HAR file that simultaneously extracts:
+    Accumulates, entry by entry, everything extract_data_from_har needs from a HAR:
     - structures (GraphQL / API v1 / HTML responses)
     - video segment maps (.mp4 entries)
     - photo maps (image entries)
     - the set of every requested .mp4 URL (incl. bodyless ones), so acquire_videos
       can flag requested-in-session videos without a second HAR pass
 
+    Fed either by _scan_har_once or directly by the archiver's HAR merge, which
+    already holds every entry in memory while writing the merged file.
+    """
+
+    def __init__(self):
+        self.structures: list[StructureType] = []
+        self.real_xpv_dict: dict[str, Video] = {}
+        self.fallback_dict: dict[str, Video] = {}
+        self.filename_to_xpv: dict[str, str] = {}
+        self.photos_dict: dict = {}  # keys are str (filename) or int (hash fallback)
+        self.requested_mp4_urls: set[str] = set()
+
+    @staticmethod
+    def wants(e: HarIndexEntry) -> bool:
+        """Entries none of the branches can use (scripts, styles, fonts, other hosts...) are skipped by URL."""
+        return '.mp4' in e.url or _is_image_request(e.url) or may_contain_structure(e.url)
+
+    def feed(self, entry: dict) -> None:
+        url: str = entry['request']['url']
+        content: dict = entry['response']['content']
+
+        if '.mp4' in url:
+            self.requested_mp4_urls.add(url)
+
+        # --- Structures (host-routed: Instagram, Threads, ...) ---
+        try:
+            structure = extract_structure_from_entry(entry)
+            if structure:
+                self.structures.append(structure)
+        except Exception as e:
+            print(f"Error processing structures entry: {e}")
+            traceback.print_exc()
+
+        # --- Video segment maps (.mp4 entries with base64 content) ---
+        try:
+            if '.mp4' in url and 'text' in content:
+                body = base64.b64decode(content['text'])
+                accumulate_video_segment(url, body, self.real_xpv_dict, self.fallback_dict, self.filename_to_xpv,
+                                         byte_range=byte_range_from_har_entry(entry))
+        except Exception as e:
+            print(f"Error processing video entry: {e}")
+            traceback.print_exc()
+
+        # --- Photo maps (image content entries) ---
+        try:
+            if _is_image_request(url) and 'text' in content:
+                try:
+                    img_data = base64.b64decode(content['text'])
+                except Exception:
+                    pass
+                else:
+                    asset_id = _extract_photo_asset_id(url) or hash(url)
+                    img_filename = url.split('/')[-1].split('?')[0]
+                    if asset_id not in self.photos_dict:
+                        self.photos_dict[asset_id] = Photo(asset_id=str(asset_id), fetched_assets={}, url=url)
+                    self.photos_dict[asset_id].fetched_assets[img_filename] = img_data
+        except Exception:
+            pass
+
+    def result(self) -> HarScanResult:
+        reconcile_video_dicts(self.real_xpv_dict, self.fallback_dict, self.filename_to_xpv,
+                              structures=self.structures)
+        return (self.structures, list(self.real_xpv_dict.values()), list(self.photos_dict.values()),
+                self.requested_mp4_urls)
+
+
+def _scan_har_once(har_path: Path) -> HarScanResult:
+    """
+    Single streaming pass over a HAR file feeding a HarScanner.
+
     Replaces three separate ijson passes with one, roughly tripling parse speed.
+    With a HAR sidecar index (har_index.py) entries the scanner does not want
+    are never even read.
     """
-    structures: list[StructureType] = []
-    real_xpv_dict: dict[str, Video] = {}
-    fallback_dict: dict[str, Video] = {}
-    filename_to_xpv: dict[str, str] = {}
-    photos_dict: dict = {}  # keys are str (filename) or int (hash fallback)
-    requested_mp4_urls: set[str] = set()
-
-    with open(har_path, 'rb') as f:
-        for entry in ijson.items(f, 'log.entries.item'):
-            url: str = entry['request']['url']
-            content: dict = entry['response']['content']
-            mime: str = content.get('mimeType', '')
-
-            if '.mp4' in url:
-                requested_mp4_urls.add(url)
-
-            # --- Structures (host-routed: Instagram, Threads, ...) ---
-            try:
-                structure = extract_structure_from_entry(entry)
-                if structure:
-                    structures.append(structure)
-            except Exception as e:
-                print(f"Error processing structures entry: {e}")
-                traceback.print_exc()
-
-            # --- Video segment maps (.mp4 entries with base64 content) ---
-            try:
-                if '.mp4' in url and 'text' in content:
-                    body = base64.b64decode(content['text'])
-                    accumulate_video_segment(url, body, real_xpv_dict, fallback_dict, filename_to_xpv,
-                                             byte_range=byte_range_from_har_entry(entry))
-            except Exception as e:
-                print(f"Error processing video entry: {e}")
-                traceback.print_exc()
-
-            # --- Photo maps (image content entries) ---
-            try:
-                if _is_image_request(url) and 'text' in content:
-                    try:
-                        img_data = base64.b64decode(content['text'])
-                    except Exception:
-                        pass
-                    else:
-                        asset_id = _extract_photo_asset_id(url) or hash(url)
-                        img_filename = url.split('/')[-1].split('?')[0]
-                        if asset_id not in photos_dict:
-                            photos_dict[asset_id] = Photo(asset_id=str(asset_id), fetched_assets={}, url=url)
-                        photos_dict[asset_id].fetched_assets[img_filename] = img_data
-            except Exception:
-                pass
-
-    reconcile_video_dicts(real_xpv_dict, fallback_dict, filename_to_xpv, structures=structures)
-    return structures, list(real_xpv_dict.values()), list(photos_dict.values()), requested_mp4_urls
+    scanner = HarScanner()
+    for entry in iter_har_entries(har_path, scanner.wants):
+        scanner.feed(entry)
+    return scanner.result()
 
 
 def extract_data_from_har(
@@ -116,11 +153,14 @@ def extract_data_from_har(
         photo_acquisition_config: PhotoAcquisitionConfig = PhotoAcquisitionConfig(
             download_missing=True, download_media_not_in_structures=True, download_unfetched_media=True,
             download_highest_quality_assets_from_structures=True
-        )
+        ),
+        scan: Optional[HarScanResult] = None,
 ) -> ExtractedHarData:
+    """``scan``: a HarScanner result for this HAR gathered by the caller (e.g. during
+    the archiver's merge); when omitted the HAR is scanned here."""
     archive_dir = har_path.parent
 
-    structures, har_video_maps, har_photo_maps, requested_mp4_urls = _scan_har_once(har_path)
+    structures, har_video_maps, har_photo_maps, requested_mp4_urls = scan or _scan_har_once(har_path)
 
     # downloaded_media_log.json carries acquisition history across re-extraction
     # runs. Pass the live object into both acquire_* calls so they can both
@@ -198,12 +238,14 @@ def extract_entities_from_har(
         photo_acquisition_config: PhotoAcquisitionConfig = PhotoAcquisitionConfig(
             download_missing=True, download_media_not_in_structures=True, download_unfetched_media=True,
             download_highest_quality_assets_from_structures=True
-        )
+        ),
+        scan: Optional[HarScanResult] = None,
 ) -> ExtractedEntitiesFlattened:
     har_data = extract_data_from_har(
         har_path,
         video_acquisition_config=video_acquisition_config,
-        photo_acquisition_config=photo_acquisition_config
+        photo_acquisition_config=photo_acquisition_config,
+        scan=scan,
     )
     flattened_entities = har_data_to_entities(
         har_path,
@@ -19,7 +19,6 @@ reached the content, the same walk finds it — and robust to Meta renaming the
 import json
 from typing import Iterator, List, Optional
 
-from bs4 import BeautifulSoup
 from pydantic import BaseModel, ConfigDict
 
 from extractors.models_har import HarRequest
@@ -140,6 +139,7 @@ def extract_structure_from_entry(entry: dict) -> Optional[ThreadsResponse]:
         if _is_graphql_url(url) and not mime.startswith("text/html"):
             result = _collect_from_json(json.loads(body))
         elif mime.startswith("text/html"):
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(body, "html.parser")
             agg = ThreadsResponse()
             for script in soup.find_all("script", {"type": "application/json"}):
@@ -0,0 +1,295 @@
+"""
+Chunked, resumable, throttled backfills for Python migrations.
+
+A Python migration normally exposes run(cnx) and the runner applies it as one
+all-or-nothing step. Data backfills over large tables instead expose a
+BACKFILL spec; the runner (infra/migrate.py) then:
+
+  * splits the table's integer key range into chunks of `chunk_size` keys
+    (lo <= key < hi) and hands each chunk to `process(cnx, lo, hi)` on its own
+    pooled connection, committing after every chunk, so no transaction or lock
+    outlives one chunk;
+  * records each finished chunk in schema_migration_backfill in the SAME
+    transaction as the chunk's writes, so an interrupted run (Ctrl+C, crash,
+    deploy) resumes where it stopped instead of from zero; the key range is
+    fixed on the first run (schema_migration_backfill_plan) so chunk boundaries
+    stay stable across resumes;
+  * runs chunks on `workers` threads, under a shared rows-per-second budget
+    and, for backfills that read archive files, an I/O budget in MiB/s
+    (process() returns rows, or (rows, bytes_read));
+  * retries a chunk that hits a lock wait timeout or deadlock, after lowering
+    innodb_lock_wait_timeout so it yields to live traffic rather than queueing
+    behind it;
+  * prints progress with throughput and an ETA.
+
+Once every chunk is done, the optional `finalize(cnx)` runs (e.g. a set-based
+UPDATE that depends on the backfilled rows), the checkpoint rows are deleted
+and the runner records the version as applied. If the module also has run(cnx),
+it runs first (e.g. the DDL the backfill fills in), and is not repeated when a
+later run resumes the backfill.
+
+process() must be idempotent over a chunk: the checkpoint makes DB writes
+exactly-once, but side effects outside the transaction (files written) can
+repeat for the chunk in flight when a run is interrupted.
+
+Example (infra/migrations/V0NN__backfill_something.py):
+
+    from infra.backfill import Backfill
+
+    def _chunk(cnx, lo, hi):
+        cur = cnx.cursor()
+        cur.execute("UPDATE account SET x = ... WHERE id >= %s AND id < %s AND x IS NULL", (lo, hi))
+        return cur.rowcount
+
+    BACKFILL = Backfill(table="account", process=_chunk, chunk_size=5000, rows_per_s=2000)
+
+Workers and budgets can be overridden per run: see `uv run infra/migrate.py --help`.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+_CREATE_PLAN_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migration_backfill_plan (
+    version    INT      NOT NULL PRIMARY KEY,
+    key_min    BIGINT   NOT NULL,
+    key_max    BIGINT   NOT NULL,
+    chunk_size INT      NOT NULL,
+    started_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL
+) ENGINE = InnoDB
+"""
+
+_CREATE_CHUNK_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migration_backfill (
+    version     INT      NOT NULL,
+    chunk_start BIGINT   NOT NULL,
+    row_count   INT      NOT NULL,
+    done_at     DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (version, chunk_start)
+) ENGINE = InnoDB
+"""
+
+# mysql.connector errno for "Lock wait timeout exceeded" and "Deadlock found".
+_RETRYABLE_ERRNOS = {1205, 1213}
+MAX_CHUNK_RETRIES = 5
+MAX_WORKERS = 16  # utils.db's pool has 20 connections; leave some for the runner
+
+ChunkResult = Union[int, tuple[int, int]]
+
+
+@dataclass
+class Backfill:
+    table: str
+    process: Callable[..., ChunkResult]
+    key: str = "id"
+    where: Optional[str] = None  # SQL predicate bounding the key range, e.g. "bio IS NULL"
+    chunk_size: int = 1000
+    workers: int = 1
+    rows_per_s: float = 0.0  # 0 = unlimited
+    io_mib_per_s: float = 0.0  # 0 = unlimited
+    lock_wait_timeout_s: int = 5
+    finalize: Optional[Callable] = None
+    progress_every_s: float = 10.0
+
+
+class _Budget:
+    """Shared rate limit: charge() sleeps the caller while the running total is ahead of rate * elapsed."""
+
+    def __init__(self, per_s: float):
+        self.per_s = per_s
+        self.started = time.monotonic()
+        self.used = 0.0
+        self._lock = threading.Lock()
+
+    def charge(self, amount: float) -> None:
+        if self.per_s <= 0 or amount <= 0:
+            return
+        with self._lock:
+            self.used += amount
+            ahead = self.used / self.per_s - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _ensure_tables(cnx) -> None:
+    cur = cnx.cursor()
+    try:
+        cur.execute(_CREATE_PLAN_TABLE)
+        cur.execute(_CREATE_CHUNK_TABLE)
+        cnx.commit()
+    finally:
+        cur.close()
+
+
+def _load_or_create_plan(cnx, version: int, spec: Backfill) -> Optional[tuple[int, int, int]]:
+    """(key_min, key_max, chunk_size) for this version, fixed on the first run; None for an empty range."""
+    cur = cnx.cursor()
+    try:
+        cur.execute(
+            "SELECT key_min, key_max, chunk_size FROM schema_migration_backfill_plan WHERE version = %s",
+            (version,),
+        )
+        row = cur.fetchone()
+        if row:
+            return int(row[0]), int(row[1]), int(row[2])
+        where = f" WHERE {spec.where}" if spec.where else ""
+        cur.execute(f"SELECT MIN(`{spec.key}`), MAX(`{spec.key}`) FROM `{spec.table}`{where}")
+        key_min, key_max = cur.fetchone()
+        if key_min is None:
+            return None
+        cur.execute(
+            "INSERT INTO schema_migration_backfill_plan (version, key_min, key_max, chunk_size) "
+            "VALUES (%s, %s, %s, %s)",
+            (version, key_min, key_max, spec.chunk_size),
+        )
+        cnx.commit()
+        return int(key_min), int(key_max), spec.chunk_size
+    finally:
+        cur.close()
+
+
+def backfill_started(cnx, version: int) -> bool:
+    """True when a backfill for this version has a saved plan, i.e. a re-run is a resume."""
+    _ensure_tables(cnx)
+    cur = cnx.cursor()
+    try:
+        cur.execute("SELECT 1 FROM schema_migration_backfill_plan WHERE version = %s", (version,))
+        return cur.fetchone() is not None
+    finally:
+        cur.close()
+
+
+def _done_chunks(cnx, version: int) -> tuple[set[int], int]:
+    cur = cnx.cursor()
+    try:
+        cur.execute("SELECT chunk_start, row_count FROM schema_migration_backfill WHERE version = %s", (version,))
+        rows = cur.fetchall()
+        return {int(r[0]) for r in rows}, sum(int(r[1]) for r in rows)
+    finally:
+        cur.close()
+
+
+def _clear_checkpoint(cnx, version: int) -> None:
+    cur = cnx.cursor()
+    try:
+        cur.execute("DELETE FROM schema_migration_backfill WHERE version = %s", (version,))
+        cur.execute("DELETE FROM schema_migration_backfill_plan WHERE version = %s", (version,))
+        cnx.commit()
+    finally:
+        cur.close()
+
+
+def _run_chunk(pool, version: int, spec: Backfill, lo: int, hi: int,
+               rows_budget: _Budget, io_budget: _Budget) -> int:
+    attempt = 0
+    while True:
+        cnx = pool.get_connection()
+        try:
+            cnx.autocommit = False
+            cur = cnx.cursor()
+            try:
+                cur.execute("SET SESSION innodb_lock_wait_timeout = %s", (spec.lock_wait_timeout_s,))
+                result = spec.process(cnx, lo, hi)
+                rows, io_bytes = result if isinstance(result, tuple) else (result or 0, 0)
+                cur.execute(
+                    "INSERT INTO schema_migration_backfill (version, chunk_start, row_count) VALUES (%s, %s, %s)",
+                    (version, lo, rows),
+                )
+                cnx.commit()
+            finally:
+                cur.close()
+        except Exception as e:
+            cnx.rollback()
+            attempt += 1
+            if getattr(e, "errno", None) not in _RETRYABLE_ERRNOS or attempt > MAX_CHUNK_RETRIES:
+                raise
+            time.sleep(min(30.0, 0.5 * 2 ** attempt))
+            continue
+        finally:
+            cnx.close()
+        rows_budget.charge(rows)
+        io_budget.charge(io_bytes)
+        return rows
+
+
+def run_backfill(pool, cnx, version: int, spec: Backfill, workers: Optional[int] = None,
+                 rows_per_s: Optional[float] = None, io_mib_per_s: Optional[float] = None) -> None:
+    """Run (or resume) a backfill. `pool` hands out worker connections; `cnx` is the runner's own."""
+    workers = max(1, min(MAX_WORKERS, workers if workers is not None else spec.workers))
+    rows_per_s = spec.rows_per_s if rows_per_s is None else rows_per_s
+    io_mib_per_s = spec.io_mib_per_s if io_mib_per_s is None else io_mib_per_s
+
+    _ensure_tables(cnx)
+    plan = _load_or_create_plan(cnx, version, spec)
+    if plan is not None:
+        key_min, key_max, chunk_size = plan
+        done, rows_before = _done_chunks(cnx, version)
+        starts = range(key_min, key_max + 1, chunk_size)
+        todo = [lo for lo in starts if lo not in done]
+        total = len(starts)
+        print(f"    V{version:03d} backfill: {spec.table}.{spec.key} {key_min}..{key_max}, {total} chunk(s) of "
+              f"{chunk_size}; {total - len(todo)} already done; {workers} worker(s), "
+              f"{f'{rows_per_s:g} rows/s' if rows_per_s > 0 else 'no row limit'}, "
+              f"{f'{io_mib_per_s:g} MiB/s' if io_mib_per_s > 0 else 'no I/O limit'}", flush=True)
+
+        rows_budget = _Budget(rows_per_s)
+        io_budget = _Budget(io_mib_per_s * (1 << 20))
+        started = time.monotonic()
+        last_report = started
+        chunks_done = total - len(todo)
+        rows_done = rows_before
+        this_run = 0
+        rows_this_run = 0
+        queue = list(todo)
+        in_flight: dict[Future, int] = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while queue or in_flight:
+                    while queue and len(in_flight) < workers * 2:
+                        lo = queue.pop(0)
+                        future = executor.submit(_run_chunk, pool, version, spec, lo,
+                                                 min(lo + chunk_size, key_max + 1), rows_budget, io_budget)
+                        in_flight[future] = lo
+                    finished, _ = wait(in_flight, timeout=spec.progress_every_s, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        in_flight.pop(future)
+                        rows = future.result()
+                        rows_done += rows
+                        rows_this_run += rows
+                        chunks_done += 1
+                        this_run += 1
+                    now = time.monotonic()
+                    if now - last_report >= spec.progress_every_s or not (queue or in_flight):
+                        last_report = now
+                        elapsed = now - started
+                        remaining = total - chunks_done
+                        eta = _format_duration(elapsed / this_run * remaining) if this_run else "?"
+                        print(f"    V{version:03d} backfill: {chunks_done}/{total} chunks "
+                              f"({chunks_done * 100 // max(total, 1)}%), {rows_done:,} rows, "
+                              f"{rows_this_run / max(elapsed, 1e-9):,.0f} rows/s, ETA {eta}", flush=True)
+            except BaseException:
+                # Ctrl+C or a failed chunk: stop handing out work and let the
+                # chunks in flight commit their checkpoints before leaving.
+                queue.clear()
+                for future in in_flight:
+                    future.cancel()
+                print(f"    V{version:03d} backfill stopping after {chunks_done}/{total} chunks (plus any "
+                      f"in flight); finished chunks are saved, re-run to resume.", flush=True)
+                raise
+
+    if spec.finalize is not None:
+        spec.finalize(cnx)
+        cnx.commit()
+    _clear_checkpoint(cnx, version)
@@ -5,6 +5,7 @@ Database migration runner.
 Usage:
     uv run infra/migrate.py
     uv run infra/migrate.py --one-at-a-time
+    uv run infra/migrate.py --backfill-workers 4 --backfill-rows-per-s 2000 --backfill-io-mib-s 50
 
 Pending migrations are listed and you are prompted to choose a starting
 version.  Migrations before the chosen version are recorded as applied
@@ -21,6 +22,9 @@ naming convention:
                                   where cnx is a mysql.connector connection.
                                   The runner commits after run() returns;
                                   raise an exception to abort.
+                                  Long data backfills expose BACKFILL (an
+                                  infra.backfill.Backfill) instead, and are
+                                  run in resumable, throttled chunks.
 
 Each applied migration is recorded in the schema_migration table with its
 version number.  Migrations are never re-applied.
@@ -57,6 +61,7 @@ class _Tee:
     def close(self):
         self._file.close()
 
+from infra.backfill import backfill_started, run_backfill  # noqa: E402
 from utils import db as db_utils  # noqa: E402
 
 MIGRATIONS_DIR = ROOT / "infra" / "migrations"
@@ -150,21 +155,28 @@ def _apply_sql(cnx, path: Path):
         cur.close()
 
 
-def _apply_python(cnx, path: Path):
+def _apply_python(cnx, path: Path, version: int, backfill_options: dict):
     spec = importlib.util.spec_from_file_location("migration", path)
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
-    if not hasattr(module, "run"):
-        raise AttributeError(f"{path.name} must expose a run(cnx) function")
-    module.run(cnx)
-    cnx.commit()
+    backfill = getattr(module, "BACKFILL", None)
+    if not hasattr(module, "run") and backfill is None:
+        raise AttributeError(f"{path.name} must expose a run(cnx) function or a BACKFILL spec")
+    resuming = backfill is not None and backfill_started(cnx, version)
+    if hasattr(module, "run") and not resuming:
+        module.run(cnx)
+        cnx.commit()
+    if backfill is not None:
+        run_backfill(db_utils.cnx_pool, cnx, version, backfill, **backfill_options)
 
 
 # ---------------------------------------------------------------------------
 # Public interface
 # ---------------------------------------------------------------------------
 
-def run_pending_migrations(one_at_a_time: bool = False):
+def run_pending_migrations(one_at_a_time: bool = False, backfill_options: dict | None = None):
+    """backfill_options: workers / rows_per_s / io_mib_per_s overrides for BACKFILL migrations."""
+    backfill_options = backfill_options or {}
     cnx = db_utils.cnx_pool.get_connection()
     try:
         _ensure_migration_table(cnx)
@@ -236,7 +248,7 @@ def run_pending_migrations(one_at_a_time: bool = False):
                 if path.suffix == ".sql":
                     _apply_sql(cnx, path)
                 else:
-                    _apply_python(cnx, path)
+                    _apply_python(cnx, path, version, backfill_options)
                 _record_version(cnx, version, description)
                 elapsed = time.perf_counter() - t_start
                 print(f"  V{version:03d} done ({elapsed:.1f}s).")
@@ -266,7 +278,20 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run database migrations.")
     parser.add_argument("--one-at-a-time", action="store_true",
                         help="Prompt for a single version to run, then stop.")
+    parser.add_argument("--backfill-workers", type=int, default=None,
+                        help="Parallel chunk workers for BACKFILL migrations (default: the migration's own).")
+    parser.add_argument("--backfill-rows-per-s", type=float, default=None,
+                        help="Row budget for BACKFILL migrations; 0 = unlimited.")
+    parser.add_argument("--backfill-io-mib-s", type=float, default=None,
+                        help="Archive read budget for BACKFILL migrations; 0 = unlimited.")
     args = parser.parse_args()
+    backfill_options = {
+        key: value for key, value in (
+            ("workers", args.backfill_workers),
+            ("rows_per_s", args.backfill_rows_per_s),
+            ("io_mib_per_s", args.backfill_io_mib_s),
+        ) if value is not None
+    }
 
     log_dir = ROOT / "logs"
     log_dir.mkdir(exist_ok=True)
@@ -279,7 +304,7 @@ if __name__ == "__main__":
     sys.stderr = tee_err
 
     try:
-        run_pending_migrations(one_at_a_time=args.one_at_a_time)
+        run_pending_migrations(one_at_a_time=args.one_at_a_time, backfill_options=backfill_options)
     finally:
         sys.stdout = tee._stream
         sys.stderr = tee_err._stream
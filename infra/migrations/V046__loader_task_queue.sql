@@ -0,0 +1,36 @@
+-- V046 — Explicit work queue for the archive loader (db_loaders/job_queue.py).
+--
+-- One row per (archive session, stage): parse (Part B), extract (Part C), thumbnails
+-- (Part D) and phash (Part E). Workers claim queued rows with SELECT … FOR UPDATE
+-- SKIP LOCKED and hold a lease they renew by heartbeat; a row whose lease expired
+-- (worker killed, host lost) is re-queued by the next worker that looks. Failures
+-- are retried with exponential backoff until max_attempts, then the row is 'dead'
+-- (dead-lettered) with its last error. archive_session.incorporation_status stays
+-- the record of what each session has been through; this table only schedules work.
+-- stage is a varchar rather than an enum so new stages need no migration.
+
+CREATE TABLE loader_task
+(
+    id                 bigint auto_increment PRIMARY KEY,
+    archive_session_id int                                           NOT NULL,
+    stage              varchar(20)                                   NOT NULL,
+    status             enum ('queued', 'running', 'done', 'dead')    NOT NULL DEFAULT 'queued',
+    attempts           int                                           NOT NULL DEFAULT 0,
+    max_attempts       int                                           NOT NULL DEFAULT 5,
+    available_at       datetime(3)                                   NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    lease_owner        varchar(200)                                  NULL,
+    lease_expires_at   datetime(3)                                   NULL,
+    heartbeat_at       datetime(3)                                   NULL,
+    last_error         text                                          NULL,
+    create_date        timestamp DEFAULT CURRENT_TIMESTAMP           NOT NULL,
+    update_date        timestamp DEFAULT CURRENT_TIMESTAMP           NOT NULL ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT loader_task_session_stage_uindex UNIQUE (archive_session_id, stage),
+    CONSTRAINT loader_task_archive_session_fk FOREIGN KEY (archive_session_id) REFERENCES archive_session (id) ON DELETE CASCADE
+)
+    ENGINE = InnoDB;
+
+-- Claiming: next queued row that is due.
+CREATE INDEX loader_task_claim_index ON loader_task (status, available_at);
+
+-- Reaping: running rows whose lease has expired.
+CREATE INDEX loader_task_lease_index ON loader_task (status, lease_expires_at);
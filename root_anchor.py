@@ -1,8 +1,31 @@
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Optional
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_ARCHIVES = Path(ROOT_DIR) / "archives"
 
 # DM testing V034 migration
 # ROOT_ARCHIVES = Path(ROOT_DIR) / "/mnt/u/archives2"
+
+# Per-context archives root, set by use_archives_root() for the duration of one
+# incorporation job. Context variables follow the job into asyncio tasks and
+# asyncio.to_thread, so concurrent jobs each resolve paths against their own root.
+_archives_root: ContextVar[Optional[Path]] = ContextVar("archives_root", default=None)
+
+
+def archives_root() -> Path:
+    """The archives root for the current context: the job's own root inside
+    use_archives_root(), otherwise ROOT_ARCHIVES."""
+    return _archives_root.get() or ROOT_ARCHIVES
+
+
+@contextmanager
+def use_archives_root(path):
+    token = _archives_root.set(Path(path))
+    try:
+        yield
+    finally:
+        _archives_root.reset(token)
@@ -1,15 +1,43 @@
+"""
+Package archive directories into transfer batches:
+
+    batch_N_with_par2.tar
+        batch_N.tar.zst                  tar of the batch's archive dirs, zstd-compressed
+        batch_N.tar.zst.par2, .vol*.par2 PAR2 recovery for the .zst (10%)
+        batch_N.tar.zst.manifest.json    chunked SHA-256 manifest of the .zst (utils/integrity format)
+        batch_N.contents.json            SHA-256 and size of every file inside the tar
+
+The tar is streamed straight into a multithreaded zstd compressor (no
+intermediate .tar on disk, so peak disk use is the compressed size rather than
+twice the dataset), and both manifests are computed from the bytes as they go
+by instead of re-reading the outputs. PAR2 needs the finished .zst, so parity
+and bundling of batch N run in the background while batch N+1 is compressed.
+
+The .zst is a standard multi-frame zstd stream: decompress_zst (and the zstd
+CLI) read it as before; the two JSON members are additions to the bundle.
+
+Tuning (env): PACKAGE_ZSTD_LEVEL (default 19; 20-22 use much more memory per
+thread for a few % size), PACKAGE_ZSTD_THREADS (default 0 = all cores).
+"""
+import json
 import os
 import tarfile
 import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
 import zstandard as zstd
 
 from root_anchor import ROOT_DIR
-from utils.integrity.par2 import create_recovery
+from utils.integrity.chunk_manifest import ChunkHasher, write_manifest
+from utils.integrity.par2 import create_recovery, hash_par2_index, index_file_for
 
 BATCH_SIZE_LIMIT = 6000 * 1024 * 1024
+ZSTD_LEVEL = int(os.getenv("PACKAGE_ZSTD_LEVEL", "19"))
+ZSTD_THREADS = int(os.getenv("PACKAGE_ZSTD_THREADS", "0")) or -1  # -1: zstandard uses every logical CPU
+_READ_BLOCK = 1 << 20
 
 
 def get_size_bytes(start_path: Path):
@@ -24,6 +52,97 @@ def get_size_bytes(start_path: Path):
     return total_size
 
 
+class _HashingWriter:
+    """File-like sink that hashes (ChunkHasher) everything written through it."""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.hasher = ChunkHasher()
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        return self.out.write(data)
+
+    def flush(self) -> None:
+        self.out.flush()
+
+
+class _HashingReader:
+    """Wraps a member file as tarfile reads it, so its SHA-256 costs no extra read."""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.hasher = ChunkHasher()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.hasher.update(data)
+        return data
+
+
+def _add_tree(tar: tarfile.TarFile, path: Path, arcname: str, contents: list[dict]) -> None:
+    """tar.add(path, arcname) equivalent (same member order: sorted, recursive) that
+    records each regular file's SHA-256 while it is being streamed."""
+    tarinfo = tar.gettarinfo(str(path), arcname)
+    if tarinfo is None:  # sockets etc. - tar.add skips them too
+        return
+    if tarinfo.isreg():
+        with open(path, "rb") as f:
+            reader = _HashingReader(f)
+            tar.addfile(tarinfo, reader)
+        contents.append({"path": arcname, "size": tarinfo.size, "sha256": reader.hasher.whole_file_sha256})
+    else:
+        tar.addfile(tarinfo)
+        if tarinfo.isdir():
+            for name in sorted(os.listdir(path)):
+                _add_tree(tar, path / name, f"{arcname}/{name}", contents)
+
+
+def _compress_batch(batch: list[Path], zst_path: Path) -> tuple[ChunkHasher, list[dict]]:
+    """Stream tar -> zstd -> zst_path. Returns the .zst chunk hashes and the tar contents list."""
+    cctx = zstd.ZstdCompressor(level=ZSTD_LEVEL, threads=ZSTD_THREADS)
+    contents: list[dict] = []
+    with zst_path.open("wb") as zst_file:
+        sink = _HashingWriter(zst_file)
+        with cctx.stream_writer(sink, closefd=False) as compressor:
+            with tarfile.open(fileobj=compressor, mode="w|") as tar:
+                for p in batch:
+                    print(f"adding {p.name}")
+                    _add_tree(tar, p, p.name, contents)
+    return sink.hasher, contents
+
+
+def _finish_batch(batch_counter: int, zst_path: Path, hasher: ChunkHasher, contents: list[dict],
+                  root_zips: Path) -> Path:
+    """PAR2 + manifests + bundle for one compressed batch. Runs on the background thread."""
+    bundle_path = root_zips / f'batch_{batch_counter}_with_par2.tar'
+    contents_path = root_zips / f'batch_{batch_counter}.contents.json'
+    manifest_path = zst_path.with_suffix(zst_path.suffix + ".manifest.json")
+
+    print(f"Generating PAR2 recovery for batch {batch_counter} (10% redundancy)")
+    par2_files = create_recovery(zst_path, redundancy_pct=10)
+    index_path = index_file_for(zst_path)
+    par2_record = {
+        "redundancy_pct": 10,
+        "index_sha256": hash_par2_index(index_path),
+        "files": sorted(p.name for p in par2_files),
+    } if index_path.exists() else None
+    write_manifest(hasher.manifest(zst_path.name, par2=par2_record), manifest_path)
+    contents_path.write_text(json.dumps({"files": contents}, indent=1), encoding="utf-8")
+
+    extras = [manifest_path, contents_path]
+    print(f"Bundling {zst_path.name} + {len(par2_files)} par2 files into {bundle_path.name}")
+    with tarfile.open(bundle_path, mode='w') as bundle:
+        bundle.add(zst_path, arcname=zst_path.name)
+        for p in par2_files + extras:
+            bundle.add(p, arcname=p.name)
+
+    os.remove(zst_path)
+    for p in par2_files + extras:
+        os.remove(p)
+    return bundle_path
+
+
 def package_archives_zstd(max_batches: int = 0):
     root_archives = Path(ROOT_DIR) / "archives"
     archive_dirs = [d for d in root_archives.iterdir() if d.is_dir()]
@@ -49,54 +168,57 @@ def package_archives_zstd(max_batches: int = 0):
     current_batch: list[Path] = []
     current_batch_size = 0
     batches_created = 0
-    for i in range(len(to_archive)):
-        a = to_archive[i]
-        print(f"processing {a.name}")
-        a_size = get_size_bytes(a)
-        print(f"size of {a.name} = {a_size}")
-        current_batch.append(a)
-        current_batch_size += a_size
-        if current_batch_size >= BATCH_SIZE_LIMIT or i == (len(to_archive) - 1):
-            print("starting new zstd batch")
-            tar_path = root_zips / f'batch_{batch_counter}.tar'
-            zst_path = root_zips / f'batch_{batch_counter}.tar.zst'
-            bundle_path = root_zips / f'batch_{batch_counter}_with_par2.tar'
-            with tar_path.open('wb') as tar_file:
-                with tarfile.open(fileobj=tar_file, mode='w') as tar:
-                    for p in current_batch:
-                        print(f"adding {p.name}")
-                        tar.add(p, arcname=p.name)
-            print(f"Created tar file for batch {batch_counter} with size {os.path.getsize(tar_path)} bytes")
-            with tar_path.open('rb') as tar_file:
-                cctx = zstd.ZstdCompressor(level=22)
-                with zst_path.open('wb') as zst_file:
-                    print(f"Compressing batch {batch_counter} to zstd")
-                    cctx.copy_stream(tar_file, zst_file)
-            os.remove(tar_path)
-
-            print(f"Generating PAR2 recovery for batch {batch_counter} (10% redundancy)")
-            par2_files = create_recovery(zst_path, redundancy_pct=10)
-
-            print(f"Bundling {zst_path.name} + {len(par2_files)} par2 files into {bundle_path.name}")
-            with tarfile.open(bundle_path, mode='w') as bundle:
-                bundle.add(zst_path, arcname=zst_path.name)
-                for p in par2_files:
-                    bundle.add(p, arcname=p.name)
-
-            os.remove(zst_path)
-            for p in par2_files:
-                os.remove(p)
-
-            batch_counter += 1
-            batches_created += 1
-            with batch_counter_path.open("w", encoding="utf-8") as f:
-                f.write(str(batch_counter))
-            with packaged_list_path.open("a", encoding="utf-8") as f:
-                f.writelines([p.name + "\n" for p in current_batch])
-            current_batch = []
-            current_batch_size = 0
-            if max_batches and batches_created >= max_batches:
-                return
+    # One batch's parity/bundling overlaps the next batch's compression. Bookkeeping
+    # (counter + packaged list) is only written once a batch's bundle is complete,
+    # so an interrupted run re-packages any unfinished batch.
+    finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="package-par2")
+    pending: Optional[tuple[Future, int, list[Path]]] = None
+
+    def complete_pending():
+        nonlocal pending
+        if pending is None:
+            return
+        future, done_counter, done_batch = pending
+        pending = None
+        bundle_path = future.result()
+        print(f"Batch {done_counter} complete: {bundle_path.name}")
+        with batch_counter_path.open("w", encoding="utf-8") as f:
+            f.write(str(done_counter + 1))
+        with packaged_list_path.open("a", encoding="utf-8") as f:
+            f.writelines([p.name + "\n" for p in done_batch])
+
+    try:
+        for i in range(len(to_archive)):
+            a = to_archive[i]
+            print(f"processing {a.name}")
+            a_size = get_size_bytes(a)
+            print(f"size of {a.name} = {a_size}")
+            current_batch.append(a)
+            current_batch_size += a_size
+            if current_batch_size >= BATCH_SIZE_LIMIT or i == (len(to_archive) - 1):
+                print(f"starting new zstd batch (level {ZSTD_LEVEL}, threads {ZSTD_THREADS})")
+                zst_path = root_zips / f'batch_{batch_counter}.tar.zst'
+                started = time.perf_counter()
+                hasher, contents = _compress_batch(current_batch, zst_path)
+                elapsed = time.perf_counter() - started
+                print(f"Compressed batch {batch_counter}: {current_batch_size} -> {hasher.size} bytes "
+                      f"in {elapsed:.1f}s ({current_batch_size / (1 << 20) / max(elapsed, 1e-9):.1f} MiB/s)")
+
+                complete_pending()
+                pending = (
+                    finisher.submit(_finish_batch, batch_counter, zst_path, hasher, contents, root_zips),
+                    batch_counter,
+                    current_batch,
+                )
+                batch_counter += 1
+                batches_created += 1
+                current_batch = []
+                current_batch_size = 0
+                if max_batches and batches_created >= max_batches:
+                    break
+        complete_pending()
+    finally:
+        finisher.shutdown(wait=True)
 
 
 def decompress_zst(zstd_file: Path, output_dir: Optional[Path]):
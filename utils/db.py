@@ -2,6 +2,7 @@ import json
 import logging
 import os
 import threading
+import time
 from contextlib import contextmanager
 from typing import Literal
 
@@ -9,6 +10,8 @@ import mysql
 import mysql.connector
 from dotenv import load_dotenv
 
+from utils.db_stats import db_stats
+
 load_dotenv()
 USER = os.getenv("DB_USER")
 PASSWORD = os.getenv("DB_PASS")
@@ -38,6 +41,25 @@ class DbError(Exception):
 _local = threading.local()
 
 
+def _checkout():
+    """Get a pooled connection, recording the checkout time (and pool exhaustion) in db_stats."""
+    if not db_stats.enabled:
+        return cnx_pool.get_connection()
+    started = time.perf_counter()
+    try:
+        cnx = cnx_pool.get_connection()
+    except mysql.connector.errors.PoolError:
+        db_stats.record_checkout(time.perf_counter() - started, exhausted=True)
+        raise
+    db_stats.record_checkout(time.perf_counter() - started)
+    return cnx
+
+
+def _release(cnx, checked_out_at: float) -> None:
+    cnx.close()
+    db_stats.record_release(time.perf_counter() - checked_out_at)
+
+
 @contextmanager
 def transaction_batch():
     """
@@ -60,18 +82,45 @@ def transaction_batch():
         yield
         return
 
-    cnx = cnx_pool.get_connection()
+    cnx = _checkout()
+    started = time.perf_counter()
+    rolled_back = False
     cnx.autocommit = False
     _local.connection = cnx
     try:
         yield
         cnx.commit()
     except Exception:
+        rolled_back = True
         cnx.rollback()
         raise
     finally:
         _local.connection = None
-        cnx.close()
+        db_stats.record_transaction(time.perf_counter() - started, rolled_back)
+        _release(cnx, started)
+
+
+@contextmanager
+def named_lock(name: str, timeout_s: int = 600):
+    """
+    Hold the MySQL named lock ``name`` (GET_LOCK) for the duration of the block, so
+    the block runs one at a time across every process and host using this database.
+    Holds a pooled connection until released; the server drops the lock if that
+    connection dies with its process. Raises DbError if not acquired in ``timeout_s``.
+    """
+    cnx = _checkout()
+    checked_out_at = time.perf_counter()
+    try:
+        acquired = _execute_query_on_connection(cnx, "SELECT GET_LOCK(%s, %s) AS acquired",
+                                                (name, timeout_s), "single_row")
+        if not acquired or acquired["acquired"] != 1:
+            raise DbError(f"Timed out after {timeout_s}s waiting for lock {name!r}")
+        try:
+            yield
+        finally:
+            _execute_query_on_connection(cnx, "SELECT RELEASE_LOCK(%s) AS released", (name,), "single_row")
+    finally:
+        _release(cnx, checked_out_at)
 
 
 def in_transaction_batch() -> bool:
@@ -97,15 +146,21 @@ def batch_insert(table: str, columns: list, rows: list) -> list:
     query = f'INSERT INTO `{table}` ({cols_sql}) VALUES {values_sql}'
     flat_args = [val for row in rows for val in row]
     cursor = cnx.cursor(buffered=True)
+    started = time.perf_counter()
+    failed = False
     try:
         cursor.execute(query, flat_args)
         first_id = cursor.lastrowid
         return list(range(first_id, first_id + n))
     except mysql.connector.Error as err:
+        failed = True
         logger.error("batch_insert failed: %s\nTable: %s\nColumns: %s", err, table, columns)
         raise DbError(str(err)) from err
     finally:
         cursor.close()
+        # Fingerprint built directly: normalizing an n-row VALUES list would cost O(n) per call.
+        db_stats.record_query(query, flat_args, time.perf_counter() - started, n, failed,
+                              fingerprint=f"INSERT INTO `{table}` ({cols_sql}) VALUES (?+), ...")
 
 
 def execute_query(query, args, return_type: Literal["single_row", "rows", "id", "none", "rowcount", "debug"] = "rows", timeout_ms: int | None = None):
@@ -113,11 +168,12 @@ def execute_query(query, args, return_type: Literal["single_row", "rows", "id",
         # Reuse the open transaction connection on this thread.
         return _execute_query_on_connection(_local.connection, query, args, return_type, commit=False, timeout_ms=timeout_ms)
 
-    cnx = cnx_pool.get_connection()
+    cnx = _checkout()
+    checked_out_at = time.perf_counter()
     try:
         return _execute_query_on_connection(cnx, query, args, return_type, commit=True, timeout_ms=timeout_ms)
     finally:
-        cnx.close()
+        _release(cnx, checked_out_at)
 
 
 def _execute_query_on_connection(cnx, query, args, return_type, commit=True, timeout_ms: int | None = None):
@@ -127,6 +183,8 @@ def _execute_query_on_connection(cnx, query, args, return_type, commit=True, tim
         if stripped[:6].upper() == "SELECT":
             query = stripped[:6] + f" /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */" + stripped[6:]
     cursor = cnx.cursor(buffered=True)
+    started = time.perf_counter()
+    failed = False
     try:
         cursor.execute(query, args)
         if return_type == "single_row":
@@ -146,14 +204,17 @@ def _execute_query_on_connection(cnx, query, args, return_type, commit=True, tim
             return cursor.rowcount
         return None
     except mysql.connector.Error as err:
+        failed = True
         if err.errno == 3024:
             raise TimeoutError(f"Query timed out after {timeout_ms}ms") from err
         logger.error("DB query failed: %s\nQuery: %s\nArgs: %s", err, query, json.dumps(args, default=str))
         raise DbError(str(err)) from err
     finally:
+        rows = cursor.rowcount
         cursor.close()
         if commit:
             cnx.commit()
+        db_stats.record_query(query, args, time.perf_counter() - started, rows, failed)
 
 
 def select_results(cursor):
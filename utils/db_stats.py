@@ -0,0 +1,333 @@
+"""
+In-process instrumentation for utils.db: per-statement latency, rows, pool
+checkout wait and connection hold times, plus a slow-query log.
+
+Every statement run through execute_query / batch_insert is recorded under a
+normalized fingerprint (literals, placeholders and IN/VALUES lists collapsed,
+comments and optimizer hints dropped), so
+
+    SELECT * FROM post WHERE id IN (%s, %s, %s) /*+ MAX_EXECUTION_TIME(500) */
+
+and the same query with 40 ids are one entry. Per fingerprint we keep a count,
+errors, total/max seconds, rows (returned or affected) and a fixed-bucket
+latency histogram (the bucket bounds are Prometheus-style, so the histograms
+can be exported as-is). Pool checkouts record how long get_connection() took
+and how often the pool was exhausted (mysql.connector's pool fails immediately
+instead of queueing, so exhaustion shows up as a count, not as wait time);
+releases record how long the connection was held, and the peak number of
+connections in use.
+
+Statements slower than DB_SLOW_QUERY_MS are logged at WARNING on the
+"utils.db.slow" logger with their duration, rows and a truncated sample of
+their parameters; the most recent ones are kept for stats().
+
+Reports: stats() (served by GET /api/admin/stats), report() / log_report()
+for a top-N table by total time; with DB_STATS_REPORT_S > 0 the server logs
+that table periodically (start_reporter() from the lifespan).
+
+The cost per statement is two perf_counter() calls, a dict lookup for the
+cached fingerprint and a short critical section; DB_STATS=false turns it off.
+"""
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("utils.db.slow")
+
+DB_STATS_ENABLED = os.getenv("DB_STATS", "true").lower() in ("1", "true", "yes")
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+DB_STATS_REPORT_S = float(os.getenv("DB_STATS_REPORT_S", "0"))
+DB_STATS_TOP_N = int(os.getenv("DB_STATS_TOP_N", "10"))
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_MAX_FINGERPRINTS = 2000  # distinct statements tracked; later ones share one overflow entry
+_FINGERPRINT_CACHE_MAX = 4096
+_SLOW_KEPT = 50
+_PARAM_SAMPLE_ITEMS = 10
+_PARAM_SAMPLE_CHARS = 80
+_OVERFLOW_KEY = "(other statements)"
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s")
+_NUMBER_RE = re.compile(r"(?<![\w`])-?\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_RE = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(query: str) -> str:
+    fp = _COMMENT_RE.sub(" ", query)
+    fp = _STRING_RE.sub("?", fp)
+    fp = _PLACEHOLDER_RE.sub("?", fp)
+    fp = _NUMBER_RE.sub("?", fp)
+    fp = _LIST_RE.sub("(?+)", fp)
+    fp = _VALUES_RE.sub("(?+), ...", fp)
+    return _SPACE_RE.sub(" ", fp).strip()[:500]
+
+
+def _sample_params(args: Any) -> str:
+    if args is None:
+        return ""
+    if isinstance(args, dict):
+        items = [f"{k}={v!r:.{_PARAM_SAMPLE_CHARS}}" for k, v in list(args.items())[:_PARAM_SAMPLE_ITEMS]]
+        more = len(args) - _PARAM_SAMPLE_ITEMS
+    else:
+        args = list(args)
+        items = [f"{v!r:.{_PARAM_SAMPLE_CHARS}}" for v in args[:_PARAM_SAMPLE_ITEMS]]
+        more = len(args) - _PARAM_SAMPLE_ITEMS
+    return ", ".join(items) + (f", ... (+{more})" if more > 0 else "")
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 4),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": {("+Inf" if i == len(LATENCY_BUCKETS) else str(LATENCY_BUCKETS[i])): n
+                        for i, n in enumerate(self.counts)},
+        }
+
+
+class _StatementStats:
+    __slots__ = ("latency", "rows", "errors", "slow")
+
+    def __init__(self):
+        self.latency = _Histogram()
+        self.rows = 0
+        self.errors = 0
+        self.slow = 0
+
+
+class DbStats:
+    def __init__(self, enabled: bool = DB_STATS_ENABLED, slow_query_ms: float = DB_SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_s = slow_query_ms / 1000.0
+        self._lock = threading.Lock()
+        self._fingerprints: dict[str, str] = {}
+        self._reporter_stop = threading.Event()
+        self._reporter: Optional[threading.Thread] = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements: dict[str, _StatementStats] = {}
+            self._checkout_wait = _Histogram()
+            self._hold = _Histogram()
+            self._transactions = _Histogram()
+            self._rollbacks = 0
+            self._exhausted = 0
+            self._in_use = 0
+            self._peak_in_use = 0
+            self._slow: deque = deque(maxlen=_SLOW_KEPT)
+            self._since = time.time()
+
+    # ------------------------------------------------------------------
+    # Recording (called from utils.db)
+    # ------------------------------------------------------------------
+
+    def fingerprint(self, query: str) -> str:
+        fp = self._fingerprints.get(query)
+        if fp is None:
+            fp = _normalize(query)
+            if len(self._fingerprints) >= _FINGERPRINT_CACHE_MAX:
+                self._fingerprints.clear()
+            self._fingerprints[query] = fp
+        return fp
+
+    def record_query(self, query: str, args: Any, seconds: float, rows: int, failed: bool = False,
+                     fingerprint: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        fp = fingerprint or self.fingerprint(query)
+        slow = seconds >= self.slow_query_s
+        with self._lock:
+            stats = self._statements.get(fp)
+            if stats is None:
+                if len(self._statements) >= _MAX_FINGERPRINTS:
+                    fp = _OVERFLOW_KEY
+                    stats = self._statements.get(fp)
+                if stats is None:
+                    stats = self._statements[fp] = _StatementStats()
+            stats.latency.observe(seconds)
+            if rows > 0:
+                stats.rows += rows
+            if failed:
+                stats.errors += 1
+            if slow:
+                stats.slow += 1
+        if slow:
+            sample = _sample_params(args)
+            self._slow.append({"at": time.time(), "ms": round(seconds * 1000, 1), "rows": rows,
+                               "statement": fp, "params": sample})
+            slow_logger.warning(f"Slow query ({seconds * 1000:.0f} ms, {rows} rows{', failed' if failed else ''}): "
+                                f"{fp}\n  params: {sample}")
+
+    def record_checkout(self, seconds: float, exhausted: bool = False) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if exhausted:
+                self._exhausted += 1
+                return
+            self._checkout_wait.observe(seconds)
+            self._in_use += 1
+            if self._in_use > self._peak_in_use:
+                self._peak_in_use = self._in_use
+
+    def record_release(self, held_seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._hold.observe(held_seconds)
+            self._in_use = max(0, self._in_use - 1)
+
+    def record_transaction(self, seconds: float, rolled_back: bool) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._transactions.observe(seconds)
+            if rolled_back:
+                self._rollbacks += 1
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def top(self, n: int = DB_STATS_TOP_N, by: str = "total_s") -> list[dict]:
+        with self._lock:
+            rows = [
+                {"statement": fp, **s.latency.as_dict(), "rows": s.rows, "errors": s.errors, "slow": s.slow}
+                for fp, s in self._statements.items()
+            ]
+        rows.sort(key=lambda r: r[by], reverse=True)
+        return rows[:n]
+
+    def pool_stats(self) -> dict:
+        with self._lock:
+            checkout = self._checkout_wait.as_dict()
+            hold = self._hold.as_dict()
+            transactions = self._transactions.as_dict()
+            for h in (checkout, hold, transactions):
+                h.pop("buckets")
+            return {
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "exhausted": self._exhausted,
+                "checkout_wait": checkout,
+                "hold": hold,
+                "transactions": {**transactions, "rollbacks": self._rollbacks},
+            }
+
+    def stats(self, top_n: int = DB_STATS_TOP_N) -> dict:
+        with self._lock:
+            statements = len(self._statements)
+            totals = sum(s.latency.count for s in self._statements.values())
+            slow = list(self._slow)
+        return {
+            "enabled": self.enabled,
+            "since": self._since,
+            "statements_tracked": statements,
+            "queries": totals,
+            "pool": self.pool_stats(),
+            "top_by_total_time": [{k: v for k, v in r.items() if k != "buckets"} for r in self.top(top_n)],
+            "recent_slow": slow[-10:],
+        }
+
+    def histograms(self) -> dict:
+        """Raw per-statement histograms and pool histograms, for metric exporters."""
+        with self._lock:
+            return {
+                "statements": {fp: {"buckets": list(s.latency.counts), "count": s.latency.count,
+                                    "sum": s.latency.total, "rows": s.rows, "errors": s.errors}
+                               for fp, s in self._statements.items()},
+                "checkout_wait": {"buckets": list(self._checkout_wait.counts), "count": self._checkout_wait.count,
+                                  "sum": self._checkout_wait.total},
+                "hold": {"buckets": list(self._hold.counts), "count": self._hold.count, "sum": self._hold.total},
+                "in_use": self._in_use,
+                "exhausted": self._exhausted,
+            }
+
+    def report(self, top_n: int = DB_STATS_TOP_N) -> str:
+        pool = self.pool_stats()
+        wait, hold = pool["checkout_wait"], pool["hold"]
+        lines = [
+            f"DB pool: {wait['count']} checkouts, wait p95 {wait['p95_ms']} ms / max {wait['max_ms']} ms, "
+            f"hold p95 {hold['p95_ms']} ms / max {hold['max_ms']} ms, peak in use {pool['peak_in_use']}, "
+            f"exhausted {pool['exhausted']}x; {pool['transactions']['count']} transactions, "
+            f"{pool['transactions']['rollbacks']} rolled back",
+            f"{'count':>8s} {'total s':>9s} {'mean ms':>9s} {'p95 ms':>9s} {'max ms':>9s} {'rows':>10s} "
+            f"{'err':>5s}  statement",
+        ]
+        for r in self.top(top_n):
+            lines.append(f"{r['count']:8d} {r['total_s']:9.2f} {r['mean_ms']:9.2f} {r['p95_ms']:9.1f} "
+                         f"{r['max_ms']:9.1f} {r['rows']:10d} {r['errors']:5d}  {r['statement'][:160]}")
+        return "\n".join(lines)
+
+    def log_report(self, top_n: int = DB_STATS_TOP_N) -> None:
+        if self.enabled:
+            logger.info(f"DB statement report (top {top_n} by total time):\n{self.report(top_n)}")
+
+    def start_reporter(self, interval_s: float = DB_STATS_REPORT_S) -> None:
+        """Log the top-N report every interval_s seconds on a daemon thread (no-op when <= 0)."""
+        if not self.enabled or interval_s <= 0 or (self._reporter is not None and self._reporter.is_alive()):
+            return
+        self._reporter_stop.clear()
+
+        def run():
+            while not self._reporter_stop.wait(interval_s):
+                try:
+                    self.log_report()
+                except Exception as e:
+                    logger.warning(f"DB stats report failed: {e}")
+
+        self._reporter = threading.Thread(target=run, name="db-stats-reporter", daemon=True)
+        self._reporter.start()
+
+    def stop_reporter(self) -> None:
+        self._reporter_stop.set()
+        self._reporter = None
+
+
+db_stats = DbStats()
@@ -0,0 +1,95 @@
+"""
+In-process per-entity version counters.
+
+Writers (ingestion, annotation, tagging) call ``bump()`` for every entity they
+change; readers that memoise derived views (see
+browsing_platform/server/services/entity_cache.py) record the versions they
+saw and treat the memo as stale as soon as any of them moves.
+
+Keys are ``(entity_type, entity_id)`` with entity_type one of 'account', 'post',
+'media', 'media_part', 'archive_session'. ``bump_all()`` advances a global epoch
+for changes whose blast radius isn't worth computing (e.g. renaming a tag that
+appears on thousands of entities).
+
+The counter map is capped at ENTITY_VERSIONS_MAX keys. When a bump would take
+it past that, the map is cleared and the global epoch advanced instead: every
+cached view goes stale at once (as after ``bump_all()``), and counting starts
+again from zero. A long-running server that has touched millions of entities
+therefore holds at most that many counters, at the price of an occasional full
+cache flush.
+
+Counters live in process memory only: a loader running in a separate process
+cannot reach them, which is why readers also bound staleness with a TTL.
+Tracking is off until ``enable()`` is called so CLI tools pay nothing for it.
+"""
+
+import os
+import threading
+from typing import Iterable
+
+ENTITY_VERSIONS_MAX = int(os.getenv("ENTITY_VERSIONS_MAX", "200000"))
+
+_lock = threading.Lock()
+_versions: dict[tuple[str, int], int] = {}
+_epoch = 0
+# Incremented by every bump; lets a reader detect that *something* changed while
+# it was building a value whose dependency set it didn't know up front.
+_write_seq = 0
+_enabled = False
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def get(entity_type: str, entity_id: int) -> int:
+    return _versions.get((entity_type, entity_id), 0)
+
+
+def epoch() -> int:
+    return _epoch
+
+
+def write_seq() -> int:
+    return _write_seq
+
+
+def bump(entity_type: str, entity_ids: Iterable[int]) -> None:
+    global _write_seq
+    if not _enabled:
+        return
+    with _lock:
+        _write_seq += 1
+        for entity_id in entity_ids:
+            if entity_id is None:
+                continue
+            key = (entity_type, int(entity_id))
+            _versions[key] = _versions.get(key, 0) + 1
+        if len(_versions) > ENTITY_VERSIONS_MAX:
+            _reset_locked()
+
+
+def _reset_locked() -> None:
+    # Clearing alone would let a counter fall back to a value a cached entry
+    # already recorded; advancing the epoch makes every such entry stale.
+    global _epoch
+    _versions.clear()
+    _epoch += 1
+
+
+def tracked() -> int:
+    return len(_versions)
+
+
+def bump_all() -> None:
+    global _epoch, _write_seq
+    if not _enabled:
+        return
+    with _lock:
+        _write_seq += 1
+        _epoch += 1
@@ -1,15 +1,55 @@
 import asyncio
+import json
+import tempfile
+from pathlib import Path
 
+import ijson
 from har2warc.har2warc import har2warc
 
+from extractors.har_body_store import uses_body_store
+from extractors.har_index import iter_har_entries
+
+
+def inline_har_bodies(har_path: Path, out_path: Path) -> None:
+    """Write a copy of a body-store HAR (extractors/har_body_store.py) with every
+    body inlined, for tools such as har2warc that only understand content.text."""
+    log_header = {}
+    for key in ('version', 'creator', 'browser', 'pages'):
+        # Separate small passes, as in merge_har_attachments: only the entries grow large.
+        with open(har_path, 'rb') as f:
+            value = next(ijson.items(f, f'log.{key}', use_float=True), None)
+        if value is not None:
+            log_header[key] = value
+    with open(out_path, 'w', encoding='utf-8') as out_f:
+        out_f.write('{"log":{')
+        for key, value in log_header.items():
+            out_f.write(f'{json.dumps(key)}:{json.dumps(value, ensure_ascii=False)},')
+        out_f.write('"entries":[')
+        for i, entry in enumerate(iter_har_entries(har_path, use_float=True)):
+            if i:
+                out_f.write(',')
+            out_f.write(json.dumps(entry, ensure_ascii=False))
+        out_f.write(']}}')
+
+
+def har_to_warc_file(har_path: Path, warc_path: Path) -> None:
+    """har2warc, resolving content-addressed bodies first when the archive uses them."""
+    if not uses_body_store(har_path.parent):
+        har2warc(str(har_path), str(warc_path))
+        return
+    with tempfile.TemporaryDirectory(dir=har_path.parent) as tmp:
+        inlined = Path(tmp) / har_path.name
+        inline_har_bodies(har_path, inlined)
+        har2warc(str(inlined), str(warc_path))
+
 
 async def generate_warc(har_path:str):
     warc_path =  har_path.replace(".har", ".warc")
-    har2warc(har_path, warc_path)
+    har_to_warc_file(Path(har_path), Path(warc_path))
     print(f"WARC file generated at: {warc_path}")
 
 
 if __name__ == "__main__":
     har_path_arg = input("Enter the path to the HAR file: ").strip().strip('"').strip("'")
 
-    asyncio.run(generate_warc(har_path_arg))
\ No newline at end of file
+    asyncio.run(generate_warc(har_path_arg))
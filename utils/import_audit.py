@@ -0,0 +1,146 @@
+"""
+Startup cost of each entry point: imports every ENTRY_POINTS module in a fresh
+interpreter under ``python -X importtime`` and reports the wall time of the
+import, the peak RSS of the process, the modules that cost the most (cumulative
+and self time), and which of the heavy optional libraries (HEAVY_MODULES) got
+loaded on the way. Those should only be imported by the code that uses them
+(a function-level import), so the server and the CLIs start without paying for
+OpenCV, numpy or a browser driver they may never touch.
+
+Run from the project root:
+
+    uv run utils/import_audit.py [entry ...] [--top 15] [--runs 3] [--json]
+
+An entry is a name from ENTRY_POINTS or any importable module path. Importing
+the server module builds the FastAPI app but does not run its lifespan (the tie
+graph build and the other startup work), which is deferred by design. Peak RSS
+is reported where the ``resource`` module exists (not on Windows); ru_maxrss is
+in KiB on Linux and bytes on macOS, both shown here in MiB.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ENTRY_POINTS = {
+    "server": "browsing_platform.server.server",
+    "archives_db_loader": "db_loaders.archives_db_loader",
+    "job_queue": "db_loaders.job_queue",
+    "migrate": "infra.migrate",
+    "archiver": "archiver.archive",
+}
+
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "imagehash", "playwright", "warcio", "bs4", "pyautogui", "scipy")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# Runs in the child: import the target, then report what it cost as one JSON line.
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+ok, error = True, None
+try:
+    import {module}
+except BaseException as e:
+    ok, error = False, f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - t0
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mib = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+except ImportError:
+    rss_mib = None
+print(json.dumps({{"ok": ok, "error": error, "import_s": elapsed, "peak_rss_mib": rss_mib,
+                  "modules": sorted(sys.modules)}}))
+"""
+
+
+def _run_child(module: str) -> tuple[dict, list[tuple[int, int, int, str]]]:
+    """Import ``module`` in a fresh interpreter; returns the child's report and the
+    parsed -X importtime rows as (self_us, cumulative_us, depth, module)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(module=module)],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.getenv("PYTHONPATH")]))),
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    report_line = next((l for l in reversed(proc.stdout.splitlines()) if l.startswith("{")), None)
+    if report_line is None:
+        tail = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))[-500:]
+        return {"ok": False, "error": f"exit {proc.returncode}: {tail}", "import_s": None,
+                "peak_rss_mib": None, "modules": []}, rows
+    return json.loads(report_line), rows
+
+
+def audit(module: str, runs: int = 1, top: int = 15) -> dict:
+    """Best of ``runs`` cold imports of ``module`` (best, so a busy disk cache or a
+    noisy neighbour doesn't get blamed on the code)."""
+    best: Optional[tuple[dict, list]] = None
+    for _ in range(max(1, runs)):
+        report, rows = _run_child(module)
+        if best is None or (report["import_s"] or 0) < (best[0]["import_s"] or 0):
+            best = (report, rows)
+    report, rows = best
+    loaded = set(report.pop("modules"))
+    return {
+        "module": module,
+        **report,
+        "modules_loaded": len(loaded),
+        "import_time_total_s": sum(r[0] for r in rows) / 1e6,
+        "heavy_loaded": [h for h in HEAVY_MODULES if h in loaded],
+        "top_cumulative": [{"module": r[3], "cumulative_ms": r[1] / 1000, "self_ms": r[0] / 1000}
+                           for r in sorted((r for r in rows if r[2] <= 1), key=lambda r: -r[1])[:top]],
+        "top_self": [{"module": r[3], "self_ms": r[0] / 1000}
+                     for r in sorted(rows, key=lambda r: -r[0])[:top]],
+    }
+
+
+def _print_report(r: dict) -> None:
+    print(f"\n== {r['module']}")
+    if not r["ok"]:
+        print(f"   import FAILED: {r['error']}")
+    if r["import_s"] is not None:
+        rss = f"{r['peak_rss_mib']:.1f} MiB" if r["peak_rss_mib"] is not None else "n/a"
+        print(f"   import {r['import_s'] * 1000:.0f} ms wall, {r['import_time_total_s'] * 1000:.0f} ms in module "
+              f"bodies, {r['modules_loaded']} modules, peak RSS {rss}")
+    print(f"   heavy modules loaded: {', '.join(r['heavy_loaded']) or 'none'}")
+    if r["top_cumulative"]:
+        print("   top-level imports by cumulative time:")
+        for row in r["top_cumulative"]:
+            print(f"     {row['cumulative_ms']:8.1f} ms  {row['module']}")
+    if r["top_self"]:
+        print("   modules by own time:")
+        for row in r["top_self"]:
+            print(f"     {row['self_ms']:8.1f} ms  {row['module']}")
+
+
+def main(args) -> int:
+    entries = args.entries or list(ENTRY_POINTS)
+    baseline = audit("sys", runs=args.runs, top=0)
+    results = [audit(ENTRY_POINTS.get(e, e), runs=args.runs, top=args.top) for e in entries]
+    if args.json:
+        print(json.dumps({"baseline": baseline, "entries": results}, indent=2))
+    else:
+        rss = baseline["peak_rss_mib"]
+        print(f"bare interpreter: peak RSS {rss:.1f} MiB" if rss is not None else "bare interpreter")
+        for r in results:
+            _print_report(r)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entries", nargs="*", help=f"Entry points ({', '.join(ENTRY_POINTS)}) or module paths")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=1, help="Cold imports per entry; the fastest is reported")
+    parser.add_argument("--json", action="store_true")
+    sys.exit(main(parser.parse_args()))
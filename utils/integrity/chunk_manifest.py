@@ -33,43 +33,70 @@ def _merkle_root(chunk_digests: list[bytes]) -> bytes:
     return layer[0]
 
 
+class ChunkHasher:
+    """
+    Incremental form of build_manifest for callers that already stream the
+    file's bytes (e.g. the archiver's HAR merge), so the manifest costs no
+    extra read. Chunk boundaries are independent of how update() is called.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._whole = hashlib.sha256()
+        self._digests: list[bytes] = []
+        self._pending = bytearray()
+
+    def update(self, data: bytes) -> None:
+        self.size += len(data)
+        self._whole.update(data)
+        self._pending += data
+        full = len(self._pending) - len(self._pending) % self.chunk_size
+        if full:
+            with memoryview(self._pending) as view:
+                for start in range(0, full, self.chunk_size):
+                    self._digests.append(hashlib.sha256(view[start:start + self.chunk_size]).digest())
+            del self._pending[:full]
+
+    @property
+    def whole_file_sha256(self) -> str:
+        return self._whole.hexdigest()
+
+    def manifest(self, filename: str, par2: Optional[dict] = None) -> dict:
+        chunk_digests = list(self._digests)
+        if self._pending:
+            chunk_digests.append(hashlib.sha256(self._pending).digest())
+        manifest: dict = {
+            "version": MANIFEST_VERSION,
+            "filename": filename,
+            "size": self.size,
+            "algorithm": ALGORITHM,
+            "chunk_size": self.chunk_size,
+            "chunk_count": len(chunk_digests),
+            "whole_file_sha256": self.whole_file_sha256,
+            "merkle_root": _merkle_root(chunk_digests).hex(),
+            "chunks": [d.hex() for d in chunk_digests],
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        if par2 is not None:
+            manifest["par2"] = par2
+        return manifest
+
+
 def build_manifest(
     path: Path,
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     par2: Optional[dict] = None,
 ) -> dict:
     path = Path(path)
-    chunk_hex: list[str] = []
-    chunk_digests: list[bytes] = []
-    whole = hashlib.sha256()
-    size = 0
-
+    hasher = ChunkHasher(chunk_size)
     with open(path, "rb") as f:
         while True:
             buf = f.read(chunk_size)
             if not buf:
                 break
-            size += len(buf)
-            digest = hashlib.sha256(buf).digest()
-            chunk_digests.append(digest)
-            chunk_hex.append(digest.hex())
-            whole.update(buf)
-
-    manifest: dict = {
-        "version": MANIFEST_VERSION,
-        "filename": path.name,
-        "size": size,
-        "algorithm": ALGORITHM,
-        "chunk_size": chunk_size,
-        "chunk_count": len(chunk_hex),
-        "whole_file_sha256": whole.hexdigest(),
-        "merkle_root": _merkle_root(chunk_digests).hex(),
-        "chunks": chunk_hex,
-        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-    }
-    if par2 is not None:
-        manifest["par2"] = par2
-    return manifest
+            hasher.update(buf)
+    return hasher.manifest(path.name, par2=par2)
 
 
 def serialize_manifest(manifest: dict) -> bytes:
@@ -0,0 +1,409 @@
+"""
+Parallel, resumable integrity verification for a whole tree of archives.
+
+verify.py checks one archive at a time: a serial rglob, then each manifest's
+chunks hashed one by one. Over the full fleet that takes days. This verifier
+splits every protected asset into chunk ranges (CHUNKS_PER_TASK manifest chunks
+each) and hashes them in worker processes through mmap, so large files are
+spread over all workers and small ones don't wait behind them.
+
+Every manifest is also checked for internal consistency: its merkle_root and
+chunk_count are recomputed from its chunk list. In a sealed archive (the seal,
+manifests.json, lists the current SHA-256 of every manifest and is checked per
+archive) the chunk list is anchored, so all chunks matching and the chunk count
+matching the file's length implies the whole-file SHA-256 matches too, and it
+is not recomputed serially. An unsealed archive's manifests are anchored by
+nothing, so there the whole-file SHA-256 is recomputed as well (one extra read
+per asset; --whole-file does it for sealed archives too). Someone who rewrites
+an unsealed asset and every hash in its manifest consistently still passes:
+only a seal can catch that. When present, the content-addressed body store is
+checked too: its bodies are re-hashed by the workers in batches
+(BODY_TASK_BYTES), under the same rate limit as the chunks. PAR2 is only consulted, with --par2, for assets that failed
+(`par2 verify`, never repair: use verify.py for that).
+
+I/O budget: --max-mib-s caps the combined read rate; each worker gets an equal
+share and sleeps when ahead of it, so a run can share disks with the live server.
+
+Report: JSON lines, one record per asset and one {"type": "archive", ...} record
+when an archive is complete. --resume skips archives that already have their
+archive record in the report, so an interrupted fleet run picks up where it
+stopped; records of archives left half-done are dropped from the report first
+and those archives verified again from the start. Exit code 0 if everything verified, 2 otherwise.
+
+Usage:
+    uv run python -m utils.integrity.fleet_verify archives/ --report verify_report.jsonl \\
+        [--workers N] [--max-mib-s 200] [--resume] [--par2] [--whole-file]
+
+The root may also be a single archive directory (one with a seal, a body store
+or manifests of its own at the top level).
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Optional
+
+from extractors.har_body_store import read_body_index, uses_body_store, verify_bodies
+from utils.integrity import par2 as par2_mod
+from utils.integrity.chunk_manifest import _merkle_root, read_manifest
+from utils.integrity.seal import SEAL_FILENAME
+
+CHUNKS_PER_TASK = 64
+# Body-store bodies are small files; a task takes up to this many bytes or bodies of them.
+BODY_TASK_BYTES = 64 << 20
+BODY_TASK_MAX = 1024
+_MANIFEST_SUFFIX = ".manifest.json"
+
+# Per-process I/O budget, set by _init_worker.
+_rate_bytes_per_s: float = 0.0
+_rate_started = 0.0
+_rate_bytes = 0
+
+
+def _init_worker(rate_bytes_per_s: float) -> None:
+    global _rate_bytes_per_s, _rate_started, _rate_bytes
+    _rate_bytes_per_s = rate_bytes_per_s
+    _rate_started = time.monotonic()
+    _rate_bytes = 0
+
+
+def _throttle(n: int) -> None:
+    global _rate_bytes
+    if _rate_bytes_per_s <= 0:
+        return
+    _rate_bytes += n
+    ahead = _rate_bytes / _rate_bytes_per_s - (time.monotonic() - _rate_started)
+    if ahead > 0:
+        time.sleep(ahead)
+
+
+def _hash_chunk_range(asset_path: str, chunk_size: int, first: int, expected: list[str]) -> list[int]:
+    """Hash chunks [first, first + len(expected)) of an asset; returns the bad chunk indices."""
+    bad = []
+    with open(asset_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return [first + i for i in range(len(expected))]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            for i, want in enumerate(expected):
+                start = (first + i) * chunk_size
+                if start >= size:
+                    bad.append(first + i)
+                    continue
+                piece = view[start:start + chunk_size]
+                _throttle(len(piece))
+                if hashlib.sha256(piece).hexdigest() != want:
+                    bad.append(first + i)
+                piece.release()
+    return bad
+
+
+def _verify_body_batch(archive_dir: str, bodies: dict[str, int]) -> list[str]:
+    return verify_bodies(Path(archive_dir), bodies, on_read=_throttle)
+
+
+def _body_batches(bodies: dict[str, int]) -> list[dict[str, int]]:
+    batches, batch, batch_bytes = [], {}, 0
+    for sha256, size in bodies.items():
+        if batch and (batch_bytes + size > BODY_TASK_BYTES or len(batch) >= BODY_TASK_MAX):
+            batches.append(batch)
+            batch, batch_bytes = {}, 0
+        batch[sha256] = size
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _whole_file_sha256(asset_path: str) -> str:
+    h = hashlib.sha256()
+    with open(asset_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            _throttle(len(block))
+            h.update(block)
+    return h.hexdigest()
+
+
+def _manifest_problems(manifest: dict) -> list[str]:
+    """Inconsistencies between a manifest's chunk list and the values derived from it."""
+    chunks = manifest["chunks"]
+    problems = []
+    if manifest.get("chunk_count", len(chunks)) != len(chunks):
+        problems.append(f"chunk_count {manifest.get('chunk_count')} but {len(chunks)} chunks listed")
+    try:
+        merkle = _merkle_root([bytes.fromhex(c) for c in chunks]).hex()
+    except ValueError:
+        problems.append("malformed chunk digest")
+    else:
+        if merkle != manifest.get("merkle_root"):
+            problems.append("merkle_root does not match the chunk list")
+    return problems
+
+
+def _check_seal(archive_dir: Path) -> Optional[dict]:
+    seal_path = archive_dir / SEAL_FILENAME
+    if not seal_path.exists():
+        return None
+    seal = json.loads(seal_path.read_bytes())
+    mismatched = []
+    for entry in seal.get("manifests", []):
+        mp = archive_dir / entry["path"]
+        if not mp.exists() or hashlib.sha256(mp.read_bytes()).hexdigest() != entry["manifest_sha256"]:
+            mismatched.append(entry["path"])
+    return {"ok": not mismatched, "manifest_count": len(seal.get("manifests", [])), "mismatched": mismatched}
+
+
+class _AssetState:
+    def __init__(self, archive: str, manifest_path: Path, asset_path: Path, manifest: dict, tasks: int,
+                 check_whole: bool):
+        self.archive = archive
+        self.manifest_path = manifest_path
+        self.asset_path = asset_path
+        self.manifest = manifest
+        self.check_whole = check_whole
+        self.tasks_left = tasks + check_whole
+        self.bad_chunks: list[int] = []
+        self.whole_file_sha256: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started = time.monotonic()
+
+
+def _is_archive_dir(path: Path) -> bool:
+    return ((path / SEAL_FILENAME).exists() or uses_body_store(path)
+            or any(path.glob("*" + _MANIFEST_SUFFIX)))
+
+
+def _plan_archive(archive_dir: Path, whole_file: bool) -> tuple[list[_AssetState], list[dict]]:
+    """Assets to hash for one archive, plus records for manifests that could not be planned."""
+    assets, errors = [], []
+    check_whole = whole_file or not (archive_dir / SEAL_FILENAME).exists()
+    for mp in sorted(archive_dir.rglob("*" + _MANIFEST_SUFFIX)):
+        asset_path = mp.with_name(mp.name[: -len(_MANIFEST_SUFFIX)])
+        rel = mp.relative_to(archive_dir).as_posix()
+        try:
+            manifest = read_manifest(mp)
+            chunks = manifest["chunks"]
+        except (OSError, ValueError, KeyError) as e:
+            errors.append({"type": "asset", "archive": archive_dir.name, "manifest": rel, "ok": False,
+                           "error": f"unreadable manifest: {e}"})
+            continue
+        if not asset_path.exists():
+            errors.append({"type": "asset", "archive": archive_dir.name, "manifest": rel, "ok": False,
+                           "error": "asset missing"})
+            continue
+        tasks = max(1, -(-len(chunks) // CHUNKS_PER_TASK))
+        assets.append(_AssetState(archive_dir.name, mp, asset_path, manifest, tasks, check_whole))
+    return assets, errors
+
+
+def _asset_record(state: _AssetState, archive_dir: Path, check_par2: bool) -> dict:
+    manifest = state.manifest
+    size = state.asset_path.stat().st_size if state.asset_path.exists() else -1
+    expected_count = -(-size // manifest["chunk_size"]) if size > 0 else 0
+    length_mismatch = size != manifest.get("size", size) or expected_count != len(manifest["chunks"])
+    manifest_problems = _manifest_problems(manifest)
+    whole_file_mismatch = (state.whole_file_sha256 is not None
+                           and state.whole_file_sha256 != manifest.get("whole_file_sha256"))
+    ok = (state.error is None and not state.bad_chunks and not length_mismatch
+          and not manifest_problems and not whole_file_mismatch)
+    record = {
+        "type": "asset",
+        "archive": state.archive,
+        "asset": state.asset_path.relative_to(archive_dir).as_posix(),
+        "ok": ok,
+        "size": size,
+        "chunk_count": len(manifest["chunks"]),
+        "bad_chunk_indices": sorted(state.bad_chunks),
+        "length_mismatch": length_mismatch,
+        "whole_file_checked": state.whole_file_sha256 is not None,
+        "whole_file_mismatch": whole_file_mismatch,
+        "seconds": round(time.monotonic() - state.started, 3),
+    }
+    if state.error:
+        record["error"] = state.error
+    if manifest_problems:
+        record["manifest_problems"] = manifest_problems
+    if not ok and check_par2:
+        index_path = par2_mod.index_file_for(state.asset_path)
+        record["par2_recoverable"] = par2_mod.verify_recovery(index_path) if index_path.exists() else None
+    return record
+
+
+def _completed_archives(report_path: Path) -> dict[str, bool]:
+    """archive name -> ok, for every archive record already in the report. Records of
+    archives without one (interrupted half-way) and a torn last line are dropped from
+    the report, so those archives are reported afresh rather than twice."""
+    done = {}
+    if not report_path.exists():
+        return done
+    records = []
+    with report_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            records.append(record)
+            if record.get("type") == "archive":
+                done[record["archive"]] = bool(record.get("ok"))
+    kept = [r for r in records if r.get("archive") in done]
+    if len(kept) != len(records):
+        tmp_path = report_path.with_name(report_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for record in kept:
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+        os.replace(tmp_path, report_path)
+        print(f"Dropped {len(records) - len(kept)} record(s) of unfinished archives from {report_path}")
+    return done
+
+
+def verify_fleet(root: Path, report_path: Path, workers: int, max_mib_s: float, resume: bool,
+                 check_par2: bool, whole_file: bool = False) -> int:
+    archive_dirs = [root] if _is_archive_dir(root) else sorted(d for d in root.iterdir() if d.is_dir())
+    done = _completed_archives(report_path) if resume else {}
+    if not resume and report_path.exists():
+        report_path.unlink()
+    todo = [d for d in archive_dirs if d.name not in done]
+    print(f"{len(archive_dirs)} archive(s), {len(done)} already verified, {len(todo)} to go; "
+          f"{workers} worker(s), {'unlimited' if max_mib_s <= 0 else f'{max_mib_s} MiB/s'}")
+
+    failures = sum(1 for name, ok in done.items() if not ok)
+    total_bytes = 0
+    started = time.monotonic()
+    rate = max_mib_s * (1 << 20) / workers if max_mib_s > 0 else 0.0
+    with report_path.open("a", encoding="utf-8") as report, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rate,)) as pool:
+
+        def emit(record: dict) -> None:
+            report.write(json.dumps(record, sort_keys=True) + "\n")
+
+        # future -> ("chunks" | "whole", _AssetState) or ("bodies", (archive name, bytes))
+        in_flight: dict[Future, tuple[str, object]] = {}
+        archive_pending: dict[str, int] = {}  # assets and body batches not finished yet
+        archive_failed: dict[str, int] = {}
+        body_problems: dict[str, list[str]] = {}
+        archive_dirs_by_name = {d.name: d for d in todo}
+
+        def finish_archive(name: str) -> None:
+            nonlocal failures
+            archive_dir = archive_dirs_by_name[name]
+            record = {"type": "archive", "archive": name, "seal": _check_seal(archive_dir)}
+            bad = archive_failed.get(name, 0)
+            if record["seal"] is not None and not record["seal"]["ok"]:
+                bad += 1
+            if name in body_problems:
+                problems = body_problems.pop(name)
+                record["body_store"] = {"ok": not problems, "problems": problems[:100]}
+                bad += bool(problems)
+            record["ok"] = bad == 0
+            emit(record)
+            report.flush()
+            failures += not record["ok"]
+            print(f"{'✅' if record['ok'] else '❌'} {name}")
+
+        def submit_archive(archive_dir: Path) -> None:
+            assets, errors = _plan_archive(archive_dir, whole_file)
+            for record in errors:
+                emit(record)
+            name = archive_dir.name
+            archive_failed[name] = len(errors)
+            body_batches = []
+            if uses_body_store(archive_dir):
+                body_problems[name] = []
+                try:
+                    body_batches = _body_batches(read_body_index(archive_dir))
+                except (OSError, ValueError, KeyError) as e:
+                    body_problems[name].append(f"unreadable body index: {e}")
+            archive_pending[name] = len(assets) + len(body_batches)
+            if not archive_pending[name]:
+                finish_archive(name)
+                return
+            # The bodies are hashed by the workers under the same rate limit as the chunks.
+            for batch in body_batches:
+                in_flight[pool.submit(_verify_body_batch, str(archive_dir), batch)] = \
+                    ("bodies", (name, sum(batch.values())))
+            for state in assets:
+                chunks = state.manifest["chunks"]
+                for first in range(0, max(len(chunks), 1), CHUNKS_PER_TASK):
+                    future = pool.submit(_hash_chunk_range, str(state.asset_path), state.manifest["chunk_size"],
+                                         first, chunks[first:first + CHUNKS_PER_TASK])
+                    in_flight[future] = ("chunks", state)
+                if state.check_whole:
+                    in_flight[pool.submit(_whole_file_sha256, str(state.asset_path))] = ("whole", state)
+
+        queue = list(todo)
+        while queue or in_flight:
+            # Keep roughly two tasks per worker queued; plan more archives as they drain.
+            while queue and len(in_flight) < workers * 2:
+                submit_archive(queue.pop(0))
+            if not in_flight:
+                continue
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                kind, item = in_flight.pop(future)
+                if kind == "bodies":
+                    name, batch_bytes = item
+                    try:
+                        body_problems[name].extend(future.result())
+                    except Exception as e:
+                        body_problems[name].append(f"body check failed: {e}")
+                    total_bytes += batch_bytes
+                    archive_pending[name] -= 1
+                    if archive_pending[name] == 0:
+                        finish_archive(name)
+                    continue
+                state = item
+                try:
+                    if kind == "whole":
+                        state.whole_file_sha256 = future.result()
+                    else:
+                        state.bad_chunks.extend(future.result())
+                except Exception as e:
+                    state.error = str(e)
+                state.tasks_left -= 1
+                if state.tasks_left:
+                    continue
+                archive_dir = archive_dirs_by_name[state.archive]
+                record = _asset_record(state, archive_dir, check_par2)
+                emit(record)
+                total_bytes += max(record["size"], 0)
+                if not record["ok"]:
+                    archive_failed[state.archive] += 1
+                    print(f"  ❌ {state.archive}/{record['asset']}: {len(record['bad_chunk_indices'])} bad chunk(s)"
+                          f"{' (length mismatch)' if record['length_mismatch'] else ''}"
+                          f"{' (whole-file hash mismatch)' if record['whole_file_mismatch'] else ''}"
+                          f"{''.join(f' ({p})' for p in record.get('manifest_problems', []))}")
+                archive_pending[state.archive] -= 1
+                if archive_pending[state.archive] == 0:
+                    finish_archive(state.archive)
+
+    elapsed = time.monotonic() - started
+    print(f"Verified {total_bytes / (1 << 30):.2f} GiB in {elapsed:.0f}s "
+          f"({total_bytes / (1 << 20) / max(elapsed, 1e-9):.1f} MiB/s); {failures} archive(s) failed. "
+          f"Report: {report_path}")
+    return 0 if failures == 0 else 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify every integrity-protected archive under a directory.")
+    parser.add_argument("root", type=Path, help="Archives directory (or a single archive directory).")
+    parser.add_argument("--report", type=Path, default=Path("verify_report.jsonl"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-mib-s", type=float, default=0.0, help="Combined read rate cap; 0 = unlimited.")
+    parser.add_argument("--resume", action="store_true", help="Skip archives already completed in --report.")
+    parser.add_argument("--par2", action="store_true", help="Run `par2 verify` on assets that fail.")
+    parser.add_argument("--whole-file", action="store_true",
+                        help="Recompute whole-file SHA-256s in sealed archives too (always done for unsealed ones).")
+    args = parser.parse_args()
+    sys.exit(verify_fleet(args.root.resolve(), args.report, max(1, args.workers), args.max_mib_s,
+                          args.resume, args.par2, args.whole_file))
+
+
+if __name__ == "__main__":
+    main()
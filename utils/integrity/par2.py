@@ -125,6 +125,51 @@ def create_recovery(
     return produced
 
 
+def create_tree_recovery(
+    tree: Path,
+    redundancy_pct: int = DEFAULT_REDUNDANCY_PCT,
+) -> list[Path]:
+    """
+    Generate one PAR2 recovery set covering every file under the directory `tree`
+    (recursively), written as `<tree>.par2` beside it with paths stored relative
+    to its parent, so `repair(index_file_for(tree))` restores damaged or missing
+    files in place.
+
+    Used for trees of many small files (the HAR body store), where a set per
+    file would double the file count.
+    """
+    exe = ensure_par2_on_path()
+    tree = Path(tree).resolve()
+    if not tree.is_dir():
+        raise FileNotFoundError(f"Cannot create PAR2 recovery for missing directory: {tree}")
+    base = tree.parent
+    par2_index = index_file_for(tree)
+    # Only this set's files: a sibling such as bodies.json.par2 shares the prefix.
+    for old in [par2_index, *base.glob(tree.name + ".vol*.par2")]:
+        old.unlink(missing_ok=True)
+    cmd = [
+        str(exe),
+        "create",
+        f"-r{int(redundancy_pct)}",
+        "-n1",
+        "-q",
+        "-q",
+        "-R",
+        f"-B{base}",
+        "--",
+        str(par2_index),
+        str(tree),
+    ]
+    subprocess.run(
+        cmd,
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=str(base),
+    )
+    return sorted(p for p in [par2_index, *base.glob(tree.name + ".vol*.par2")] if p.exists())
+
+
 def index_file_for(path: Path) -> Path:
     path = Path(path)
     return path.with_suffix(path.suffix + ".par2")
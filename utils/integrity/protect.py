@@ -18,6 +18,7 @@ from pydantic import BaseModel
 
 from utils.integrity.chunk_manifest import (
     DEFAULT_CHUNK_SIZE,
+    ChunkHasher,
     build_manifest,
     serialize_manifest,
     write_manifest,
@@ -77,6 +78,7 @@ def protect_file(
     redundancy_pct: int = par2_mod.DEFAULT_REDUNDANCY_PCT,
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     timestamp: bool = False,
+    prehashed: Optional[ChunkHasher] = None,
 ) -> ProtectionResult:
     """
     Protect a single file end-to-end.
@@ -91,6 +93,10 @@ def protect_file(
     do not raise, since archiving must always finish writing metadata even if a
     secondary tool is missing. The chunk manifest itself is mandatory; if its
     creation fails the exception propagates.
+
+    `prehashed` lets a caller that just wrote the file hand over the chunk
+    hashes it computed on the way out, skipping the manifest's re-read. It is
+    ignored unless its size and chunk size match the file on disk.
     """
     path = Path(path).resolve()
     if not path.exists():
@@ -111,7 +117,10 @@ def protect_file(
         traceback.print_exc()
         print(f"⚠️  PAR2 recovery generation failed for {path.name}: {e}")
 
-    manifest = build_manifest(path, chunk_size=chunk_size, par2=par2_record)
+    if prehashed is not None and prehashed.chunk_size == chunk_size and prehashed.size == path.stat().st_size:
+        manifest = prehashed.manifest(path.name, par2=par2_record)
+    else:
+        manifest = build_manifest(path, chunk_size=chunk_size, par2=par2_record)
     manifest_path = path.with_suffix(path.suffix + ".manifest.json")
     manifest_hash = write_manifest(manifest, manifest_path)
 
@@ -49,11 +49,15 @@ class SealResult(BaseModel):
     merkle_root: str
 
 
-def seal_archive(archive_dir: Path, summary_name: str = SEAL_FILENAME) -> SealResult:
+def seal_archive(archive_dir: Path, summary_name: str = SEAL_FILENAME, stamp: bool = True) -> SealResult:
     """
     Walk `archive_dir` recursively, hash every `*.manifest.json`, write a single
     summary file, and OpenTimestamp it. Returns a `SealResult` even if OTS
     stamping fails (ots_path will be None in that case).
+
+    Pass `stamp=False` when sealing many archives at once and stamp the
+    summaries together with utils.opentimestamps.batch_stamper (one calendar
+    round trip for the whole batch).
     """
     archive_dir = Path(archive_dir).resolve()
     summary_path = archive_dir / summary_name
@@ -90,11 +94,12 @@ def seal_archive(archive_dir: Path, summary_name: str = SEAL_FILENAME) -> SealRe
     summary_hash = hashlib.sha256(payload).hexdigest()
 
     ots_path: Optional[Path] = None
-    try:
-        ots_path = timestamp_file(summary_path)
-    except Exception as e:
-        traceback.print_exc()
-        print(f"⚠️  OpenTimestamps stamping failed for {summary_path.name}: {e}")
+    if stamp:
+        try:
+            ots_path = timestamp_file(summary_path)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"⚠️  OpenTimestamps stamping failed for {summary_path.name}: {e}")
 
     return SealResult(
         summary_path=summary_path,
@@ -21,6 +21,7 @@ from typing import Optional
 
 from pydantic import BaseModel
 
+from extractors.har_body_store import BODY_DIR, uses_body_store, verify_body_store
 from utils.integrity.chunk_manifest import (
     ChunkVerifyReport,
     read_manifest,
@@ -108,6 +109,28 @@ def _verify_archive_dir(archive_dir: Path, *, attempt_repair: bool) -> int:
         print(f"{status} {r.asset_path.relative_to(archive_dir)}{repaired}{bad_summary}")
         if not r.final_whole_file_ok:
             failures += 1
+    if uses_body_store(archive_dir):
+        # Bodies are named by their SHA-256 and listed in the (manifested) bodies.json;
+        # bodies.par2 covers the whole bodies/ tree. A repair is re-checked against the
+        # hashes, so a damaged or substituted PAR2 set cannot pass a wrong body off.
+        problems = verify_body_store(archive_dir)
+        bodies_par2 = par2_mod.index_file_for(archive_dir / BODY_DIR)
+        if problems and attempt_repair and bodies_par2.exists():
+            try:
+                repaired = par2_mod.repair(bodies_par2)
+            except par2_mod.Par2NotFoundError as e:
+                print(f"⚠️  bodies/: {e}")
+                repaired = False
+            if repaired:
+                remaining = verify_body_store(archive_dir)
+                print(f"🔧 bodies/: par2-repaired {len(problems) - len(remaining)} of {len(problems)} problem(s)")
+                problems = remaining
+        for problem in problems[:20]:
+            print(f"❌ bodies/: {problem}")
+        if len(problems) > 20:
+            print(f"❌ bodies/: ... {len(problems) - 20} more")
+        print(f"{'❌' if problems else '✅'} body store ({len(problems)} problem(s))")
+        failures += len(problems)
     return 0 if failures == 0 else 2
 
 
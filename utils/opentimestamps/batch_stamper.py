@@ -0,0 +1,240 @@
+"""
+batch_stamper.py
+
+Stamp many files with ONE OpenTimestamps calendar round trip.
+
+timestamp_file() shells out to `ots stamp` once per file, so stamping N archive
+seals costs N calendar round trips, one after another. The batch stamper
+instead:
+
+  1. hashes every pending file (SHA-256) and salts each digest with a random
+     nonce (append nonce, SHA-256), as `ots stamp` does, so a proof never
+     reveals its siblings' digests;
+  2. builds a local binary Merkle tree over the salted leaves;
+  3. submits only the root to each calendar (POST <calendar>/digest);
+  4. writes, per file, a standard detached `<file>.ots` proof: the file digest,
+     the append/prepend + SHA-256 path from its leaf to the root, then the
+     calendar's timestamp for the root.
+
+The proofs are ordinary .ots files: `ots upgrade` / `ots verify` (and
+timestamper_opentimestamps.verify_timestamp) handle them as usual. The binary
+format (header, varuint/varbytes, op tags, 0xff branch markers) is implemented
+here directly, so no opentimestamps library is needed in-process.
+
+Calendars come from OTS_CALENDARS (comma-separated URLs) or DEFAULT_CALENDARS;
+OTS_MIN_CALENDARS (default 1) must accept the root or stamp() raises. Point
+OTS_CALENDARS at utils/opentimestamps/stub_calendar.py to test offline.
+
+Usage:
+    uv run python -m utils.opentimestamps.batch_stamper <file> [<file> ...] [--calendar URL ...]
+"""
+
+import argparse
+import hashlib
+import os
+import secrets
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+HEADER_MAGIC = b"\x00OpenTimestamps\x00\x00Proof\x00\xbf\x89\xe2\xe8\x84\xe8\x92\x94"
+MAJOR_VERSION = 1
+
+OP_SHA256 = 0x08
+OP_APPEND = 0xf0
+OP_PREPEND = 0xf1
+_UNARY_OPS = {0x02, 0x03, 0x08, 0x67, 0xf2, 0xf3}  # sha1, ripemd160, sha256, keccak256, reverse, hexlify
+_BINARY_OPS = {OP_APPEND, OP_PREPEND}
+_ATTESTATION = 0x00
+_BRANCH = 0xff
+
+DEFAULT_CALENDARS = [
+    "https://a.pool.opentimestamps.org",
+    "https://b.pool.opentimestamps.org",
+    "https://a.pool.eternitywall.com",
+    "https://ots.btc.catallaxy.com",
+]
+_NONCE_BYTES = 16
+
+
+def varuint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7f
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def varbytes(b: bytes) -> bytes:
+    return varuint(len(b)) + b
+
+
+def _read_varuint(buf: bytes, pos: int) -> tuple[int, int]:
+    value, shift = 0, 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        value |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _skip_item(buf: bytes, pos: int) -> int:
+    """End offset of one timestamp item (attestation, or op + its child timestamp) starting at pos."""
+    tag = buf[pos]
+    pos += 1
+    if tag == _ATTESTATION:
+        pos += 8
+        length, pos = _read_varuint(buf, pos)
+        return pos + length
+    if tag in _BINARY_OPS:
+        length, pos = _read_varuint(buf, pos)
+        pos += length
+    elif tag not in _UNARY_OPS:
+        raise ValueError(f"Unknown OpenTimestamps op tag 0x{tag:02x}")
+    return _skip_timestamp(buf, pos)
+
+
+def _skip_timestamp(buf: bytes, pos: int) -> int:
+    while buf[pos] == _BRANCH:
+        pos = _skip_item(buf, pos + 1)
+    return _skip_item(buf, pos)
+
+
+def timestamp_items(serialized: bytes) -> list[bytes]:
+    """Split a serialized timestamp into its top-level items (branch markers removed)."""
+    items, pos = [], 0
+    while True:
+        branch = serialized[pos] == _BRANCH
+        start = pos + 1 if branch else pos
+        pos = _skip_item(serialized, start)
+        items.append(serialized[start:pos])
+        if not branch:
+            if pos != len(serialized):
+                raise ValueError("Trailing bytes after timestamp")
+            return items
+
+
+def join_items(items: list[bytes]) -> bytes:
+    """Serialize a timestamp node from its items: every item but the last gets a branch marker."""
+    return b"".join(bytes([_BRANCH]) + item for item in items[:-1]) + items[-1]
+
+
+def _calendars() -> list[str]:
+    raw = os.getenv("OTS_CALENDARS")
+    return [c.strip().rstrip("/") for c in raw.split(",") if c.strip()] if raw else list(DEFAULT_CALENDARS)
+
+
+def submit_to_calendar(calendar: str, digest: bytes, timeout: float = 10.0) -> bytes:
+    """POST a 32-byte digest to a calendar; returns its serialized timestamp for that digest."""
+    request = urllib.request.Request(
+        f"{calendar}/digest",
+        data=digest,
+        headers={"Accept": "application/vnd.opentimestamps.v1", "User-Agent": "evidenceplatform-batch-stamper"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read(10000)
+    timestamp_items(body)  # reject anything that isn't a well-formed timestamp
+    return body
+
+
+def _sha256_file(path: Path) -> bytes:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.digest()
+
+
+def _merkle_paths(leaves: list[bytes]) -> tuple[bytes, list[bytes]]:
+    """Root of a binary SHA-256 tree over ``leaves`` (odd nodes paired with themselves, as in
+    chunk_manifest) and, per leaf, the serialized op path from the leaf up to the root."""
+    paths = [b""] * len(leaves)
+    members = [[i] for i in range(len(leaves))]  # leaf indices under each node of the current layer
+    layer = list(leaves)
+    while len(layer) > 1:
+        if len(layer) % 2 == 1:
+            layer.append(layer[-1])
+            members.append([])  # the duplicate carries no leaves of its own
+        next_layer, next_members = [], []
+        for i in range(0, len(layer), 2):
+            left, right = layer[i], layer[i + 1]
+            for leaf in members[i]:
+                paths[leaf] += bytes([OP_APPEND]) + varbytes(right) + bytes([OP_SHA256])
+            for leaf in members[i + 1]:
+                paths[leaf] += bytes([OP_PREPEND]) + varbytes(left) + bytes([OP_SHA256])
+            next_layer.append(hashlib.sha256(left + right).digest())
+            next_members.append(members[i] + members[i + 1])
+        layer, members = next_layer, next_members
+    return layer[0], paths
+
+
+class BatchStamper:
+    def __init__(self, calendars: Optional[list[str]] = None, min_calendars: Optional[int] = None,
+                 timeout: float = 10.0):
+        self.calendars = calendars or _calendars()
+        self.min_calendars = min_calendars or int(os.getenv("OTS_MIN_CALENDARS", "1"))
+        self.timeout = timeout
+        self.pending: list[tuple[Path, Path]] = []
+
+    def add(self, path: Path, ots_path: Optional[Path] = None) -> None:
+        path = Path(path).resolve()
+        self.pending.append((path, Path(ots_path) if ots_path else path.with_suffix(path.suffix + ".ots")))
+
+    def stamp(self) -> list[Path]:
+        """Stamp every pending file with one submission per calendar; returns the proof paths written."""
+        if not self.pending:
+            return []
+        file_digests = [_sha256_file(path) for path, _ in self.pending]
+        nonces = [secrets.token_bytes(_NONCE_BYTES) for _ in self.pending]
+        leaves = [hashlib.sha256(d + n).digest() for d, n in zip(file_digests, nonces)]
+        root, paths = _merkle_paths(leaves)
+
+        root_items: list[bytes] = []
+        failures = []
+        for calendar in self.calendars:
+            try:
+                root_items.extend(timestamp_items(submit_to_calendar(calendar, root, self.timeout)))
+            except Exception as e:
+                failures.append(f"{calendar}: {e}")
+        accepted = len(self.calendars) - len(failures)
+        for failure in failures:
+            print(f"⚠️  Calendar submission failed: {failure}")
+        if accepted < self.min_calendars:
+            raise RuntimeError(f"Only {accepted} calendar(s) accepted the batch root; need {self.min_calendars}")
+        root_timestamp = join_items(root_items)
+
+        written = []
+        for (path, ots_path), digest, nonce, leaf_path in zip(self.pending, file_digests, nonces, paths):
+            proof = (
+                HEADER_MAGIC + varuint(MAJOR_VERSION) + bytes([OP_SHA256]) + digest
+                + bytes([OP_APPEND]) + varbytes(nonce) + bytes([OP_SHA256])
+                + leaf_path + root_timestamp
+            )
+            ots_path.parent.mkdir(parents=True, exist_ok=True)
+            ots_path.write_bytes(proof)
+            written.append(ots_path)
+        print(f"✅ Stamped {len(written)} file(s) with one root via {accepted} calendar(s)")
+        self.pending = []
+        return written
+
+
+def stamp_files(paths: list[Path], calendars: Optional[list[str]] = None) -> list[Path]:
+    stamper = BatchStamper(calendars)
+    for p in paths:
+        stamper.add(p)
+    return stamper.stamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stamp files with one OpenTimestamps calendar round trip.")
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--calendar", action="append", help="Calendar URL (repeatable); default OTS_CALENDARS.")
+    args = parser.parse_args()
+    stamp_files(args.files, args.calendar)
@@ -12,13 +12,20 @@ Files timestamped per archive (if they exist and have no .ots sibling):
     videos/full_track_*hashes_hash_*.txt  (legacy schemes, kept harmless;
     new archives won't produce these)
 
+All missing proofs across all archives are stamped as one batch (one calendar
+round trip, see batch_stamper.py). Pass --per-file to fall back to one
+`ots stamp` call per file.
+
 Usage:
-    uv run python utils/opentimestamps/retroactive_timestamping.py
+    uv run python utils/opentimestamps/retroactive_timestamping.py [--per-file]
 """
 
+import sys
+
 from pathlib import Path
 
 from root_anchor import ROOT_DIR
+from utils.opentimestamps.batch_stamper import BatchStamper
 from utils.opentimestamps.timestamper_opentimestamps import timestamp_file
 
 ARCHIVES_DIR = Path(ROOT_DIR) / "archives"
@@ -37,21 +44,23 @@ HASH_FILE_PATTERNS = [
 ]
 
 
+def unstamped_files(archive_dir: Path) -> list[Path]:
+    """Hash files in archive_dir that are missing a .ots proof."""
+    candidates = []
+    for pattern in HASH_FILE_PATTERNS:
+        candidates.extend(archive_dir.glob(pattern))
+    return [f for f in sorted(candidates) if not f.with_suffix(f.suffix + ".ots").exists()]
+
+
 def stamp_archive(archive_dir: Path) -> list[Path]:
     """
-    Timestamps any hash files in archive_dir that are missing a .ots proof.
-    Returns the list of files that were successfully timestamped.
+    Timestamps any hash files in archive_dir that are missing a .ots proof,
+    one `ots stamp` call per file. Returns the list of files that were
+    successfully timestamped.
     """
     stamped = []
 
-    candidates = []
-    for pattern in HASH_FILE_PATTERNS:
-        candidates.extend(archive_dir.glob(pattern))
-
-    for hash_file in sorted(candidates):
-        ots_file = hash_file.with_suffix(hash_file.suffix + ".ots")
-        if ots_file.exists():
-            continue
+    for hash_file in unstamped_files(archive_dir):
 
         print(f"  Stamping {hash_file.relative_to(archive_dir)} ...", end=" ", flush=True)
         try:
@@ -64,7 +73,7 @@ def stamp_archive(archive_dir: Path) -> list[Path]:
     return stamped
 
 
-def stamp_all_archives(archives_dir: Path = ARCHIVES_DIR) -> None:
+def stamp_all_archives(archives_dir: Path = ARCHIVES_DIR, per_file: bool = False) -> None:
     """
     Iterates over every subdirectory in archives_dir and timestamps any
     hash files that are missing .ots proofs.
@@ -79,6 +88,18 @@ def stamp_all_archives(archives_dir: Path = ARCHIVES_DIR) -> None:
         print(f"No archives found in {archives_dir}")
         return
 
+    if not per_file:
+        stamper = BatchStamper()
+        for archive_dir in archive_dirs:
+            for hash_file in unstamped_files(archive_dir):
+                stamper.add(hash_file)
+        count = len(stamper.pending)
+        if count:
+            print(f"Stamping {count} file(s) across {len(archive_dirs)} archive(s) as one batch...")
+            stamper.stamp()
+        print(f"\nDone. Total files timestamped: {count}")
+        return
+
     total_stamped = 0
 
     for archive_dir in archive_dirs:
@@ -93,4 +114,4 @@ def stamp_all_archives(archives_dir: Path = ARCHIVES_DIR) -> None:
 
 
 if __name__ == "__main__":
-    stamp_all_archives()
+    stamp_all_archives(per_file="--per-file" in sys.argv[1:])
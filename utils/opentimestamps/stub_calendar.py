@@ -0,0 +1,83 @@
+"""
+stub_calendar.py
+
+Minimal local stand-in for an OpenTimestamps calendar, for exercising
+batch_stamper.py offline. Answers POST /digest like a real calendar: with a
+serialized timestamp for the submitted digest (append a random nonce, SHA-256,
+then a PendingAttestation naming this server). The proofs it yields parse with
+`ots info` but will never upgrade to a Bitcoin attestation.
+
+Prints how many digests it received, which makes the O(1) round trips of a
+batch visible:
+
+    uv run python -m utils.opentimestamps.stub_calendar --port 14788
+    OTS_CALENDARS=http://127.0.0.1:14788 uv run python -m utils.opentimestamps.batch_stamper a b c
+"""
+
+import argparse
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.opentimestamps.batch_stamper import OP_APPEND, OP_SHA256, varbytes
+
+PENDING_ATTESTATION_TAG = bytes.fromhex("83dfe30d2ef90c8e")
+
+
+class StubCalendar:
+    """Runs the stub on a background thread; ``url`` is the calendar URL to hand the stamper."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        stub = self
+        self.digests: list[bytes] = []
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip("/") != "/digest":
+                    self.send_error(404)
+                    return
+                digest = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not 1 <= len(digest) <= 64:
+                    self.send_error(400)
+                    return
+                with stub._lock:
+                    stub.digests.append(digest)
+                uri = stub.url.encode("ascii")
+                body = (
+                    bytes([OP_APPEND]) + varbytes(secrets.token_bytes(8)) + bytes([OP_SHA256])
+                    + b"\x00" + PENDING_ATTESTATION_TAG + varbytes(varbytes(uri))
+                )
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "StubCalendar":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=14788)
+    args = parser.parse_args()
+    calendar = StubCalendar(port=args.port).start()
+    print(f"Stub calendar listening on {calendar.url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"Received {len(calendar.digests)} digest(s)")
+        calendar.stop()
@@ -0,0 +1,334 @@
+"""
+Lightweight, dependency-free tracing for the archive loader.
+
+Spans nest through a ContextVar, so a span opened inside another one (in the
+same thread, in an asyncio task, or in asyncio.to_thread, which copy the
+context) records it as its parent. Three ways to open one:
+
+    with tracer.span("B.archive", archive=name) as span:   # a block (or `async with`)
+        span.items = len(structures)                       # optional, for items/s
+
+    @traced("D.image_decode")                              # a whole function (sync or async)
+    def load_image(...): ...
+
+    steps = tracer.steps()                                 # consecutive phases of a long
+    steps.step("B.metadata"); ...; steps.step("B.parse")   # function, without re-indenting it
+    steps.end()
+
+Tracing is off unless LOADER_TRACE=true or tracer.enable() is called (the
+loader's --trace-json / --trace-chrome flags do that); disabled spans cost one
+attribute check. Results:
+
+  * summary(): per span name, count, total seconds, p50/p90/p99/max, items and
+    items per second (per busy second of that span, and per wall second from
+    its first start to its last end, which is what matters for concurrent
+    spans such as thumbnails);
+  * export_json(path): the summary plus every span;
+  * export_chrome_trace(path): Chrome trace-event JSON, viewable offline in
+    chrome://tracing or https://ui.perfetto.dev (load the file).
+
+Raw span records are capped at MAX_RECORDED_SPANS; beyond that only the
+aggregates are kept. Per span name those are a count, total, max, items and a
+uniform reservoir sample of at most MAX_DURATION_SAMPLES durations, from which
+the percentiles come (exact until a name has more spans than that), so a
+long-lived process with tracing on (the server's incorporation jobs) does not
+grow without bound. The server resets the tracer when a job starts with no
+other job running.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Optional
+
+MAX_RECORDED_SPANS = 500_000
+MAX_DURATION_SAMPLES = 10_000
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "items", "id", "parent_id", "tid", "start_ns", "end_ns", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.items: Optional[int] = None
+        self.id = 0
+        self.parent_id: Optional[int] = None
+        self.tid = 0
+        self.start_ns = 0
+        self.end_ns = 0
+        self._token = None
+
+    def start(self) -> "Span":
+        parent = _current.get()
+        self.parent_id = parent.id if parent is not None else None
+        self.id = self.tracer._next_id()
+        self.tid = threading.get_ident()
+        self._token = _current.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self._token is None:
+            return
+        self.end_ns = time.perf_counter_ns()
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            pass  # ended from a different context than it was started in
+        self._token = None
+        if error is not None:
+            self.attrs["error"] = type(error).__name__
+        self.tracer._record(self)
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end(exc)
+
+    # Usable in `async with semaphore, tracer.span(...)` too; entering never awaits.
+    async def __aenter__(self) -> "Span":
+        return self.start()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.end(exc)
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled; accepts the same calls and does nothing."""
+
+    def __init__(self):
+        self.attrs: dict = {}
+        self.items: Optional[int] = None
+
+    def start(self):
+        return self
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+class _Steps:
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.current = None
+
+    def step(self, name: str, **attrs) -> Any:
+        """End the previous step (if any) and start `name`; returns the new span."""
+        self.end()
+        self.current = self.tracer.start(name, **attrs)
+        return self.current
+
+    def end(self) -> None:
+        if self.current is not None:
+            self.current.end()
+            self.current = None
+
+
+class _Aggregate:
+    __slots__ = ("count", "total_s", "max_s", "samples", "items", "first_start_ns", "last_end_ns", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.samples: list[float] = []  # reservoir of at most MAX_DURATION_SAMPLES durations
+        self.items = 0
+        self.first_start_ns = None
+        self.last_end_ns = 0
+        self.errors = 0
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    # Nearest-rank percentile on an already-sorted list: the ceil(q * n)-th value. The
+    # epsilon keeps float noise (0.7 * 10 == 7.000000000000001) from moving up a rank.
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values) - 1e-9) - 1))
+    return sorted_values[index]
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._ids = 0
+        self._spans: list[Span] = []
+        self._dropped = 0
+        self._aggregates: dict[str, _Aggregate] = {}
+        self._rng = random.Random()
+        self._epoch_ns = time.perf_counter_ns()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._aggregates.clear()
+            self._dropped = 0
+            self._epoch_ns = time.perf_counter_ns()
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            agg = self._aggregates.get(span.name)
+            if agg is None:
+                agg = self._aggregates[span.name] = _Aggregate()
+            duration = (span.end_ns - span.start_ns) / 1e9
+            agg.count += 1
+            agg.total_s += duration
+            agg.max_s = max(agg.max_s, duration)
+            if len(agg.samples) < MAX_DURATION_SAMPLES:
+                agg.samples.append(duration)
+            else:
+                # Algorithm R: every span so far is in the sample with equal probability.
+                slot = self._rng.randrange(agg.count)
+                if slot < MAX_DURATION_SAMPLES:
+                    agg.samples[slot] = duration
+            if span.items:
+                agg.items += span.items
+            if agg.first_start_ns is None or span.start_ns < agg.first_start_ns:
+                agg.first_start_ns = span.start_ns
+            agg.last_end_ns = max(agg.last_end_ns, span.end_ns)
+            if "error" in span.attrs:
+                agg.errors += 1
+            if len(self._spans) < MAX_RECORDED_SPANS:
+                self._spans.append(span)
+            else:
+                self._dropped += 1
+
+    def span(self, name: str, items: Optional[int] = None, **attrs) -> Any:
+        """A span for use in a with-block (not started until entered)."""
+        if not self.enabled:
+            return _NoopSpan()
+        span = Span(self, name, attrs)
+        span.items = items
+        return span
+
+    def start(self, name: str, items: Optional[int] = None, **attrs) -> Any:
+        """Start a span now; call .end() on it (in a finally) when done."""
+        return self.span(name, items, **attrs).start()
+
+    def steps(self) -> _Steps:
+        return _Steps(self)
+
+    def summary(self) -> dict[str, dict]:
+        with self._lock:
+            aggregates = {name: (a.count, a.total_s, a.max_s, list(a.samples), a.items, a.first_start_ns,
+                                 a.last_end_ns, a.errors)
+                          for name, a in self._aggregates.items()}
+        out = {}
+        for name, (count, total, max_s, durations, items, first, last, errors) in sorted(aggregates.items()):
+            durations.sort()
+            wall = (last - first) / 1e9 if first is not None else 0.0
+            out[name] = {
+                "count": count,
+                "errors": errors,
+                "total_s": round(total, 4),
+                "p50_s": round(_percentile(durations, 0.50), 4),
+                "p90_s": round(_percentile(durations, 0.90), 4),
+                "p99_s": round(_percentile(durations, 0.99), 4),
+                "max_s": round(max_s, 4),
+                "items": items,
+                "items_per_s": round(items / total, 2) if items and total > 0 else None,
+                "items_per_wall_s": round(items / wall, 2) if items and wall > 0 else None,
+            }
+        return out
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        summary = self.summary()
+        if not summary:
+            return
+        lines = [f"{'span':40s} {'count':>7s} {'total s':>9s} {'p50 s':>8s} {'p90 s':>8s} {'p99 s':>8s} "
+                 f"{'max s':>8s} {'items/s':>9s}"]
+        for name, s in summary.items():
+            rate = s["items_per_wall_s"] or s["items_per_s"]
+            lines.append(f"{name:40s} {s['count']:7d} {s['total_s']:9.2f} {s['p50_s']:8.3f} {s['p90_s']:8.3f} "
+                         f"{s['p99_s']:8.3f} {s['max_s']:8.3f} {rate if rate is not None else '-':>9}")
+        logger.info("Trace summary:\n" + "\n".join(lines))
+
+    def _span_dicts(self) -> list[dict]:
+        with self._lock:
+            spans = list(self._spans)
+        return [
+            {
+                "id": s.id, "parent": s.parent_id, "name": s.name, "thread": s.tid,
+                "start_s": round((s.start_ns - self._epoch_ns) / 1e9, 6),
+                "duration_s": round((s.end_ns - s.start_ns) / 1e9, 6),
+                "items": s.items, "attrs": s.attrs,
+            }
+            for s in spans
+        ]
+
+    def export_json(self, path: Path) -> Path:
+        path = Path(path)
+        payload = {"summary": self.summary(), "dropped_spans": self._dropped, "spans": self._span_dicts()}
+        path.write_text(json.dumps(payload, default=str), encoding="utf-8")
+        return path
+
+    def export_chrome_trace(self, path: Path) -> Path:
+        path = Path(path)
+        pid = os.getpid()
+        events = []
+        for s in self._span_dicts():
+            args = dict(s["attrs"])
+            if s["items"] is not None:
+                args["items"] = s["items"]
+            events.append({
+                "name": s["name"], "cat": s["name"].split(".", 1)[0], "ph": "X", "pid": pid, "tid": s["thread"],
+                "ts": round(s["start_s"] * 1e6, 1), "dur": round(s["duration_s"] * 1e6, 1), "args": args,
+            })
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str), encoding="utf-8")
+        return path
+
+
+tracer = Tracer(enabled=os.getenv("LOADER_TRACE", "false").lower() in ("1", "true", "yes"))
+
+
+def traced(name: str):
+    """Decorator: run the function (sync or async) inside a span called `name`."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with tracer.span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate